@@ -7,6 +7,7 @@ uses async SQLAlchemy. We bridge this with `run_async()`.
 """
 
 import asyncio
+import re
 from logging.config import fileConfig
 
 from alembic import context
@@ -18,7 +19,10 @@ from sqlalchemy.ext.asyncio import create_async_engine
 # with Base.metadata — Alembic needs this for --autogenerate to work.
 from hts_oracle.config import get_settings
 from hts_oracle.db import Base
-from hts_oracle.models import HtsCode, Classification, BatchJob  # noqa: F401
+from hts_oracle.models import (  # noqa: F401
+    HtsCode, Classification, BatchJob, BatchJobEvent, BatchJobItem, BatchBlob,
+    ExtractionCacheEntry, CatalogRevision, ImportJob, RateLimitCounter,
+)
 
 # Alembic Config object — provides access to alembic.ini values
 config = context.config
@@ -31,6 +35,17 @@ if config.config_file_name is not None:
 # Base.metadata contains all tables defined by our ORM models.
 target_metadata = Base.metadata
 
+# Tables the HTS import creates at runtime — catalog revisions
+# (hts_codes_r1, ...), the --rebuild shadow table and the COPY staging
+# table. They aren't models, so --autogenerate must not try to drop them.
+_RUNTIME_TABLES = re.compile(r"^hts_codes_(r\d+|shadow|import_staging)$")
+
+
+def include_name(name, type_, parent_names):
+    if type_ == "table":
+        return not _RUNTIME_TABLES.match(name)
+    return True
+
 
 def run_migrations_offline() -> None:
     """
@@ -44,6 +59,7 @@ def run_migrations_offline() -> None:
     context.configure(
         url=settings.database_url,
         target_metadata=target_metadata,
+        include_name=include_name,
         literal_binds=True,
     )
     with context.begin_transaction():
@@ -52,7 +68,9 @@ def run_migrations_offline() -> None:
 
 def do_run_migrations(connection):
     """Run migrations using an existing database connection."""
-    context.configure(connection=connection, target_metadata=target_metadata)
+    context.configure(
+        connection=connection, target_metadata=target_metadata, include_name=include_name,
+    )
     with context.begin_transaction():
         context.run_migrations()
 
@@ -0,0 +1,69 @@
+"""
+Batch job queue — worker bookkeeping columns + per-job event log.
+
+This migration turns batch_jobs into a durable job queue:
+  1. worker_id / heartbeat_at / attempts / started_at on batch_jobs
+     (workers claim jobs with FOR UPDATE SKIP LOCKED and heartbeat while running)
+  2. A partial index over pending jobs (the only rows workers search)
+  3. batch_job_events table — the append-only log the SSE endpoint tails
+
+Run with: alembic upgrade head
+Undo with: alembic downgrade -1
+
+Revision ID: 002
+Revises: 001
+"""
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "002"
+down_revision: str | None = "001"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    # --- Step 1: Queue bookkeeping on batch_jobs ---
+    op.add_column("batch_jobs", sa.Column("worker_id", sa.String(100)))
+    op.add_column("batch_jobs", sa.Column("heartbeat_at", sa.DateTime))
+    op.add_column(
+        "batch_jobs",
+        sa.Column("attempts", sa.Integer, nullable=False, server_default="0"),
+    )
+    op.add_column("batch_jobs", sa.Column("started_at", sa.DateTime))
+
+    # Workers poll for the oldest pending job — keep that lookup tiny
+    op.create_index(
+        "ix_batch_jobs_pending",
+        "batch_jobs",
+        ["id"],
+        postgresql_where=sa.text("status = 'pending'"),
+    )
+
+    # --- Step 2: batch_job_events (append-only event log) ---
+    op.create_table(
+        "batch_job_events",
+        sa.Column("id", sa.BigInteger, primary_key=True),
+        sa.Column(
+            "job_id",
+            sa.Integer,
+            sa.ForeignKey("batch_jobs.id", ondelete="CASCADE"),
+            nullable=False,
+        ),
+        sa.Column("seq", sa.Integer, nullable=False),
+        sa.Column("payload", sa.dialects.postgresql.JSONB, nullable=False),
+        sa.Column("created_at", sa.DateTime, server_default=sa.func.now()),
+        # Also serves as the (job_id, seq) index for "events after Last-Event-ID"
+        sa.UniqueConstraint("job_id", "seq", name="uq_batch_job_events_job_seq"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("batch_job_events")
+    op.drop_index("ix_batch_jobs_pending", table_name="batch_jobs")
+    op.drop_column("batch_jobs", "started_at")
+    op.drop_column("batch_jobs", "attempts")
+    op.drop_column("batch_jobs", "heartbeat_at")
+    op.drop_column("batch_jobs", "worker_id")
@@ -0,0 +1,61 @@
+"""
+Batch job items — per-item rows instead of one JSONB array.
+
+Creates batch_job_items with a unique (job_id, position) index. Workers
+append one row per classified item; the API reads them back with keyset
+pagination. batch_jobs.items stays for the upload payload only.
+
+Existing completed jobs keep their items in batch_jobs.items (old rows
+are not backfilled).
+
+Run with: alembic upgrade head
+Undo with: alembic downgrade -1
+
+Revision ID: 003
+Revises: 002
+"""
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "003"
+down_revision: str | None = "002"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "batch_job_items",
+        sa.Column("id", sa.BigInteger, primary_key=True),
+        sa.Column(
+            "job_id",
+            sa.Integer,
+            sa.ForeignKey("batch_jobs.id", ondelete="CASCADE"),
+            nullable=False,
+        ),
+        sa.Column("position", sa.Integer, nullable=False),
+        sa.Column("commodity", sa.Text, nullable=False),
+        sa.Column("quantity", sa.Text),
+        sa.Column("value", sa.Text),
+        sa.Column("hts_code", sa.String(20)),
+        sa.Column("description", sa.Text),
+        sa.Column("confidence", sa.Float),
+        sa.Column("general_rate", sa.String(200)),
+        sa.Column("status", sa.String(20), nullable=False),
+        sa.Column("created_at", sa.DateTime, server_default=sa.func.now()),
+    )
+
+    # Keyset pagination index: WHERE job_id = ? AND position > ? ORDER BY position
+    op.create_index(
+        "ix_batch_job_items_job_position",
+        "batch_job_items",
+        ["job_id", "position"],
+        unique=True,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_batch_job_items_job_position", table_name="batch_job_items")
+    op.drop_table("batch_job_items")
@@ -0,0 +1,44 @@
+"""
+Blob storage — uploaded files move out of batch_jobs.items.
+
+  1. batch_jobs.blob_ref / content_sha256: the job's reference to its file
+  2. batch_blobs: SHA-256 → Postgres large object, for BLOB_STORE_BACKEND=postgres
+
+Run with: alembic upgrade head
+Undo with: alembic downgrade -1
+
+Revision ID: 004
+Revises: 003
+"""
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "004"
+down_revision: str | None = "003"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    op.add_column("batch_jobs", sa.Column("blob_ref", sa.String(80)))
+    op.add_column("batch_jobs", sa.Column("content_sha256", sa.String(64)))
+
+    # Index of large objects for the Postgres blob backend.
+    # loid is a Postgres oid (unsigned 32-bit) — BigInteger holds it safely.
+    op.create_table(
+        "batch_blobs",
+        sa.Column("sha256", sa.String(64), primary_key=True),
+        sa.Column("loid", sa.BigInteger, nullable=False),
+        sa.Column("size_bytes", sa.BigInteger, nullable=False),
+        sa.Column("created_at", sa.DateTime, server_default=sa.func.now()),
+    )
+
+
+def downgrade() -> None:
+    # Unlink the large objects before their index disappears
+    op.execute("SELECT lo_unlink(loid::oid) FROM batch_blobs")
+    op.drop_table("batch_blobs")
+    op.drop_column("batch_jobs", "content_sha256")
+    op.drop_column("batch_jobs", "blob_ref")
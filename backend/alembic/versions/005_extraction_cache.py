@@ -0,0 +1,44 @@
+"""
+Extraction cache — PDF text and commodities keyed by content hash, model and settings.
+
+Creates extraction_cache, with an index on last_used_at for LRU eviction.
+Dropping the table only loses cached work; jobs re-extract as before.
+
+Run with: alembic upgrade head
+Undo with: alembic downgrade -1
+
+Revision ID: 005
+Revises: 004
+"""
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects.postgresql import JSONB
+
+revision: str = "005"
+down_revision: str | None = "004"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "extraction_cache",
+        sa.Column("content_sha256", sa.String(64), primary_key=True),
+        sa.Column("claude_model", sa.String(100), primary_key=True),
+        sa.Column("extraction_settings", sa.String(100), primary_key=True),
+        sa.Column("pdf_text", sa.Text, nullable=False),
+        sa.Column("commodities", JSONB, nullable=False),
+        sa.Column("source", sa.String(20)),
+        sa.Column("size_bytes", sa.BigInteger, nullable=False),
+        sa.Column("hits", sa.Integer, nullable=False, server_default="0"),
+        sa.Column("created_at", sa.DateTime, server_default=sa.func.now()),
+        sa.Column("last_used_at", sa.DateTime, server_default=sa.func.now(), nullable=False),
+    )
+    op.create_index("ix_extraction_cache_last_used", "extraction_cache", ["last_used_at"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_extraction_cache_last_used", table_name="extraction_cache")
+    op.drop_table("extraction_cache")
@@ -0,0 +1,35 @@
+"""
+Structured uploads — batch jobs can come from CSV / XLSX / JSON files.
+
+  1. batch_jobs.source_format: "pdf" (existing rows) or the structured format
+  2. batch_jobs.column_map: the upload's role → column name mapping, if any
+
+Run with: alembic upgrade head
+Undo with: alembic downgrade -1
+
+Revision ID: 006
+Revises: 005
+"""
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects.postgresql import JSONB
+
+revision: str = "006"
+down_revision: str | None = "005"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "batch_jobs",
+        sa.Column("source_format", sa.String(10), nullable=False, server_default="pdf"),
+    )
+    op.add_column("batch_jobs", sa.Column("column_map", JSONB))
+
+
+def downgrade() -> None:
+    op.drop_column("batch_jobs", "column_map")
+    op.drop_column("batch_jobs", "source_format")
@@ -0,0 +1,35 @@
+"""
+Embedding provenance — record what each hts_codes embedding was built from.
+
+Adds embed_hash (SHA-256 of the embedded text), embedding_model and
+embedding_dimensions. The import re-embeds only rows whose hash, model or
+dimensions changed. Existing rows start with NULLs, so the first import
+after this migration re-embeds everything once.
+
+Run with: alembic upgrade head
+Undo with: alembic downgrade -1
+
+Revision ID: 007
+Revises: 006
+"""
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "007"
+down_revision: str | None = "006"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    op.add_column("hts_codes", sa.Column("embed_hash", sa.String(64)))
+    op.add_column("hts_codes", sa.Column("embedding_model", sa.String(100)))
+    op.add_column("hts_codes", sa.Column("embedding_dimensions", sa.Integer))
+
+
+def downgrade() -> None:
+    op.drop_column("hts_codes", "embedding_dimensions")
+    op.drop_column("hts_codes", "embedding_model")
+    op.drop_column("hts_codes", "embed_hash")
@@ -0,0 +1,57 @@
+"""
+Catalog revisions — one table per HTS catalog generation, one active.
+
+Adds catalog_revisions. No revision is active after this migration, so
+the app keeps reading hts_codes until `import_hts --revision --activate`
+(or `python -m hts_oracle.cli.catalog activate N`) switches it over.
+The original hts_codes table is recorded as revision 0, retired, so the
+first activation can be rolled back like any other.
+
+Run with: alembic upgrade head
+Undo with: alembic downgrade -1
+
+Revision ID: 008
+Revises: 007
+"""
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "008"
+down_revision: str | None = "007"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "catalog_revisions",
+        sa.Column("id", sa.Integer, primary_key=True),
+        sa.Column("table_name", sa.String(63), unique=True, nullable=False),
+        sa.Column("status", sa.String(20), nullable=False, server_default="building"),
+        sa.Column("source_file", sa.String(255)),
+        sa.Column("source_sha256", sa.String(64)),
+        sa.Column("row_count", sa.Integer),
+        sa.Column("created_at", sa.DateTime, server_default=sa.func.now()),
+        sa.Column("ready_at", sa.DateTime),
+        sa.Column("activated_at", sa.DateTime),
+    )
+    op.create_index(
+        "uq_catalog_revisions_active",
+        "catalog_revisions",
+        ["status"],
+        unique=True,
+        postgresql_where=sa.text("status = 'active'"),
+    )
+    op.execute(
+        "INSERT INTO catalog_revisions (id, table_name, status, ready_at) "
+        "VALUES (0, 'hts_codes', 'retired', now())"
+    )
+
+
+def downgrade() -> None:
+    # Revision tables (hts_codes_r*) are left in place — drop them by hand
+    # if they're no longer wanted.
+    op.drop_index("uq_catalog_revisions_active", table_name="catalog_revisions")
+    op.drop_table("catalog_revisions")
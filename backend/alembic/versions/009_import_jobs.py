@@ -0,0 +1,56 @@
+"""
+Import jobs — admin-triggered HTS imports and their progress.
+
+Adds import_jobs, written by POST /api/v1/admin/import-csv and read by
+its SSE progress stream.
+
+Run with: alembic upgrade head
+Undo with: alembic downgrade -1
+
+Revision ID: 009
+Revises: 008
+"""
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects.postgresql import JSONB
+
+revision: str = "009"
+down_revision: str | None = "008"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "import_jobs",
+        sa.Column("id", sa.Integer, primary_key=True),
+        sa.Column("filename", sa.String(255)),
+        sa.Column("status", sa.String(20), nullable=False, server_default="pending"),
+        sa.Column("mode", sa.String(20), nullable=False),
+        sa.Column("options", JSONB, server_default=sa.text("'{}'::jsonb")),
+        sa.Column("phase", sa.String(30)),
+        sa.Column("progress", JSONB),
+        sa.Column("summary", JSONB),
+        sa.Column("error", sa.Text),
+        sa.Column("log_tail", sa.Text),
+        sa.Column("pid", sa.Integer),
+        sa.Column("created_at", sa.DateTime, server_default=sa.func.now()),
+        sa.Column("started_at", sa.DateTime),
+        sa.Column("finished_at", sa.DateTime),
+        sa.Column("heartbeat_at", sa.DateTime, server_default=sa.func.now(), nullable=False),
+    )
+    op.create_index("ix_import_jobs_status", "import_jobs", ["status"])
+    # At most one pending/running import. Two API processes can both find
+    # no active import and insert one; the second insert fails here.
+    op.create_index(
+        "uq_import_jobs_one_active", "import_jobs", [sa.text("(true)")], unique=True,
+        postgresql_where=sa.text("status IN ('pending', 'running')"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("uq_import_jobs_one_active", table_name="import_jobs")
+    op.drop_index("ix_import_jobs_status", table_name="import_jobs")
+    op.drop_table("import_jobs")
@@ -0,0 +1,35 @@
+"""
+Rate limit counters — shared request counts for multi-node deployments.
+
+Adds the UNLOGGED rate_limit_counters table, used by the Postgres rate
+limiter backend (RATE_LIMIT_BACKEND=postgres).
+
+Run with: alembic upgrade head
+Undo with: alembic downgrade -1
+
+Revision ID: 010
+Revises: 009
+"""
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "010"
+down_revision: str | None = "009"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "rate_limit_counters",
+        sa.Column("key", sa.String(255), primary_key=True),
+        sa.Column("window_start", sa.BigInteger, primary_key=True),
+        sa.Column("count", sa.Integer, nullable=False, server_default="0"),
+        prefixes=["UNLOGGED"],
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("rate_limit_counters")
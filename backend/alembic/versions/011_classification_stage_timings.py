@@ -0,0 +1,30 @@
+"""
+Classification stage timings — per-stage milliseconds on the audit log.
+
+Adds classifications.stage_timings (JSONB), e.g.
+{"embed": 182.4, "search": 3.1, "llm": 1240.7}.
+
+Run with: alembic upgrade head
+Undo with: alembic downgrade -1
+
+Revision ID: 011
+Revises: 010
+"""
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects.postgresql import JSONB
+
+revision: str = "011"
+down_revision: str | None = "010"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    op.add_column("classifications", sa.Column("stage_timings", JSONB))
+
+
+def downgrade() -> None:
+    op.drop_column("classifications", "stage_timings")
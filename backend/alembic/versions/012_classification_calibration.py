@@ -0,0 +1,37 @@
+"""
+Classification calibration columns — what the vector search and Claude each picked.
+
+Adds to classifications:
+  - vector_top_hts_code: the vector search's top result, before Claude reorders
+  - llm_pick_hts_code:   Claude's pick (null when Claude wasn't asked)
+  - top2_similarity:     the runner-up's similarity (confidence is the top one's)
+
+python -m hts_oracle.cli.calibrate reads these to fit the confidence gate.
+
+Run with: alembic upgrade head
+Undo with: alembic downgrade -1
+
+Revision ID: 012
+Revises: 011
+"""
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "012"
+down_revision: str | None = "011"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    op.add_column("classifications", sa.Column("vector_top_hts_code", sa.String(20)))
+    op.add_column("classifications", sa.Column("llm_pick_hts_code", sa.String(20)))
+    op.add_column("classifications", sa.Column("top2_similarity", sa.Float))
+
+
+def downgrade() -> None:
+    op.drop_column("classifications", "top2_similarity")
+    op.drop_column("classifications", "llm_pick_hts_code")
+    op.drop_column("classifications", "vector_top_hts_code")
@@ -0,0 +1,33 @@
+"""
+Calibration sample rate — which audit rows were sampled to Claude, and at what rate.
+
+Adds to classifications:
+  - calibration_sample_rate: CALIBRATION_SAMPLE_RATE when a confident query
+    was sent to Claude only as a calibration sample (null otherwise)
+
+python -m hts_oracle.cli.calibrate weights each sampled row by 1/rate, so
+the sampled traffic above the threshold counts for what it stands for.
+
+Run with: alembic upgrade head
+Undo with: alembic downgrade -1
+
+Revision ID: 013
+Revises: 012
+"""
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "013"
+down_revision: str | None = "012"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    op.add_column("classifications", sa.Column("calibration_sample_rate", sa.Float))
+
+
+def downgrade() -> None:
+    op.drop_column("classifications", "calibration_sample_rate")
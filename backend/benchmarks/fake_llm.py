@@ -0,0 +1,197 @@
+"""
+Local stand-ins for the OpenAI embeddings and Anthropic messages APIs.
+
+Usage (from backend/):
+    python benchmarks/fake_llm.py --port 9100 --embed-ms 60 --llm-ms 900 --error-rate 0.01
+
+Then point the app at it:
+    OPENAI_BASE_URL=http://127.0.0.1:9100/v1 ANTHROPIC_BASE_URL=http://127.0.0.1:9100
+
+load_test.py starts one of these itself. Responses have the real APIs'
+shapes, so the official clients (retries included) run unmodified:
+
+  POST /v1/embeddings   hashed bag-of-words vectors — deterministic, and
+                        texts sharing words get similar vectors, so searches
+                        against a catalog imported through this server
+                        return sensible neighbours and a realistic mix of
+                        high- and low-confidence results
+  POST /v1/messages     picks the first candidate from a classify prompt,
+                        one per item from a batch prompt, or one line item
+                        per text line from an extraction prompt
+
+Latency is log-normal around the given median (--sigma sets the spread;
+0 = fixed). A fraction of requests fail with 500 (--error-rate) or 429
+(--throttle-rate), which the clients retry.
+"""
+
+import argparse
+import asyncio
+import base64
+import hashlib
+import json
+import math
+import random
+import re
+from array import array
+
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+def embed(text: str, dimensions: int) -> list[float]:
+    """Hashed bag-of-words embedding, L2-normalized."""
+    vector = [0.0] * dimensions
+    for word in _WORD.findall(text.lower()):
+        digest = hashlib.blake2b(word.encode(), digest_size=8).digest()
+        index = int.from_bytes(digest[:4], "little") % dimensions
+        vector[index] += 1.0 if digest[4] & 1 else -1.0
+    norm = math.sqrt(sum(v * v for v in vector))
+    if norm == 0:
+        vector[0] = norm = 1.0  # No words: any unit vector
+    return [v / norm for v in vector]
+
+
+def _tokens(text: str) -> int:
+    return max(len(text) // 4, 1)
+
+
+# ---------------------------------------------------------------------------
+# Canned Claude answers
+# ---------------------------------------------------------------------------
+
+_CANDIDATE = re.compile(r"^\s+1\. (\S+) —", re.MULTILINE)
+_BATCH_ITEM = re.compile(r"^Item (\d+): .*?\n  Candidates:\n    - ([^:]+):", re.MULTILINE)
+
+
+def answer(prompt: str) -> str:
+    """Claude's reply to one of the app's prompts (see module docstring)."""
+    batch = _BATCH_ITEM.findall(prompt)
+    if batch:
+        return json.dumps([
+            {"item_index": int(index), "hts_code": code, "analysis": "Closest candidate."}
+            for index, code in batch
+        ])
+    if "Invoice text:" in prompt:
+        text = prompt.split("Invoice text:\n---\n", 1)[-1].rsplit("\n---", 1)[0]
+        return json.dumps([
+            {"description": line.strip(), "quantity": None, "value": None}
+            for line in text.splitlines() if len(line.strip()) > 10
+        ][:200])
+    candidate = _CANDIDATE.search(prompt)
+    return json.dumps({
+        "hts_code": candidate.group(1) if candidate else "",
+        "analysis": "The first candidate matches the product's material and form.",
+    })
+
+
+# ---------------------------------------------------------------------------
+# Server
+# ---------------------------------------------------------------------------
+
+class Behaviour:
+    def __init__(self, args: argparse.Namespace):
+        self.args = args
+        self.random = random.Random(args.seed)
+
+    async def delay(self, median_ms: float) -> None:
+        if median_ms <= 0:
+            return
+        ms = median_ms
+        if self.args.sigma:
+            ms *= math.exp(self.random.gauss(0, self.args.sigma))
+        await asyncio.sleep(ms / 1000)
+
+    def failure(self) -> JSONResponse | None:
+        roll = self.random.random()
+        if roll < self.args.error_rate:
+            return JSONResponse(
+                {"error": {"type": "api_error", "message": "Injected failure"}}, 500,
+            )
+        if roll < self.args.error_rate + self.args.throttle_rate:
+            return JSONResponse(
+                {"error": {"type": "rate_limit_error", "message": "Injected throttle"}}, 429,
+                headers={"retry-after": "1"},
+            )
+        return None
+
+
+def build_app(args: argparse.Namespace) -> Starlette:
+    behaviour = Behaviour(args)
+
+    async def embeddings(request: Request):
+        body = await request.json()
+        await behaviour.delay(args.embed_ms)
+        if (failed := behaviour.failure()) is not None:
+            return failed
+        inputs = body["input"] if isinstance(body["input"], list) else [body["input"]]
+        dimensions = body.get("dimensions") or 1536
+        as_base64 = body.get("encoding_format") == "base64"
+        data = []
+        for i, text in enumerate(inputs):
+            vector = embed(text, dimensions)
+            if as_base64:
+                vector = base64.b64encode(array("f", vector).tobytes()).decode()
+            data.append({"object": "embedding", "index": i, "embedding": vector})
+        tokens = sum(_tokens(text) for text in inputs)
+        return JSONResponse({
+            "object": "list", "data": data, "model": body.get("model"),
+            "usage": {"prompt_tokens": tokens, "total_tokens": tokens},
+        })
+
+    async def messages(request: Request):
+        body = await request.json()
+        await behaviour.delay(args.llm_ms)
+        if (failed := behaviour.failure()) is not None:
+            return failed
+        prompt = "".join(
+            m["content"] if isinstance(m["content"], str)
+            else "".join(part.get("text", "") for part in m["content"])
+            for m in body["messages"]
+        )
+        text = answer(prompt)
+        return JSONResponse({
+            "id": f"msg_{behaviour.random.getrandbits(48):012x}",
+            "type": "message",
+            "role": "assistant",
+            "model": body.get("model"),
+            "content": [{"type": "text", "text": text}],
+            "stop_reason": "end_turn",
+            "stop_sequence": None,
+            "usage": {"input_tokens": _tokens(prompt), "output_tokens": _tokens(text)},
+        })
+
+    return Starlette(routes=[
+        Route("/v1/embeddings", embeddings, methods=["POST"]),
+        Route("/v1/messages", messages, methods=["POST"]),
+    ])
+
+
+def parser() -> argparse.ArgumentParser:
+    p = argparse.ArgumentParser(description="Fake OpenAI embeddings + Anthropic messages server")
+    p.add_argument("--host", default="127.0.0.1")
+    p.add_argument("--port", type=int, default=9100)
+    p.add_argument("--embed-ms", type=float, default=60.0,
+                   help="Median embeddings latency (default: 60)")
+    p.add_argument("--llm-ms", type=float, default=900.0,
+                   help="Median messages latency (default: 900)")
+    p.add_argument("--sigma", type=float, default=0.4, help="Log-normal latency spread (0 = fixed)")
+    p.add_argument("--error-rate", type=float, default=0.0,
+                   help="Share of requests failing with 500")
+    p.add_argument("--throttle-rate", type=float, default=0.0,
+                   help="Share of requests failing with 429")
+    p.add_argument("--seed", type=int, default=None, help="Random seed, for repeatable runs")
+    return p
+
+
+def main():
+    args = parser().parse_args()
+    uvicorn.run(build_app(args), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,523 @@
+"""
+Offline load test — the real app under concurrent load, with local
+stand-ins for OpenAI and Anthropic.
+
+Usage (from backend/):
+    # Once: migrate a scratch database and import the catalog through the fake embedder
+    python benchmarks/load_test.py --database-url postgresql+asyncpg://localhost:5432/hts_bench \\
+        --seed-csv ../data/hts_2026_revision_4_csv.csv --scenarios none
+
+    python benchmarks/load_test.py --label baseline
+    python benchmarks/load_test.py --label threshold-60 --set HIGH_CONFIDENCE_THRESHOLD=0.60 \\
+        --compare benchmarks/results/<baseline>.json
+
+What runs:
+  - benchmarks/fake_llm.py, with the latency and error settings given here
+  - `uvicorn hts_oracle.main:app --workers N`, pointed at it through
+    OPENAI_BASE_URL / ANTHROPIC_BASE_URL, against --database-url (a local
+    Postgres with pgvector — use a scratch database, batch jobs are written to it)
+
+Rate limits are raised out of the way. Extra app settings are passed with
+--set NAME=VALUE and recorded in the results.
+
+Scenarios (--scenarios, comma-separated):
+  classify          POST /classify, cycling through a fixed list of queries
+  classify_unique   the same, with a random suffix on every query — nothing
+                    can be answered from a cache
+  batch             upload a generated CSV of --batch-items line items, then
+                    follow its SSE stream until "complete"; one sample per job
+
+Each classify scenario keeps --concurrency requests in flight for
+--duration seconds (after --warmup seconds that aren't counted). Reported
+per scenario: requests/s, latency p50/p95/p99, errors by status, the
+share of answers that needed Claude, mean stage times from the
+Server-Timing header, and CPU used by the app's processes (all uvicorn
+workers, from /proc — Linux only) in total and per request. The load
+generator's own CPU is reported too: if it nears one core, the client
+is the bottleneck, not the app.
+
+Results are written to benchmarks/results/<time>-<label>.json along with
+the git commit and every setting, and --compare prints the change against
+an earlier run.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import signal
+import socket
+import subprocess
+import sys
+import time
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+
+import httpx
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+
+QUERIES = [
+    "cotton knitted t-shirts, men's, crew neck",
+    "stainless steel hex bolts M10x40",
+    "frozen boneless beef cuts",
+    "lithium-ion battery packs for laptops",
+    "women's leather handbags",
+    "polyester woven fabric, dyed, 150cm width",
+    "ceramic coffee mugs",
+    "roasted coffee beans, not decaffeinated",
+    "wooden dining chairs, upholstered",
+    "LED light bulbs, screw base",
+    "children's plastic toy building blocks",
+    "fresh atlantic salmon fillets",
+    "aluminum window frames",
+    "rubber garden hoses",
+    "glass wine bottles, 750ml",
+    "wireless bluetooth headphones",
+    "men's wool suits",
+    "printed paperback books",
+    "olive oil, extra virgin, in bottles",
+    "bicycle tires, pneumatic, rubber",
+    "copper electrical wire, insulated",
+    "cordless electric drills",
+    "frozen shrimp, peeled",
+    "solar panels, photovoltaic cells assembled in modules",
+]
+
+
+# ---------------------------------------------------------------------------
+# Processes
+# ---------------------------------------------------------------------------
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _start_fake(
+    args: argparse.Namespace, port: int, embed_ms: float, llm_ms: float,
+) -> subprocess.Popen:
+    command = [
+        sys.executable, str(BACKEND_DIR / "benchmarks" / "fake_llm.py"), "--port", str(port),
+        "--embed-ms", str(embed_ms), "--llm-ms", str(llm_ms), "--sigma", str(args.sigma),
+        "--error-rate", str(args.error_rate), "--throttle-rate", str(args.throttle_rate),
+    ]
+    process = subprocess.Popen(command)
+    _wait_for_port(port, process)
+    return process
+
+
+def _wait_for_port(port: int, process: subprocess.Popen, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise SystemExit(f"{Path(process.args[1]).name} exited with {process.returncode}")
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.5).close()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise SystemExit(f"Nothing listening on port {port} after {timeout}s")
+
+
+def _stop(process: subprocess.Popen) -> None:
+    if process.poll() is None:
+        process.send_signal(signal.SIGINT)
+        try:
+            process.wait(timeout=15)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+def app_env(args: argparse.Namespace, fake_port: int) -> dict[str, str]:
+    """Environment for the app and the seeding CLI."""
+    env = dict(os.environ)
+    env.update({
+        "DATABASE_URL": args.database_url,
+        "OPENAI_API_KEY": "load-test",
+        "ANTHROPIC_API_KEY": "load-test",
+        "OPENAI_BASE_URL": f"http://127.0.0.1:{fake_port}/v1",
+        "ANTHROPIC_BASE_URL": f"http://127.0.0.1:{fake_port}",
+        "RATE_LIMIT_BACKEND": "memory",
+        "RATE_LIMIT_DEFAULT": "1000000/second",
+        "RATE_LIMIT_ROUTES": "",
+        "ENVIRONMENT": "production",
+    })
+    env.update(args.set)
+    return env
+
+
+def seed(args: argparse.Namespace) -> None:
+    """Migrate the database and import the catalog with fake embeddings (no added latency)."""
+    port = _free_port()
+    fake = _start_fake(args, port, embed_ms=0, llm_ms=0)
+    try:
+        env = app_env(args, port)
+        subprocess.run(["alembic", "upgrade", "head"], cwd=BACKEND_DIR, env=env, check=True)
+        subprocess.run(
+            [sys.executable, "-m", "hts_oracle.cli.import_hts", str(Path(args.seed_csv).resolve())],
+            cwd=BACKEND_DIR, env=env, check=True,
+        )
+    finally:
+        _stop(fake)
+
+
+# ---------------------------------------------------------------------------
+# CPU accounting (/proc)
+# ---------------------------------------------------------------------------
+
+_TICKS = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+
+
+def _stat(pid: int) -> list[str] | None:
+    try:
+        text = Path(f"/proc/{pid}/stat").read_text()
+    except OSError:
+        return None
+    # Fields after "pid (comm)" — comm may itself contain spaces or ")"
+    return text[text.rindex(")") + 2:].split()
+
+
+def process_tree(root: int) -> list[int]:
+    """root and all its descendants."""
+    children: dict[int, list[int]] = {}
+    for entry in Path("/proc").iterdir():
+        if entry.name.isdigit() and (fields := _stat(int(entry.name))) is not None:
+            children.setdefault(int(fields[1]), []).append(int(entry.name))
+    tree, pending = [], [root]
+    while pending:
+        pid = pending.pop()
+        tree.append(pid)
+        pending.extend(children.get(pid, []))
+    return tree
+
+
+def cpu_seconds(root: int) -> float | None:
+    """User + system CPU of root and its descendants so far. None off Linux."""
+    if not Path("/proc").is_dir():
+        return None
+    total = 0
+    for pid in process_tree(root):
+        if (fields := _stat(pid)) is not None:
+            total += int(fields[11]) + int(fields[12])  # utime, stime
+    return total / _TICKS
+
+
+# ---------------------------------------------------------------------------
+# Load generation
+# ---------------------------------------------------------------------------
+
+@dataclass
+class Sample:
+    latency_ms: float
+    status: int                 # 0 = transport error
+    llm: bool = False
+    stages: dict[str, float] = field(default_factory=dict)
+
+
+def parse_server_timing(header: str | None) -> dict[str, float]:
+    stages = {}
+    for part in (header or "").split(","):
+        name, _, rest = part.strip().partition(";dur=")
+        if rest and name != "total":
+            stages[name] = float(rest)
+    return stages
+
+
+async def run_classify(
+    client: httpx.AsyncClient, args: argparse.Namespace, unique: bool,
+) -> tuple[list[Sample], float]:
+    """Closed loop: --concurrency requests in flight until --duration runs out."""
+    samples: list[Sample] = []
+    start = time.monotonic()
+    measure_from = start + args.warmup
+    stop_at = measure_from + args.duration
+    counter = iter(range(sys.maxsize))
+
+    async def worker():
+        while time.monotonic() < stop_at:
+            query = QUERIES[next(counter) % len(QUERIES)]
+            if unique:
+                query = f"{query} lot {uuid.uuid4().hex[:8]}"
+            began = time.monotonic()
+            try:
+                response = await client.post("/api/v1/classify", json={"query": query})
+                sample = Sample((time.monotonic() - began) * 1000, response.status_code)
+                if response.status_code == 200:
+                    sample.llm = response.json().get("method") == "llm_assisted"
+                    sample.stages = parse_server_timing(response.headers.get("server-timing"))
+            except httpx.HTTPError:
+                sample = Sample((time.monotonic() - began) * 1000, 0)
+            if began >= measure_from:
+                samples.append(sample)
+
+    await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+    return samples, time.monotonic() - measure_from
+
+
+def batch_csv(items: int, job: int) -> bytes:
+    rows = ["Description,Quantity,Value"]
+    for i in range(items):
+        query = QUERIES[(job + i) % len(QUERIES)]
+        rows.append(f"\"{query}\",{random.randint(1, 999)} pcs,${random.randint(10, 9999)}")
+    rows.append(f"\"sample swatches, job {job}\",1 pcs,$0")  # Every upload is a new file
+    return ("\n".join(rows) + "\n").encode()
+
+
+async def run_batch(
+    client: httpx.AsyncClient, args: argparse.Namespace,
+) -> tuple[list[Sample], float]:
+    """--batch-jobs uploads, --batch-concurrency at a time, each followed to completion."""
+    samples: list[Sample] = []
+    jobs = iter(range(args.batch_jobs))
+    start = time.monotonic()
+
+    async def one(job: int) -> Sample:
+        began = time.monotonic()
+        files = {"file": (f"load-{job}.csv", batch_csv(args.batch_items, job), "text/csv")}
+        response = await client.post("/api/v1/batch/upload", files=files)
+        if response.status_code != 200:
+            return Sample((time.monotonic() - began) * 1000, response.status_code)
+        job_id = response.json()["job_id"]
+        async with client.stream("GET", f"/api/v1/batch/{job_id}/stream") as stream:
+            async for line in stream.aiter_lines():
+                if not line.startswith("data:"):
+                    continue
+                event = json.loads(line[5:]).get("event")
+                if event in ("complete", "error"):
+                    status = 200 if event == "complete" else 500
+                    return Sample((time.monotonic() - began) * 1000, status)
+        return Sample((time.monotonic() - began) * 1000, 0)
+
+    async def worker():
+        for job in jobs:
+            try:
+                samples.append(await one(job))
+            except httpx.HTTPError:
+                samples.append(Sample(0.0, 0))
+
+    await asyncio.gather(*(worker() for _ in range(args.batch_concurrency)))
+    return samples, time.monotonic() - start
+
+
+# ---------------------------------------------------------------------------
+# Reporting
+# ---------------------------------------------------------------------------
+
+def percentile(ordered: list[float], q: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, max(0, round(q / 100 * len(ordered)) - 1))]
+
+
+def summarize(
+    samples: list[Sample], wall_seconds: float, cpu: float | None, client_cpu: float,
+) -> dict:
+    ok = [s for s in samples if s.status == 200]
+    latencies = sorted(s.latency_ms for s in ok)
+    errors: dict[str, int] = {}
+    for s in samples:
+        if s.status != 200:
+            errors[str(s.status)] = errors.get(str(s.status), 0) + 1
+    stage_totals: dict[str, float] = {}
+    for s in ok:
+        for name, ms in s.stages.items():
+            stage_totals[name] = stage_totals.get(name, 0.0) + ms
+    return {
+        "requests": len(samples),
+        "ok": len(ok),
+        "errors": errors,
+        "seconds": round(wall_seconds, 2),
+        "qps": round(len(ok) / wall_seconds, 2) if wall_seconds else 0.0,
+        "p50_ms": round(percentile(latencies, 50), 1),
+        "p95_ms": round(percentile(latencies, 95), 1),
+        "p99_ms": round(percentile(latencies, 99), 1),
+        "max_ms": round(latencies[-1], 1) if latencies else 0.0,
+        "llm_fraction": round(sum(s.llm for s in ok) / len(ok), 3) if ok else 0.0,
+        "stage_mean_ms": {
+            name: round(total / len(ok), 1) for name, total in sorted(stage_totals.items())
+        },
+        "app_cpu_seconds": round(cpu, 2) if cpu is not None else None,
+        "app_cpu_cores": round(cpu / wall_seconds, 2) if cpu is not None and wall_seconds else None,
+        "app_cpu_ms_per_request": (
+            round(cpu * 1000 / len(ok), 2) if cpu is not None and ok else None
+        ),
+        "client_cpu_cores": round(client_cpu / wall_seconds, 2) if wall_seconds else None,
+    }
+
+
+def print_summary(name: str, result: dict) -> None:
+    errors = ", ".join(f"{status}: {n}" for status, n in result["errors"].items()) or "none"
+    print(f"\n{name}")
+    print(f"  {result['ok']:,} ok in {result['seconds']}s — {result['qps']:,.1f}/s, "
+          f"errors: {errors}")
+    print(f"  p50 {result['p50_ms']:,.1f} ms   p95 {result['p95_ms']:,.1f} ms   "
+          f"p99 {result['p99_ms']:,.1f} ms   max {result['max_ms']:,.1f} ms")
+    if result["stage_mean_ms"]:
+        stages = "  ".join(f"{name} {ms}" for name, ms in result["stage_mean_ms"].items())
+        print(f"  stage means (ms): {stages}   needed Claude: {result['llm_fraction']:.0%}")
+    if result["app_cpu_seconds"] is not None:
+        print(f"  app CPU {result['app_cpu_cores']} cores "
+              f"({result['app_cpu_ms_per_request']} ms/request), "
+              f"load generator {result['client_cpu_cores']} cores")
+
+
+COMPARED = ("qps", "p50_ms", "p95_ms", "p99_ms", "app_cpu_ms_per_request")
+
+
+def compare(current: dict, baseline: dict) -> None:
+    print(f"\nAgainst {baseline['label']} "
+          f"({baseline['git_commit'][:10]}, {baseline['started_at']}):")
+    for name, result in current["scenarios"].items():
+        before = baseline["scenarios"].get(name)
+        if before is None:
+            continue
+        print(f"  {name}")
+        for metric in COMPARED:
+            old, new = before.get(metric), result.get(metric)
+            if not old or new is None:
+                continue
+            print(f"    {metric:<24} {old:>10,.1f} → {new:>10,.1f}  ({(new - old) / old:+.1%})")
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            cwd=BACKEND_DIR, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+# ---------------------------------------------------------------------------
+# Entry point
+# ---------------------------------------------------------------------------
+
+SCENARIOS = ("classify", "classify_unique", "batch")
+
+
+async def run_scenarios(args: argparse.Namespace, base_url: str, app_pid: int) -> dict:
+    results = {}
+    limits = httpx.Limits(max_connections=args.concurrency + args.batch_concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=args.timeout) as client:
+        for name in args.scenarios:
+            warmup = 0.0 if name == "batch" else args.warmup
+
+            async def cpu_after_warmup() -> tuple[float | None, float]:
+                await asyncio.sleep(warmup)
+                return cpu_seconds(app_pid), time.process_time()
+
+            baseline = asyncio.create_task(cpu_after_warmup())
+            if name == "batch":
+                samples, seconds = await run_batch(client, args)
+            else:
+                unique = name == "classify_unique"
+                samples, seconds = await run_classify(client, args, unique=unique)
+            cpu_before, client_before = await baseline
+            cpu_after = cpu_seconds(app_pid)
+            cpu = cpu_after - cpu_before if cpu_after is not None else None
+            results[name] = summarize(samples, seconds, cpu, time.process_time() - client_before)
+            print_summary(name, results[name])
+    return results
+
+
+def _setting(text: str) -> tuple[str, str]:
+    name, sep, value = text.partition("=")
+    if not sep:
+        raise argparse.ArgumentTypeError(f"expected NAME=VALUE, got {text!r}")
+    return name.upper(), value
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Offline load test against local OpenAI/Anthropic stand-ins",
+    )
+    parser.add_argument("--database-url", default=os.environ.get(
+        "DATABASE_URL", "postgresql+asyncpg://localhost:5432/hts_bench"))
+    parser.add_argument("--seed-csv", help="Migrate the database and import this HTS CSV first")
+    parser.add_argument("--scenarios", default="classify,classify_unique,batch",
+                        help=f"Comma-separated: {', '.join(SCENARIOS)} (or 'none')")
+    parser.add_argument("--workers", type=int, default=2,
+                        help="uvicorn worker processes (default: 2)")
+    parser.add_argument("-c", "--concurrency", type=int, default=32,
+                        help="Classify requests in flight (default: 32)")
+    parser.add_argument("--duration", type=float, default=30.0,
+                        help="Seconds measured per classify scenario")
+    parser.add_argument("--warmup", type=float, default=5.0,
+                        help="Seconds run before measuring (default: 5)")
+    parser.add_argument("--batch-jobs", type=int, default=20)
+    parser.add_argument("--batch-items", type=int, default=50,
+                        help="Line items per batch CSV (default: 50)")
+    parser.add_argument("--batch-concurrency", type=int, default=4)
+    parser.add_argument("--timeout", type=float, default=120.0, help="Per-request client timeout")
+    parser.add_argument("--embed-ms", type=float, default=60.0,
+                        help="Fake embeddings median latency")
+    parser.add_argument("--llm-ms", type=float, default=900.0, help="Fake Claude median latency")
+    parser.add_argument("--sigma", type=float, default=0.4, help="Fake latency spread (log-normal)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fake 500 share")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="Fake 429 share")
+    parser.add_argument("--set", type=_setting, action="append", default=[], metavar="NAME=VALUE",
+                        help="App setting for this run (repeatable)")
+    parser.add_argument("--label", default="run", help="Name for the results file")
+    parser.add_argument("--compare", help="Earlier results JSON to compare against")
+    args = parser.parse_args()
+    args.set = dict(args.set)
+    args.scenarios = (
+        [] if args.scenarios == "none" else [s.strip() for s in args.scenarios.split(",")]
+    )
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+
+    if args.seed_csv:
+        seed(args)
+    if not args.scenarios:
+        return
+
+    fake_port, app_port = _free_port(), _free_port()
+    fake = _start_fake(args, fake_port, args.embed_ms, args.llm_ms)
+    app = subprocess.Popen(
+        ["uvicorn", "hts_oracle.main:app", "--host", "127.0.0.1", "--port", str(app_port),
+         "--workers", str(args.workers), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=app_env(args, fake_port),
+    )
+    started_at = datetime.now().isoformat(timespec="seconds")
+    try:
+        _wait_for_port(app_port, app)
+        scenarios = asyncio.run(run_scenarios(args, f"http://127.0.0.1:{app_port}", app.pid))
+    finally:
+        _stop(app)
+        _stop(fake)
+
+    report = {
+        "label": args.label,
+        "started_at": started_at,
+        "git_commit": git_commit(),
+        "config": {
+            key: getattr(args, key) for key in (
+                "workers", "concurrency", "duration", "warmup", "batch_jobs", "batch_items",
+                "batch_concurrency", "embed_ms", "llm_ms", "sigma", "error_rate", "throttle_rate",
+                "set",
+            )
+        },
+        "cpu_count": os.cpu_count(),
+        "scenarios": scenarios,
+    }
+    RESULTS_DIR.mkdir(exist_ok=True)
+    path = RESULTS_DIR / f"{datetime.now():%Y%m%dT%H%M%S}-{args.label}.json"
+    path.write_text(json.dumps(report, indent=2) + "\n")
+    print(f"\nResults: {path.relative_to(BACKEND_DIR)}")
+
+    if args.compare:
+        compare(report, json.loads(Path(args.compare).read_text()))
+
+
+if __name__ == "__main__":
+    main()
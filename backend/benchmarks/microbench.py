@@ -0,0 +1,389 @@
+"""
+Microbenchmarks for the pure-Python functions on the hot path — run on
+every request, every search result or every imported row.
+
+Usage (from backend/):
+    python benchmarks/microbench.py --save-baseline      # on main, before a change
+    python benchmarks/microbench.py                      # after it: compare, exit 1 on regressions
+    python benchmarks/microbench.py -k rate_limiter --threshold 0.05
+
+Each case is timed like timeit, with the garbage collector off: the loop
+count is calibrated so one sample takes at least --min-time, --warmup
+samples are thrown away, then --repeat samples are kept. The median time
+per call is reported, with the interquartile range as the spread.
+
+Against the baseline (benchmarks/results/microbench-baseline.json, or
+--baseline), a case is a regression when its median is more than
+--threshold slower AND the difference is significant — a Mann-Whitney U
+test on the two sets of samples, p < --alpha. Either alone isn't enough:
+a 1% shift can be significant, and a noisy 15% one can be chance.
+
+Baselines only compare on the same machine and Python — save one before
+the change, don't reuse one from elsewhere (the script warns when the
+Python version or platform differ).
+"""
+
+import argparse
+import gc
+import itertools
+import json
+import math
+import os
+import platform
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections.abc import Callable
+from datetime import datetime
+from pathlib import Path
+
+# Settings validation needs the API keys, which these functions never use
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+os.environ.setdefault("ANTHROPIC_API_KEY", "benchmark")
+
+from hts_oracle.cli.import_hts import build_embed_text, clean_unit
+from hts_oracle.models import HtsCode
+from hts_oracle.routes.batch import _format_sse
+from hts_oracle.services import timing
+from hts_oracle.services.rate_limiter import (
+    MemoryBackend,
+    RateLimiter,
+    SharedMemoryBackend,
+    parse_limit,
+)
+from hts_oracle.services.searcher import _format_result
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+DEFAULT_BASELINE = Path(__file__).resolve().parent / "results" / "microbench-baseline.json"
+
+
+# ---------------------------------------------------------------------------
+# Cases — each setup function returns the zero-argument callable to time
+# ---------------------------------------------------------------------------
+
+CASES: dict[str, Callable[[], Callable[[], object]]] = {}
+
+
+def case(name: str):
+    def register(setup):
+        CASES[name] = setup
+        return setup
+    return register
+
+
+def _hts_code() -> HtsCode:
+    return HtsCode(
+        hts_number="6109.10.00.12",
+        description="Men's or boys' T-shirts, of cotton",
+        enhanced_description="T-shirts, singlets, tank tops and similar garments, "
+                             "knitted or crocheted: Of cotton: Men's or boys': T-shirts, "
+                             "all white, short hemmed sleeves",
+        context_path="Section XI > Chapter 61 > 6109 > 6109.10",
+        chapter="61",
+        general_rate="16.5%",
+        special_rate="Free (AU,BH,CL,CO,IL,JO,KR,MA,OM,P,PA,PE,S,SG)",
+        unit='["doz.", "kg"]',
+    )
+
+
+@case("searcher.format_result")
+def _():
+    code = _hts_code()
+    return lambda: _format_result(code, 0.81234)
+
+
+@case("import.build_embed_text.enriched")
+def _():
+    row = {
+        "Enriched Text": "Cotton knitted T-shirts for men and boys, crew neck or v-neck, "
+                         "short sleeves, white undershirts, tees, jersey knit tops",
+        "Context Path": "Apparel > Knitted > T-shirts > Cotton",
+    }
+    return lambda: build_embed_text(row)
+
+
+@case("import.build_embed_text.usitc")
+def _():
+    row = {
+        "Enhanced Description": "T-shirts, singlets, tank tops and similar garments, "
+                                "knitted or crocheted: Of cotton: Men's or boys'",
+        "Search Keywords": "",
+        "Context Path": "Section XI > Chapter 61 > 6109",
+    }
+    return lambda: build_embed_text(row)
+
+
+@case("import.clean_unit")
+def _():
+    return lambda: clean_unit('["doz.", "kg"]')
+
+
+def _drive(coroutine):
+    """Run a coroutine that never suspends, without an event loop."""
+    try:
+        coroutine.send(None)
+    except StopIteration as stop:
+        return stop.value
+    raise RuntimeError("coroutine suspended")
+
+
+def _limiter(backend) -> tuple[RateLimiter, Callable[[], str]]:
+    limiter = RateLimiter(
+        backend,
+        default=parse_limit("1000000/minute"),  # Never denied: time the allowed path
+        routes={
+            "/api/v1/batch/upload": parse_limit("10/minute"),
+            "/api/v1/admin": parse_limit("30/minute"),
+        },
+        exempt=("/health", "/metrics"),
+    )
+    clients = itertools.cycle([f"10.0.{i // 256}.{i % 256}" for i in range(1000)])
+    return limiter, clients.__next__
+
+
+@case("rate_limiter.check.memory")
+def _():
+    limiter, next_client = _limiter(MemoryBackend())
+    return lambda: _drive(limiter.check(next_client(), "/api/v1/classify"))
+
+
+@case("rate_limiter.check.shared")
+def _():
+    path = os.path.join(tempfile.mkdtemp(prefix="microbench-"), "ratelimit")
+    limiter, next_client = _limiter(SharedMemoryBackend(path, slots=4096))
+    return lambda: _drive(limiter.check(next_client(), "/api/v1/classify"))
+
+
+@case("rate_limiter.check.exempt")
+def _():
+    limiter, _ = _limiter(MemoryBackend())
+    return lambda: _drive(limiter.check("10.0.0.1", "/api/v1/health"))
+
+
+@case("sse.format.item_progress")
+def _():
+    event = {
+        "event": "item_progress", "index": 12, "total": 50,
+        "commodity": "Cotton knitted t-shirts, men's, crew neck", "status": "searching",
+    }
+    return lambda: _format_sse(event, 1234)
+
+
+@case("sse.format.complete_50_items")
+def _():
+    result = _format_result(_hts_code(), 0.81234)
+    items = [
+        {
+            "commodity": f"Cotton knitted t-shirts, men's, crew neck, style {i}",
+            "quantity": "500 pcs", "value": "$2,500",
+            "hts_code": result["hts_code"], "description": result["description"],
+            "confidence": result["confidence_score"], "status": "confident",
+            "analysis": None, "alternatives": [result] * 3,
+        }
+        for i in range(50)
+    ]
+    event = {
+        "event": "complete", "items": items,
+        "summary": {"total": 50, "classified": 50, "needs_review": 0, "avg_confidence": 81.2},
+    }
+    return lambda: _format_sse(event, 1290)
+
+
+@case("timing.span")
+def _():
+    def one_span():
+        with timing.span("microbench"):
+            pass
+    return one_span
+
+
+@case("timing.span.in_request")
+def _():
+    def request_with_spans():
+        with timing.collect():
+            for name in ("embed", "search", "db_commit"):
+                with timing.span(name):
+                    pass
+    return request_with_spans
+
+
+# ---------------------------------------------------------------------------
+# Timing
+# ---------------------------------------------------------------------------
+
+def _time_loops(function: Callable[[], object], loops: int) -> int:
+    repeat = itertools.repeat(None, loops)
+    started = time.perf_counter_ns()
+    for _ in repeat:
+        function()
+    return time.perf_counter_ns() - started
+
+
+def measure(
+    function: Callable[[], object], repeat: int, warmup: int, min_time: float,
+) -> list[float]:
+    """Nanoseconds per call, one value per sample."""
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        loops = 1
+        while _time_loops(function, loops) < min_time * 1e9:  # Calibrate, like timeit.autorange
+            loops *= 2
+        for _ in range(warmup):
+            _time_loops(function, loops)
+        return [_time_loops(function, loops) / loops for _ in range(repeat)]
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+
+
+def spread(samples: list[float]) -> float:
+    """Interquartile range relative to the median."""
+    q1, _, q3 = statistics.quantiles(samples, n=4)
+    return (q3 - q1) / statistics.median(samples)
+
+
+def mann_whitney_p(a: list[float], b: list[float]) -> float:
+    """Two-sided p-value of a Mann-Whitney U test (normal approximation, tie-corrected)."""
+    n1, n2 = len(a), len(b)
+    combined = sorted([(value, 0) for value in a] + [(value, 1) for value in b])
+    ranks = [0.0] * len(combined)
+    tie_term = 0
+    i = 0
+    while i < len(combined):
+        j = i
+        while j + 1 < len(combined) and combined[j + 1][0] == combined[i][0]:
+            j += 1
+        for k in range(i, j + 1):
+            ranks[k] = (i + j) / 2 + 1
+        tie_term += (j - i + 1) ** 3 - (j - i + 1)
+        i = j + 1
+    rank_sum_a = sum(rank for rank, (_, group) in zip(ranks, combined) if group == 0)
+    u = rank_sum_a - n1 * (n1 + 1) / 2
+    n = n1 + n2
+    variance = n1 * n2 / 12 * ((n + 1) - tie_term / (n * (n - 1)))
+    if variance <= 0:
+        return 1.0
+    z = (abs(u - n1 * n2 / 2) - 0.5) / math.sqrt(variance)  # With continuity correction
+    return min(1.0, math.erfc(max(z, 0.0) / math.sqrt(2)))
+
+
+# ---------------------------------------------------------------------------
+# Reporting
+# ---------------------------------------------------------------------------
+
+def _format_ns(ns: float) -> str:
+    if ns >= 1e6:
+        return f"{ns / 1e6:.2f} ms"
+    if ns >= 1e3:
+        return f"{ns / 1e3:.2f} µs"
+    return f"{ns:.0f} ns"
+
+
+def compare(
+    name: str, samples: list[float], baseline: dict | None, threshold: float, alpha: float,
+) -> tuple[str, bool]:
+    """(report line, is a regression) for one case."""
+    median = statistics.median(samples)
+    line = f"{name:<34} {_format_ns(median):>10}  ±{spread(samples):>5.1%}"
+    if baseline is None:
+        return line, False
+    base_samples = baseline["samples_ns"]
+    change = median / statistics.median(base_samples) - 1
+    p = mann_whitney_p(samples, base_samples)
+    regression = change > threshold and p < alpha
+    faster = change < -threshold and p < alpha
+    verdict = "REGRESSION" if regression else ("faster" if faster else "")
+    base_median = _format_ns(statistics.median(base_samples))
+    line += f"  {base_median:>10}  {change:>+7.1%}  p={p:<6.3f} {verdict}"
+    return line, regression
+
+
+def environment() -> dict:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            cwd=BACKEND_DIR, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = "unknown"
+    return {
+        "git_commit": commit,
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "machine": platform.node(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Microbenchmarks for hot pure-Python functions")
+    parser.add_argument("-k", dest="pattern", help="Only cases whose name matches this regex")
+    parser.add_argument("--list", action="store_true", help="List the cases and exit")
+    parser.add_argument("--repeat", type=int, default=25,
+                        help="Samples kept per case (default: 25)")
+    parser.add_argument("--warmup", type=int, default=3,
+                        help="Samples thrown away first (default: 3)")
+    parser.add_argument("--min-time", type=float, default=0.02,
+                        help="Seconds per sample, at least (default: 0.02)")
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true",
+                        help="Store this run as the baseline")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="Slowdown that fails (default: 0.10 = 10%%)")
+    parser.add_argument("--alpha", type=float, default=0.01,
+                        help="Significance level (default: 0.01)")
+    args = parser.parse_args()
+
+    names = [name for name in CASES if not args.pattern or re.search(args.pattern, name)]
+    if args.list:
+        print("\n".join(names))
+        return
+    if not names:
+        parser.error(f"no cases match {args.pattern!r}")
+
+    env = environment()
+    baseline = None
+    if not args.save_baseline and args.baseline.exists():
+        baseline = json.loads(args.baseline.read_text())
+        for key in ("python", "implementation", "platform"):
+            if baseline["environment"].get(key) != env[key]:
+                was = baseline["environment"].get(key)
+                print(f"warning: baseline {key} was {was}, now {env[key]}")
+        commit = baseline["environment"]["git_commit"][:10]
+        print(f"Baseline: {args.baseline} ({commit}, {baseline['created_at']})\n")
+
+    results: dict[str, dict] = {}
+    regressions = []
+    for name in names:
+        samples = measure(CASES[name](), args.repeat, args.warmup, args.min_time)
+        results[name] = {"median_ns": statistics.median(samples), "samples_ns": samples}
+        base = baseline["cases"].get(name) if baseline else None
+        line, regressed = compare(name, samples, base, args.threshold, args.alpha)
+        print(line, flush=True)
+        if regressed:
+            regressions.append(name)
+
+    if args.save_baseline:
+        args.baseline.parent.mkdir(parents=True, exist_ok=True)
+        args.baseline.write_text(json.dumps({
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+            "environment": env,
+            "settings": {"repeat": args.repeat, "warmup": args.warmup, "min_time": args.min_time},
+            "cases": results,
+        }, indent=1) + "\n")
+        print(f"\nBaseline saved: {args.baseline}")
+    elif baseline is None:
+        print(f"\nNo baseline at {args.baseline} — save one with --save-baseline")
+
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) over {args.threshold:.0%}: "
+              f"{', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+"""
+Middleware overhead benchmark — requests/sec and latency percentiles for
+/classify and /health through the app's middleware stack.
+
+Usage (from backend/):
+    python benchmarks/middleware_overhead.py                    # both stacks, side by side
+    python benchmarks/middleware_overhead.py --stack asgi -n 20000
+
+The app is driven in-process through httpx's ASGI transport, with the
+classifier stubbed out (no OpenAI, Claude or database), so the numbers
+are the framework + middleware cost per request — what the middleware
+stack actually changes. Two stacks are compared:
+
+  basehttp  the previous BaseHTTPMiddleware versions of RateLimitMiddleware
+            and SecurityHeadersMiddleware (kept here as the baseline)
+  asgi      the pure-ASGI middleware in hts_oracle/middleware.py
+
+Both use the same in-memory rate limiter, with a limit high enough that
+nothing is rejected, and the same CORS middleware as main.py.
+
+Requests go one at a time by default. With the classifier stubbed, the
+pure-ASGI stack never yields mid-request, so with -c > 1 its requests
+run back to back while the BaseHTTPMiddleware ones interleave — the
+latency percentiles then mostly measure queueing, not overhead.
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import time
+from unittest.mock import patch
+
+# Settings validation needs the API keys, which these requests never use
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+os.environ.setdefault("ANTHROPIC_API_KEY", "benchmark")
+
+import httpx
+from fastapi import FastAPI
+from fastapi.middleware.cors import CORSMiddleware
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+
+from hts_oracle.db import get_db
+from hts_oracle.middleware import RateLimitMiddleware, SecurityHeadersMiddleware
+from hts_oracle.routes import classify, health
+from hts_oracle.services.rate_limiter import (
+    MemoryBackend,
+    RateLimit,
+    RateLimiter,
+    retry_after_header,
+)
+
+CLASSIFY_RESULT = {
+    "results": [{
+        "hts_code": "6109.10.00",
+        "description": (
+            "T-shirts, singlets, tank tops and similar garments, knitted or crocheted: Of cotton"
+        ),
+        "general_rate": "16.5%",
+        "chapter": "61",
+        "confidence_score": 82.0,
+        "similarity": 0.82,
+    }] * 10,
+    "method": "vector_only",
+    "analysis": None,
+    "latency_ms": 0,
+}
+
+
+# ---------------------------------------------------------------------------
+# Baseline: the BaseHTTPMiddleware implementations being replaced
+# ---------------------------------------------------------------------------
+
+class BaseHTTPRateLimitMiddleware(BaseHTTPMiddleware):
+    def __init__(self, app, limiter: RateLimiter):
+        super().__init__(app)
+        self.limiter = limiter
+
+    async def dispatch(self, request: Request, call_next):
+        client_ip = request.headers.get("X-Forwarded-For", "").split(",")[0].strip()
+        if not client_ip:
+            client_ip = request.client.host if request.client else "unknown"
+
+        decision = await self.limiter.check(client_ip, request.url.path)
+        if decision is None:
+            return await call_next(request)
+        if not decision.allowed:
+            return JSONResponse(
+                status_code=429,
+                content={"detail": "Too many requests. Please try again later."},
+                headers={"Retry-After": retry_after_header(decision)},
+            )
+        response = await call_next(request)
+        response.headers["X-RateLimit-Limit"] = str(decision.limit)
+        response.headers["X-RateLimit-Remaining"] = str(decision.remaining)
+        return response
+
+
+class BaseHTTPSecurityHeadersMiddleware(BaseHTTPMiddleware):
+    async def dispatch(self, request: Request, call_next):
+        response = await call_next(request)
+        response.headers["X-Content-Type-Options"] = "nosniff"
+        response.headers["X-Frame-Options"] = "DENY"
+        response.headers["Referrer-Policy"] = "strict-origin-when-cross-origin"
+        return response
+
+
+STACKS = {
+    "basehttp": (BaseHTTPSecurityHeadersMiddleware, BaseHTTPRateLimitMiddleware),
+    "asgi": (SecurityHeadersMiddleware, RateLimitMiddleware),
+}
+
+
+def build_app(stack: str) -> FastAPI:
+    """The API's routes and middleware order (main.py), with a stubbed database."""
+    security, rate_limit = STACKS[stack]
+    app = FastAPI()
+    app.add_middleware(
+        CORSMiddleware, allow_origins=["http://localhost:5173"],
+        allow_credentials=True, allow_methods=["*"], allow_headers=["*"],
+    )
+    app.add_middleware(security)
+    app.add_middleware(
+        rate_limit,
+        limiter=RateLimiter(MemoryBackend(), default=RateLimit(10**9, 60), exempt=("/health",)),
+    )
+    app.include_router(health.router, prefix="/api/v1")
+    app.include_router(classify.router, prefix="/api/v1")
+
+    async def no_db():
+        yield None
+
+    app.dependency_overrides[get_db] = no_db
+    return app
+
+
+# ---------------------------------------------------------------------------
+# Load generation
+# ---------------------------------------------------------------------------
+
+async def _stub_classify(**kwargs):
+    return CLASSIFY_RESULT
+
+
+async def run(app: FastAPI, endpoint: str, requests: int, concurrency: int) -> dict:
+    """Send `requests` requests, `concurrency` at a time. Returns throughput + latency stats."""
+    latencies: list[float] = []
+    transport = httpx.ASGITransport(app=app, client=("198.51.100.7", 50000))
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def one() -> None:
+            started = time.perf_counter()
+            if endpoint == "classify":
+                response = await client.post("/api/v1/classify", json={"query": "cotton t-shirts"})
+            else:
+                response = await client.get("/api/v1/health")
+            latencies.append(time.perf_counter() - started)
+            response.raise_for_status()
+
+        async def worker(count: int) -> None:
+            for _ in range(count):
+                await one()
+
+        for _ in range(min(200, requests)):  # Warm up
+            await one()
+        latencies.clear()
+
+        per_worker, extra = divmod(requests, concurrency)
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(per_worker + (i < extra)) for i in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "rps": len(latencies) / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p99_ms": latencies[int(len(latencies) * 0.99) - 1] * 1000,
+    }
+
+
+async def main_async(args: argparse.Namespace) -> None:
+    stacks = [args.stack] if args.stack else list(STACKS)
+    results = {}
+    with patch.object(classify, "classify", _stub_classify):
+        for endpoint in ("classify", "health"):
+            for stack in stacks:
+                results[endpoint, stack] = await run(build_app(stack), endpoint, args.n, args.c)
+
+    print(f"{args.n:,} requests per run, {args.c} concurrent\n")
+    print(f"{'endpoint':<10} {'stack':<9} {'req/s':>9} {'p50 ms':>8} {'p99 ms':>8}")
+    for (endpoint, stack), r in results.items():
+        print(f"{endpoint:<10} {stack:<9} {r['rps']:>9,.0f} "
+              f"{r['p50_ms']:>8.2f} {r['p99_ms']:>8.2f}")
+    if len(stacks) == 2:
+        print()
+        for endpoint in ("classify", "health"):
+            before, after = results[endpoint, "basehttp"], results[endpoint, "asgi"]
+            print(f"{endpoint}: {after['rps'] / before['rps']:.2f}x req/s, "
+                  f"p99 {before['p99_ms']:.2f} → {after['p99_ms']:.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the API middleware stack")
+    parser.add_argument("--stack", choices=list(STACKS), help="Run one stack only (default: both)")
+    parser.add_argument("-n", type=int, default=5000, help="Requests per run (default: 5000)")
+    parser.add_argument("-c", type=int, default=1, help="Concurrent requests (default: 1)")
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
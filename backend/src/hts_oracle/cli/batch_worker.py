@@ -0,0 +1,52 @@
+"""
+Standalone batch worker process.
+
+Usage:
+    python -m hts_oracle.cli.batch_worker --concurrency 4
+
+Claims jobs from the same Postgres queue as the API's in-process workers.
+Run as many of these as you like, on as many machines as you like — the
+FOR UPDATE SKIP LOCKED claim guarantees each job goes to exactly one worker.
+
+To run ONLY dedicated workers, set BATCH_WORKERS=0 on the API service.
+"""
+
+import argparse
+import asyncio
+
+import structlog
+
+from hts_oracle.db import close_db, init_db
+from hts_oracle.services.batch_worker import BatchWorkerPool
+
+log = structlog.get_logger()
+
+
+async def run(concurrency: int):
+    await init_db()
+    pool = BatchWorkerPool(concurrency)
+    pool.start()
+    print(f"Batch worker running with {concurrency} task(s). Ctrl+C to stop.")
+    try:
+        await asyncio.Event().wait()  # Run until cancelled
+    finally:
+        await pool.stop()
+        await close_db()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run batch classification workers")
+    parser.add_argument(
+        "--concurrency", type=int, default=2,
+        help="Number of jobs this process works on at once (default: 2)",
+    )
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(run(args.concurrency))
+    except KeyboardInterrupt:
+        print("\nStopped.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+"""
+COPY-based bulk upsert into hts_codes — the import's database phase.
+
+The import used to SELECT each code, then update it through the ORM or
+insert a new object: two round trips (plus ORM bookkeeping) per row,
+thousands per import. This does one batch in four statements:
+
+    1. CREATE TEMP TABLE staging ... ON COMMIT DROP
+    2. COPY the batch (text columns + vectors, binary format) into it
+    3. INSERT ... SELECT FROM staging ON CONFLICT (hts_number) DO UPDATE
+    4. COMMIT (which drops the staging table)
+
+The staging table is temporary — scratch space private to this session,
+so concurrent imports can't clobber each other's batches, and it skips
+the WAL. Created and dropped inside the batch's transaction, it also
+works through PgBouncer's transaction pooling. Embeddings travel in
+pgvector's binary format (registered on this connection with
+pgvector.asyncpg.register_vector).
+
+A row that arrives without an embedding (unchanged text, or the OpenAI
+call failed) keeps the embedding it already had, along with the
+embed_hash / model / dimensions that describe it.
+
+Uses a plain asyncpg connection rather than the app's SQLAlchemy pool —
+COPY and the binary vector codec are asyncpg features, and the codec
+shouldn't leak onto pooled connections.
+"""
+
+import time
+from dataclasses import dataclass
+
+import asyncpg
+from pgvector.asyncpg import register_vector
+from sqlalchemy.engine import make_url
+
+LIVE_TABLE = "hts_codes"
+STAGING_TABLE = "hts_codes_import_staging"
+
+# Column order of the records passed to upsert_batch()
+COLUMNS = (
+    "hts_number",
+    "description",
+    "enhanced_description",
+    "enriched_text",
+    "context_path",
+    "chapter",
+    "general_rate",
+    "special_rate",
+    "unit",
+    "is_leaf",
+    "embedding",
+    "embed_hash",
+    "embedding_model",
+    "embedding_dimensions",
+)
+
+# Columns describing the embedding — they change only together with it
+_EMBEDDING_COLUMNS = ("embedding", "embed_hash", "embedding_model", "embedding_dimensions")
+
+_CREATE_STAGING = f"""
+CREATE TEMP TABLE {STAGING_TABLE} (
+    hts_number           varchar(20) NOT NULL,
+    description          text NOT NULL,
+    enhanced_description text,
+    enriched_text        text,
+    context_path         text,
+    chapter              varchar(10),
+    general_rate         varchar(200),
+    special_rate         text,
+    unit                 varchar(100),
+    is_leaf              boolean,
+    embedding            vector,
+    embed_hash           varchar(64),
+    embedding_model      varchar(100),
+    embedding_dimensions integer
+) ON COMMIT DROP
+"""
+
+_UPDATABLE = [c for c in COLUMNS if c != "hts_number" and c not in _EMBEDDING_COLUMNS]
+
+# xmax = 0 only for freshly inserted rows — lets us count inserts vs updates
+def _merge_sql(table: str) -> str:
+    return f"""
+INSERT INTO {table} ({", ".join(COLUMNS)})
+SELECT {", ".join(COLUMNS)} FROM {STAGING_TABLE}
+ON CONFLICT (hts_number) DO UPDATE SET
+    {", ".join(f"{c} = EXCLUDED.{c}" for c in _UPDATABLE)},
+    {", ".join(
+        f"{c} = CASE WHEN EXCLUDED.embedding IS NULL THEN {table}.{c} ELSE EXCLUDED.{c} END"
+        for c in _EMBEDDING_COLUMNS
+    )},
+    updated_at = now()
+RETURNING (xmax = 0) AS inserted
+"""
+
+
+@dataclass
+class UpsertStats:
+    """Running totals for the import summary."""
+    rows: int = 0
+    inserted: int = 0
+    updated: int = 0
+    copy_seconds: float = 0.0
+    merge_seconds: float = 0.0
+
+    @property
+    def db_seconds(self) -> float:
+        return self.copy_seconds + self.merge_seconds
+
+
+def asyncpg_dsn(database_url: str) -> str:
+    """ "postgresql+asyncpg://..." (SQLAlchemy) → "postgresql://..." (asyncpg)."""
+    return make_url(database_url).set(drivername="postgresql").render_as_string(
+        hide_password=False,
+    )
+
+
+async def connect(database_url: str) -> asyncpg.Connection:
+    """
+    Open the bulk-load connection, with the vector codec registered.
+
+    statement_cache_size=0: required for Supabase/PgBouncer, as elsewhere.
+    """
+    conn = await asyncpg.connect(asyncpg_dsn(database_url), statement_cache_size=0)
+    await register_vector(conn)
+    return conn
+
+
+async def fetch_current_embed_hashes(
+    conn: asyncpg.Connection,
+    model: str,
+    dimensions: int,
+    table: str = LIVE_TABLE,
+) -> dict[str, str]:
+    """
+    hts_number → embed_hash for rows whose stored vector is usable as-is:
+    it exists and was made with this model at these dimensions.
+    """
+    rows = await conn.fetch(
+        f"SELECT hts_number, embed_hash FROM {table} "
+        "WHERE embedding IS NOT NULL AND embed_hash IS NOT NULL "
+        "AND embedding_model = $1 AND embedding_dimensions = $2",
+        model,
+        dimensions,
+    )
+    return {row["hts_number"]: row["embed_hash"] for row in rows}
+
+
+async def upsert_batch(
+    conn: asyncpg.Connection,
+    records: list[tuple],
+    stats: UpsertStats,
+    table: str = LIVE_TABLE,
+) -> None:
+    """
+    COPY `records` (tuples in COLUMNS order) into staging, then merge them
+    into `table` (hts_codes, or the rebuild's shadow table) — all in one
+    transaction.
+
+    hts_number must be unique within a batch (ON CONFLICT can't touch the
+    same row twice in one statement); dedupe_records() takes care of that.
+    """
+    if not records:
+        return
+
+    async with conn.transaction():
+        started = time.perf_counter()
+        await conn.execute(_CREATE_STAGING)
+        await conn.copy_records_to_table(STAGING_TABLE, records=records, columns=COLUMNS)
+        copied = time.perf_counter()
+
+        results = await conn.fetch(_merge_sql(table))
+        merged = time.perf_counter()
+
+    inserted = sum(1 for r in results if r["inserted"])
+    stats.rows += len(records)
+    stats.inserted += inserted
+    stats.updated += len(results) - inserted
+    stats.copy_seconds += copied - started
+    stats.merge_seconds += merged - copied
+
+
+def dedupe_records(records: list[tuple]) -> list[tuple]:
+    """Keep the last record for each hts_number, in first-seen order."""
+    latest: dict[str, tuple] = {}
+    for record in records:
+        latest[record[0]] = record
+    return list(latest.values())
@@ -0,0 +1,160 @@
+"""
+Fit the confidence gate to the classification audit log.
+
+Usage:
+    python -m hts_oracle.cli.calibrate                       # last 30 days, target 95% agreement
+    python -m hts_oracle.cli.calibrate --target 0.98 --days 90
+    python -m hts_oracle.cli.calibrate --write-env .env.local
+
+Reads classifications since --days ago and prints:
+  1. Claude's agreement with the vector top-1, by top-1 similarity and by
+     the margin over the runner-up (rows where Claude was asked)
+  2. How the current gate (HIGH_CONFIDENCE_THRESHOLD / HIGH_CONFIDENCE_MARGIN)
+     does on the same rows
+  3. The fitted gate: the fewest Claude calls with agreement on the
+     skipped queries at --target or better (see services/calibration.py)
+
+--write-env puts the fitted values into an env file (replacing the lines
+already there); the app picks them up on its next restart.
+
+Only rows written since migration 012 carry both picks. Claude's verdict
+above the current threshold comes from CALIBRATION_SAMPLE_RATE — without
+it, a higher threshold can't be checked and won't be recommended. Each
+sampled row is weighted by 1 / its sample rate (recorded since migration
+013), so agreement reflects traffic, not just the rows Claude saw.
+"""
+
+import argparse
+import asyncio
+import re
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from sqlalchemy import text
+
+from hts_oracle.config import get_settings
+from hts_oracle.db import close_db, get_session_factory, init_db
+from hts_oracle.services.calibration import (
+    GateStats,
+    Observation,
+    agreement_curve,
+    evaluate_gate,
+    fit,
+)
+
+
+async def load_observations(days: float) -> list[Observation]:
+    """Audit rows since `days` ago, labelled where Claude was asked."""
+    await init_db()
+    try:
+        async with get_session_factory()() as db:
+            rows = (await db.execute(
+                text(
+                    "SELECT confidence, top2_similarity, vector_top_hts_code, llm_pick_hts_code, "
+                    "calibration_sample_rate "
+                    "FROM classifications "
+                    "WHERE created_at >= :since AND confidence IS NOT NULL "
+                    "AND vector_top_hts_code IS NOT NULL"
+                ),
+                {"since": datetime.utcnow() - timedelta(days=days)},
+            )).fetchall()
+    finally:
+        await close_db()
+    return [
+        Observation(
+            similarity=row.confidence,
+            second=row.top2_similarity,
+            agreed=(
+                None if row.llm_pick_hts_code is None
+                else row.llm_pick_hts_code == row.vector_top_hts_code
+            ),
+            weight=1 / row.calibration_sample_rate if row.calibration_sample_rate else 1.0,
+        )
+        for row in rows
+    ]
+
+
+def print_curve(title: str, buckets) -> None:
+    print(f"\n{title}")
+    print(f"  {'range':<13} {'asked':>7} {'agreed':>8}")
+    for b in buckets:
+        print(f"  {b.low:.2f}–{b.high:.2f}    {b.n:>7,} {b.agreement:>8.1%}")
+
+
+def describe(name: str, stats: GateStats) -> str:
+    margin = f"{stats.margin:.2f}" if stats.margin else "off"
+    return (
+        f"{name:<8} threshold {stats.threshold:.2f}, margin {margin}: "
+        f"Claude on {stats.llm_share:.1%} of queries; skipped queries agree {stats.agreement:.1%} "
+        f"(≥ {stats.agreement_lower:.1%} at 95% confidence, {stats.skipped_labelled:,} checked)"
+    )
+
+
+def update_env_file(path: Path, values: dict[str, str]) -> None:
+    """Set NAME=value lines in an env file, replacing existing ones (commented or not)."""
+    lines = path.read_text().splitlines() if path.exists() else []
+    remaining = dict(values)
+    for i, line in enumerate(lines):
+        match = re.match(r"^\s*#?\s*([A-Z_]+)=", line)
+        if match and match.group(1) in remaining:
+            name = match.group(1)
+            lines[i] = f"{name}={remaining.pop(name)}"
+    lines.extend(f"{name}={value}" for name, value in remaining.items())
+    path.write_text("\n".join(lines) + "\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Fit the classify() confidence gate to the audit log",
+    )
+    parser.add_argument("--days", type=float, default=30,
+                        help="Audit rows from the last N days (default: 30)")
+    parser.add_argument("--target", type=float, default=0.95,
+                        help="Agreement with Claude required on skipped queries (default: 0.95)")
+    parser.add_argument("--min-samples", type=int, default=30,
+                        help="Labelled rows needed behind a gate (default: 30)")
+    parser.add_argument("--step", type=float, default=0.01,
+                        help="Grid step for threshold and margin")
+    parser.add_argument("--write-env", type=Path, metavar="FILE",
+                        help="Write the fitted gate into this env file")
+    args = parser.parse_args()
+
+    settings = get_settings()
+    observations = asyncio.run(load_observations(args.days))
+    labelled = sum(o.agreed is not None for o in observations)
+    print(f"{len(observations):,} classifications in the last {args.days:g} days, "
+          f"{labelled:,} with Claude's verdict")
+    if not labelled:
+        print("Nothing to calibrate from yet.")
+        return
+
+    print_curve("Agreement by top-1 similarity",
+                agreement_curve(observations, "similarity", 0.05))
+    print_curve("Agreement by margin over the runner-up",
+                agreement_curve(observations, "margin", 0.02))
+
+    print()
+    current = evaluate_gate(
+        observations, settings.high_confidence_threshold, settings.high_confidence_margin,
+    )
+    print(describe("Current", current))
+    fitted = fit(observations, target=args.target, min_samples=args.min_samples, step=args.step)
+    if fitted is None:
+        print(f"No gate reaches {args.target:.0%} agreement with "
+              f"{args.min_samples}+ checked queries — collect more data "
+              f"(or raise CALIBRATION_SAMPLE_RATE).")
+        return
+    print(describe("Fitted", fitted))
+
+    values = {
+        "HIGH_CONFIDENCE_THRESHOLD": f"{fitted.threshold:.2f}",
+        "HIGH_CONFIDENCE_MARGIN": f"{fitted.margin:.2f}",
+    }
+    print("\n" + "\n".join(f"{name}={value}" for name, value in values.items()))
+    if args.write_env:
+        update_env_file(args.write_env, values)
+        print(f"\nWritten to {args.write_env} — restart the app to apply.")
+
+
+if __name__ == "__main__":
+    main()
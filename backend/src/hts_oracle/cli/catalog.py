@@ -0,0 +1,281 @@
+"""
+Catalog revision management.
+
+Usage:
+    python -m hts_oracle.cli.catalog list
+    python -m hts_oracle.cli.catalog activate 4
+    python -m hts_oracle.cli.catalog rollback          # back to the previously active revision
+    python -m hts_oracle.cli.catalog drop 2
+    python -m hts_oracle.cli.catalog drop 3 --force    # a "building" revision whose import died
+    python -m hts_oracle.cli.catalog prune --keep 2    # drop all but the 2 newest retired revisions
+    python -m hts_oracle.cli.catalog prune --building-older-than 24   # ...and stuck builds
+
+New revisions are built by the import:
+    python -m hts_oracle.cli.import_hts data/hts_2026_revision_4_csv.csv --revision [--activate]
+
+Activating is a single transaction on catalog_revisions; each app process
+notices within catalog_poll_seconds, prewarms the new table and switches
+(services/catalog.py). Retired revisions keep their tables and indexes,
+so a rollback is the same instant switch in the other direction. The
+original hts_codes table is revision 0: rolling back the first
+activation serves it again, and drop/prune leave it alone.
+
+A build that was killed before its cleanup ran (SIGKILL, a crashed host)
+leaves its revision "building" with a half-built table. Nothing marks it
+failed, so drop refuses it unless forced; prune --building-older-than
+clears such revisions once they're clearly not an import still running.
+
+Schema migrations that change hts_codes apply to the original table only —
+after one, build a fresh revision so the served table has the new columns.
+"""
+
+import argparse
+import asyncio
+import sys
+
+import asyncpg
+
+from hts_oracle.cli.bulk_upsert import LIVE_TABLE, asyncpg_dsn
+from hts_oracle.config import get_settings
+
+# Statuses whose table can be (re)activated
+ACTIVATABLE = ("ready", "retired")
+
+# Revision 0: the original hts_codes table (recorded by migration 008)
+ORIGINAL_REVISION = 0
+
+
+class RevisionError(Exception):
+    """An invalid revision operation — the message is shown to the operator."""
+
+
+# ---------------------------------------------------------------------------
+# Operations (asyncpg connection; also used by import_hts)
+# ---------------------------------------------------------------------------
+
+async def active_revision(conn: asyncpg.Connection) -> tuple[int | None, str]:
+    """(revision id, table) being served — (None, "hts_codes") before any revision."""
+    row = await conn.fetchrow(
+        "SELECT id, table_name FROM catalog_revisions WHERE status = 'active'"
+    )
+    return (row["id"], row["table_name"]) if row else (None, LIVE_TABLE)
+
+
+async def create_revision(
+    conn: asyncpg.Connection,
+    source_file: str,
+    source_sha256: str,
+) -> tuple[int, str]:
+    """Register a new revision in "building" state; returns (id, table name)."""
+    row = await conn.fetchrow(
+        "WITH next AS (SELECT nextval(pg_get_serial_sequence('catalog_revisions', 'id')) AS id) "
+        "INSERT INTO catalog_revisions (id, table_name, status, source_file, source_sha256) "
+        f"SELECT id, '{LIVE_TABLE}_r' || id, 'building', $1, $2 FROM next "
+        "RETURNING id, table_name",
+        source_file,
+        source_sha256,
+    )
+    return row["id"], row["table_name"]
+
+
+async def mark_ready(conn: asyncpg.Connection, revision_id: int) -> int:
+    """Record a finished build (and its row count). Returns the row count."""
+    table = await conn.fetchval(
+        "SELECT table_name FROM catalog_revisions WHERE id = $1", revision_id,
+    )
+    rows = await conn.fetchval(f"SELECT count(*) FROM {table}")
+    await conn.execute(
+        "UPDATE catalog_revisions SET status = 'ready', ready_at = now(), row_count = $2 "
+        "WHERE id = $1",
+        revision_id,
+        rows,
+    )
+    return rows
+
+
+async def mark_failed(conn: asyncpg.Connection, revision_id: int) -> None:
+    """Drop an aborted build's table and record that it failed."""
+    table = await conn.fetchval(
+        "SELECT table_name FROM catalog_revisions WHERE id = $1", revision_id,
+    )
+    if table:
+        await conn.execute(f"DROP TABLE IF EXISTS {table}")
+    await conn.execute("UPDATE catalog_revisions SET status = 'failed' WHERE id = $1", revision_id)
+
+
+async def activate(conn: asyncpg.Connection, revision_id: int) -> int | None:
+    """
+    Make `revision_id` the served revision. Returns the previously active id.
+
+    Both updates happen in one transaction (and the partial unique index
+    allows only one active row), so there's never zero or two active.
+    """
+    async with conn.transaction():
+        row = await conn.fetchrow(
+            "SELECT status, table_name FROM catalog_revisions WHERE id = $1 FOR UPDATE",
+            revision_id,
+        )
+        if row is None:
+            raise RevisionError(f"No revision {revision_id}")
+        if row["status"] == "active":
+            raise RevisionError(f"Revision {revision_id} is already active")
+        if row["status"] not in ACTIVATABLE:
+            raise RevisionError(f"Revision {revision_id} is {row['status']} — can't activate it")
+        if await conn.fetchval("SELECT to_regclass($1)", row["table_name"]) is None:
+            raise RevisionError(f"Table {row['table_name']} for revision {revision_id} is missing")
+
+        previous = await conn.fetchval(
+            "UPDATE catalog_revisions SET status = 'retired' WHERE status = 'active' RETURNING id"
+        )
+        await conn.execute(
+            "UPDATE catalog_revisions SET status = 'active', activated_at = now() WHERE id = $1",
+            revision_id,
+        )
+    return previous
+
+
+async def rollback_target(conn: asyncpg.Connection) -> int:
+    """
+    The retired revision that was active most recently — revision 0 (the
+    original table, never activated through a revision) comes last.
+    """
+    revision_id = await conn.fetchval(
+        "SELECT id FROM catalog_revisions WHERE status = 'retired' "
+        "ORDER BY activated_at DESC NULLS LAST LIMIT 1"
+    )
+    if revision_id is None:
+        raise RevisionError("No earlier revision to roll back to")
+    return revision_id
+
+
+async def drop_revision(conn: asyncpg.Connection, revision_id: int, force: bool = False) -> str:
+    """
+    Drop a revision's table (never the active one or revision 0). Returns
+    the table name. A "building" revision is only dropped with force=True —
+    the caller vouches that no import is still writing to it.
+    """
+    row = await conn.fetchrow(
+        "SELECT status, table_name FROM catalog_revisions WHERE id = $1", revision_id,
+    )
+    if row is None:
+        raise RevisionError(f"No revision {revision_id}")
+    if revision_id == ORIGINAL_REVISION:
+        raise RevisionError(f"Revision {revision_id} is the original {LIVE_TABLE} table — kept")
+    if row["status"] == "active":
+        raise RevisionError(f"Revision {revision_id} is active — can't drop it")
+    if row["status"] == "building" and not force:
+        raise RevisionError(
+            f"Revision {revision_id} is building — use --force if its import is no longer running"
+        )
+    async with conn.transaction():
+        await conn.execute(f"DROP TABLE IF EXISTS {row['table_name']}")
+        await conn.execute(
+            "UPDATE catalog_revisions SET status = 'dropped' WHERE id = $1", revision_id,
+        )
+    return row["table_name"]
+
+
+async def prune(
+    conn: asyncpg.Connection,
+    keep: int,
+    building_older_than_hours: float | None = None,
+) -> list[int]:
+    """
+    Drop retired revisions beyond the `keep` most recently active ones
+    (never revision 0) and, with building_older_than_hours, revisions
+    still "building" that long after they were created — abandoned builds.
+    """
+    stale = await conn.fetch(
+        "SELECT id FROM catalog_revisions WHERE status = 'retired' AND id <> $2 "
+        "ORDER BY activated_at DESC NULLS LAST OFFSET $1",
+        keep,
+        ORIGINAL_REVISION,
+    )
+    for row in stale:
+        await drop_revision(conn, row["id"])
+    dropped = [row["id"] for row in stale]
+
+    if building_older_than_hours is not None:
+        abandoned = await conn.fetch(
+            "SELECT id FROM catalog_revisions WHERE status = 'building' "
+            "AND created_at < now() - $1 * interval '1 hour' ORDER BY id",
+            building_older_than_hours,
+        )
+        for row in abandoned:
+            await drop_revision(conn, row["id"], force=True)
+        dropped += [row["id"] for row in abandoned]
+    return dropped
+
+
+# ---------------------------------------------------------------------------
+# Entry point — python -m hts_oracle.cli.catalog <command>
+# ---------------------------------------------------------------------------
+
+async def _list(conn: asyncpg.Connection) -> None:
+    rows = await conn.fetch(
+        "SELECT id, table_name, status, row_count, source_file, created_at, activated_at "
+        "FROM catalog_revisions ORDER BY id"
+    )
+    if not rows:
+        print(f"No revisions yet — serving {LIVE_TABLE}")
+        return
+    print(f"{'id':>4}  {'status':<8}  {'rows':>7}  {'created':<16}  {'activated':<16}  source")
+    for r in rows:
+        print(
+            f"{r['id']:>4}  {r['status']:<8}  {r['row_count'] or 0:>7,}  "
+            f"{r['created_at']:%Y-%m-%d %H:%M}  "
+            f"{r['activated_at'].strftime('%Y-%m-%d %H:%M') if r['activated_at'] else '-':<16}  "
+            f"{r['source_file'] or ''}"
+        )
+
+
+async def run(args: argparse.Namespace) -> None:
+    conn = await asyncpg.connect(asyncpg_dsn(get_settings().database_url), statement_cache_size=0)
+    try:
+        if args.command == "list":
+            await _list(conn)
+        elif args.command in ("activate", "rollback"):
+            target = args.revision if args.command == "activate" else await rollback_target(conn)
+            previous = await activate(conn, target)
+            print(f"Revision {target} is now active (was {previous or LIVE_TABLE}). "
+                  f"App processes switch within {get_settings().catalog_poll_seconds:g}s.")
+        elif args.command == "drop":
+            print(f"Dropped {await drop_revision(conn, args.revision, force=args.force)}")
+        elif args.command == "prune":
+            dropped = await prune(conn, args.keep, args.building_older_than)
+            print(f"Dropped revisions: {', '.join(map(str, dropped)) or 'none'}")
+    finally:
+        await conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage HTS catalog revisions")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("list", help="Show all revisions")
+    commands.add_parser("activate", help="Serve a revision").add_argument("revision", type=int)
+    commands.add_parser("rollback", help="Re-activate the previously active revision")
+    drop = commands.add_parser("drop", help="Drop a revision's table")
+    drop.add_argument("revision", type=int)
+    drop.add_argument(
+        "--force", action="store_true",
+        help="Also drop a \"building\" revision (only if its import is no longer running)",
+    )
+    prune_parser = commands.add_parser("prune", help="Drop old retired revisions")
+    prune_parser.add_argument(
+        "--keep", type=int, default=2, help="Retired revisions to keep for rollback (default: 2)",
+    )
+    prune_parser.add_argument(
+        "--building-older-than", type=float, default=None, metavar="HOURS",
+        help="Also drop revisions still \"building\" this many hours after they were created",
+    )
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(run(args))
+    except RevisionError as e:
+        print(f"ERROR: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
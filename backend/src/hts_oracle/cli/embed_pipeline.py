@@ -0,0 +1,300 @@
+"""
+Building blocks for the pipelined HTS import (cli/import_hts.py).
+
+The import used to be strictly serial — build texts, wait for OpenAI,
+wait for Postgres, repeat — so wall-clock time was the sum of every
+round trip. The pipeline overlaps them:
+
+    CSV reader ──► embed workers (N, rate limited) ──► DB writer
+         (bounded queue)                (bounded queue)
+
+and this module provides the pieces that make that safe to run flat out:
+
+  - RateLimiter:     tokens-per-minute + requests-per-minute budget, so N
+                     workers together stay under the OpenAI account limits
+  - embed_with_retry: one embeddings call with backoff on 429s / 5xx
+  - Checkpoint:      which batches are already written, so an interrupted
+                     import resumes instead of starting over
+  - ImportProgress:  live throughput line (rows/s, embeddings/s, TPM), or
+                     JSON lines when a supervisor (POST /admin/import-csv) reads them
+
+With these, import time is bounded by the API rate limit, not by latency.
+"""
+
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+
+import openai
+
+# Rough tokens-per-character for English embed text — only used to budget
+# requests before the API tells us the real count.
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(texts: list[str]) -> int:
+    return sum(len(text) // CHARS_PER_TOKEN + 1 for text in texts)
+
+
+# ---------------------------------------------------------------------------
+# Rate limiting
+# ---------------------------------------------------------------------------
+
+class _Bucket:
+    """A token bucket refilled continuously at `per_minute / 60` per second."""
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.level = float(per_minute)
+        self.rate = per_minute / 60.0
+
+    def refill(self, elapsed: float) -> None:
+        self.level = min(self.capacity, self.level + elapsed * self.rate)
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until `amount` is available (0 if it is now)."""
+        missing = amount - self.level
+        return max(missing / self.rate, 0.0) if self.rate else float("inf")
+
+
+class RateLimiter:
+    """
+    Keeps concurrent embedding calls under a TPM and an RPM limit.
+
+    acquire() waits until both budgets allow the request. Callers are
+    served one at a time (FIFO), so a big request isn't starved by small
+    ones. After the call, settle() corrects the token budget with the
+    usage the API actually reported.
+    """
+
+    def __init__(self, tokens_per_minute: int, requests_per_minute: int, clock=time.monotonic):
+        self.tokens = _Bucket(tokens_per_minute)
+        self.requests = _Bucket(requests_per_minute)
+        self._clock = clock
+        self._last = clock()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = self._clock()
+        elapsed, self._last = now - self._last, now
+        self.tokens.refill(elapsed)
+        self.requests.refill(elapsed)
+
+    async def acquire(self, tokens: int) -> None:
+        # A single request can never need more than a full minute's budget
+        tokens = min(tokens, self.tokens.capacity)
+        async with self._lock:
+            while True:
+                self._refill()
+                wait = max(self.tokens.wait_time(tokens), self.requests.wait_time(1))
+                if wait <= 0:
+                    self.tokens.level -= tokens
+                    self.requests.level -= 1
+                    return
+                await asyncio.sleep(wait)
+
+    def settle(self, estimated: int, actual: int) -> None:
+        """Charge (or refund) the difference between estimated and real usage."""
+        self.tokens.level = min(self.tokens.capacity, self.tokens.level - (actual - estimated))
+
+
+# ---------------------------------------------------------------------------
+# One embeddings call, with retries
+# ---------------------------------------------------------------------------
+
+# Worth retrying: rate limits, timeouts, dropped connections, server errors.
+# Anything else (bad request, auth) fails the batch straight away.
+RETRYABLE_ERRORS = (
+    openai.RateLimitError,
+    openai.APITimeoutError,
+    openai.APIConnectionError,
+    openai.InternalServerError,
+)
+
+
+def _retry_after(error: Exception) -> float | None:
+    """The server's Retry-After hint, if it sent one."""
+    response = getattr(error, "response", None)
+    value = response.headers.get("retry-after") if response is not None else None
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+async def embed_with_retry(
+    client,
+    texts: list[str],
+    model: str,
+    dimensions: int,
+    limiter: RateLimiter,
+    max_attempts: int = 6,
+    base_delay: float = 1.0,
+) -> tuple[list[list[float]], int]:
+    """
+    Embed `texts` in one API call, waiting for the rate limiter first and
+    backing off (exponential + jitter, or Retry-After) on retryable errors.
+
+    Returns (vectors, tokens_used). Raises the last error if every attempt fails.
+    """
+    estimated = estimate_tokens(texts)
+    for attempt in range(1, max_attempts + 1):
+        await limiter.acquire(estimated)
+        try:
+            response = await client.embeddings.create(
+                model=model, input=texts, dimensions=dimensions,
+            )
+        except RETRYABLE_ERRORS as e:
+            if attempt == max_attempts:
+                raise
+            delay = _retry_after(e) or min(base_delay * 2 ** (attempt - 1), 60.0)
+            await asyncio.sleep(delay * (1 + random.random() * 0.25))
+            continue
+
+        used = getattr(getattr(response, "usage", None), "total_tokens", None) or estimated
+        limiter.settle(estimated, used)
+        return [item.embedding for item in response.data], used
+
+    raise RuntimeError("unreachable")
+
+
+# ---------------------------------------------------------------------------
+# Resumable checkpoint
+# ---------------------------------------------------------------------------
+
+class Checkpoint:
+    """
+    Records which batches have been committed, in a small JSON file.
+
+    The file is tied to a fingerprint of the input (CSV hash, batch size,
+    embedding model/dimensions). A checkpoint from a different file or
+    setting is ignored rather than trusted. Writes are atomic (temp file +
+    rename), so a crash mid-write can't corrupt it.
+    """
+
+    def __init__(self, path: str | Path, fingerprint: dict):
+        self.path = Path(path)
+        self.fingerprint = fingerprint
+        self.done: set[int] = set()
+
+    def load(self) -> set[int]:
+        try:
+            data = json.loads(self.path.read_text())
+        except (FileNotFoundError, json.JSONDecodeError):
+            return set()
+        if data.get("fingerprint") != self.fingerprint:
+            return set()
+        self.done = set(data.get("done", []))
+        return set(self.done)
+
+    def mark_done(self, batch_number: int) -> None:
+        self.done.add(batch_number)
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        tmp.write_text(json.dumps({"fingerprint": self.fingerprint, "done": sorted(self.done)}))
+        os.replace(tmp, self.path)
+
+    def clear(self) -> None:
+        self.path.unlink(missing_ok=True)
+
+
+# ---------------------------------------------------------------------------
+# Live progress
+# ---------------------------------------------------------------------------
+
+def emit_json(event: dict) -> None:
+    """One machine-readable progress line on stdout (--progress-json)."""
+    print(json.dumps(event), flush=True)
+
+
+def stop_when_orphaned(reporter: asyncio.Task, task: asyncio.Task) -> None:
+    """
+    Cancel `task` if the progress reporter dies of a BrokenPipeError.
+
+    With --progress-json, stdout is a pipe to the API process supervising
+    the import. If that process dies, the reporter's next line (once a
+    second) fails, and the import is cancelled — its cleanup still runs —
+    instead of carrying on unsupervised next to a newer import. Output
+    goes to /dev/null from then on, so the cleanup's prints can't fail too.
+    """
+    def done(reporter: asyncio.Task) -> None:
+        if not reporter.cancelled() and isinstance(reporter.exception(), BrokenPipeError):
+            sys.stdout = open(os.devnull, "w")
+            task.cancel()
+
+    reporter.add_done_callback(done)
+
+
+@dataclass
+class ImportProgress:
+    """Counters shared by the pipeline stages, rendered as one status line."""
+    total_rows: int
+    rows_read: int = 0
+    rows_written: int = 0
+    texts_embedded: int = 0
+    tokens_used: int = 0
+    failed_batches: int = 0        # Batches the database rejected
+    failed_embeddings: int = 0     # Batches whose embedding call failed
+    started: float = field(default_factory=time.monotonic)
+    json_lines: bool = False  # Emit snapshot() as JSON instead of a status line
+
+    def snapshot(self) -> dict:
+        elapsed = max(time.monotonic() - self.started, 1e-6)
+        return {
+            "total_rows": self.total_rows,
+            "rows_read": self.rows_read,
+            "rows_written": self.rows_written,
+            "texts_embedded": self.texts_embedded,
+            "tokens_used": self.tokens_used,
+            "failed_batches": self.failed_batches,
+            "failed_embeddings": self.failed_embeddings,
+            "elapsed_seconds": round(elapsed, 1),
+            "rows_per_second": round(self.rows_written / elapsed, 1),
+            "embeddings_per_second": round(self.texts_embedded / elapsed, 1),
+            "tokens_per_minute": round(self.tokens_used / elapsed * 60),
+        }
+
+    def line(self) -> str:
+        elapsed = max(time.monotonic() - self.started, 1e-6)
+        return (
+            f"  {self.rows_written:,}/{self.total_rows:,} rows written"
+            f" | {self.rows_written / elapsed:,.0f} rows/s"
+            f" | {self.texts_embedded / elapsed:,.1f} embeddings/s"
+            f" | {self.tokens_used / elapsed * 60:,.0f} tokens/min"
+            + (f" | {self.failed_batches} failed batches" if self.failed_batches else "")
+            + (f" | {self.failed_embeddings} failed embeddings" if self.failed_embeddings else "")
+        )
+
+    async def report(self, interval: float = 1.0) -> None:
+        """
+        Redraw the status line until cancelled.
+
+        On a terminal the line updates in place; in logs (not a TTY) it's
+        printed every 10 intervals instead. In JSON mode every interval
+        emits a {"event": "progress", ...} line.
+        """
+        tty = sys.stdout.isatty()
+        ticks = 0
+        while True:
+            await asyncio.sleep(interval)
+            ticks += 1
+            if self.json_lines:
+                emit_json({"event": "progress", **self.snapshot()})
+            elif tty:
+                print("\r" + self.line(), end="", flush=True)
+            elif ticks % 10 == 0:
+                print(self.line(), flush=True)
+
+    @property
+    def failures(self) -> int:
+        return self.failed_batches + self.failed_embeddings
+
+    def note(self, message: str) -> None:
+        """Print a message without mangling the in-place status line."""
+        if sys.stdout.isatty():
+            print()
+        print(message, flush=True)
@@ -0,0 +1,405 @@
+"""
+Retrieval quality vs cost — evaluate search settings on a labelled golden set.
+
+Usage:
+    python -m hts_oracle.cli.evaluate ../data/golden_set.csv
+    python -m hts_oracle.cli.evaluate ../data/golden_set.csv \\
+        --sweep high_confidence_threshold=0.55,0.60,0.65,0.70 \\
+        --sweep hnsw_ef_search=40,100 --sweep search_candidates=30,60
+    python -m hts_oracle.cli.evaluate ../data/golden_set.csv --classify \\
+        --sweep high_confidence_threshold=0.6,0.7
+    python -m hts_oracle.cli.evaluate ../data/golden_set.csv --table hts_codes_r5 \\
+        --set embedding_dimensions=512
+
+The golden set is a CSV with "description" and "hts_code" columns. A
+result is correct when its code starts with the labelled one (digits
+only), so a label can stop at the heading or subheading when any
+statistical suffix under it is right.
+
+Every combination of --sweep values is one configuration (--set values
+apply to all of them), and every description runs through search_hts()
+under it. Reported per configuration, side by side:
+
+  recall@1/5/10  share of descriptions with a correct code in the top k
+  llm            share that would go to Claude (under the confidence gate:
+                 high_confidence_threshold, high_confidence_margin)
+  p50/p95 ms     per query: its embedding (fetched once up front and
+                 reused across configurations, so sweeps cost one
+                 embedding per description) plus the search
+  $/1K           estimated cost per 1,000 queries: the query embedding
+                 plus, for the llm share, one Claude call — tokens taken
+                 as 4 characters each of the real prompt, at the --*-price
+                 rates (USD per million tokens)
+
+With --classify, classify() runs instead and Claude is really called for
+low-confidence queries: recall@1 is then the code classify() returns
+first, llm is the share that went to Claude, and latency includes it.
+The audit rows it writes are rolled back.
+
+Then the recommendation: the cheapest (then fastest) configuration whose
+--metric is within --tolerance of the best. --out saves everything as JSON.
+
+Embedding dimensions and HNSW build parameters belong to a catalog table:
+build a revision with them (import_hts --revision) and evaluate it with
+--table hts_codes_r<N>, plus --set embedding_dimensions=<N> if it changed.
+"""
+
+import argparse
+import asyncio
+import csv
+import itertools
+import json
+import re
+import statistics
+import sys
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from unittest.mock import patch
+
+from pydantic import TypeAdapter, ValidationError
+
+from hts_oracle.config import Settings, get_settings
+from hts_oracle.db import close_db, get_session_factory, init_db
+from hts_oracle.services import catalog, searcher
+from hts_oracle.services.calibration import skips_llm
+from hts_oracle.services.classifier import classify, claude_prompt
+from hts_oracle.services.embedder import embed_text
+from hts_oracle.services.searcher import search_hts
+
+RECALL_AT = (1, 5, 10)
+
+# Claude's reply to the disambiguation prompt: a code and 1-2 sentences
+LLM_OUTPUT_TOKENS = 80
+
+
+@dataclass
+class GoldenItem:
+    description: str
+    hts_code: str
+
+
+@dataclass
+class Prices:
+    """USD per million tokens."""
+    embedding: float = 0.02      # text-embedding-3-small
+    llm_input: float = 1.00      # Claude Haiku 4.5
+    llm_output: float = 5.00
+
+
+@dataclass
+class Outcome:
+    """One golden description under one configuration."""
+    rank: int | None       # 1-based position of the first correct code, None if missing
+    llm: bool
+    latency_ms: float
+    query_tokens: int
+    prompt_tokens: int     # Claude prompt, whether or not it was sent
+
+
+# ---------------------------------------------------------------------------
+# Golden set and matching
+# ---------------------------------------------------------------------------
+
+def load_golden(path: str | Path) -> list[GoldenItem]:
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        reader = csv.DictReader(f)
+        if not {"description", "hts_code"} <= set(reader.fieldnames or []):
+            raise SystemExit(f"{path}: needs 'description' and 'hts_code' columns")
+        items = [
+            GoldenItem(row["description"].strip(), row["hts_code"].strip())
+            for row in reader
+            if row["description"].strip() and row["hts_code"].strip()
+        ]
+    if not items:
+        raise SystemExit(f"{path}: no labelled rows")
+    return items
+
+
+def _digits(code: str) -> str:
+    return re.sub(r"\D", "", code)
+
+
+def is_correct(result_code: str, label: str) -> bool:
+    """6109.10.00.12 is correct for labels 6109.10.00.12, 6109.10.00, 6109.10 or 6109."""
+    return _digits(result_code).startswith(_digits(label))
+
+
+def first_correct_rank(codes: list[str], label: str) -> int | None:
+    return next((i for i, code in enumerate(codes, 1) if is_correct(code, label)), None)
+
+
+def estimate_tokens(text: str) -> int:
+    return max(len(text) // 4, 1)
+
+
+# ---------------------------------------------------------------------------
+# Configurations
+# ---------------------------------------------------------------------------
+
+def parse_assignment(text: str) -> tuple[str, list[str]]:
+    """NAME=v1,v2 → (name, [v1, v2]), checked against the Settings fields."""
+    name, sep, values = text.partition("=")
+    name = name.strip().lower()
+    if not sep or not values:
+        raise argparse.ArgumentTypeError(f"expected NAME=VALUE[,VALUE...], got {text!r}")
+    if name not in Settings.model_fields:
+        raise argparse.ArgumentTypeError(f"unknown setting {name!r}")
+    return name, [value.strip() for value in values.split(",")]
+
+
+def coerce(name: str, raw: str):
+    """A setting's value from text, typed like the Settings field."""
+    try:
+        return TypeAdapter(Settings.model_fields[name].annotation).validate_python(raw)
+    except ValidationError as e:
+        raise SystemExit(f"{name}={raw}: {e.errors()[0]['msg']}")
+
+
+def configurations(
+    sweeps: list[tuple[str, list[str]]], fixed: list[tuple[str, list[str]]],
+) -> list[dict]:
+    """The grid of --sweep values, each with the --set values added."""
+    if any(len(values) > 1 for _, values in fixed):
+        raise SystemExit("--set takes one value — use --sweep to compare several")
+    base = {name: coerce(name, values[0]) for name, values in fixed}
+    names = [name for name, _ in sweeps]
+    grids = [[coerce(name, value) for value in values] for name, values in sweeps]
+    return [{**base, **dict(zip(names, combo))} for combo in itertools.product(*grids)]
+
+
+def label(config: dict) -> str:
+    return " ".join(f"{name}={value}" for name, value in config.items()) or "(current settings)"
+
+
+@contextmanager
+def overridden(settings: Settings, values: dict) -> Iterator[Settings]:
+    """Apply settings for one configuration and restore them afterwards."""
+    previous = {name: getattr(settings, name) for name in values}
+    for name, value in values.items():
+        setattr(settings, name, value)
+    try:
+        yield settings
+    finally:
+        for name, value in previous.items():
+            setattr(settings, name, value)
+
+
+# ---------------------------------------------------------------------------
+# Running
+# ---------------------------------------------------------------------------
+
+async def embed_all(
+    items: list[GoldenItem], concurrency: int,
+) -> tuple[dict[str, list[float]], dict[str, float]]:
+    """Each description's query embedding and the time it took, under the current settings."""
+    vectors: dict[str, list[float]] = {}
+    latency: dict[str, float] = {}
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(text: str):
+        async with semaphore:
+            started = time.perf_counter()
+            vectors[text] = await embed_text(text)
+            latency[text] = (time.perf_counter() - started) * 1000
+
+    await asyncio.gather(*(one(text) for text in {item.description for item in items}))
+    return vectors, latency
+
+
+async def run_config(
+    items: list[GoldenItem],
+    vectors: dict[str, list[float]],
+    embed_ms: dict[str, float],
+    use_classify: bool,
+) -> list[Outcome]:
+    """All golden items under the current settings, one at a time."""
+    settings = get_settings()
+    factory = get_session_factory()
+
+    async def cached_embedding(text: str) -> list[float]:
+        return vectors[text]
+
+    outcomes = []
+    # search_hts() (also inside classify()) embeds the query itself; hand it
+    # the stored vector so configurations differ only in what they change
+    with patch.object(searcher, "embed_text", cached_embedding):
+        async with factory() as outer:
+            # classify() commits its audit row — inside this transaction
+            # that only releases a savepoint, and it's all rolled back below
+            connection = await outer.connection()
+            async with factory(bind=connection, join_transaction_mode="create_savepoint") as db:
+                for item in items:
+                    started = time.perf_counter()
+                    if use_classify:
+                        result = await classify(item.description, db)
+                        results, llm = result["results"], result["method"] == "llm_assisted"
+                    else:
+                        top_k = max(max(RECALL_AT), settings.search_top_k)
+                        results = await search_hts(item.description, db, top_k=top_k)
+                        llm = bool(results) and not skips_llm(
+                            results[0]["similarity"],
+                            results[1]["similarity"] if len(results) > 1 else None,
+                            settings.high_confidence_threshold,
+                            settings.high_confidence_margin,
+                        )
+                    elapsed = (time.perf_counter() - started) * 1000
+
+                    candidates = results[:settings.search_top_k]
+                    prompt = claude_prompt(item.description, candidates, {})
+                    outcomes.append(Outcome(
+                        rank=first_correct_rank([r["hts_code"] for r in results], item.hts_code),
+                        llm=llm,
+                        latency_ms=embed_ms[item.description] + elapsed,
+                        query_tokens=estimate_tokens(item.description),
+                        prompt_tokens=estimate_tokens(prompt),
+                    ))
+            await outer.rollback()
+    return outcomes
+
+
+# ---------------------------------------------------------------------------
+# Reporting
+# ---------------------------------------------------------------------------
+
+def _percentile(values: list[float], q: int) -> float:
+    if len(values) < 2:
+        return values[0] if values else 0.0
+    return statistics.quantiles(values, n=100, method="inclusive")[q - 1]
+
+
+def summarize(outcomes: list[Outcome], prices: Prices) -> dict:
+    n = len(outcomes)
+    latencies = [o.latency_ms for o in outcomes]
+    llm_tokens_cost = sum(
+        o.prompt_tokens * prices.llm_input + LLM_OUTPUT_TOKENS * prices.llm_output
+        for o in outcomes if o.llm
+    )
+    cost = (sum(o.query_tokens * prices.embedding for o in outcomes) + llm_tokens_cost) / 1e6
+    summary = {
+        f"recall@{k}": round(sum(1 for o in outcomes if o.rank is not None and o.rank <= k) / n, 3)
+        for k in RECALL_AT
+    }
+    summary.update({
+        "llm": round(sum(o.llm for o in outcomes) / n, 3),
+        "p50_ms": round(_percentile(latencies, 50), 1),
+        "p95_ms": round(_percentile(latencies, 95), 1),
+        "cost_per_1k": round(cost / n * 1000, 4),
+    })
+    return summary
+
+
+def recommend(summaries: list[dict], metric: str, tolerance: float) -> int:
+    """Index of the cheapest (then fastest) summary within tolerance of the best metric."""
+    best = max(s[metric] for s in summaries)
+    eligible = [i for i, s in enumerate(summaries) if s[metric] >= best - tolerance]
+    return min(eligible, key=lambda i: (summaries[i]["cost_per_1k"], summaries[i]["p95_ms"]))
+
+
+def print_table(configs: list[dict], summaries: list[dict], chosen: int) -> None:
+    header = (
+        f"{'':>3} {'R@1':>6} {'R@5':>6} {'R@10':>6} {'llm':>6} "
+        f"{'p50 ms':>8} {'p95 ms':>8} {'$/1K':>8}  config"
+    )
+    print(header)
+    print("-" * len(header))
+    for i, (config, s) in enumerate(zip(configs, summaries)):
+        marker = "*" if i == chosen else " "
+        print(
+            f"{i + 1:>2}{marker} "
+            f"{s['recall@1']:>6.1%} {s['recall@5']:>6.1%} {s['recall@10']:>6.1%} "
+            f"{s['llm']:>6.1%} {s['p50_ms']:>8,.1f} {s['p95_ms']:>8,.1f} "
+            f"{s['cost_per_1k']:>8.4f}  {label(config)}"
+        )
+
+
+async def evaluate(args: argparse.Namespace) -> None:
+    items = load_golden(args.golden)
+    configs = configurations(args.sweep, args.set)
+    prices = Prices(args.embedding_price, args.llm_input_price, args.llm_output_price)
+    settings = get_settings()
+
+    await init_db()
+    try:
+        if args.table:
+            catalog.pin(args.table)
+        else:
+            async with get_session_factory()() as db:
+                catalog.pin((await catalog.fetch_active(db)).table)
+        print(f"{len(items)} golden descriptions, {len(configs)} configuration(s), "
+              f"table {catalog.active_table()}{', classify()' if args.classify else ''}\n")
+
+        # One embedding per description per (model, dimensions) in the grid
+        embeddings: dict[tuple, tuple[dict, dict]] = {}
+        summaries = []
+        for i, config in enumerate(configs, 1):
+            with overridden(settings, config):
+                key = (settings.embedding_model, settings.embedding_dimensions)
+                if key not in embeddings:
+                    embeddings[key] = await embed_all(items, args.concurrency)
+                outcomes = await run_config(items, *embeddings[key], use_classify=args.classify)
+            summaries.append(summarize(outcomes, prices))
+            print(f"  [{i}/{len(configs)}] {label(config)}", file=sys.stderr)
+    finally:
+        await close_db()
+
+    metric = args.metric or ("recall@1" if args.classify else "recall@5")
+    chosen = recommend(summaries, metric, args.tolerance)
+    print()
+    print_table(configs, summaries, chosen)
+    print(f"\n* Recommended: #{chosen + 1} — the cheapest, then fastest, within "
+          f"{args.tolerance:.1%} of the best {metric} ({max(s[metric] for s in summaries):.1%})")
+
+    if args.out:
+        Path(args.out).write_text(json.dumps({
+            "golden": str(args.golden),
+            "items": len(items),
+            "table": catalog.active_table(),
+            "classify": args.classify,
+            "prices_per_mtok": asdict(prices),
+            "recommended": chosen,
+            "results": [{"config": config, **s} for config, s in zip(configs, summaries)],
+        }, indent=2, default=str) + "\n")
+        print(f"Saved: {args.out}")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Evaluate search settings on a labelled golden set: "
+                    "recall, LLM share, latency, cost",
+        epilog="Example: python -m hts_oracle.cli.evaluate ../data/golden_set.csv "
+               "--sweep high_confidence_threshold=0.6,0.65,0.7",
+    )
+    parser.add_argument("golden", help="CSV with description and hts_code columns")
+    parser.add_argument(
+        "--sweep", type=parse_assignment, action="append", default=[], metavar="NAME=V1,V2,...",
+        help="A setting to vary; several --sweep flags make a grid",
+    )
+    parser.add_argument(
+        "--set", type=parse_assignment, action="append", default=[], metavar="NAME=VALUE",
+        help="A setting for every configuration",
+    )
+    parser.add_argument("--classify", action="store_true",
+                        help="Run classify() — calls Claude for low-confidence queries")
+    parser.add_argument("--table", help="Catalog table to search (default: the active revision's)")
+    parser.add_argument("--metric", choices=[f"recall@{k}" for k in RECALL_AT],
+                        help="Accuracy to hold (default: recall@5, or recall@1 with --classify)")
+    parser.add_argument("--tolerance", type=float, default=0.02,
+                        help="Allowed drop from the best metric (default: 0.02)")
+    parser.add_argument("--concurrency", type=int, default=4,
+                        help="Query embeddings in flight (default: 4)")
+    parser.add_argument("--embedding-price", type=float, default=Prices.embedding,
+                        help="USD per million tokens")
+    parser.add_argument("--llm-input-price", type=float, default=Prices.llm_input,
+                        help="USD per million tokens")
+    parser.add_argument("--llm-output-price", type=float, default=Prices.llm_output,
+                        help="USD per million tokens")
+    parser.add_argument("--out", help="Save the results as JSON")
+    args = parser.parse_args()
+    asyncio.run(evaluate(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -3,29 +3,63 @@ CSV → Postgres + Embeddings import script.
 
 Usage:
     python -m hts_oracle.cli.import_hts data/hts_2026_revision_4_enriched.csv
+    python -m hts_oracle.cli.import_hts data/hts_2026_revision_4_csv.csv   # raw USITC file
+
+Both the enriched CSV and the official USITC CSV (HTS Number / Indent /
+Description) are accepted — the format is detected from the header.
 
 What it does:
     1. Reads the CSV file
     2. Filters to leaf nodes only (non-leaves are category headers, not searchable)
     3. For each leaf node, builds the text to embed
-    4. Calls OpenAI in batches of 100 to generate embeddings
-    5. Upserts rows into the hts_codes table (safe to re-run)
-
-The script prints progress as it goes so you can watch it work.
+    4. Calls OpenAI in batches of 200 to embed new or changed texts
+       (unchanged codes keep their vectors; --reembed forces all), several
+       batches at once within the account's TPM/RPM limits
+    5. Bulk-upserts each batch into hts_codes with COPY while the next
+       batches are being embedded (safe to re-run)
+
+The script shows a live throughput line as it goes. If it's interrupted,
+running it again resumes from the checkpoint file written next to the CSV
+(--restart to start over). With --progress-json it prints JSON progress
+lines instead, for POST /api/v1/admin/import-csv to relay (see
+services/import_jobs.py).
+
+For a full catalog load, --rebuild writes into a shadow table with no
+vector index, builds the HNSW index once at the end and swaps the table in
+atomically (see shadow_table.py) — much faster than updating the live
+index row by row, and searches never see a half-built index.
+
+--revision builds the same way into a new catalog revision table
+(hts_codes_r{N}) and leaves the live one alone; --activate then switches
+the app over to it, and `python -m hts_oracle.cli.catalog rollback`
+switches back (see cli/catalog.py).
 """
 
+import argparse
 import asyncio
 import csv
+import hashlib
+import io
+import os
 import sys
 import time
+from collections import Counter
+from dataclasses import dataclass, field
 from pathlib import Path
 
 from openai import AsyncOpenAI
-from sqlalchemy import select
-from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 
+from hts_oracle.cli import bulk_upsert, catalog, shadow_table
+from hts_oracle.cli.embed_pipeline import (
+    Checkpoint,
+    ImportProgress,
+    RateLimiter,
+    embed_with_retry,
+    emit_json,
+    stop_when_orphaned,
+)
+from hts_oracle.cli.usitc_parser import is_usitc_file, parse_usitc_rows
 from hts_oracle.config import get_settings
-from hts_oracle.models import HtsCode
 
 
 # ---------------------------------------------------------------------------
@@ -58,11 +92,13 @@ def build_embed_text(row: dict) -> str:
         # If context path is empty, just return enriched text.
         return f"{enriched}\n{context_path}" if context_path else enriched 
 
-    # Fallback: combine what we have
+    # Fallback: combine what we have. Skip the context path if the enhanced
+    # description already spells it out (the USITC parser's rows do).
+    enhanced = row.get("Enhanced Description", "").strip()
     parts = [
-        row.get("Enhanced Description", "").strip(),
+        enhanced,
         row.get("Search Keywords", "").strip(),
-        context_path,
+        context_path if context_path not in enhanced else "",
     ]
     return "\n".join(part for part in parts if part)
     # Note: If all fields are empty, this will return an empty string, which is valid but won't produce a useful embedding.
@@ -81,146 +117,502 @@ def clean_unit(raw_unit: str) -> str:
     return raw_unit.strip().strip("[]\"' ")
 
 
+def embed_hash(text: str) -> str:
+    """SHA-256 of an embed text — stored with the vector as hts_codes.embed_hash."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def hts_record(
+    row: dict,
+    embedding: list[float] | None,
+    text_hash: str | None = None,
+    model: str | None = None,
+    dimensions: int | None = None,
+) -> tuple:
+    """
+    One CSV row as a bulk_upsert record (fields in bulk_upsert.COLUMNS order).
+
+    Pass embedding=None to keep the row's stored vector; the hash / model /
+    dimensions only count when a new embedding comes with them.
+    """
+    has_embedding = embedding is not None
+    return (
+        row.get("HTS Number", "").strip(),
+        row.get("Original Description", "").strip(),
+        row.get("Enhanced Description", "").strip(),
+        row.get("Enriched Text", "").strip(),
+        row.get("Context Path", "").strip(),
+        row.get("Category", "").strip(),
+        row.get("General Rate of Duty", "").strip(),
+        row.get("Special Rate of Duty", "").strip(),
+        clean_unit(row.get("Unit of Quantity", "")),
+        True,  # Only leaf rows are imported
+        embedding,
+        text_hash if has_embedding else None,
+        model if has_embedding else None,
+        dimensions if has_embedding else None,
+    )
+
+
+# ---------------------------------------------------------------------------
+# Incremental embedding — only embed what changed, each distinct text once
+# ---------------------------------------------------------------------------
+
+class EmbeddingPlan:
+    """
+    Decides which rows need a new embedding, and shares vectors between
+    rows with identical embed text.
+
+    A row is re-embedded when its text hash differs from the stored
+    embed_hash, or it has no usable embedding for the current model and
+    dimensions (`current` comes from bulk_upsert.fetch_current_embed_hashes).
+
+    Identical texts within a run are embedded once, even across batches
+    being embedded concurrently: the first batch to claim() a text embeds
+    it, and other batches' take() waits for that result. A vector is kept
+    only until the last row waiting for it has taken it, so memory stays
+    proportional to the duplicates in flight, not the whole catalog.
+    """
+
+    def __init__(self, keys: list[tuple[str, str]], current: dict[str, str], force: bool = False):
+        # keys: (hts_number, embed_hash) for every row in the import
+        self.current = current
+        self.force = force
+        self._waiting = Counter(h for number, h in keys if self.needs_embedding(number, h))
+        self._vectors: dict[str, list[float]] = {}
+        self._in_flight: dict[str, asyncio.Future] = {}
+        self.rows_to_embed = sum(self._waiting.values())
+        self.unique_texts = len(self._waiting)
+        self.unchanged = len(keys) - self.rows_to_embed
+
+    def needs_embedding(self, hts_number: str, text_hash: str) -> bool:
+        return self.force or self.current.get(hts_number) != text_hash
+
+    def claim(self, hashes: list[str]) -> list[str]:
+        """
+        The distinct hashes (in order) this caller should send to OpenAI —
+        those nobody has embedded or is embedding. The caller must
+        resolve() each one, with None if the call failed.
+        """
+        mine = []
+        for h in dict.fromkeys(hashes):
+            if h not in self._vectors and h not in self._in_flight:
+                self._in_flight[h] = asyncio.get_running_loop().create_future()
+                mine.append(h)
+        return mine
+
+    def resolve(self, text_hash: str, vector: list[float] | None) -> None:
+        future = self._in_flight.pop(text_hash)
+        if vector is not None and self._waiting[text_hash] > 0:
+            self._vectors[text_hash] = vector
+        # A failed text (None) isn't stored, so a later batch can claim it again
+        future.set_result(vector)
+
+    async def take(self, text_hash: str) -> list[float] | None:
+        """A row's vector (None if embedding it failed), freed after its last use."""
+        if text_hash in self._in_flight:
+            vector = await asyncio.shield(self._in_flight[text_hash])
+        else:
+            vector = self._vectors.get(text_hash)
+        self._waiting[text_hash] -= 1
+        if self._waiting[text_hash] <= 0:
+            self._vectors.pop(text_hash, None)
+        return vector
+
+
 # ---------------------------------------------------------------------------
 # Main import logic
 # ---------------------------------------------------------------------------
+# The import is a three-stage pipeline (see embed_pipeline.py):
+#
+#   read_batches ──► embed_worker × N ──► write_batches
+#
+# Bounded queues between the stages keep memory flat: the reader can't race
+# ahead of the embedders, and the embedders can't race ahead of Postgres.
+
+BATCH_SIZE = 200
+
+# Batches allowed to wait between stages
+QUEUE_DEPTH = 4
+
 
-async def import_csv(csv_path: str):
+@dataclass
+class ImportBatch:
+    """One batch of CSV rows on its way through the pipeline."""
+    number: int                 # 1-based, in CSV order (checkpoint key)
+    rows: list[dict]
+    texts: list[str]
+    hashes: list[str]
+    records: list[tuple] = field(default_factory=list)
+    embed_failed: bool = False  # Written without its new embeddings
+
+
+class _HashingReader(io.RawIOBase):
+    """A binary file that feeds every byte read from it through `digest`."""
+
+    def __init__(self, raw, digest):
+        self._raw = raw
+        self._digest = digest
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        size = self._raw.readinto(buffer)
+        if size:
+            self._digest.update(memoryview(buffer)[:size])
+        return size
+
+
+def _leaf_rows(csv_file: Path, digest=None):
+    """
+    Stream the CSV's leaf rows — one row in memory at a time.
+
+    Accepts the enriched CSV or the raw USITC file; the latter goes through
+    usitc_parser, which derives leaf status, context paths and inherited
+    duty rates from the indent hierarchy. With `digest` (a hashlib object),
+    the file's bytes are hashed as they're read.
+    """
+    usitc = is_usitc_file(csv_file)
+    with open(csv_file, "rb") as raw:
+        binary = io.BufferedReader(_HashingReader(raw, digest)) if digest else raw
+        with io.TextIOWrapper(binary, encoding="utf-8-sig", newline="") as f:
+            if usitc:
+                yield from parse_usitc_rows(csv.reader(f))
+                return
+            for row in csv.DictReader(f):
+                # Only leaf nodes are actual classifiable products.
+                # Non-leaf nodes are category headers (e.g., "Chapter 61: Knitted apparel")
+                if row.get("Is Leaf Node") == "Yes":
+                    yield row
+
+
+def _scan(csv_file: Path) -> tuple[str, list[tuple[int, str, str]]]:
+    """
+    First pass: the file's SHA-256 plus (batch number, hts_number, embed_hash)
+    per leaf row — enough to plan embeddings without keeping the rows. The
+    hash is taken as the rows are parsed, so the file is read once here.
+    """
+    digest = hashlib.sha256()
+    keys = []
+    for index, row in enumerate(_leaf_rows(csv_file, digest)):
+        keys.append((
+            index // BATCH_SIZE + 1,
+            row.get("HTS Number", "").strip(),
+            embed_hash(build_embed_text(row)),
+        ))
+    return digest.hexdigest(), keys
+
+
+async def import_csv(
+    csv_path: str,
+    reembed: bool = False,
+    concurrency: int | None = None,
+    resume: bool = True,
+    rebuild: bool = False,
+    revision: bool = False,
+    activate: bool = False,
+    progress_json: bool = False,
+    tpm_limit: int | None = None,
+):
     """
     Read a CSV file and import all leaf-node HTS codes into Postgres.
 
     This function:
-      1. Reads and filters the CSV
-      2. Generates embeddings via OpenAI (batches of 200)
-      3. Upserts each row into the hts_codes table
+      1. Scans the CSV (file hash, which rows changed) and loads the checkpoint
+      2. Streams batches of 200 rows to `concurrency` embedding workers —
+         only rows whose embed text changed are embedded, unless reembed=True —
+         under the OpenAI TPM/RPM limits, with retry/backoff
+      3. Bulk-upserts each embedded batch into hts_codes (COPY + ON CONFLICT)
+         while later batches are still being embedded
+      4. Records each committed batch in a checkpoint file, so an interrupted
+         import picks up where it stopped (resume=False starts over)
+
+    Batches normally go into the served table: hts_codes, or the active
+    catalog revision's table. With rebuild=True they go into a freshly
+    seeded shadow table instead, which gets its HNSW index and replaces
+    hts_codes at the end. revision=True builds a new catalog revision the
+    same way, activated at the end only if activate=True. Both always start
+    over — a half-built table doesn't outlive a run.
+
+    progress_json=True reports phases, throughput and the final summary as
+    JSON lines. tpm_limit caps this import below EMBEDDING_TPM_LIMIT, leaving
+    the rest of the account's budget to live query embeddings.
     """
     settings = get_settings()
     csv_file = Path(csv_path)
+    concurrency = max(concurrency or settings.import_embed_concurrency, 1)
 
     if not csv_file.exists():
         print(f"ERROR: File not found: {csv_file}")
         sys.exit(1)
 
-    # --- Step 1: Read CSV and filter to leaf nodes ---
+    # --- Step 1: Scan the CSV ---
+    if progress_json:
+        emit_json({"event": "phase", "phase": "scan"})
     print(f"Reading {csv_file.name}...")
-
-    with open(csv_file, "r", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        # Only leaf nodes are actual classifiable products.
-        # Non-leaf nodes are category headers (e.g., "Chapter 61: Knitted apparel")
-        all_rows = [row for row in reader if row.get("Is Leaf Node") == "Yes"]
-
-    print(f"Found {len(all_rows)} leaf-node HTS codes")
+    file_hash, keys = _scan(csv_file)
+    print(f"Found {len(keys)} leaf-node HTS codes")
+
+    checkpoint = Checkpoint(
+        csv_file.with_name(csv_file.name + ".import-checkpoint.json"),
+        fingerprint={
+            "csv_sha256": file_hash,
+            "batch_size": BATCH_SIZE,
+            "embedding_model": settings.embedding_model,
+            "embedding_dimensions": settings.embedding_dimensions,
+        },
+    )
+    build = rebuild or revision  # Load into a fresh table, index it at the end
+    done = checkpoint.load() if resume and not build else set()
+    if done:
+        print(f"  Resuming: {len(done)} batches already imported "
+              f"(checkpoint {checkpoint.path.name})")
 
     # --- Step 2: Connect to database ---
-    # CLI scripts create their own engine (not the app's global one)
-    # statement_cache_size=0: required for Supabase/PgBouncer which doesn't
-    # support prepared statements in transaction pooling mode
-    engine = create_async_engine(
-        settings.database_url,
-        connect_args={"statement_cache_size": 0},
-    )
-    session_factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
-
-    # --- Step 3: Generate embeddings and upsert in batches ---
-    openai_client = AsyncOpenAI(api_key=settings.openai_api_key)
-    batch_size = 200
-    total_imported = 0
-    total_embedded = 0
-    start_time = time.time()
-
-    for batch_start in range(0, len(all_rows), batch_size):
-        batch = all_rows[batch_start : batch_start + batch_size]
-        batch_num = batch_start // batch_size + 1
-        total_batches = (len(all_rows) + batch_size - 1) // batch_size
-
-        print(f"\nBatch {batch_num}/{total_batches} ({len(batch)} codes)...")
+    # CLI scripts open their own connection (not the app's pool). Writes go
+    # through COPY into a temporary staging table — see bulk_upsert.py.
+    conn = await bulk_upsert.connect(settings.database_url)
+
+    # The table being served: hts_codes, or the active catalog revision's
+    served_revision, live = await catalog.active_revision(conn)
+    if rebuild and live != bulk_upsert.LIVE_TABLE:
+        await conn.close()
+        print(f"ERROR: revision {served_revision} ({live}) is being served, not "
+              f"{bulk_upsert.LIVE_TABLE} — use --revision to build a new revision instead")
+        sys.exit(1)
 
-        # Build the text to embed for each row in this batch
-        texts_to_embed = [build_embed_text(row) for row in batch]
+    timings = shadow_table.PhaseTimings(
+        on_start=(
+            (lambda name: emit_json({"event": "phase", "phase": name})) if progress_json else None
+        ),
+    )
+    target = live
+    new_revision = None
+    if build:
+        if revision:
+            new_revision, target = await catalog.create_revision(conn, csv_file.name, file_hash)
+        else:
+            target = shadow_table.SHADOW_TABLE
+        with timings.phase("seed"):
+            seeded = await shadow_table.create_shadow(conn, target, source=live)
+        load_started = await conn.fetchval("SELECT now()")
+        print(f"  Building {target} (seeded with {seeded} codes from {live})")
+
+    # --- Step 3: Work out what actually needs embedding ---
+    # Most codes don't change between revisions: a row whose embed text
+    # hashes to its stored embed_hash (same model + dimensions) keeps its vector.
+    current = await bulk_upsert.fetch_current_embed_hashes(
+        conn, settings.embedding_model, settings.embedding_dimensions, table=live,
+    )
+    plan = EmbeddingPlan(
+        [(number, h) for batch, number, h in keys if batch not in done],
+        current,
+        force=reembed,
+    )
+    print(f"  {plan.unchanged} unchanged, {plan.rows_to_embed} to embed "
+          f"({plan.unique_texts} distinct texts), {concurrency} workers, "
+          f"limits {settings.embedding_tpm_limit:,} TPM / {settings.embedding_rpm_limit:,} RPM")
+
+    # --- Step 4: Run the pipeline ---
+    # max_retries=0: embed_with_retry owns retries, so they respect the limiter
+    openai_client = AsyncOpenAI(
+        api_key=settings.openai_api_key, base_url=settings.openai_base_url, max_retries=0,
+    )
+    limiter = RateLimiter(tpm_limit or settings.embedding_tpm_limit, settings.embedding_rpm_limit)
+    progress = ImportProgress(
+        total_rows=sum(1 for batch, _, _ in keys if batch not in done),
+        json_lines=progress_json,
+    )
+    db_stats = bulk_upsert.UpsertStats()
+    embed_seconds = 0.0
+
+    to_embed: asyncio.Queue = asyncio.Queue(maxsize=QUEUE_DEPTH)
+    to_write: asyncio.Queue = asyncio.Queue(maxsize=QUEUE_DEPTH)
+
+    async def read_batches() -> None:
+        batch = ImportBatch(number=1, rows=[], texts=[], hashes=[])
+        for index, row in enumerate(_leaf_rows(csv_file)):
+            number = index // BATCH_SIZE + 1
+            if number != batch.number:
+                if batch.number not in done:
+                    await to_embed.put(batch)
+                batch = ImportBatch(number=number, rows=[], texts=[], hashes=[])
+            if number in done:
+                continue
+            text = build_embed_text(row)
+            batch.rows.append(row)
+            batch.texts.append(text)
+            batch.hashes.append(embed_hash(text))
+            progress.rows_read += 1
+        if batch.rows:
+            await to_embed.put(batch)
+        for _ in range(concurrency):
+            await to_embed.put(None)  # One stop signal per worker
+
+    async def embed_worker() -> None:
+        nonlocal embed_seconds
+        while (batch := await to_embed.get()) is not None:
+            needed = [
+                plan.needs_embedding(row.get("HTS Number", "").strip(), h)
+                for row, h in zip(batch.rows, batch.hashes)
+            ]
+            text_by_hash = dict(zip(batch.hashes, batch.texts))
+            mine = plan.claim([h for h, need in zip(batch.hashes, needed) if need])
+
+            vectors: list = [None] * len(mine)
+            if mine:
+                started = time.perf_counter()
+                try:
+                    vectors, tokens = await embed_with_retry(
+                        openai_client,
+                        [text_by_hash[h] for h in mine],
+                        settings.embedding_model,
+                        settings.embedding_dimensions,
+                        limiter,
+                    )
+                    progress.texts_embedded += len(vectors)
+                    progress.tokens_used += tokens
+                except Exception as e:
+                    # Counted separately from database failures: in a build,
+                    # these rows would go live with no vector (invisible to
+                    # search), so the build is aborted at the end.
+                    batch.embed_failed = True
+                    progress.failed_embeddings += 1
+                    progress.note(f"  ✗ Embedding failed for batch {batch.number}: {e}")
+                    progress.note(
+                        "    (the build will be aborted — re-run to retry)" if build else
+                        "    (importing rows without new embeddings — re-run to retry)"
+                    )
+                finally:
+                    for h, vector in zip(mine, vectors):
+                        plan.resolve(h, vector)
+                    embed_seconds += time.perf_counter() - started
+
+            for row, h, need in zip(batch.rows, batch.hashes, needed):
+                embedding = await plan.take(h) if need else None
+                if row.get("HTS Number", "").strip():
+                    batch.records.append(hts_record(
+                        row, embedding, h, settings.embedding_model, settings.embedding_dimensions,
+                    ))
+            await to_write.put(batch)
+
+    async def write_batches() -> None:
+        # One writer: the bulk connection runs one transaction at a time, and
+        # COPY into Postgres is rarely the bottleneck next to the API.
+        while (batch := await to_write.get()) is not None:
+            records = bulk_upsert.dedupe_records(batch.records)
+            try:
+                await bulk_upsert.upsert_batch(conn, records, db_stats, table=target)
+            except Exception as e:
+                # If a batch fails (network hiccup, DB timeout), log it and continue.
+                # It isn't checkpointed, so re-running the script retries it.
+                progress.failed_batches += 1
+                progress.note(f"  ✗ Database error on batch {batch.number}: {e}")
+                continue
+            progress.rows_written += len(batch.rows)
+            if not build and not batch.embed_failed:
+                checkpoint.mark_done(batch.number)
 
-        # Call OpenAI to generate embeddings for all texts in one API call.
-        embeddings = []
-        try:
-            response = await openai_client.embeddings.create(
-                model=settings.embedding_model,
-                input=texts_to_embed,
-                dimensions=settings.embedding_dimensions,
-            )
-            embeddings = [item.embedding for item in response.data]
-            total_embedded += len(embeddings)
-            print(f"  ✓ Generated {len(embeddings)} embeddings")
-        except Exception as e:
-            print(f"  ✗ Embedding failed: {e}")
-            print(f"    (importing rows without embeddings — re-run to retry)")
-            embeddings = [None] * len(batch)
-
-        # Upsert each row. Each batch commits independently, so if the
-        # script crashes on batch 50, batches 1-49 are already saved.
-        # Re-running skips those (upsert updates existing rows).
+    start_time = time.time()
+    reporter = asyncio.create_task(progress.report())
+    if progress_json:
+        stop_when_orphaned(reporter, asyncio.current_task())
+    writer = asyncio.create_task(write_batches())
+    finished = False
+    try:
         try:
-            async with session_factory() as session:
-                for i, row in enumerate(batch):
-                    hts_number = row.get("HTS Number", "").strip()
-                    if not hts_number:
-                        continue
-
-                    # Check if this code already exists
-                    existing = await session.execute(
-                        select(HtsCode).where(HtsCode.hts_number == hts_number)
-                    )
-                    hts_code = existing.scalar_one_or_none()
-
-                    if hts_code:
-                        # Update existing row
-                        hts_code.description = row.get("Original Description", "").strip()
-                        hts_code.enhanced_description = row.get("Enhanced Description", "").strip()
-                        hts_code.enriched_text = row.get("Enriched Text", "").strip()
-                        hts_code.context_path = row.get("Context Path", "").strip()
-                        hts_code.chapter = row.get("Category", "").strip()
-                        hts_code.general_rate = row.get("General Rate of Duty", "").strip()
-                        hts_code.special_rate = row.get("Special Rate of Duty", "").strip()
-                        hts_code.unit = clean_unit(row.get("Unit of Quantity", ""))
-                        hts_code.is_leaf = True
-                        if embeddings[i] is not None:
-                            hts_code.embedding = embeddings[i]
-                    else:
-                        # Insert new row
-                        hts_code = HtsCode(
-                            hts_number=hts_number,
-                            description=row.get("Original Description", "").strip(),
-                            enhanced_description=row.get("Enhanced Description", "").strip(),
-                            enriched_text=row.get("Enriched Text", "").strip(),
-                            context_path=row.get("Context Path", "").strip(),
-                            chapter=row.get("Category", "").strip(),
-                            general_rate=row.get("General Rate of Duty", "").strip(),
-                            special_rate=row.get("Special Rate of Duty", "").strip(),
-                            unit=clean_unit(row.get("Unit of Quantity", "")),
-                            is_leaf=True,
-                            embedding=embeddings[i] if embeddings[i] is not None else None,
-                        )
-                        session.add(hts_code)
-
-                    total_imported += 1
-
-                await session.commit()
-                print(f"  ✓ Upserted {len(batch)} rows to database")
-        except Exception as e:
-            # If a batch fails (network hiccup, DB timeout), log it and continue.
-            # The failed batch can be retried by re-running the script.
-            print(f"  ✗ Database error on batch {batch_num}: {e}")
-            print(f"    (re-run the script to retry failed batches)")
+            with timings.phase("load"):
+                await asyncio.gather(read_batches(), *(embed_worker() for _ in range(concurrency)))
+                await to_write.put(None)
+                await writer
+        finally:
+            reporter.cancel()
+            writer.cancel()
+            # Let a cancelled COPY finish unwinding before the cleanup uses the connection
+            await asyncio.gather(writer, return_exceptions=True)
+            print("\n" + progress.line())
+
+        if build and not progress.failures:
+            with timings.phase("prune"):
+                pruned = await shadow_table.prune_stale(conn, load_started, table=target)
+            print(f"  Removed {pruned} codes no longer in the file")
+            print(f"  Building HNSW index "
+                  f"(maintenance_work_mem={settings.index_build_maintenance_work_mem}, "
+                  f"{settings.index_build_parallel_workers} parallel workers)...")
+            with timings.phase("index"):
+                await shadow_table.build_indexes(
+                    conn,
+                    settings.index_build_maintenance_work_mem,
+                    settings.index_build_parallel_workers,
+                    table=target,
+                )
+            if revision:
+                await catalog.mark_ready(conn, new_revision)
+                if activate:
+                    with timings.phase("activate"):
+                        await catalog.activate(conn, new_revision)
+            else:
+                with timings.phase("swap"):
+                    await shadow_table.swap_in(conn)
+            finished = True
+    finally:
+        if build and not finished:
+            # Live table untouched — just throw the partial build away
+            if revision:
+                await catalog.mark_failed(conn, new_revision)
+            else:
+                await shadow_table.drop_shadow(conn)
+        await conn.close()
+
+    if not progress.failures:
+        checkpoint.clear()  # Everything's in — next import starts fresh
 
     # --- Summary ---
     elapsed = time.time() - start_time
     print(f"\n{'='*60}")
-    print(f"Import complete!")
-    print(f"  Rows imported:     {total_imported}")
-    print(f"  Embeddings created: {total_embedded}")
+    failed = (f"{progress.failed_batches} failed batches, "
+              f"{progress.failed_embeddings} failed embedding batches")
+    if build and not finished:
+        print(f"Build aborted: {failed} — {live} is unchanged")
+    else:
+        print("Import complete!" if not progress.failures else
+              f"Import finished with {failed} — re-run to retry them")
+    print(f"  Rows imported:     {db_stats.rows} "
+          f"({db_stats.inserted} new, {db_stats.updated} updated)")
+    print(f"  Embeddings created: {progress.texts_embedded} "
+          f"(skipped {plan.unchanged} unchanged codes)")
+    print(f"  Tokens used:       {progress.tokens_used:,}")
+    print(f"  Embedding time:    {embed_seconds:.1f}s (summed across {concurrency} workers)")
+    print(f"  Database time:     {db_stats.db_seconds:.2f}s "
+          f"(COPY {db_stats.copy_seconds:.2f}s, merge {db_stats.merge_seconds:.2f}s)")
     print(f"  Time elapsed:      {elapsed:.1f}s")
+    if build:
+        print("  Build phases:")
+        print(timings.report())
+    if revision and finished:
+        print(f"  Revision {new_revision} ({target}) is "
+              + ("now active" if activate else
+                 f"ready — activate with: "
+                 f"python -m hts_oracle.cli.catalog activate {new_revision}"))
     print(f"{'='*60}")
 
-    await engine.dispose()
+    if progress_json:
+        emit_json({
+            "event": "summary",
+            "ok": not progress.failures and (finished or not build),
+            "rows": db_stats.rows,
+            "inserted": db_stats.inserted,
+            "updated": db_stats.updated,
+            "unchanged": plan.unchanged,
+            "failed_batches": progress.failed_batches,
+            "failed_embeddings": progress.failed_embeddings,
+            "elapsed_seconds": round(elapsed, 1),
+            "phases": {name: round(seconds, 1) for name, seconds in timings.phases.items()},
+            "revision": new_revision,
+            "activated": bool(revision and activate and finished),
+            **{k: v for k, v in progress.snapshot().items() if k.endswith("_per_second")},
+        })
 
 
 # ---------------------------------------------------------------------------
@@ -228,14 +620,71 @@ async def import_csv(csv_path: str):
 # ---------------------------------------------------------------------------
 
 def main():
-    if len(sys.argv) < 2:
-        print("Usage: python -m hts_oracle.cli.import_hts <path-to-csv>")
-        print("Example: python -m hts_oracle.cli.import_hts data/hts_2026_revision_4_enriched.csv")
+    parser = argparse.ArgumentParser(
+        description="Import an HTS CSV into Postgres and embed new/changed codes",
+        epilog="Example: python -m hts_oracle.cli.import_hts data/hts_2026_revision_4_enriched.csv",
+    )
+    parser.add_argument("csv_path", help="Path to the enriched HTS CSV or the raw USITC CSV")
+    parser.add_argument(
+        "--reembed", action="store_true",
+        help="Re-embed every code, even ones whose text hasn't changed",
+    )
+    parser.add_argument(
+        "--concurrency", type=int, default=None,
+        help="Embedding requests in flight (default: IMPORT_EMBED_CONCURRENCY)",
+    )
+    parser.add_argument(
+        "--restart", action="store_true",
+        help="Ignore the checkpoint from an interrupted import and start over",
+    )
+    parser.add_argument(
+        "--rebuild", action="store_true",
+        help="Load into a shadow table, build the HNSW index once, then swap it in atomically",
+    )
+    parser.add_argument(
+        "--revision", action="store_true",
+        help="Build a new catalog revision table instead of changing the served one",
+    )
+    parser.add_argument(
+        "--activate", action="store_true",
+        help="With --revision: switch the app to the new revision once it's built",
+    )
+    parser.add_argument(
+        "--progress-json", action="store_true",
+        help="Print progress as JSON lines (for the admin import endpoint)",
+    )
+    parser.add_argument(
+        "--tpm-limit", type=int, default=None,
+        help="Embedding tokens/minute for this import (default: EMBEDDING_TPM_LIMIT)",
+    )
+    parser.add_argument(
+        "--nice", type=int, default=0,
+        help="Lower this process's CPU priority by N (e.g. 10) to stay out of live traffic's way",
+    )
+    args = parser.parse_args()
+    if args.activate and not args.revision:
+        parser.error("--activate only applies to --revision")
+    if args.rebuild and args.revision:
+        parser.error("--rebuild and --revision are alternatives — pick one")
+    if args.nice:
+        os.nice(args.nice)
+    try:
+        asyncio.run(import_csv(
+            args.csv_path,
+            reembed=args.reembed,
+            concurrency=args.concurrency,
+            resume=not args.restart,
+            rebuild=args.rebuild,
+            revision=args.revision,
+            activate=args.activate,
+            progress_json=args.progress_json,
+            tpm_limit=args.tpm_limit,
+        ))
+    except (asyncio.CancelledError, KeyboardInterrupt):
+        # Orphaned, or interrupted (SIGINT from a supervising API process
+        # that's shutting down) — either way the build was cleaned up
         sys.exit(1)
 
-    csv_path = sys.argv[1]
-    asyncio.run(import_csv(csv_path))
-
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,366 @@
+"""
+Capture real traffic from the classification audit log and replay it.
+
+Usage:
+    python -m hts_oracle.cli.replay export traffic.jsonl \\
+        --since 2026-10-01T09:00 --until 2026-10-01T17:00
+    python -m hts_oracle.cli.replay run traffic.jsonl --target http://staging:8000            # 1x
+    python -m hts_oracle.cli.replay run traffic.jsonl --target http://staging:8000 --speed 10
+    python -m hts_oracle.cli.replay run traffic.jsonl --target http://staging:8000 \\
+        --speed max --out replay.json
+
+export writes one JSON line per /classify request in the window, oldest
+first: when it arrived, the query and refinements, and what we answered
+then (top code, method, server-side latency).
+
+run sends them to --target's POST /api/v1/classify:
+
+  --speed N     open loop at N times the recorded rate: each request goes
+                out at its original offset from the first, divided by N,
+                whether or not earlier ones have been answered — bursts
+                and lulls are kept. Requests that couldn't be sent on
+                time (--concurrency already in flight) are counted as late;
+                if many are, the numbers describe the client, not the target.
+  --speed max   as fast as the target answers, --concurrency in flight
+
+  --admin-key   the target's ADMIN_API_KEY (default: $ADMIN_API_KEY), sent
+                as X-Admin-Key so the rate limiter lets the replay through
+
+Reported: requests/s achieved vs recorded, client-side latency
+percentiles and histogram (next to the recorded server-side ones),
+rate-limited requests (429) apart from other errors by status, and drift
+against the recorded answers — how often the top code changed, whether
+the recorded code is still in the top 5, and the change in the share
+that went to Claude. --out saves it as JSON.
+
+Point this at a staging deployment: every replayed request is classified
+(and audited, and maybe sent to Claude) there for real. The whole replay
+comes from one address, so without --admin-key the target's per-IP
+limit (RATE_LIMIT_DEFAULT, 60/minute) caps it — anything faster than that
+comes back 429 and is reported as rate_limited, not as a latency.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+from dataclasses import asdict, dataclass
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import httpx
+from sqlalchemy import text
+
+from hts_oracle.db import close_db, get_session_factory, init_db
+
+
+@dataclass
+class Recorded:
+    """One request from the audit log, and what we answered at the time."""
+    at: str                     # ISO timestamp
+    query: str
+    refinements: dict
+    top_hts_code: str | None
+    method: str | None
+    latency_ms: int | None
+
+
+@dataclass
+class Outcome:
+    recorded: Recorded
+    status: int                 # 0 = transport error
+    latency_ms: float
+    late_ms: float              # How long after its scheduled time it was sent
+    codes: list[str] | None = None
+    method: str | None = None
+
+
+# ---------------------------------------------------------------------------
+# Export
+# ---------------------------------------------------------------------------
+
+async def export(path: Path, since: datetime, until: datetime, limit: int | None) -> int:
+    await init_db()
+    try:
+        async with get_session_factory()() as db:
+            rows = (await db.execute(
+                text(
+                    "SELECT created_at, query_text, refinements, top_hts_code, method, latency_ms "
+                    "FROM classifications WHERE created_at >= :since AND created_at < :until "
+                    "ORDER BY created_at, id LIMIT :limit"
+                ),
+                {"since": since, "until": until, "limit": limit},
+            )).fetchall()
+    finally:
+        await close_db()
+    with path.open("w") as f:
+        for row in rows:
+            record = Recorded(
+                at=row.created_at.isoformat(),
+                query=row.query_text,
+                refinements=row.refinements or {},
+                top_hts_code=row.top_hts_code,
+                method=row.method,
+                latency_ms=row.latency_ms,
+            )
+            f.write(json.dumps(asdict(record)) + "\n")
+    return len(rows)
+
+
+def load(path: Path) -> list[Recorded]:
+    records = [
+        Recorded(**json.loads(line)) for line in path.read_text().splitlines() if line.strip()
+    ]
+    return sorted(records, key=lambda r: r.at)
+
+
+def offsets(records: list[Recorded]) -> list[float]:
+    """Seconds from the first request to each one."""
+    if not records:
+        return []
+    first = datetime.fromisoformat(records[0].at)
+    return [(datetime.fromisoformat(r.at) - first).total_seconds() for r in records]
+
+
+# ---------------------------------------------------------------------------
+# Replay
+# ---------------------------------------------------------------------------
+
+async def send(client: httpx.AsyncClient, record: Recorded, late_ms: float) -> Outcome:
+    body = {"query": record.query, **{k: v for k, v in record.refinements.items() if v}}
+    began = time.monotonic()
+    try:
+        response = await client.post("/api/v1/classify", json=body)
+    except httpx.HTTPError:
+        return Outcome(record, 0, (time.monotonic() - began) * 1000, late_ms)
+    outcome = Outcome(record, response.status_code, (time.monotonic() - began) * 1000, late_ms)
+    if response.status_code == 200:
+        payload = response.json()
+        outcome.codes = [r["hts_code"] for r in payload["results"]]
+        outcome.method = payload["method"]
+    return outcome
+
+
+async def replay(
+    client: httpx.AsyncClient, records: list[Recorded], speed: float | None, concurrency: int,
+) -> tuple[list[Outcome], float]:
+    """
+    Send every record; speed None = as fast as possible. Returns the
+    outcomes in record order and the wall time taken.
+    """
+    slots = asyncio.Semaphore(concurrency)
+    start = time.monotonic()
+
+    async def one(record: Recorded, due: float) -> Outcome:
+        async with slots:
+            late_ms = max(0.0, time.monotonic() - due) * 1000 if speed else 0.0
+            return await send(client, record, late_ms)
+
+    tasks = []
+    for record, offset in zip(records, offsets(records)):
+        due = start + offset / speed if speed else start
+        delay = due - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.create_task(one(record, due)))
+    outcomes = await asyncio.gather(*tasks)
+    return outcomes, time.monotonic() - start
+
+
+# ---------------------------------------------------------------------------
+# Reporting
+# ---------------------------------------------------------------------------
+
+HISTOGRAM_MS = (50, 100, 250, 500, 1000, 2500, 5000)
+LATE_MS = 100
+
+
+def _percentile(values: list[float], q: int) -> float:
+    if len(values) < 2:
+        return values[0] if values else 0.0
+    return statistics.quantiles(values, n=100, method="inclusive")[q - 1]
+
+
+def histogram(latencies: list[float]) -> dict[str, int]:
+    counts = {f"<{edge}": 0 for edge in HISTOGRAM_MS}
+    counts[f">={HISTOGRAM_MS[-1]}"] = 0
+    for ms in latencies:
+        edge = next((e for e in HISTOGRAM_MS if ms < e), None)
+        counts[f"<{edge}" if edge else f">={HISTOGRAM_MS[-1]}"] += 1
+    return counts
+
+
+def summarize(outcomes: list[Outcome], seconds: float) -> dict:
+    records = [o.recorded for o in outcomes]
+    span = offsets(records)[-1] if records else 0.0
+    ok = [o for o in outcomes if o.status == 200]
+    latencies = [o.latency_ms for o in ok]
+    recorded_latencies = [r.latency_ms for r in records if r.latency_ms is not None]
+    errors: dict[str, int] = {}
+    for o in outcomes:
+        if o.status not in (200, 429):
+            errors[str(o.status)] = errors.get(str(o.status), 0) + 1
+
+    compared = [o for o in ok if o.recorded.top_hts_code]
+    changed = [o for o in compared if o.codes[:1] != [o.recorded.top_hts_code]]
+    with_method = [o for o in ok if o.recorded.method]
+
+    def llm_share(methods: list[str | None]) -> float:
+        if not methods:
+            return 0.0
+        return round(sum(m == "llm_assisted" for m in methods) / len(methods), 3)
+
+    return {
+        "requests": len(outcomes),
+        "ok": len(ok),
+        "rate_limited": sum(o.status == 429 for o in outcomes),
+        "errors": errors,
+        "seconds": round(seconds, 2),
+        "qps": round(len(outcomes) / seconds, 2) if seconds else 0.0,
+        "recorded_qps": round(len(records) / span, 2) if span else None,
+        "late": sum(o.late_ms > LATE_MS for o in outcomes),
+        "p50_ms": round(_percentile(latencies, 50), 1),
+        "p95_ms": round(_percentile(latencies, 95), 1),
+        "p99_ms": round(_percentile(latencies, 99), 1),
+        "max_ms": round(max(latencies), 1) if latencies else 0.0,
+        "recorded_p50_ms": round(_percentile(recorded_latencies, 50), 1),
+        "recorded_p95_ms": round(_percentile(recorded_latencies, 95), 1),
+        "histogram": histogram(latencies),
+        "compared": len(compared),
+        "top1_changed": round(len(changed) / len(compared), 3) if compared else 0.0,
+        "recorded_in_top5": (
+            round(sum(o.recorded.top_hts_code in o.codes[:5] for o in compared) / len(compared), 3)
+            if compared else 0.0
+        ),
+        "llm_recorded": llm_share([o.recorded.method for o in with_method]),
+        "llm_replayed": llm_share([o.method for o in with_method]),
+        "changed_examples": [
+            {
+                "query": o.recorded.query,
+                "recorded": o.recorded.top_hts_code,
+                "replayed": o.codes[0] if o.codes else None,
+            }
+            for o in changed[:10]
+        ],
+    }
+
+
+def print_summary(summary: dict) -> None:
+    errors = ", ".join(f"{status}: {n}" for status, n in summary["errors"].items()) or "none"
+    recorded = f" (recorded {summary['recorded_qps']:,.2f}/s)" if summary["recorded_qps"] else ""
+    print(f"{summary['ok']:,}/{summary['requests']:,} ok in {summary['seconds']}s — "
+          f"{summary['qps']:,.2f}/s{recorded}, errors: {errors}")
+    if summary["rate_limited"]:
+        print(f"  {summary['rate_limited']:,} rate limited (429) — "
+              f"pass --admin-key or raise the target's RATE_LIMIT_DEFAULT")
+    if summary["late"]:
+        print(f"  {summary['late']:,} sent over {LATE_MS} ms late — "
+              f"raise --concurrency or lower --speed")
+    print(f"  latency p50 {summary['p50_ms']:,.1f} ms   p95 {summary['p95_ms']:,.1f} ms   "
+          f"p99 {summary['p99_ms']:,.1f} ms   max {summary['max_ms']:,.1f} ms")
+    print(f"  recorded  p50 {summary['recorded_p50_ms']:,.1f} ms   "
+          f"p95 {summary['recorded_p95_ms']:,.1f} ms (server-side)")
+    total = max(summary["ok"], 1)
+    for bucket, n in summary["histogram"].items():
+        print(f"    {bucket:>7} ms {n:>8,} {'#' * round(40 * n / total)}")
+    print(f"  drift on {summary['compared']:,}: top code changed {summary['top1_changed']:.1%}, "
+          f"recorded code still in top 5 {summary['recorded_in_top5']:.1%}, "
+          f"Claude {summary['llm_recorded']:.1%} → {summary['llm_replayed']:.1%}")
+    for example in summary["changed_examples"]:
+        print(f"    {example['recorded']} → {example['replayed']}  {example['query'][:60]}")
+
+
+# ---------------------------------------------------------------------------
+# Entry point
+# ---------------------------------------------------------------------------
+
+def _speed(value: str) -> float | None:
+    if value == "max":
+        return None
+    try:
+        speed = float(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected a number or 'max', got {value!r}") from None
+    if speed <= 0:
+        raise argparse.ArgumentTypeError("speed must be positive")
+    return speed
+
+
+async def run(args: argparse.Namespace) -> None:
+    records = load(args.file)
+    if not records:
+        sys.exit(f"No requests in {args.file}")
+    span = offsets(records)[-1]
+    pace = f"{args.speed:g}x" if args.speed else "max speed"
+    print(f"Replaying {len(records):,} requests ({span:,.0f}s recorded) "
+          f"against {args.target} at {pace}")
+
+    limits = httpx.Limits(max_connections=args.concurrency)
+    headers = {"X-Admin-Key": args.admin_key} if args.admin_key else {}
+    async with httpx.AsyncClient(
+        base_url=args.target, limits=limits, timeout=args.timeout, headers=headers,
+    ) as client:
+        outcomes, seconds = await replay(client, records, args.speed, args.concurrency)
+    summary = summarize(outcomes, seconds)
+    print_summary(summary)
+
+    if args.out:
+        Path(args.out).write_text(json.dumps({
+            "file": str(args.file),
+            "target": args.target,
+            "speed": args.speed or "max",
+            "concurrency": args.concurrency,
+            "started_at": datetime.now().isoformat(timespec="seconds"),
+            **summary,
+        }, indent=2))
+        print(f"Saved: {args.out}")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Export /classify traffic from the audit log and replay it",
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = commands.add_parser(
+        "export", help="Write a time window of requests to a replay file",
+    )
+    export_parser.add_argument("file", type=Path, help="Replay file to write (JSON lines)")
+    export_parser.add_argument("--since", type=datetime.fromisoformat,
+                               help="Start of the window (default: 24 hours ago)")
+    export_parser.add_argument("--until", type=datetime.fromisoformat,
+                               help="End of the window (default: now)")
+    export_parser.add_argument("--limit", type=int, help="At most this many requests")
+
+    run_parser = commands.add_parser("run", help="Replay a file against a deployment")
+    run_parser.add_argument("file", type=Path, help="Replay file from export")
+    run_parser.add_argument("--target", required=True,
+                            help="Base URL of the deployment, e.g. http://staging:8000")
+    run_parser.add_argument("--speed", type=_speed, default=1.0,
+                            help="Multiple of the recorded rate, or 'max' (default: 1)")
+    run_parser.add_argument("--concurrency", type=int, default=64,
+                            help="Requests in flight at most (default: 64)")
+    run_parser.add_argument("--timeout", type=float, default=60.0,
+                            help="Per-request timeout in seconds")
+    run_parser.add_argument("--out", help="Save the results as JSON")
+    run_parser.add_argument(
+        "--admin-key", default=os.environ.get("ADMIN_API_KEY"),
+        help="Target's ADMIN_API_KEY, so the replay isn't rate limited (default: $ADMIN_API_KEY)",
+    )
+    args = parser.parse_args()
+
+    if args.command == "export":
+        until = args.until or datetime.utcnow()
+        since = args.since or until - timedelta(days=1)
+        count = asyncio.run(export(args.file, since, until, args.limit))
+        print(f"Exported {count:,} requests from {since.isoformat()} to {until.isoformat()} "
+              f"→ {args.file}")
+    else:
+        asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
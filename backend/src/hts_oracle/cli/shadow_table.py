@@ -0,0 +1,258 @@
+"""
+Shadow-table rebuild for the HTS import (import_hts --rebuild).
+
+Upserting into the live hts_codes table keeps ix_hts_codes_embedding up
+to date row by row — every insert or changed vector is an incremental
+HNSW insert, the slowest way to build the graph. For a full catalog load
+it's much faster to build the index once, over the finished table:
+
+    1. seed:   CREATE hts_codes_shadow (same columns, no vector index)
+               and copy the live rows in, so unchanged codes keep their vectors
+    2. load:   the normal import pipeline, writing into the shadow table
+    3. prune:  drop codes the new file no longer has
+    4. index:  CREATE INDEX ... USING hnsw, with maintenance_work_mem and
+               max_parallel_maintenance_workers raised for this session
+    5. swap:   copy any other indexes (from pg_indexes) onto the shadow, then
+               one transaction — drop hts_codes, rename the shadow into
+               place, re-grant the live table's privileges
+
+Searches keep reading the old table (and its complete index) until the
+swap commits; they never see a half-built index or a half-loaded catalog.
+The swap holds an ACCESS EXCLUSIVE lock for only as long as a few
+renames take.
+
+Catalog revisions (import_hts --revision, see cli/catalog.py) reuse the
+seed / prune / index phases on a hts_codes_r{N} table, but instead of a
+swap the new revision is activated by a pointer switch.
+"""
+
+import re
+import time
+from collections.abc import Callable
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+
+import asyncpg
+
+from hts_oracle.cli.bulk_upsert import LIVE_TABLE
+
+SHADOW_TABLE = "hts_codes_shadow"
+
+# Same graph parameters as the migration / HtsCode model
+HNSW_M = 16
+HNSW_EF_CONSTRUCTION = 64
+
+# Constraint / index names on the shadow table → their names once it's live
+_RENAMES = {
+    f"{SHADOW_TABLE}_pkey": f"{LIVE_TABLE}_pkey",
+    f"{SHADOW_TABLE}_hts_number_key": f"{LIVE_TABLE}_hts_number_key",
+}
+_INDEX_RENAMES = {
+    f"ix_{SHADOW_TABLE}_hts_number": f"ix_{LIVE_TABLE}_hts_number",
+    f"ix_{SHADOW_TABLE}_embedding": f"ix_{LIVE_TABLE}_embedding",
+}
+
+# pg_get_indexdef() output: CREATE [UNIQUE] INDEX <name> ON [ONLY] <table> USING ...
+_INDEXDEF = re.compile(r"^CREATE (UNIQUE )?INDEX (\S+) ON (?:ONLY )?\S+ (USING .+)$")
+
+_EXTRA_INDEXES = """
+    SELECT indexname, indexdef FROM pg_indexes
+    WHERE schemaname = current_schema() AND tablename = $1
+    ORDER BY indexname
+"""
+
+# Privileges granted on a table to anyone but its owner (grantee 0 = PUBLIC)
+_GRANTS = """
+    SELECT a.privilege_type, coalesce(quote_ident(r.rolname), 'PUBLIC') AS grantee, a.is_grantable
+    FROM pg_class c
+    CROSS JOIN LATERAL aclexplode(c.relacl) a
+    LEFT JOIN pg_roles r ON r.oid = a.grantee
+    WHERE c.oid = $1::regclass AND a.grantee <> c.relowner
+    ORDER BY 2, 1
+"""
+
+# Don't queue behind a long-running query for the swap — fail and let
+# the operator re-run the swap instead of stalling every search behind us.
+SWAP_LOCK_TIMEOUT = "10s"
+
+
+# ---------------------------------------------------------------------------
+# Phase timing
+# ---------------------------------------------------------------------------
+
+@dataclass
+class PhaseTimings:
+    """Wall-clock seconds per rebuild phase, in the order they ran."""
+    phases: dict[str, float] = field(default_factory=dict)
+    on_start: Callable[[str], None] | None = None  # Told each phase's name as it begins
+
+    @contextmanager
+    def phase(self, name: str):
+        if self.on_start:
+            self.on_start(name)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = self.phases.get(name, 0.0) + time.perf_counter() - started
+
+    @property
+    def total(self) -> float:
+        return sum(self.phases.values())
+
+    def report(self) -> str:
+        lines = [f"  {name:<8} {seconds:8.1f}s" for name, seconds in self.phases.items()]
+        lines.append(f"  {'total':<8} {self.total:8.1f}s")
+        return "\n".join(lines)
+
+
+# ---------------------------------------------------------------------------
+# Phases
+# ---------------------------------------------------------------------------
+
+async def create_shadow(
+    conn: asyncpg.Connection,
+    table: str = SHADOW_TABLE,
+    source: str = LIVE_TABLE,
+) -> int:
+    """
+    (Re)create the shadow table and seed it with the rows of `source`.
+
+    LIKE ... INCLUDING DEFAULTS keeps the id default, so new codes draw from
+    the live table's sequence. Only the primary key and the hts_number
+    unique constraint (ON CONFLICT needs it) are created up front; the
+    other indexes are built after the load. Returns the rows seeded.
+    """
+    await conn.execute(f"DROP TABLE IF EXISTS {table}")
+    await conn.execute(
+        f"CREATE TABLE {table} ("
+        f"LIKE {source} INCLUDING DEFAULTS, "
+        f"CONSTRAINT {table}_pkey PRIMARY KEY (id), "
+        f"CONSTRAINT {table}_hts_number_key UNIQUE (hts_number))"
+    )
+    status = await conn.execute(f"INSERT INTO {table} SELECT * FROM {source}")
+    return int(status.split()[-1])  # "INSERT 0 <rows>"
+
+
+async def drop_shadow(conn: asyncpg.Connection, table: str = SHADOW_TABLE) -> None:
+    await conn.execute(f"DROP TABLE IF EXISTS {table}")
+
+
+async def prune_stale(conn: asyncpg.Connection, load_started, table: str = SHADOW_TABLE) -> int:
+    """
+    Delete seeded codes the import didn't touch — they're gone from the new
+    file. Every imported row had updated_at set by its merge, after
+    `load_started` (the database's now() before the load began).
+    """
+    status = await conn.execute(
+        f"DELETE FROM {table} WHERE updated_at IS NULL OR updated_at < $1",
+        load_started,
+    )
+    return int(status.split()[-1])  # "DELETE <rows>"
+
+
+async def build_indexes(
+    conn: asyncpg.Connection,
+    maintenance_work_mem: str,
+    parallel_workers: int,
+    table: str = SHADOW_TABLE,
+) -> None:
+    """
+    Build the HNSW and hts_number indexes on the loaded shadow table.
+
+    pgvector builds the graph in memory while it fits in
+    maintenance_work_mem (~300 MB for the full catalog at 1536 dims) and
+    falls back to a much slower on-disk build when it doesn't; parallel
+    workers split the build. Both are set for this session only.
+    """
+    await conn.execute("SELECT set_config('maintenance_work_mem', $1, false)", maintenance_work_mem)
+    await conn.execute(
+        "SELECT set_config('max_parallel_maintenance_workers', $1, false)", str(parallel_workers),
+    )
+    await conn.execute(
+        f"CREATE INDEX ix_{table}_embedding ON {table} "
+        f"USING hnsw (embedding vector_cosine_ops) "
+        f"WITH (m = {HNSW_M}, ef_construction = {HNSW_EF_CONSTRUCTION})"
+    )
+    await conn.execute(f"CREATE INDEX ix_{table}_hts_number ON {table} (hts_number)")
+    await conn.execute(f"ANALYZE {table}")
+    await conn.execute("RESET maintenance_work_mem")
+    await conn.execute("RESET max_parallel_maintenance_workers")
+
+
+def copy_index(number: int, indexdef: str) -> tuple[str, str]:
+    """
+    (CREATE INDEX statement on the shadow table, its temporary name) for one
+    of the live table's extra indexes. Refuses definitions it can't rewrite
+    rather than swap in a table that silently lost an index.
+    """
+    match = _INDEXDEF.match(indexdef)
+    if not match:
+        raise RuntimeError(f"Can't copy index onto {SHADOW_TABLE}: {indexdef}")
+    unique, _, using = match.groups()
+    temporary = f"ix_{SHADOW_TABLE}_copy{number}"
+    return f"CREATE {unique or ''}INDEX {temporary} ON {SHADOW_TABLE} {using}", temporary
+
+
+def swap_statements(
+    sequence: str | None,
+    index_renames: dict[str, str] | None = None,
+    grants: list[str] | None = None,
+) -> list[str]:
+    """
+    The swap, statement by statement (run in one transaction).
+
+    The id sequence is owned by hts_codes.id, so dropping the old table
+    would drop it too — ownership moves to the shadow table first.
+    index_renames (copied index → live name) and grants carry over what
+    the live table had beyond the indexes this module builds.
+    """
+    statements = [
+        f"SET LOCAL lock_timeout = '{SWAP_LOCK_TIMEOUT}'",
+        f"LOCK TABLE {LIVE_TABLE} IN ACCESS EXCLUSIVE MODE",
+    ]
+    if sequence:
+        statements.append(f"ALTER SEQUENCE {sequence} OWNED BY {SHADOW_TABLE}.id")
+    statements += [
+        f"DROP TABLE {LIVE_TABLE}",
+        f"ALTER TABLE {SHADOW_TABLE} RENAME TO {LIVE_TABLE}",
+    ]
+    statements += [
+        f"ALTER TABLE {LIVE_TABLE} RENAME CONSTRAINT {old} TO {new}"
+        for old, new in _RENAMES.items()
+    ]
+    renames = {**_INDEX_RENAMES, **(index_renames or {})}
+    statements += [f"ALTER INDEX {old} RENAME TO {new}" for old, new in renames.items()]
+    statements += grants or []
+    return statements
+
+
+async def swap_in(conn: asyncpg.Connection) -> None:
+    """
+    Atomically replace hts_codes with the shadow table.
+
+    Indexes on hts_codes that the rebuild doesn't create (added by hand or
+    by a later migration) are built on the shadow first, outside the lock,
+    and the live table's grants are re-issued inside the swap.
+    """
+    sequence = await conn.fetchval("SELECT pg_get_serial_sequence($1, 'id')", LIVE_TABLE)
+
+    known = set(_RENAMES.values()) | set(_INDEX_RENAMES.values())
+    index_renames = {}
+    for row in await conn.fetch(_EXTRA_INDEXES, LIVE_TABLE):
+        if row["indexname"] in known:
+            continue
+        create, temporary = copy_index(len(index_renames), row["indexdef"])
+        await conn.execute(f"DROP INDEX IF EXISTS {temporary}")
+        await conn.execute(create)
+        index_renames[temporary] = row["indexname"]
+
+    grants = [
+        f"GRANT {row['privilege_type']} ON {LIVE_TABLE} TO {row['grantee']}"
+        + (" WITH GRANT OPTION" if row["is_grantable"] else "")
+        for row in await conn.fetch(_GRANTS, LIVE_TABLE)
+    ]
+
+    async with conn.transaction():
+        for statement in swap_statements(sequence, index_renames, grants):
+            await conn.execute(statement)
@@ -0,0 +1,234 @@
+"""
+Streaming parser for the official USITC HTS CSV.
+
+The file USITC publishes (data/hts_2026_revision_4_csv.csv) is a flat
+list of lines with an indent level, not a table of codes:
+
+    HTS Number     Indent  Description                         General Rate
+    0101           0       Live horses, asses, mules and ...
+                   1       Horses:                              (group row, no number)
+    0101.21.00     2       Purebred breeding animals            Free
+    0101.21.00.10  3       Males                                (inherits Free)
+
+import_hts.py wants one row per classifiable code with a context path,
+leaf flag and duty rates, in the enriched CSV's column names. This parser
+derives them in a single pass:
+
+  - Hierarchy:  a stack of open ancestors, popped back to the current
+                line's indent. Context path = the ancestors' descriptions.
+  - Leaf:       a line is a leaf when the next line isn't indented deeper
+                (one line of lookahead).
+  - Duty rates: 10-digit statistical lines usually leave the rate blank —
+                they inherit the rates of the nearest ancestor that has them.
+  - Numbers:    leaves are normalized to the 10-digit "XXXX.XX.XXXX" form
+                used in hts_codes (an 8-digit leaf gets the implied "00").
+
+Memory is bounded by the tree depth (the ancestor stack), not the file
+size, so rows go straight into the import pipeline as they're read.
+
+Benchmark on the full file:
+    python -m hts_oracle.cli.usitc_parser data/hts_2026_revision_4_csv.csv --benchmark
+"""
+
+import argparse
+import csv
+import re
+import sys
+import time
+import tracemalloc
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass
+from pathlib import Path
+
+# Columns that identify the raw USITC format (vs the enriched CSV)
+USITC_COLUMNS = {"HTS Number", "Indent", "Description"}
+
+_TRAILING_PUNCTUATION = re.compile(r"[\s:;,]+$")
+
+
+@dataclass
+class _Line:
+    """One line of the USITC file, parsed."""
+    number: str
+    indent: int
+    description: str
+    unit: str
+    general_rate: str
+    special_rate: str
+
+
+def is_usitc_header(header: Iterable[str]) -> bool:
+    """True for the raw USITC CSV header, False for the enriched format."""
+    columns = {name.strip().lstrip("﻿") for name in header}
+    return USITC_COLUMNS <= columns and "Is Leaf Node" not in columns
+
+
+def normalize_hts_number(number: str) -> str:
+    """
+    "0101.21.00.10" / "0101210010" → "0101.21.0010"; "0101.21.00" → "0101.21.0000".
+
+    Anything shorter than 8 digits (headings, subheadings) is returned
+    with its original punctuation.
+    """
+    digits = re.sub(r"\D", "", number)
+    if len(digits) == 8:
+        digits += "00"  # Implied statistical suffix
+    if len(digits) != 10:
+        return number.strip()
+    return f"{digits[:4]}.{digits[4:6]}.{digits[6:]}"
+
+
+def _clean_description(text: str) -> str:
+    """Strip the trailing ':' USITC puts on lines that have children."""
+    return _TRAILING_PUNCTUATION.sub("", " ".join(text.split()))
+
+
+def _lines(rows: Iterator[list[str]], header: list[str]) -> Iterator[_Line]:
+    index = {name.strip().lstrip("﻿"): i for i, name in enumerate(header)}
+
+    def get(row: list[str], column: str) -> str:
+        i = index.get(column)
+        return row[i].strip() if i is not None and i < len(row) else ""
+
+    for row in rows:
+        if not any(cell.strip() for cell in row):
+            continue
+        try:
+            indent = int(get(row, "Indent") or 0)
+        except ValueError:
+            continue  # Repeated header or a stray note line
+        yield _Line(
+            number=get(row, "HTS Number"),
+            indent=indent,
+            description=get(row, "Description"),
+            unit=get(row, "Unit of Quantity"),
+            general_rate=get(row, "General Rate of Duty"),
+            special_rate=get(row, "Special Rate of Duty"),
+        )
+
+
+def parse_usitc_rows(rows: Iterator[list[str]], leaves_only: bool = True) -> Iterator[dict]:
+    """
+    Turn raw USITC rows (header first) into import rows, streaming.
+
+    Output dicts use the enriched CSV's column names, so import_hts.py
+    handles both formats the same way. Group rows (no HTS number) shape
+    the context path but aren't emitted.
+    """
+    header = next(rows, None)
+    if header is None:
+        return
+
+    # Ancestors of the current line: (indent, line, inherited (general, special))
+    stack: list[tuple[int, _Line, tuple[str, str]]] = []
+    lines = _lines(rows, header)
+    current = next(lines, None)
+
+    while current is not None:
+        following = next(lines, None)  # One line of lookahead decides leaf status
+
+        while stack and stack[-1][0] >= current.indent:
+            stack.pop()
+
+        inherited = stack[-1][2] if stack else ("", "")
+        rates = (
+            (current.general_rate, current.special_rate) if current.general_rate else inherited
+        )
+        is_leaf = following is None or following.indent <= current.indent
+
+        if current.number and (is_leaf or not leaves_only):
+            ancestors = [_clean_description(line.description) for _, line, _ in stack]
+            description = current.description.strip()
+            context_path = " > ".join(a for a in ancestors if a)
+            enhanced = (
+                f"{_clean_description(description)} ({context_path})"
+                if context_path else description
+            )
+            number = normalize_hts_number(current.number) if is_leaf else current.number
+            yield {
+                "HTS Number": number,
+                "Original Description": description,
+                "Enhanced Description": enhanced,
+                "Enriched Text": "",
+                "Search Keywords": "",
+                "Context Path": context_path,
+                "Category": re.sub(r"\D", "", current.number)[:2],
+                "General Rate of Duty": rates[0],
+                "Special Rate of Duty": rates[1],
+                "Unit of Quantity": current.unit,
+                "Is Leaf Node": "Yes" if is_leaf else "No",
+            }
+
+        stack.append((current.indent, current, rates))
+        current = following
+
+
+def iter_usitc_csv(path: str | Path, leaves_only: bool = True) -> Iterator[dict]:
+    """Stream import rows from a USITC CSV file."""
+    with open(path, encoding="utf-8-sig", newline="") as f:
+        yield from parse_usitc_rows(csv.reader(f), leaves_only=leaves_only)
+
+
+def is_usitc_file(path: str | Path) -> bool:
+    """Peek at a CSV's header to tell the raw USITC format from the enriched one."""
+    with open(path, encoding="utf-8-sig", newline="") as f:
+        header = next(csv.reader(f), [])
+    return is_usitc_header(header)
+
+
+# ---------------------------------------------------------------------------
+# Benchmark — python -m hts_oracle.cli.usitc_parser <csv> --benchmark
+# ---------------------------------------------------------------------------
+
+def benchmark(path: str | Path, repeat: int = 3) -> dict:
+    """Parse the whole file `repeat` times; report throughput and peak memory."""
+    with open(path, "rb") as f:
+        lines = sum(1 for _ in f) - 1  # Minus the header
+
+    timings = []
+    leaves = 0
+    for _ in range(repeat):
+        started = time.perf_counter()
+        leaves = sum(1 for _ in iter_usitc_csv(path))
+        timings.append(time.perf_counter() - started)
+
+    # Memory is measured on a separate run — tracemalloc slows parsing down
+    tracemalloc.start()
+    for _ in iter_usitc_csv(path):
+        pass
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    best = min(timings)
+    return {
+        "lines": lines,
+        "leaves": leaves,
+        "best_seconds": round(best, 3),
+        "lines_per_second": round(lines / best),
+        "peak_memory_kb": round(peak / 1024, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Parse the raw USITC HTS CSV")
+    parser.add_argument("csv_path")
+    parser.add_argument("--benchmark", action="store_true", help="Report parse speed and memory")
+    parser.add_argument("--all", action="store_true", help="Include non-leaf codes in the output")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        for key, value in benchmark(args.csv_path).items():
+            print(f"  {key:18} {value:,}" if isinstance(value, int) else f"  {key:18} {value}")
+        return
+
+    # Otherwise, write the parsed rows as CSV (handy for inspecting the result)
+    writer = None
+    for row in iter_usitc_csv(args.csv_path, leaves_only=not args.all):
+        if writer is None:
+            writer = csv.DictWriter(sys.stdout, fieldnames=list(row))
+            writer.writeheader()
+        writer.writerow(row)
+
+
+if __name__ == "__main__":
+    main()
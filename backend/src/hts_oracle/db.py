@@ -60,11 +60,12 @@ async def init_db():
 
     # Create the async engine with connection pooling.
     # pool_size=5: keep 5 connections open
-    # echo=True in dev: logs all SQL queries to the terminal
+    # echo=DB_ECHO: logs every SQL statement to the terminal (synchronously,
+    # outside the log writer thread — for debugging only)
     _engine = create_async_engine(
         settings.database_url,
         pool_size=5,
-        echo=(settings.environment == "development"),
+        echo=settings.db_echo,
         # statement_cache_size=0: required for Supabase/PgBouncer
         connect_args={"statement_cache_size": 0},
     )
@@ -87,6 +88,34 @@ async def close_db():
         _engine = None
 
 
+def pool_stats() -> dict:
+    """Connection pool usage (for /metrics). Empty before init_db()."""
+    if _engine is None:
+        return {}
+    pool = _engine.pool
+    return {
+        "size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "overflow": pool.overflow(),
+        "checked_in": pool.checkedin(),
+    }
+
+
+def get_session_factory() -> async_sessionmaker:
+    """
+    Return the app's session factory for code that runs outside a request.
+
+    Background work (batch workers, SSE tails) opens its own short-lived
+    sessions instead of holding one request-scoped session open.
+
+        async with get_session_factory()() as session:
+            ...
+    """
+    if _session_factory is None:
+        raise RuntimeError("Database not initialized — call init_db() first")
+    return _session_factory
+
+
 async def get_db() -> AsyncSession:
     """
     FastAPI dependency that provides a database session.
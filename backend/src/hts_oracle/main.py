@@ -19,29 +19,28 @@ from fastapi.middleware.cors import CORSMiddleware
 
 from hts_oracle.config import get_settings
 from hts_oracle.db import init_db, close_db
-from hts_oracle.middleware import RateLimitMiddleware, SecurityHeadersMiddleware
-from hts_oracle.routes import health, classify, batch, admin
+from hts_oracle.middleware import (
+    ProfilerMiddleware,
+    RateLimitMiddleware,
+    SecurityHeadersMiddleware,
+    TimingMiddleware,
+)
+from hts_oracle.routes import admin, batch, classify, health, metrics
+from hts_oracle.services.batch_worker import start_worker_pool, stop_worker_pool
+from hts_oracle.services.catalog import start_catalog_watcher, stop_catalog_watcher
+from hts_oracle.services.import_jobs import stop_imports
+from hts_oracle.services.log_writer import configure_logging
+from hts_oracle.services.pdf_parser import shutdown_pdf_pool
 
 # ---------------------------------------------------------------------------
 # Structured logging setup
 # ---------------------------------------------------------------------------
 # structlog outputs JSON in production (machine-readable for log aggregators)
 # and pretty-printed text in development (human-readable in terminal).
+# Lines are written by a background thread, so a slow stdout never holds
+# up a request; see services/log_writer.py.
 
-structlog.configure(
-    processors=[
-        structlog.contextvars.merge_contextvars,        # Attach request_id etc.
-        structlog.processors.add_log_level,             # Add "level": "info"
-        structlog.processors.TimeStamper(fmt="iso"),    # Add ISO timestamp
-        structlog.dev.ConsoleRenderer()                 # Pretty terminal output
-        if get_settings().environment == "development"
-        else structlog.processors.JSONRenderer(),       # JSON for production
-    ],
-    wrapper_class=structlog.make_filtering_bound_logger(0),
-    context_class=dict,
-    logger_factory=structlog.PrintLoggerFactory(),
-    cache_logger_on_first_use=True,
-)
+configure_logging(get_settings())
 
 log = structlog.get_logger()
 
@@ -62,9 +61,21 @@ async def lifespan(app: FastAPI):
     await init_db()
     log.info("database_connected")
 
+    # Serve the active catalog revision (prewarmed), and follow switches
+    await start_catalog_watcher()
+
+    # Start in-process batch workers (they share the Postgres job queue
+    # with any standalone `hts_oracle.cli.batch_worker` processes)
+    start_worker_pool()
+
     yield  # App is running and serving requests
 
-    # Shutdown: close database connections
+    # Shutdown: stop workers first (their jobs get reclaimed if unfinished),
+    # then close database connections
+    await stop_worker_pool()
+    await stop_catalog_watcher()
+    await stop_imports()
+    shutdown_pdf_pool()
     await close_db()
     log.info("shutdown_complete")
 
@@ -100,9 +111,16 @@ def create_app() -> FastAPI:
         allow_headers=["*"],
     )
 
+    # --- Sampling profiler (innermost; only installed when enabled) ---
+    if settings.profiler_enabled:
+        app.add_middleware(ProfilerMiddleware)
+
     # --- Security + rate limiting middleware ---
     app.add_middleware(SecurityHeadersMiddleware)
-    app.add_middleware(RateLimitMiddleware, max_requests=60, window_seconds=60)
+    app.add_middleware(RateLimitMiddleware)  # Limits from RATE_LIMIT_* settings
+
+    # --- Stage timings → Server-Timing header (outermost, so it times everything) ---
+    app.add_middleware(TimingMiddleware)
 
     # --- Register route modules ---
     # Each module in routes/ handles a group of related endpoints.
@@ -110,6 +128,8 @@ def create_app() -> FastAPI:
     app.include_router(classify.router, prefix="/api/v1")
     app.include_router(batch.router, prefix="/api/v1")
     app.include_router(admin.router, prefix="/api/v1")
+    if settings.metrics_enabled:
+        app.include_router(metrics.router)  # GET /metrics — Prometheus scrape target
 
     return app
 
@@ -2,85 +2,174 @@
 Middleware — request-level processing that runs on every request.
 
 Currently includes:
-  - Rate limiting: prevents abuse by limiting requests per IP
+  - Timing: per-stage durations as a Server-Timing header
+  - Rate limiting: prevents abuse by limiting requests per IP (and route)
   - Security headers: adds standard security headers to all responses
+  - Profiling: samples the stacks of selected requests (PROFILER_ENABLED only)
 
 These run BEFORE route handlers, so they protect the entire API.
+
+All are plain ASGI middleware rather than Starlette's BaseHTTPMiddleware.
+BaseHTTPMiddleware runs the rest of the app in a separate task and pipes
+the response back through a memory stream — extra work on every request,
+and every chunk of a streaming response (the batch and import SSE
+streams) takes the detour too. Here the request passes straight through;
+headers are added by editing the "http.response.start" message in place
+as it goes by, and the body is never touched.
 """
 
-import time
-from collections import defaultdict
+import asyncio
+import secrets
+from time import perf_counter
 
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.requests import Request
+from starlette.datastructures import Headers, MutableHeaders
 from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
 from hts_oracle.config import get_settings
+from hts_oracle.services import metrics, timing
+from hts_oracle.services.profiler import Profiler, get_profiler
+from hts_oracle.services.rate_limiter import RateLimiter, build_rate_limiter, retry_after_header
+
+
+def client_ip(scope: Scope) -> str:
+    """X-Forwarded-For if behind a proxy, else the direct peer address."""
+    forwarded = Headers(scope=scope).get("x-forwarded-for", "").split(",")[0].strip()
+    if forwarded:
+        return forwarded
+    client = scope.get("client")
+    return client[0] if client else "unknown"
+
+
+def has_admin_key(scope: Scope) -> bool:
+    """Whether the request carries a valid X-Admin-Key (never, if ADMIN_API_KEY is unset)."""
+    given = Headers(scope=scope).get("x-admin-key")
+    if not given:
+        return False
+    expected = get_settings().admin_api_key
+    # As bytes: headers decode as latin-1, and compare_digest refuses non-ASCII str
+    return bool(expected) and secrets.compare_digest(given.encode(), expected.encode())
+
+
+# ---------------------------------------------------------------------------
+# Request timing
+# ---------------------------------------------------------------------------
+
+class TimingMiddleware:
+    """
+    Collects the request's stage timings (services/timing.py) and returns
+    them as a Server-Timing header, e.g.
+
+        Server-Timing: embed;dur=182.4, search;dur=3.1, db_commit;dur=2.0, total;dur=191.9
+
+    The request's total (until the response starts) goes to the
+    hts_oracle_request_ms histogram. For streamed responses (SSE) the
+    header covers the work done before the stream's first byte.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = perf_counter()
+
+        async def send_with_timing(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                total_ms = (perf_counter() - started) * 1000
+                metrics.observe("request", total_ms)
+                message["headers"] = [
+                    *message.get("headers", []),
+                    (b"server-timing", timing.server_timing(timings, total_ms).encode()),
+                ]
+            await send(message)
+
+        with timing.collect() as timings:
+            await self.app(scope, receive, send_with_timing)
 
 
 # ---------------------------------------------------------------------------
 # Rate limiting
 # ---------------------------------------------------------------------------
-# Simple in-memory rate limiter. Tracks request counts per IP address
-# in a sliding time window.
-#
-# For a single-process deployment (Render/Railway with 1 worker), this
-# is fine. For multi-worker, you'd use Redis instead.
+# Sliding-window counters per client IP and route group. The counters
+# live in the backend chosen by RATE_LIMIT_BACKEND (services/rate_limiter.py):
+# in this process, shared by all workers on the host, or in Postgres for
+# several nodes — so the API can run more than one worker.
 
-class RateLimitMiddleware(BaseHTTPMiddleware):
+class RateLimitMiddleware:
     """
     Limits requests per IP address.
 
-    Default: 60 requests per 60-second window.
-    When exceeded, returns 429 Too Many Requests.
+    Default: 60 requests per minute, with tighter limits on expensive
+    routes (RATE_LIMIT_ROUTES). When exceeded, returns 429 Too Many
+    Requests with a Retry-After header.
 
     Health checks (/api/v1/health) are exempt — monitoring tools
-    hit this endpoint frequently and shouldn't be rate limited.
+    hit this endpoint frequently and shouldn't be rate limited. So are
+    requests with a valid X-Admin-Key: load tests and traffic replays
+    (cli/replay.py) come from one address at many times the normal rate.
     """
 
-    def __init__(self, app, max_requests: int = 60, window_seconds: int = 60):
-        super().__init__(app)
-        self.max_requests = max_requests
-        self.window_seconds = window_seconds
-        # { ip_address: [timestamp1, timestamp2, ...] }
-        self._requests: dict[str, list[float]] = defaultdict(list)
-
-    async def dispatch(self, request: Request, call_next):
-        # Skip rate limiting for health checks
-        if request.url.path.endswith("/health"):
-            return await call_next(request)
-
-        # Get client IP (X-Forwarded-For if behind a proxy, else direct IP)
-        client_ip = request.headers.get("X-Forwarded-For", "").split(",")[0].strip()
-        if not client_ip:
-            client_ip = request.client.host if request.client else "unknown"
-
-        now = time.time()
-        window_start = now - self.window_seconds
-
-        # Remove timestamps outside the current window
-        self._requests[client_ip] = [
-            t for t in self._requests[client_ip] if t > window_start
-        ]
-
-        # Check if over the limit
-        if len(self._requests[client_ip]) >= self.max_requests:
-            return JSONResponse(
+    def __init__(self, app: ASGIApp, limiter: RateLimiter | None = None):
+        self.app = app
+        self.limiter = limiter or build_rate_limiter(get_settings())
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        if has_admin_key(scope):
+            await self.app(scope, receive, send)
+            return
+
+        decision = await self.limiter.check(client_ip(scope), scope["path"])
+        if decision is None:  # Exempt path
+            await self.app(scope, receive, send)
+            return
+
+        if not decision.allowed:
+            response = JSONResponse(
                 status_code=429,
                 content={"detail": "Too many requests. Please try again later."},
+                headers={
+                    "Retry-After": retry_after_header(decision),
+                    "X-RateLimit-Limit": str(decision.limit),
+                    "X-RateLimit-Remaining": "0",
+                },
             )
+            await response(scope, receive, send)
+            return
+
+        limit, remaining = str(decision.limit), str(decision.remaining)
 
-        # Record this request
-        self._requests[client_ip].append(now)
+        async def send_with_headers(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                headers["X-RateLimit-Limit"] = limit
+                headers["X-RateLimit-Remaining"] = remaining
+            await send(message)
 
-        return await call_next(request)
+        await self.app(scope, receive, send_with_headers)
 
 
 # ---------------------------------------------------------------------------
 # Security headers
 # ---------------------------------------------------------------------------
 
-class SecurityHeadersMiddleware(BaseHTTPMiddleware):
+# Encoded once; appended to every response's raw header list
+_SECURITY_HEADERS = [
+    (b"x-content-type-options", b"nosniff"),
+    (b"x-frame-options", b"DENY"),
+    (b"referrer-policy", b"strict-origin-when-cross-origin"),
+]
+_SECURITY_HEADER_NAMES = {name for name, _ in _SECURITY_HEADERS}
+
+
+class SecurityHeadersMiddleware:
     """
     Adds standard security headers to all responses.
 
@@ -90,9 +179,67 @@ class SecurityHeadersMiddleware(BaseHTTPMiddleware):
       - Referrer-Policy: limits referrer info leakage
     """
 
-    async def dispatch(self, request: Request, call_next):
-        response = await call_next(request)
-        response.headers["X-Content-Type-Options"] = "nosniff"
-        response.headers["X-Frame-Options"] = "DENY"
-        response.headers["Referrer-Policy"] = "strict-origin-when-cross-origin"
-        return response
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_headers(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                # Replace any the route set itself, like response.headers[...] = did
+                headers = [
+                    (name, value) for name, value in message.get("headers", [])
+                    if name.lower() not in _SECURITY_HEADER_NAMES
+                ]
+                message["headers"] = headers + _SECURITY_HEADERS
+            await send(message)
+
+        await self.app(scope, receive, send_with_headers)
+
+
+# ---------------------------------------------------------------------------
+# Profiling
+# ---------------------------------------------------------------------------
+
+class ProfilerMiddleware:
+    """
+    Profiles selected requests with the sampling profiler
+    (services/profiler.py): a random sample_rate share of them, and any
+    sent with "X-Profile: 1" plus a valid X-Admin-Key. The profile's file
+    name comes back in an X-Profile header.
+
+    Only added to the app when PROFILER_ENABLED is set.
+    """
+
+    def __init__(self, app: ASGIApp, profiler: Profiler | None = None):
+        self.app = app
+        self.profiler = profiler or get_profiler(get_settings())
+
+    def _requested(self, scope: Scope) -> bool:
+        return Headers(scope=scope).get("x-profile") == "1" and has_admin_key(scope)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not (self.profiler.sampled() or self._requested(scope)):
+            await self.app(scope, receive, send)
+            return
+
+        profile = self.profiler.start(scope["method"], scope["path"])
+        if profile is None:  # Another request is being profiled
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_name(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                message["headers"] = [
+                    *message.get("headers", []), (b"x-profile", profile.name.encode()),
+                ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_name)
+        finally:
+            # Joining the sampler and writing the file happen off the event loop
+            await asyncio.to_thread(profile.finish)
@@ -8,5 +8,15 @@ generating migrations. If you add a new model file, import it here.
 from hts_oracle.models.hts_code import HtsCode
 from hts_oracle.models.classification import Classification
 from hts_oracle.models.batch_job import BatchJob
+from hts_oracle.models.batch_job_event import BatchJobEvent
+from hts_oracle.models.batch_job_item import BatchJobItem
+from hts_oracle.models.batch_blob import BatchBlob
+from hts_oracle.models.extraction_cache import ExtractionCacheEntry
+from hts_oracle.models.catalog_revision import CatalogRevision
+from hts_oracle.models.import_job import ImportJob
+from hts_oracle.models.rate_limit_counter import RateLimitCounter
 
-__all__ = ["HtsCode", "Classification", "BatchJob"]
\ No newline at end of file
+__all__ = [
+    "HtsCode", "Classification", "BatchJob", "BatchJobEvent", "BatchJobItem", "BatchBlob",
+    "ExtractionCacheEntry", "CatalogRevision", "ImportJob", "RateLimitCounter",
+]
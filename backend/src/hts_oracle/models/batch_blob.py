@@ -0,0 +1,28 @@
+"""
+Batch blob index — maps content hashes to Postgres large objects.
+
+Only used by the "postgres" blob store backend (services/blob_store.py).
+The bytes themselves live in pg_largeobject; this table just records which
+large object holds the file with a given SHA-256.
+"""
+
+from sqlalchemy import BigInteger, Column, DateTime, String
+from sqlalchemy.sql import func
+
+from hts_oracle.db import Base
+
+
+class BatchBlob(Base):
+    """One stored file, addressed by the SHA-256 of its content."""
+    __tablename__ = "batch_blobs"
+
+    sha256 = Column(String(64), primary_key=True)
+
+    # The large object's oid (Postgres oids are unsigned 32-bit → BigInteger)
+    loid = Column(BigInteger, nullable=False)
+
+    size_bytes = Column(BigInteger, nullable=False)
+
+    # Refreshed when the same content is uploaded again: garbage collection
+    # only deletes unreferenced blobs older than its grace period
+    created_at = Column(DateTime, server_default=func.now())
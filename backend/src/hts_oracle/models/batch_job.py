@@ -1,18 +1,19 @@
 """
-Batch job model — tracks PDF invoice classification jobs.
+Batch job model — tracks invoice (PDF or structured file) classification jobs.
 
-Job state lives in Postgres. The flow is:
-  1. User uploads PDF  →  POST /api/v1/batch/upload  →  returns job_id
-  2. Frontend connects  →  GET /api/v1/batch/{job_id}/stream  →  SSE events
-  3. If connection drops, frontend reconnects and resumes from last event
+Job state lives in Postgres, and this table doubles as the job queue. The flow is:
+  1. User uploads PDF  →  POST /api/v1/batch/upload  →  job queued as "pending"
+  2. A worker claims it (FOR UPDATE SKIP LOCKED) and appends events to batch_job_events
+  3. Frontend connects  →  GET /api/v1/batch/{job_id}/stream  →  tails those events
+  4. If connection drops, frontend reconnects with Last-Event-ID and resumes
 
-This means progress survives network hiccups, and we have a history of
-every batch job ever run (useful for debugging and analytics).
+This means progress survives network hiccups (and worker crashes — stale
+jobs are reclaimed), and we have a history of every batch job ever run.
 """
 
 from datetime import datetime
 
-from sqlalchemy import Column, DateTime, Integer, String, Text
+from sqlalchemy import Column, DateTime, Index, Integer, String, text
 from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.sql import func
 
@@ -33,29 +34,56 @@ class BatchJob(Base):
     filename = Column(String(255))
 
     # Current status of the job
-    #   "pending":    uploaded, not yet started
+    #   "pending":    uploaded, waiting in the queue for a worker
     #   "processing": actively classifying items
     #   "complete":   all items classified
     #   "error":      something went wrong
     status = Column(String(20), default="pending", nullable=False)
 
-    # Classified items — stored as a JSON array.
-    # Each item: { commodity, hts_code, confidence, status, description, duty_rate }
-    # Using JSONB instead of a separate table keeps things simple —
-    # we always read/write all items together, never query individual items.
+    # The uploaded file lives in the blob store (services/blob_store.py).
+    # The job only holds its reference ("local:<sha256>" / "pg:<sha256>")
+    # and content hash, so job reads stay small.
+    blob_ref = Column(String(80))
+    content_sha256 = Column(String(64))
+
+    # What kind of file was uploaded: "pdf", or a structured export ("csv",
+    # "xlsx", "json") that skips PDF parsing and Claude extraction.
+    # column_map names the file's columns ({"description": "Item", ...});
+    # null means detect them from the header row.
+    source_format = Column(String(10), default="pdf", nullable=False)
+    column_map = Column(JSONB)
+
+    # Legacy: jobs from before the blob store kept the base64 PDF here, and
+    # results before batch_job_items. New jobs leave it empty.
     items = Column(JSONB, default=[])
 
     # Summary stats (set when job completes)
     # { total, classified, needs_review, avg_confidence }
     summary = Column(JSONB, default={})
 
-    # How many items have been processed so far (for progress tracking)
+    # How many items have been processed so far (for progress tracking).
+    # Workers update this in throttled batches, not on every item.
     items_processed = Column(Integer, default=0)
     items_total = Column(Integer, default=0)
 
     # Current processing phase (for SSE progress events)
-    # "extracting_text", "extracting_commodities", "searching", "resolving"
+    # "extracting_text", "extracting_commodities", "reading_rows", "searching", "resolving"
     current_phase = Column(String(50))
 
+    # --- Queue bookkeeping ---
+    # worker_id: which worker claimed the job ("hostname:pid:task")
+    # heartbeat_at: last time that worker said it was alive — if this goes
+    #   stale, another worker puts the job back in the queue
+    # attempts: how many times the job has been claimed (capped by batch_max_attempts)
+    worker_id = Column(String(100))
+    heartbeat_at = Column(DateTime)
+    attempts = Column(Integer, default=0, nullable=False)
+
     created_at = Column(DateTime, server_default=func.now())
-    completed_at = Column(DateTime)
\ No newline at end of file
+    started_at = Column(DateTime)
+    completed_at = Column(DateTime)
+
+    # Partial index over the queue: workers only ever look for pending jobs
+    __table_args__ = (
+        Index("ix_batch_jobs_pending", "id", postgresql_where=text("status = 'pending'")),
+    )
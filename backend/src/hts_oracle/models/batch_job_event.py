@@ -0,0 +1,41 @@
+"""
+Batch job event log — the append-only record of everything a worker emitted.
+
+Workers append one row per SSE event while they process a job. The SSE
+endpoint only tails this table, so:
+  - a slow or disconnected client never stalls classification
+  - a reconnecting client sends Last-Event-ID and gets replayed from there
+  - any API process can serve the stream, not just the one doing the work
+"""
+
+from sqlalchemy import BigInteger, Column, DateTime, ForeignKey, Integer, UniqueConstraint
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.sql import func
+
+from hts_oracle.db import Base
+
+
+class BatchJobEvent(Base):
+    """
+    One row per event emitted for a batch job.
+
+    `seq` is a per-job counter starting at 1 — it doubles as the SSE event id.
+    """
+    __tablename__ = "batch_job_events"
+
+    id = Column(BigInteger, primary_key=True)
+
+    job_id = Column(Integer, ForeignKey("batch_jobs.id", ondelete="CASCADE"), nullable=False)
+
+    # Per-job sequence number (1, 2, 3, ...) — sent to the client as the SSE id
+    seq = Column(Integer, nullable=False)
+
+    # The event itself, exactly as streamed: { "event": "phase", ... }
+    payload = Column(JSONB, nullable=False)
+
+    created_at = Column(DateTime, server_default=func.now())
+
+    # (job_id, seq) is both the uniqueness rule and the index the SSE tail reads
+    __table_args__ = (
+        UniqueConstraint("job_id", "seq", name="uq_batch_job_events_job_seq"),
+    )
@@ -0,0 +1,62 @@
+"""
+Batch job items — one row per classified line item.
+
+Items used to live in a single JSONB array on batch_jobs, so every write
+rewrote the whole (TOASTed) array. As separate rows, writing an item costs
+the same whether the job has 5 items or 5,000, and results are read back a
+page at a time with keyset pagination on (job_id, position).
+"""
+
+from sqlalchemy import BigInteger, Column, DateTime, Float, ForeignKey, Index, Integer, String, Text
+from sqlalchemy.sql import func
+
+from hts_oracle.db import Base
+
+
+class BatchJobItem(Base):
+    """
+    One classified commodity from a batch job.
+
+    Columns mirror the item dicts built by services/batch_classifier.py.
+    """
+    __tablename__ = "batch_job_items"
+
+    id = Column(BigInteger, primary_key=True)
+
+    job_id = Column(Integer, ForeignKey("batch_jobs.id", ondelete="CASCADE"), nullable=False)
+
+    # 0-based position in the job's result list (stable ordering for pagination)
+    position = Column(Integer, nullable=False)
+
+    # What the invoice said
+    commodity = Column(Text, nullable=False)
+    quantity = Column(Text)
+    value = Column(Text)
+
+    # What we classified it as
+    hts_code = Column(String(20))
+    description = Column(Text)
+    confidence = Column(Float)
+    general_rate = Column(String(200))
+
+    # "confident", "llm_assisted", "ambiguous", or "needs_review"
+    status = Column(String(20), nullable=False)
+
+    created_at = Column(DateTime, server_default=func.now())
+
+    __table_args__ = (
+        Index("ix_batch_job_items_job_position", "job_id", "position", unique=True),
+    )
+
+    def to_dict(self) -> dict:
+        """The item shape the API and SSE `complete` event have always used."""
+        return {
+            "commodity": self.commodity,
+            "quantity": self.quantity,
+            "value": self.value,
+            "hts_code": self.hts_code or "",
+            "description": self.description or "",
+            "confidence": self.confidence or 0,
+            "general_rate": self.general_rate or "",
+            "status": self.status,
+        }
@@ -0,0 +1,58 @@
+"""
+Catalog revisions — versioned generations of the HTS catalog.
+
+Each revision is a complete copy of the catalog in its own table
+(hts_codes_r1, hts_codes_r2, ...) with its own HNSW index. Exactly one
+revision is "active"; that's the table searches read. Activating a
+different revision is a single-row update, so a new catalog goes live
+(or an old one comes back) atomically, and a revision being imported
+never shares a table with live traffic.
+
+Lifecycle (status):
+    building → ready → active → retired → dropped
+        └→ failed (import aborted; its table is dropped)
+
+Before the first revision is activated, searches read the original
+hts_codes table. It's recorded as revision 0 (retired until rolled back
+to), so `cli.catalog rollback` can return to it; it's never dropped.
+"""
+
+from sqlalchemy import Column, DateTime, Index, Integer, String, text
+from sqlalchemy.sql import func
+
+from hts_oracle.db import Base
+
+
+class CatalogRevision(Base):
+    """One generation of the HTS catalog (see cli/catalog.py for the commands)."""
+    __tablename__ = "catalog_revisions"
+
+    id = Column(Integer, primary_key=True)
+
+    # The table holding this revision's codes, e.g. "hts_codes_r3"
+    table_name = Column(String(63), unique=True, nullable=False)
+
+    # building | ready | active | retired | failed | dropped
+    status = Column(String(20), nullable=False, default="building")
+
+    # Where the revision came from (the imported CSV) and how many codes it has
+    source_file = Column(String(255))
+    source_sha256 = Column(String(64))
+    row_count = Column(Integer)
+
+    created_at = Column(DateTime, server_default=func.now())
+    ready_at = Column(DateTime)
+    activated_at = Column(DateTime)
+
+    __table_args__ = (
+        # At most one active revision — activation can't leave two live
+        Index(
+            "uq_catalog_revisions_active",
+            "status",
+            unique=True,
+            postgresql_where=text("status = 'active'"),
+        ),
+    )
+
+    def __repr__(self):
+        return f"<CatalogRevision {self.id} {self.table_name} ({self.status})>"
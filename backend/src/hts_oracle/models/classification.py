@@ -9,6 +9,9 @@ This table answers questions like:
   - "What's the average confidence score?"
   - "What queries produce low confidence?" (→ improve enriched text for those codes)
   - "How fast are responses?" (latency_ms)
+  - "Where did the time go?" (stage_timings: embed / search / llm ms)
+  - "How often does Claude just confirm the vector search's top result?"
+    (llm_pick_hts_code vs vector_top_hts_code — see cli/calibrate.py)
 """
 
 from datetime import datetime
@@ -41,9 +44,22 @@ class Classification(Base):
     # The top result we returned
     top_hts_code = Column(String(20))
 
-    # How confident we were (0.0 to 1.0)
+    # How confident we were (0.0 to 1.0) — the top result's similarity
     confidence = Column(Float)
 
+    # The runner-up's similarity; confidence - top2_similarity is the margin
+    top2_similarity = Column(Float)
+
+    # The vector search's top result before Claude reordered anything,
+    # and Claude's pick (null if Claude wasn't asked). When they match,
+    # the Claude call only confirmed what we already had.
+    vector_top_hts_code = Column(String(20))
+    llm_pick_hts_code = Column(String(20))
+
+    # Set when Claude was asked only as a calibration sample of a confident
+    # query: the sample rate then in effect (each such row stands for 1/rate)
+    calibration_sample_rate = Column(Float)
+
     # How was this classified?
     #   "vector_only": high confidence, no Claude needed (fast + free)
     #   "llm_assisted": Claude picked the best match (slower + costs money)
@@ -55,4 +71,8 @@ class Classification(Base):
     # How long the request took (milliseconds)
     latency_ms = Column(Integer)
 
+    # Milliseconds per stage (services/timing.py), e.g.
+    # {"embed": 182.4, "search": 3.1, "llm": 1240.7}
+    stage_timings = Column(JSONB)
+
     created_at = Column(DateTime, server_default=func.now())
\ No newline at end of file
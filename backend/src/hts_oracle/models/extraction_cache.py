@@ -0,0 +1,51 @@
+"""
+Extraction cache — PDF text and line items, keyed by the file's content hash.
+
+The same invoice PDF often arrives several times (re-uploads, forwards,
+retries after a timeout). Uploads are already addressed by SHA-256 in the
+blob store, so that hash keys a cache of the expensive part of a batch job:
+pdfplumber's text and the extracted commodity list. A repeat upload skips
+straight to classification.
+
+Entries are also keyed by claude_model and by the settings that decide
+how items are extracted (extraction_settings, e.g. "tables=on,min_confidence=0.8")
+— a different model or table fast-path threshold might read the invoice
+differently, so its results aren't reused.
+"""
+
+from sqlalchemy import BigInteger, Column, DateTime, Index, Integer, String, Text
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.sql import func
+
+from hts_oracle.db import Base
+
+
+class ExtractionCacheEntry(Base):
+    """One extracted invoice (services/extraction_cache.py reads and writes these)."""
+    __tablename__ = "extraction_cache"
+
+    content_sha256 = Column(String(64), primary_key=True)
+    claude_model = Column(String(100), primary_key=True)
+    extraction_settings = Column(String(100), primary_key=True)
+
+    # pdfplumber's text for the whole document
+    pdf_text = Column(Text, nullable=False)
+
+    # The commodity dicts ({description, quantity, value}), in document order
+    commodities = Column(JSONB, nullable=False)
+
+    # "table" (rule-based fast path) or "claude"
+    source = Column(String(20))
+
+    # pdf_text + commodities JSON, counted against extraction_cache_max_bytes
+    size_bytes = Column(BigInteger, nullable=False)
+
+    # How many uploads this entry has served, and when it was last used.
+    # Eviction drops the least recently used entries first.
+    hits = Column(Integer, default=0, nullable=False)
+    created_at = Column(DateTime, server_default=func.now())
+    last_used_at = Column(DateTime, server_default=func.now(), nullable=False)
+
+    __table_args__ = (
+        Index("ix_extraction_cache_last_used", "last_used_at"),
+    )
@@ -66,6 +66,15 @@ class HtsCode(Base):
     # Nullable because we might import codes before generating embeddings.
     embedding = Column(Vector(1536))
 
+    # --- What the embedding was made from ---
+    # embed_hash: SHA-256 of build_embed_text() for this row when it was embedded.
+    # With the model + dimensions, the import can tell when a code's vector is
+    # still current and skip re-embedding it (most codes don't change between
+    # HTS revisions).
+    embed_hash = Column(String(64))
+    embedding_model = Column(String(100))
+    embedding_dimensions = Column(Integer)
+
     # --- Timestamps ---
     created_at = Column(DateTime, server_default=func.now())
     updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
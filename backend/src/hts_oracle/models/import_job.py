@@ -0,0 +1,73 @@
+"""
+Import job model — HTS CSV imports started through the admin API.
+
+POST /api/v1/admin/import-csv saves the upload and runs the import CLI
+in a child process (services/import_jobs.py). The process reports its
+progress as JSON lines; the API process that started it copies the
+latest snapshot here. Any API process can then serve the SSE progress
+stream by reading this row, the same way batch streams tail
+batch_job_events.
+
+heartbeat_at is refreshed every few seconds while the import runs. A
+pending/running job whose heartbeat stopped (the API process died) is
+treated as failed, so it can't block new imports forever.
+
+A partial unique index allows only one pending/running job at a time.
+"""
+
+from sqlalchemy import Column, DateTime, Index, Integer, String, Text, text
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.sql import func
+
+from hts_oracle.db import Base
+
+
+class ImportJob(Base):
+    """
+    One admin-triggered catalog import.
+
+    Status progression: pending → running → complete (or → failed)
+    """
+    __tablename__ = "import_jobs"
+
+    id = Column(Integer, primary_key=True)
+
+    # Uploaded filename (e.g., "hts_2026_revision_5_csv.csv")
+    filename = Column(String(255))
+
+    status = Column(String(20), default="pending", nullable=False)
+
+    # "revision" (build a new catalog revision), "incremental" (upsert into
+    # the served table) or "rebuild" (shadow table + swap) — see import_hts.py
+    mode = Column(String(20), nullable=False)
+    options = Column(JSONB, default={})
+
+    # Latest progress from the import process: current phase, then the
+    # ImportProgress snapshot (rows written, rows/s, embeddings/s, ...)
+    phase = Column(String(30))
+    progress = Column(JSONB)
+
+    # The import's final summary line, and on failure the error plus the
+    # last lines of its output
+    summary = Column(JSONB)
+    error = Column(Text)
+    log_tail = Column(Text)
+
+    # OS process id of the import (on the API host that started it)
+    pid = Column(Integer)
+
+    created_at = Column(DateTime, server_default=func.now())
+    started_at = Column(DateTime)
+    finished_at = Column(DateTime)
+    heartbeat_at = Column(DateTime, server_default=func.now(), nullable=False)
+
+    __table_args__ = (
+        Index("ix_import_jobs_status", "status"),
+        Index(
+            "uq_import_jobs_one_active", text("(true)"), unique=True,
+            postgresql_where=text("status IN ('pending', 'running')"),
+        ),
+    )
+
+    def __repr__(self):
+        return f"<ImportJob {self.id} {self.filename} ({self.status})>"
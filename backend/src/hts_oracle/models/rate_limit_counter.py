@@ -0,0 +1,33 @@
+"""
+Rate limit counter model — request counts shared by every API node.
+
+Used when RATE_LIMIT_BACKEND=postgres (services/rate_limiter.py). Each
+row is one client key's request count in one fixed window; the sliding
+estimate combines the current window's row with the previous one.
+
+The table is UNLOGGED: counters are written on every request, and losing
+them in a crash only resets a few minutes of rate limiting — not worth
+the WAL traffic. Windows older than a day are deleted periodically.
+"""
+
+from sqlalchemy import BigInteger, Column, Integer, String
+
+from hts_oracle.db import Base
+
+
+class RateLimitCounter(Base):
+    """Requests from one client key in one fixed window."""
+    __tablename__ = "rate_limit_counters"
+
+    # "<route group>|<client IP>", e.g. "/api/v1/batch/upload|203.0.113.7"
+    key = Column(String(255), primary_key=True)
+
+    # Window start, in Unix seconds (a multiple of the window length)
+    window_start = Column(BigInteger, primary_key=True)
+
+    count = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = {"prefixes": ["UNLOGGED"]}
+
+    def __repr__(self):
+        return f"<RateLimitCounter {self.key} @{self.window_start}: {self.count}>"
@@ -2,42 +2,300 @@
 Admin API endpoints.
 
 POST /api/v1/admin/import-csv — Upload a new HTS CSV and reimport.
+GET  /api/v1/admin/import/{id}/stream — SSE progress of that import.
+GET/PUT /api/v1/admin/profiler — Sampling profiler switch.
+GET  /api/v1/admin/profiles[/{name}] — Stored request profiles.
 
 Protected by a simple API key check. Not a full auth system —
 just enough to prevent random users from triggering a reimport.
 Set ADMIN_API_KEY in your .env to enable.
 """
 
-import csv
-import io
+import asyncio
+import os
+import secrets
+import tempfile
+import time
+from pathlib import Path
 
 import structlog
-from fastapi import APIRouter, Depends, UploadFile, File, HTTPException, Header
-from sqlalchemy import func, select
+from fastapi import APIRouter, Body, Depends, File, Form, Header, HTTPException, UploadFile
+from fastapi.responses import FileResponse, StreamingResponse
+from sqlalchemy import text
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from hts_oracle.config import get_settings
-from hts_oracle.db import get_db
-from hts_oracle.models.hts_code import HtsCode
+from hts_oracle.db import get_db, get_session_factory
+from hts_oracle.models.import_job import ImportJob
+from hts_oracle.routes.batch import KEEPALIVE_SECONDS, UPLOAD_CHUNK_SIZE, _format_sse
+from hts_oracle.services import catalog, extraction_cache, import_jobs
+from hts_oracle.services.profiler import Profiler, get_profiler
 
 log = structlog.get_logger()
 
 router = APIRouter(tags=["admin"])
 
+# The full USITC file is ~10MB; leave plenty of room for enriched exports
+MAX_IMPORT_SIZE = 200 * 1024 * 1024
+
+# How often the progress stream re-reads the job row
+IMPORT_STREAM_POLL_SECONDS = 1.0
+
+
+def require_admin_key(x_admin_key: str | None = Header(None, alias="X-Admin-Key")) -> None:
+    """Dependency: the request must carry ADMIN_API_KEY in X-Admin-Key."""
+    expected = get_settings().admin_api_key
+    if not expected:
+        raise HTTPException(
+            status_code=503, detail="Admin import is disabled (ADMIN_API_KEY is not set)",
+        )
+    if not x_admin_key or not secrets.compare_digest(x_admin_key.encode(), expected.encode()):
+        raise HTTPException(status_code=401, detail="Invalid admin key")
+
 
 @router.get("/admin/stats")
 async def get_stats(db: AsyncSession = Depends(get_db)):
     """
     Database stats — how many codes, how many have embeddings, etc.
-    Useful for the admin dashboard.
+    Useful for the admin dashboard. Counts are for the catalog revision
+    this process is serving.
     """
-    total = await db.scalar(select(func.count(HtsCode.id)))
-    with_embeddings = await db.scalar(
-        select(func.count(HtsCode.id)).where(HtsCode.embedding.isnot(None))
-    )
+    active = catalog.active_catalog()
+    counts = (await db.execute(
+        text(f"SELECT count(*) AS total, count(embedding) AS embedded FROM {active.table}")
+    )).one()
+    total, with_embeddings = counts.total, counts.embedded
 
     return {
+        "catalog": {"revision": active.revision, "table": active.table},
         "total_codes": total or 0,
         "with_embeddings": with_embeddings or 0,
         "without_embeddings": (total or 0) - (with_embeddings or 0),
+        # Batch extraction cache: table totals (all processes) + this process's hit rate
+        "extraction_cache": {
+            **await extraction_cache.table_stats(db),
+            "process": extraction_cache.cache_stats(),
+        },
+    }
+
+
+# ---------------------------------------------------------------------------
+# CSV import (runs in a child process — see services/import_jobs.py)
+# ---------------------------------------------------------------------------
+
+@router.post("/admin/import-csv", dependencies=[Depends(require_admin_key)])
+async def import_csv_upload(
+    file: UploadFile = File(...),
+    mode: str = Form("revision", description="revision | incremental | rebuild (see import_hts)"),
+    activate: bool = Form(
+        True, description="revision mode: serve the new revision once it's built",
+    ),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Upload an HTS CSV (enriched or raw USITC) and import it in the background.
+
+    Returns a job_id right away. Follow progress (phase, rows/s,
+    embeddings/s) at GET /api/v1/admin/import/{job_id}/stream.
+
+    The default mode builds a new catalog revision and activates it when
+    it's done — searches keep using the current revision until then.
+    """
+    filename = file.filename or ""
+    if not filename.lower().endswith(".csv"):
+        raise HTTPException(status_code=400, detail="Only CSV files are accepted")
+    if mode not in import_jobs.MODES:
+        raise HTTPException(
+            status_code=400, detail=f"mode must be one of: {', '.join(import_jobs.MODES)}",
+        )
+
+    running = await import_jobs.active_job(db)
+    if running is not None:
+        raise HTTPException(status_code=409, detail=f"Import {running.id} is already running")
+
+    settings = get_settings()
+    path = await _save_upload(file, Path(settings.import_upload_dir))
+
+    try:
+        job = await import_jobs.create_job(db, filename, mode, activate)
+    except import_jobs.ImportAlreadyRunningError as e:
+        path.unlink(missing_ok=True)
+        raise HTTPException(status_code=409, detail=str(e))
+
+    import_jobs.launch(job.id, path, import_jobs.build_command(path, mode, activate, settings))
+    log.info("import_job_created", job_id=job.id, filename=filename, mode=mode)
+
+    return {
+        "job_id": job.id,
+        "status": job.status,
+        "stream_url": f"/api/v1/admin/import/{job.id}/stream",
+    }
+
+
+async def _save_upload(file: UploadFile, directory: Path) -> Path:
+    """Stream the upload to a file in `directory`, enforcing MAX_IMPORT_SIZE."""
+    directory.mkdir(parents=True, exist_ok=True)
+    fd, name = tempfile.mkstemp(dir=directory, prefix="import-", suffix=".csv")
+    size = 0
+    try:
+        with os.fdopen(fd, "wb") as f:
+            while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+                size += len(chunk)
+                if size > MAX_IMPORT_SIZE:
+                    raise HTTPException(
+                        status_code=400,
+                        detail=f"File too large (max {MAX_IMPORT_SIZE // 1024 // 1024}MB)",
+                    )
+                # Disk writes happen off the event loop
+                await asyncio.to_thread(f.write, chunk)
+    except BaseException:
+        os.unlink(name)
+        raise
+    if size == 0:
+        os.unlink(name)
+        raise HTTPException(status_code=400, detail="File is empty")
+    return Path(name)
+
+
+def _job_event(job: ImportJob) -> dict:
+    """The SSE payload for a job's current state."""
+    if job.status == "complete":
+        return {"event": "complete", "job_id": job.id, "summary": job.summary or {}}
+    if job.status == "failed":
+        return {
+            "event": "error", "job_id": job.id, "message": job.error or "Import failed",
+            "log_tail": job.log_tail or "",
+        }
+    return {
+        "event": "progress",
+        "job_id": job.id,
+        "status": job.status,
+        "phase": job.phase,
+        **(job.progress or {}),
+    }
+
+
+@router.get("/admin/import/{job_id}", dependencies=[Depends(require_admin_key)])
+async def get_import(job_id: int, db: AsyncSession = Depends(get_db)):
+    """Current state of an import job (same shape as its stream events)."""
+    job = await db.get(ImportJob, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Import job {job_id} not found")
+    return _job_event(job)
+
+
+@router.get("/admin/import/{job_id}/stream", dependencies=[Depends(require_admin_key)])
+async def stream_import_progress(job_id: int, db: AsyncSession = Depends(get_db)):
+    """
+    SSE stream of an import's progress.
+
+    Event types:
+      - progress: phase (scan, seed, load, prune, index, activate/swap) plus
+                  rows_written / total_rows, rows_per_second,
+                  embeddings_per_second, tokens_per_minute
+      - complete: the import's summary
+      - error:    what went wrong, with the last lines of the import's output
+
+    Reads the job row, so any API process can serve it — not just the one
+    running the import.
+    """
+    if await db.get(ImportJob, job_id) is None:
+        raise HTTPException(status_code=404, detail=f"Import job {job_id} not found")
+
+    session_factory = get_session_factory()
+
+    async def event_generator():
+        last_payload = None
+        last_sent = time.monotonic()
+        while True:
+            async with session_factory() as poll_db:
+                job = await poll_db.get(ImportJob, job_id)
+            payload = _job_event(job)
+            if payload != last_payload:
+                last_payload = payload
+                last_sent = time.monotonic()
+                yield _format_sse(payload)
+                if payload["event"] in ("complete", "error"):
+                    return
+            elif time.monotonic() - last_sent >= KEEPALIVE_SECONDS:
+                last_sent = time.monotonic()
+                yield ": keepalive\n\n"
+            await asyncio.sleep(IMPORT_STREAM_POLL_SECONDS)
+
+    return StreamingResponse(
+        event_generator(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "Connection": "keep-alive",
+            "X-Accel-Buffering": "no",  # Disable nginx buffering
+        },
+    )
+
+
+# ---------------------------------------------------------------------------
+# Sampling profiler (see services/profiler.py)
+# ---------------------------------------------------------------------------
+# The switch is per process: with several workers, each PUT reaches one.
+# Set PROFILER_SAMPLE_RATE to start every worker sampling.
+
+def _profiler() -> Profiler:
+    settings = get_settings()
+    if not settings.profiler_enabled:
+        raise HTTPException(
+            status_code=503, detail="Profiler is disabled (PROFILER_ENABLED is not set)",
+        )
+    return get_profiler(settings)
+
+
+def _profiler_state(profiler: Profiler) -> dict:
+    return {
+        "pid": os.getpid(),
+        "sample_rate": profiler.sample_rate,
+        "interval_ms": profiler.interval * 1000,
+        "max_seconds": profiler.max_seconds,
+        "profiles": len(profiler.list_profiles()),
     }
+
+
+@router.get("/admin/profiler", dependencies=[Depends(require_admin_key)])
+async def get_profiler_state():
+    """This process's profiler settings."""
+    return _profiler_state(_profiler())
+
+
+@router.put("/admin/profiler", dependencies=[Depends(require_admin_key)])
+async def set_profiler_sample_rate(
+    sample_rate: float = Body(
+        ..., embed=True, ge=0.0, le=1.0, description="Share of requests to profile",
+    ),
+):
+    """Profile this share of requests (0 = only requests sent with X-Profile: 1)."""
+    profiler = _profiler()
+    profiler.sample_rate = sample_rate
+    log.info("profiler_sample_rate_set", sample_rate=sample_rate)
+    return _profiler_state(profiler)
+
+
+@router.get("/admin/profiles", dependencies=[Depends(require_admin_key)])
+async def list_profiles():
+    """Stored profiles, newest first (collapsed stacks — open in speedscope or flamegraph.pl)."""
+    return {
+        "profiles": [
+            {
+                "name": info.name,
+                "size_bytes": info.size_bytes,
+                "created_at": info.created_at.isoformat(),
+                "url": f"/api/v1/admin/profiles/{info.name}",
+            }
+            for info in _profiler().list_profiles()
+        ],
+    }
+
+
+@router.get("/admin/profiles/{name}", dependencies=[Depends(require_admin_key)])
+async def download_profile(name: str):
+    path = _profiler().path_for(name)
+    if path is None:
+        raise HTTPException(status_code=404, detail=f"Profile {name} not found")
+    return FileResponse(path, media_type="text/plain", filename=name)
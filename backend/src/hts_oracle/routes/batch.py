@@ -2,30 +2,43 @@
 Batch classification API endpoints.
 
 Two-step flow:
-  1. POST /api/v1/batch/upload   → Upload PDF, get a job_id back
+  1. POST /api/v1/batch/upload   → Upload PDF (or CSV/XLSX/JSON), job is queued, get a job_id back
   2. GET  /api/v1/batch/{id}/stream → SSE stream of classification progress
 
+Results can also be read page by page at GET /api/v1/batch/{id}/items.
+
 Why two steps?
-  If the SSE connection drops (network hiccup, browser tab suspended),
-  the client can reconnect to the same job_id and resume.
-  In v1, all state lived in a Python generator — connection drop = lost progress.
+  The work itself runs in a batch worker (services/batch_worker.py), not in
+  this request. The stream endpoint only tails the job's event log, so a
+  dropped connection loses nothing: the client reconnects with Last-Event-ID
+  and gets every event it missed. In v1, all state lived in a Python
+  generator — connection drop = lost progress.
 """
 
+import asyncio
 import json
-import io
-from datetime import datetime
+import time
 
 import structlog
-from fastapi import APIRouter, Depends, UploadFile, File, HTTPException
+from fastapi import APIRouter, Depends, File, Form, Header, HTTPException, Query, UploadFile
 from fastapi.responses import StreamingResponse
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from hts_oracle.db import get_db
+from hts_oracle.config import get_settings
+from hts_oracle.db import get_db, get_session_factory
 from hts_oracle.models.batch_job import BatchJob
-from hts_oracle.schemas.batch import BatchUploadResponse
-from hts_oracle.services.pdf_parser import extract_text_from_pdf, extract_commodities
-from hts_oracle.services.batch_classifier import classify_batch
+from hts_oracle.schemas.batch import BatchItem, BatchItemsPage, BatchUploadResponse
+from hts_oracle.services.batch_items import read_all_items, read_items_page
+from hts_oracle.services.batch_worker import notify_job_queued
+from hts_oracle.services.blob_store import BlobTooLargeError, get_blob_store
+from hts_oracle.services.job_queue import TERMINAL_EVENTS, read_events
+from hts_oracle.services.structured_invoice import (
+    StructuredFileError,
+    format_for_filename,
+    parse_column_map,
+    xlsx_supported,
+)
 
 log = structlog.get_logger()
 
@@ -34,68 +47,151 @@ router = APIRouter(tags=["batch"])
 # Max file size: 10MB (matching v1)
 MAX_PDF_SIZE = 10 * 1024 * 1024
 
+# Structured exports are denser per line item but can hold many more rows
+MAX_STRUCTURED_SIZE = 50 * 1024 * 1024
+
+# Uploads are read and stored in pieces of this size
+UPLOAD_CHUNK_SIZE = 256 * 1024
+
 
 @router.post("/batch/upload", response_model=BatchUploadResponse)
 async def upload_pdf(
     file: UploadFile = File(...),
+    column_map: str | None = Form(
+        None,
+        description="CSV/XLSX/JSON only: JSON object naming the columns, e.g. "
+                    '{"description": "Item", "quantity": "Qty", "value": "Total"}',
+    ),
     db: AsyncSession = Depends(get_db),
 ):
     """
-    Upload a PDF invoice for batch classification.
+    Upload an invoice for batch classification: a PDF, or a structured
+    line-item export (CSV, XLSX or JSON).
 
     Returns a job_id. Use it to connect to the SSE stream at
     GET /api/v1/batch/{job_id}/stream for real-time progress.
 
-    The PDF is processed in the background when you connect to the stream.
-    """
-    # Validate file type
-    if not file.filename or not file.filename.lower().endswith(".pdf"):
-        raise HTTPException(status_code=400, detail="Only PDF files are accepted")
+    Structured files skip PDF parsing and Claude extraction — each row is
+    a line item. Columns are detected from the header row, or named
+    explicitly with `column_map`.
 
-    # Read and validate size
-    contents = await file.read()
-    if len(contents) > MAX_PDF_SIZE:
-        raise HTTPException(status_code=400, detail=f"File too large (max {MAX_PDF_SIZE // 1024 // 1024}MB)")
-
-    # Validate it's actually a PDF (check magic bytes)
-    if not contents[:5] == b"%PDF-":
-        raise HTTPException(status_code=400, detail="File does not appear to be a valid PDF")
-
-    # Create a batch job record in the database
+    The file is queued and processed by a batch worker whether or not
+    anyone is connected to the stream.
+    """
+    filename = file.filename or ""
+    if filename.lower().endswith(".pdf"):
+        source_format = "pdf"
+    else:
+        source_format = format_for_filename(filename)
+    if source_format is None:
+        raise HTTPException(
+            status_code=400, detail="Only PDF, CSV, XLSX and JSON files are accepted",
+        )
+    if source_format == "xlsx" and not xlsx_supported():
+        raise HTTPException(status_code=400, detail="XLSX uploads are not enabled on this server")
+
+    try:
+        parsed_map = parse_column_map(column_map) if source_format != "pdf" else None
+    except StructuredFileError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    # Check the content matches the extension (magic bytes on the first chunk)
+    first_chunk = await file.read(UPLOAD_CHUNK_SIZE)
+    if not _looks_like(source_format, first_chunk):
+        raise HTTPException(
+            status_code=400,
+            detail=f"File does not appear to be a valid {source_format.upper()}",
+        )
+
+    async def chunks():
+        yield first_chunk
+        while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+            yield chunk
+
+    # Stream the file into the blob store, one chunk at a time — the whole
+    # file is never held in memory, and the size limit is enforced as we go
+    max_size = MAX_PDF_SIZE if source_format == "pdf" else MAX_STRUCTURED_SIZE
+    try:
+        blob = await get_blob_store().put_stream(chunks(), max_size=max_size)
+    except BlobTooLargeError:
+        raise HTTPException(
+            status_code=400, detail=f"File too large (max {max_size // 1024 // 1024}MB)",
+        )
+
+    # Create a batch job record in the database — it holds only a reference
+    # to the stored file, and the job is queued in this same commit
     job = BatchJob(
-        filename=file.filename,
+        filename=filename,
         status="pending",
+        blob_ref=blob.ref,
+        content_sha256=blob.sha256,
+        source_format=source_format,
+        column_map=parsed_map,
     )
     db.add(job)
     await db.commit()
-    await db.refresh(job)
 
-    log.info("batch_job_created", job_id=job.id, filename=file.filename, size_bytes=len(contents))
+    log.info(
+        "batch_job_created",
+        job_id=job.id, filename=filename, format=source_format, size_bytes=blob.size,
+    )
 
-    # Store the PDF bytes temporarily in the job's items field
-    # (In a production system, you'd store this in S3/GCS instead)
-    # For now we'll process it when the stream connects.
-    # We store the raw bytes as a base64-encoded string in metadata.
-    import base64
-    job.items = [{"_pdf_data": base64.b64encode(contents).decode()}]
-    await db.commit()
+    # The job is already "pending" — wake any idle in-process workers
+    notify_job_queued()
 
     return BatchUploadResponse(
         job_id=job.id,
-        filename=file.filename or "unknown.pdf",
+        filename=filename or "unknown.pdf",
     )
 
 
+def _looks_like(source_format: str, first_chunk: bytes) -> bool:
+    """Cheap content check for an upload's first chunk."""
+    if source_format == "pdf":
+        return first_chunk[:5] == b"%PDF-"
+    if source_format == "xlsx":
+        return first_chunk[:4] == b"PK\x03\x04"  # XLSX is a zip archive
+    if b"\x00" in first_chunk:
+        return False  # Binary data, not text
+    if source_format == "json":
+        return first_chunk.lstrip(b"\xef\xbb\xbf \t\r\n")[:1] in (b"[", b"{")
+    # CSV: any non-empty text (non-UTF-8 bytes are replaced when it's read)
+    return bool(first_chunk.strip())
+
+
+# Send an SSE comment this often while waiting, so proxies don't drop idle streams
+KEEPALIVE_SECONDS = 15
+
+
+def _format_sse(event: dict, event_id: int | None = None) -> str:
+    """
+    Format one event in SSE wire format.
+
+    With an id, browsers (and our fetch-based client) remember it and send it
+    back as Last-Event-ID when reconnecting.
+    """
+    data = json.dumps(event)
+    if event_id is None:
+        return f"data: {data}\n\n"
+    return f"id: {event_id}\ndata: {data}\n\n"
+
+
 @router.get("/batch/{job_id}/stream")
 async def stream_batch_progress(
     job_id: int,
     db: AsyncSession = Depends(get_db),
+    last_event_id: str | None = Header(None, alias="Last-Event-ID"),
+    after: int | None = Query(
+        None, description="Resume after this event id (alternative to the Last-Event-ID header)",
+    ),
 ):
     """
     SSE stream of batch classification progress.
 
     Connect to this endpoint after uploading a PDF. Events are streamed
-    in real-time as each item is classified.
+    in real-time as the worker appends them to the job's event log.
+    Each event carries an `id:`; reconnect with a `Last-Event-ID` header
+    (or `?after=<id>`) to resume without missing or repeating events.
 
     Event types:
       - phase: Overall progress update (extracting_text, searching, resolving)
@@ -104,83 +200,52 @@ async def stream_batch_progress(
       - error: Something went wrong
     """
     # Look up the job
-    result = await db.execute(select(BatchJob).where(BatchJob.id == job_id))
-    job = result.scalar_one_or_none()
-
-    if not job:
+    result = await db.execute(select(BatchJob.id).where(BatchJob.id == job_id))
+    if result.scalar_one_or_none() is None:
         raise HTTPException(status_code=404, detail=f"Batch job {job_id} not found")
 
+    cursor = after or 0
+    if last_event_id and last_event_id.isdigit():
+        cursor = max(cursor, int(last_event_id))
+
+    settings = get_settings()
+    session_factory = get_session_factory()
+
     async def event_generator():
         """
-        Async generator that processes the PDF and yields SSE events.
+        Tail the job's event log and yield new events as SSE.
 
-        Each event is formatted as: "data: {json}\n\n"
-        This is the standard SSE format that browsers' EventSource API understands.
+        Each poll uses its own short session, so an open stream doesn't pin
+        a pooled connection while it waits for the worker.
         """
-        import base64
-
-        try:
-            # Retrieve PDF data from job record
-            pdf_data_b64 = ""
-            if job.items and len(job.items) > 0 and "_pdf_data" in job.items[0]:
-                pdf_data_b64 = job.items[0]["_pdf_data"]
-
-            if not pdf_data_b64:
-                yield f"data: {json.dumps({'event': 'error', 'message': 'No PDF data found for this job'})}\n\n"
-                return
-
-            pdf_bytes = base64.b64decode(pdf_data_b64)
-
-            # Update job status
-            job.status = "processing"
-            await db.commit()
-
-            # Phase 1: Extract text from PDF
-            yield f"data: {json.dumps({'event': 'phase', 'phase': 'extracting_text', 'progress': 5, 'total': 0})}\n\n"
-
-            pdf_text = await extract_text_from_pdf(io.BytesIO(pdf_bytes))
-            if not pdf_text:
-                yield f"data: {json.dumps({'event': 'error', 'message': 'Could not extract text from PDF'})}\n\n"
-                return
-
-            # Phase 2: Extract commodity line items
-            yield f"data: {json.dumps({'event': 'phase', 'phase': 'extracting_commodities', 'progress': 10, 'total': 0})}\n\n"
-
-            commodities = await extract_commodities(pdf_text)
-
-            if not commodities:
-                yield f"data: {json.dumps({'event': 'error', 'message': 'No commodity items found in the PDF'})}\n\n"
-                return
-
-            job.items_total = len(commodities)
-            await db.commit()
-
-            # Phase 3-4: Classify all items (search + resolve)
-            # classify_batch is itself an async generator that yields SSE events
-            async for event in classify_batch(commodities, db):
-                yield f"data: {json.dumps(event)}\n\n"
-
-                # Update job progress in DB
-                if event.get("event") == "item_progress":
-                    job.items_processed = event.get("index", 0) + 1
-                    job.current_phase = event.get("status", "searching")
-
-                elif event.get("event") == "complete":
-                    job.status = "complete"
-                    job.items = event.get("items", [])
-                    job.summary = event.get("summary", {})
-                    job.completed_at = datetime.utcnow()
-
-                elif event.get("event") == "error":
-                    job.status = "error"
-
-                await db.commit()
-
-        except Exception as e:
-            log.error("batch_stream_error", job_id=job_id, error=str(e))
-            yield f"data: {json.dumps({'event': 'error', 'message': str(e)})}\n\n"
-            job.status = "error"
-            await db.commit()
+        nonlocal cursor
+        last_sent = time.monotonic()
+
+        while True:
+            async with session_factory() as tail_db:
+                events = await read_events(tail_db, job_id, after_seq=cursor)
+
+            for row in events:
+                cursor = row.seq
+                last_sent = time.monotonic()
+                payload = row.payload
+                if payload.get("event") == "complete" and "items" not in payload:
+                    # The logged event holds only the summary — attach the
+                    # items from batch_job_items so the client contract is unchanged
+                    async with session_factory() as items_db:
+                        payload = {**payload, "items": await read_all_items(items_db, job_id)}
+                yield _format_sse(payload, row.seq)
+                if payload.get("event") in TERMINAL_EVENTS:
+                    return
+
+            if events:
+                continue  # More may be waiting — read again without sleeping
+
+            if time.monotonic() - last_sent >= KEEPALIVE_SECONDS:
+                last_sent = time.monotonic()
+                yield ": keepalive\n\n"
+
+            await asyncio.sleep(settings.batch_stream_poll_seconds)
 
     return StreamingResponse(
         event_generator(),
@@ -190,4 +255,34 @@ async def stream_batch_progress(
             "Connection": "keep-alive",
             "X-Accel-Buffering": "no",  # Disable nginx buffering
         },
-    )
\ No newline at end of file
+    )
+
+
+@router.get("/batch/{job_id}/items", response_model=BatchItemsPage)
+async def list_batch_items(
+    job_id: int,
+    after: int = Query(-1, description="Return items with position greater than this"),
+    limit: int = Query(100, ge=1, le=1000),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Page through a job's classified items in order.
+
+    Uses keyset pagination: pass the previous page's `next_after` as `after`.
+    Every page costs the same, no matter how deep into a large job it is.
+
+    Items appear while the job is still processing; "ambiguous" ones get
+    their final code when it completes.
+    """
+    status = await db.scalar(select(BatchJob.status).where(BatchJob.id == job_id))
+    if status is None:
+        raise HTTPException(status_code=404, detail=f"Batch job {job_id} not found")
+
+    rows = await read_items_page(db, job_id, after_position=after, limit=limit)
+
+    return BatchItemsPage(
+        job_id=job_id,
+        status=status,
+        items=[BatchItem(position=row.position, **row.to_dict()) for row in rows],
+        next_after=rows[-1].position if len(rows) == limit else None,
+    )
@@ -0,0 +1,55 @@
+"""
+Prometheus metrics endpoint.
+
+GET /metrics — this process's stage latency histograms (embed, search,
+llm, db_commit, ...), extraction cache hit rate, DB connection pool usage,
+the log writer's queue (depth, dropped lines) and the catalog revision
+being served. See services/metrics.py.
+
+Mounted at the root (not under /api/v1), where scrapers expect it.
+"""
+
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from hts_oracle.db import pool_stats
+from hts_oracle.services import catalog, extraction_cache, log_writer, metrics
+from hts_oracle.services.metrics import Gauge
+
+router = APIRouter(tags=["metrics"])
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _gauges() -> list[Gauge]:
+    cache = extraction_cache.cache_stats()
+    gauges = [
+        Gauge("extraction_cache_hits_total", cache["hits"], "Extraction cache hits",
+              kind="counter"),
+        Gauge("extraction_cache_misses_total", cache["misses"], "Extraction cache misses",
+              kind="counter"),
+        Gauge("extraction_cache_hit_rate", cache["hit_rate"], "Extraction cache hits / lookups"),
+    ]
+    for state, value in pool_stats().items():
+        gauges.append(Gauge(
+            "db_pool_connections", value, "Database connection pool, by state",
+            labels={"state": state},
+        ))
+    logs = log_writer.log_stats()
+    gauges += [
+        Gauge("log_records_dropped_total", logs["dropped"], "Log lines dropped: writer queue full",
+              kind="counter"),
+        Gauge("log_records_sampled_out_total", logs["sampled_out"],
+              "Log events skipped by sampling", kind="counter"),
+        Gauge("log_queue_depth", logs["queued"], "Log lines waiting for the writer thread"),
+    ]
+    gauges.append(Gauge(
+        "catalog_revision", catalog.active_catalog().revision or 0,
+        "Catalog revision being served (0 = the original hts_codes table)",
+    ))
+    return gauges
+
+
+@router.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    return PlainTextResponse(metrics.render(_gauges()), media_type=CONTENT_TYPE)
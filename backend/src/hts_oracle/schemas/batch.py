@@ -18,7 +18,8 @@ from pydantic import BaseModel, Field
 class PhaseEvent(BaseModel):
     """Progress update: which phase we're in and overall progress."""
     event: str = "phase"
-    phase: str              # "extracting_text", "extracting_commodities", "searching", "resolving"
+    # "extracting_text", "extracting_commodities", "reading_rows", "searching", "resolving"
+    phase: str
     progress: int           # 0-100
     total: int = 0          # Total items (set after extraction)
 
@@ -52,4 +53,33 @@ class BatchUploadResponse(BaseModel):
     """Returned when a PDF is uploaded. Use job_id to connect to the SSE stream."""
     job_id: int
     filename: str
-    message: str = "Upload successful. Connect to the stream endpoint for progress."
\ No newline at end of file
+    message: str = "Upload successful. Connect to the stream endpoint for progress."
+
+# ---------------------------------------------------------------------------
+# Paged job results (GET /batch/{job_id}/items)
+# ---------------------------------------------------------------------------
+
+class BatchItem(BaseModel):
+    """One classified line item."""
+    position: int
+    commodity: str
+    quantity: str | None = None
+    value: str | None = None
+    hts_code: str = ""
+    description: str = ""
+    confidence: float = 0
+    general_rate: str = ""
+    status: str             # "confident", "llm_assisted", "ambiguous", "needs_review"
+
+
+class BatchItemsPage(BaseModel):
+    """
+    One page of a job's items.
+
+    Pass `next_after` back as `?after=` to get the next page; it's null on
+    the last page.
+    """
+    job_id: int
+    status: str
+    items: list[BatchItem]
+    next_after: int | None = None
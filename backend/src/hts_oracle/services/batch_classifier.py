@@ -29,6 +29,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from hts_oracle.config import get_settings
 from hts_oracle.services.searcher import search_hts
+from hts_oracle.services.timing import span
 
 log = structlog.get_logger()
 
@@ -36,7 +37,7 @@ log = structlog.get_logger()
 @lru_cache
 def _get_anthropic_client() -> AsyncAnthropic:
     settings = get_settings()
-    return AsyncAnthropic(api_key=settings.anthropic_api_key)
+    return AsyncAnthropic(api_key=settings.anthropic_api_key, base_url=settings.anthropic_base_url)
 
 
 async def classify_batch(
@@ -55,7 +56,10 @@ async def classify_batch(
         db: Database session for pgvector search
 
     Yields:
-        SSE event dicts: phase, item_progress, complete, error
+        SSE event dicts: phase, item_progress, complete, error. The
+        item_progress event that settles an item carries it as "item" (and
+        its "position" in the final list) so the caller can store it right
+        away; ambiguous ones are placeholders until "complete".
     """
     settings = get_settings()
     total = len(commodities)
@@ -107,6 +111,8 @@ async def classify_batch(
                 "total": total,
                 "commodity": description[:80],
                 "status": "needs_review",
+                "position": len(classified_items) - 1,
+                "item": item,
                 "hts_code": "",
                 "confidence": 0,
             }
@@ -134,6 +140,8 @@ async def classify_batch(
                 "total": total,
                 "commodity": description[:80],
                 "status": "confident",
+                "position": len(classified_items) - 1,
+                "item": item,
                 "hts_code": top_result["hts_code"],
                 "confidence": top_result["confidence_score"],
             }
@@ -145,7 +153,7 @@ async def classify_batch(
                 "candidates": results[:5],
             })
             # Add placeholder to maintain ordering
-            classified_items.append({
+            item = {
                 "commodity": description,
                 "quantity": commodity.get("quantity"),
                 "value": commodity.get("value"),
@@ -154,13 +162,16 @@ async def classify_batch(
                 "confidence": 0,
                 "general_rate": "",
                 "status": "ambiguous",
-            })
+            }
+            classified_items.append(item)
             yield {
                 "event": "item_progress",
                 "index": i,
                 "total": total,
                 "commodity": description[:80],
                 "status": "ambiguous",
+                "position": len(classified_items) - 1,
+                "item": dict(item),  # A snapshot: Phase B updates the placeholder
             }
 
     # --- Phase B: Resolve ambiguous items with one Claude call ---
@@ -239,11 +250,12 @@ Example: [{{"item_index": 1, "hts_code": "6109.10.0012", "analysis": "Cotton kni
 Respond with JSON only, no markdown."""
 
     try:
-        response = await client.messages.create(
-            model=settings.claude_model,
-            max_tokens=2000,
-            messages=[{"role": "user", "content": prompt}],
-        )
+        with span("llm"):
+            response = await client.messages.create(
+                model=settings.claude_model,
+                max_tokens=2000,
+                messages=[{"role": "user", "content": prompt}],
+            )
 
         response_text = response.content[0].text.strip()
         if response_text.startswith("```"):
@@ -0,0 +1,106 @@
+"""
+Batch job item storage — append and page through classified items.
+
+Items are written as rows in batch_job_items (one INSERT per chunk of
+rows, never an UPDATE of a growing array) while the job runs, a few at a
+time, and read back with keyset pagination:
+
+    WHERE job_id = :job AND position > :after ORDER BY position LIMIT :n
+
+Unlike OFFSET, keyset pagination costs the same for page 1 and page 500 —
+it's a straight walk of the (job_id, position) index.
+"""
+
+from sqlalchemy import delete, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from hts_oracle.models.batch_job_item import BatchJobItem
+
+# Rows per INSERT statement when writing a job's items
+WRITE_CHUNK_SIZE = 500
+
+
+# Columns an item write sets (the rest are keys or defaults)
+_ITEM_COLUMNS = (
+    "commodity", "quantity", "value", "hts_code", "description",
+    "confidence", "general_rate", "status",
+)
+
+
+async def write_items(
+    db: AsyncSession,
+    job_id: int,
+    items: list[dict],
+    first_position: int = 0,
+) -> None:
+    """
+    Write classified items at positions first_position, first_position + 1, ...
+    (caller commits).
+
+    `items` are the dicts from classify_batch(). A position that's already
+    stored is overwritten — an ambiguous placeholder written mid-job gets
+    Claude's answer this way.
+    """
+    rows = [
+        {
+            "job_id": job_id,
+            "position": position,
+            "commodity": item.get("commodity") or "",
+            "quantity": _as_text(item.get("quantity")),
+            "value": _as_text(item.get("value")),
+            "hts_code": item.get("hts_code") or "",
+            "description": item.get("description") or "",
+            "confidence": item.get("confidence") or 0,
+            "general_rate": item.get("general_rate") or "",
+            "status": item.get("status") or "needs_review",
+        }
+        for position, item in enumerate(items, start=first_position)
+    ]
+    statement = insert(BatchJobItem)
+    statement = statement.on_conflict_do_update(
+        index_elements=["job_id", "position"],
+        set_={column: statement.excluded[column] for column in _ITEM_COLUMNS},
+    )
+    for start in range(0, len(rows), WRITE_CHUNK_SIZE):
+        await db.execute(statement, rows[start : start + WRITE_CHUNK_SIZE])
+
+
+async def clear_items(db: AsyncSession, job_id: int) -> None:
+    """Delete a job's items — a retried job writes them again from the start."""
+    await db.execute(delete(BatchJobItem).where(BatchJobItem.job_id == job_id))
+
+
+async def read_items_page(
+    db: AsyncSession,
+    job_id: int,
+    after_position: int = -1,
+    limit: int = 100,
+) -> list[BatchJobItem]:
+    """One page of items with position > after_position, in order."""
+    result = await db.execute(
+        select(BatchJobItem)
+        .where(BatchJobItem.job_id == job_id, BatchJobItem.position > after_position)
+        .order_by(BatchJobItem.position)
+        .limit(limit)
+    )
+    return list(result.scalars().all())
+
+
+async def read_all_items(db: AsyncSession, job_id: int, page_size: int = 1000) -> list[dict]:
+    """Every item for a job as dicts, fetched page by page."""
+    items: list[dict] = []
+    after = -1
+    while True:
+        page = await read_items_page(db, job_id, after, page_size)
+        items.extend(row.to_dict() for row in page)
+        if len(page) < page_size:
+            return items
+        after = page[-1].position
+
+
+def _as_text(value) -> str | None:
+    """Claude sometimes returns quantities/values as numbers — store them as text."""
+    if value is None:
+        return None
+    return str(value)
@@ -0,0 +1,469 @@
+"""
+Batch worker — runs queued batch jobs, independent of any HTTP connection.
+
+A worker is just a loop:
+    claim a pending job → process it (appending events) → repeat
+
+Workers run either inside the API process (BatchWorkerPool, started in
+main.py's lifespan) or as standalone processes on any node:
+
+    python -m hts_oracle.cli.batch_worker --concurrency 4
+
+Both share the same Postgres queue, so throughput scales by adding
+processes. While a job runs, a side task heartbeats it; if the worker dies,
+another worker reclaims the job after batch_stale_after_seconds.
+"""
+
+import asyncio
+import base64
+import contextlib
+import time
+from datetime import datetime
+
+import structlog
+from sqlalchemy import select
+
+from hts_oracle.config import get_settings
+from hts_oracle.db import get_session_factory
+from hts_oracle.models.batch_job import BatchJob
+from hts_oracle.services import extraction_cache
+from hts_oracle.services.batch_classifier import classify_batch
+from hts_oracle.services.batch_items import clear_items, write_items
+from hts_oracle.services.blob_store import collect_garbage, store_for_ref
+from hts_oracle.services.job_queue import (
+    JobEventLog,
+    JobLostError,
+    claim_next_job,
+    heartbeat,
+    make_worker_id,
+    reclaim_stale_jobs,
+)
+from hts_oracle.services.pdf_pages import PdfPage
+from hts_oracle.services.pdf_parser import iter_line_items, iter_pdf_pages
+from hts_oracle.services.structured_invoice import (
+    STRUCTURED_FORMATS,
+    StructuredFileError,
+    read_structured_items,
+)
+
+log = structlog.get_logger()
+
+
+# ---------------------------------------------------------------------------
+# Processing one job
+# ---------------------------------------------------------------------------
+
+async def process_job(job_id: int, worker_id: str) -> None:
+    """
+    Run the full PDF → commodities → classification pipeline for one job.
+    (Structured uploads start at commodities.)
+
+    Every event that used to be yielded straight to the SSE response is now
+    appended to batch_job_events instead, so the stream can be served (and
+    replayed) by any API process.
+    """
+    settings = get_settings()
+    session_factory = get_session_factory()
+
+    async with session_factory() as db:
+        job = (await db.execute(select(BatchJob).where(BatchJob.id == job_id))).scalar_one()
+        # Every commit below goes through events.commit(), which checks in
+        # the same transaction that the job is still ours (see job_queue.py)
+        events = await JobEventLog.open(db, job_id, worker_id=worker_id)
+
+        async def emit(event: dict) -> None:
+            await events.append(event)
+            await events.commit()
+
+        # Heartbeat from a separate session so a long Claude call in this
+        # task doesn't make the job look dead.
+        lost = asyncio.Event()
+
+        async def keep_alive() -> None:
+            while True:
+                await asyncio.sleep(settings.batch_heartbeat_seconds)
+                async with session_factory() as hb_db:
+                    if not await heartbeat(hb_db, job_id, worker_id):
+                        lost.set()
+                        return
+
+        heartbeat_task = asyncio.create_task(keep_alive())
+
+        def check_ownership() -> None:
+            if lost.is_set():
+                raise JobLostError(job_id)
+
+        try:
+            commodities = await _extract_commodities(db, job, emit, check_ownership)
+            if commodities is None:
+                return  # Already failed with a message
+            check_ownership()
+
+            await clear_items(db, job_id)  # Rows left by an earlier attempt
+            job.items_total = len(commodities)
+            await events.commit()
+
+            # Phase 3-4: Classify all items (search + resolve)
+            progress = ProgressThrottle(
+                settings.batch_progress_every_items, settings.batch_progress_every_seconds,
+            )
+            # Items settled since the last write, and where they start
+            pending: list[dict] = []
+            written = 0
+            first_ambiguous: int | None = None
+            async for event in classify_batch(commodities, db):
+                check_ownership()
+
+                if event.get("event") == "item_progress":
+                    item = event.get("item")
+                    if item is not None:
+                        if item["status"] == "ambiguous" and first_ambiguous is None:
+                            first_ambiguous = event["position"]
+                        pending.append(item)
+                        event = {k: v for k, v in event.items() if k not in ("item", "position")}
+                    # Counters and the items settled so far ride along with
+                    # an event commit only when the throttle says so — not
+                    # one batch_jobs UPDATE and INSERT per item
+                    if progress.due():
+                        job.items_processed = event.get("index", 0) + 1
+                        job.current_phase = event.get("status", "searching")
+                        await write_items(db, job_id, pending, first_position=written)
+                        written += len(pending)
+                        pending = []
+
+                elif event.get("event") == "complete":
+                    # Items become rows in batch_job_items; the logged event
+                    # keeps only the summary (the SSE endpoint re-attaches
+                    # items from the table when it sends it). Rows from the
+                    # first ambiguous placeholder on are rewritten with
+                    # Claude's answers, plus any not written yet.
+                    items = event.get("items", [])
+                    start = written if first_ambiguous is None else min(first_ambiguous, written)
+                    await write_items(db, job_id, items[start:], first_position=start)
+                    job.status = "complete"
+                    job.items_processed = len(items)
+                    job.summary = event.get("summary", {})
+                    job.completed_at = datetime.utcnow()
+                    event = {k: v for k, v in event.items() if k != "items"}
+
+                elif event.get("event") == "error":
+                    job.status = "error"
+
+                await emit(event)
+
+        except JobLostError:
+            # Another worker owns the job now — leave its state alone.
+            await events.rollback()
+            log.warn("batch_job_lost", job_id=job_id, worker_id=worker_id)
+
+        except Exception as e:
+            log.error("batch_job_error", job_id=job_id, error=str(e))
+            await events.rollback()
+            try:
+                await _fail(db, job, emit, str(e))
+            except JobLostError:
+                log.warn("batch_job_lost", job_id=job_id, worker_id=worker_id)
+
+        finally:
+            heartbeat_task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await heartbeat_task
+
+
+async def _extract_commodities(db, job: BatchJob, emit, check_ownership) -> list[dict] | None:
+    """
+    Phases 1-2: the job's line items, from the extraction cache or the PDF
+    (or straight from the rows of a structured upload).
+
+    A file already extracted with the current Claude model (same SHA-256)
+    skips both the PDF parse and the Claude call. Returns None after
+    failing the job if nothing could be extracted.
+    """
+    settings = get_settings()
+    job_id = job.id
+
+    if job.source_format in STRUCTURED_FORMATS:
+        return await _read_structured(db, job, emit)
+
+    if job.content_sha256:
+        cached = await extraction_cache.lookup(db, job.content_sha256, settings.claude_model)
+        if cached is not None:
+            await emit({
+                "event": "phase", "phase": "extracting_commodities", "progress": 20,
+                "total": len(cached.commodities), "cached": True,
+            })
+            return cached.commodities
+
+    # Locate the uploaded PDF in the blob store
+    pdf_source = await _load_pdf(job)
+    if not pdf_source:
+        await _fail(db, job, emit, "No PDF data found for this job")
+        return None
+
+    # Phase 1: Extract text from PDF (in the PDF process pool).
+    # Pages stream back as they're parsed; progress events are throttled.
+    await emit({"event": "phase", "phase": "extracting_text", "progress": 5, "total": 0})
+    job.current_phase = "extracting_text"
+
+    pages: dict[int, PdfPage] = {}
+    page_progress = ProgressThrottle(every_items=10, every_seconds=1.0)
+    try:
+        async for page in iter_pdf_pages(
+            pdf_source, with_tables=settings.table_extraction_enabled,
+        ):
+            pages[page.index] = page
+            check_ownership()
+            if page_progress.due() and len(pages) < page.page_count:
+                await emit({
+                    "event": "phase", "phase": "extracting_text",
+                    "progress": 5 + int(5 * len(pages) / page.page_count), "total": 0,
+                })
+    except JobLostError:
+        raise
+    except Exception as e:
+        log.error("pdf_text_extraction_failed", job_id=job_id, error=str(e))
+        pages = {}
+
+    ordered = [pages[i] for i in sorted(pages)]
+    pdf_text = "\n\n".join(page.text for page in ordered if page.text)
+    tables = [table for page in ordered for table in page.tables]
+    if not pdf_text:
+        await _fail(db, job, emit, "Could not extract text from PDF")
+        return None
+    check_ownership()
+
+    # Phase 2: Extract commodity line items
+    await emit({
+        "event": "phase", "phase": "extracting_commodities", "progress": 10, "total": 0,
+    })
+    job.current_phase = "extracting_commodities"
+
+    # Line-item table fast path first, Claude only if that isn't confident.
+    # Long invoices come back chunk by chunk — report each as it lands.
+    chunks = []
+    async for chunk in iter_line_items(pdf_text, tables):
+        check_ownership()
+        chunks.append(chunk)
+        if chunk.total > 1:
+            await emit({
+                "event": "phase", "phase": "extracting_commodities",
+                "progress": 10 + int(10 * len(chunks) / chunk.total),
+                "total": sum(len(c.items) for c in chunks),
+            })
+    commodities = [
+        item for chunk in sorted(chunks, key=lambda c: c.index) for item in chunk.items
+    ]
+
+    if not commodities:
+        await _fail(db, job, emit, "No commodity items found in the PDF")
+        return None
+
+    if job.content_sha256:
+        # Empty results are never cached, so a failed extraction gets retried
+        await extraction_cache.store(
+            db, job.content_sha256, settings.claude_model, pdf_text, commodities,
+            source=chunks[0].source,
+        )
+    return commodities
+
+
+async def _read_structured(db, job: BatchJob, emit) -> list[dict] | None:
+    """
+    Line items from a CSV / XLSX / JSON upload — no PDF parse, no Claude call.
+
+    Rows are read in a thread (csv / openpyxl are blocking) and go straight
+    to classification. A file with more than batch_max_items line items
+    fails the job.
+    """
+    settings = get_settings()
+    await emit({"event": "phase", "phase": "reading_rows", "progress": 10, "total": 0})
+    job.current_phase = "reading_rows"
+
+    source = await _load_pdf(job)
+    if not source:
+        await _fail(db, job, emit, "No file data found for this job")
+        return None
+
+    try:
+        commodities = await asyncio.to_thread(
+            read_structured_items, source, job.source_format, job.column_map,
+            settings.batch_max_items,
+        )
+    except StructuredFileError as e:
+        await _fail(db, job, emit, str(e))
+        return None
+
+    if not commodities:
+        await _fail(db, job, emit, "No line items found in the file")
+        return None
+
+    log.info(
+        "structured_items_read", job_id=job.id, format=job.source_format, count=len(commodities),
+    )
+    await emit({
+        "event": "phase", "phase": "reading_rows", "progress": 20, "total": len(commodities),
+    })
+    return commodities
+
+
+async def _load_pdf(job: BatchJob) -> bytes | str:
+    """
+    Where the PDF parser (or structured file reader) should read the job's file from.
+
+    Local blobs are passed as a file path, so the parser's child processes
+    open the file themselves instead of each receiving a pickled copy.
+    Other backends return the bytes. Empty if the PDF is missing.
+    """
+    if job.blob_ref:
+        store = store_for_ref(job.blob_ref)
+        path = store.local_path(job.blob_ref)
+        if path is not None:
+            return str(path) if path.exists() else b""
+        try:
+            return await store.get(job.blob_ref)
+        except FileNotFoundError:
+            return b""
+
+    # Jobs queued before the blob store kept the PDF inline as base64
+    if job.items and "_pdf_data" in job.items[0]:
+        return base64.b64decode(job.items[0]["_pdf_data"])
+    return b""
+
+
+async def _fail(db, job: BatchJob, emit, message: str) -> None:
+    """Mark a job as failed and emit the terminal error event in one commit."""
+    job.status = "error"
+    job.completed_at = datetime.utcnow()
+    await emit({"event": "error", "message": message})
+
+
+class ProgressThrottle:
+    """
+    Says when progress counters are worth writing: every `every_items`
+    calls or every `every_seconds`, whichever comes first.
+    """
+
+    def __init__(self, every_items: int, every_seconds: float):
+        self.every_items = max(every_items, 1)
+        self.every_seconds = every_seconds
+        self._count = 0
+        self._last = time.monotonic()
+
+    def due(self) -> bool:
+        self._count += 1
+        now = time.monotonic()
+        if self._count >= self.every_items or now - self._last >= self.every_seconds:
+            self._count = 0
+            self._last = now
+            return True
+        return False
+
+
+# ---------------------------------------------------------------------------
+# Worker loop + pool
+# ---------------------------------------------------------------------------
+
+async def run_worker(slot: int, wake: asyncio.Event | None = None) -> None:
+    """
+    Claim and process jobs forever. Cancel the task to stop it.
+
+    Idle workers sleep batch_poll_seconds between queue checks, or less if
+    `wake` is set (the upload route sets it for in-process workers).
+    Slot 0 also sweeps for stale jobs on each idle tick, and for
+    unreferenced blobs every blob_gc_interval_seconds.
+    """
+    settings = get_settings()
+    session_factory = get_session_factory()
+    worker_id = make_worker_id(slot)
+    log.info("batch_worker_started", worker_id=worker_id)
+    last_gc = time.monotonic()
+
+    while True:
+        try:
+            async with session_factory() as db:
+                if slot == 0:
+                    await reclaim_stale_jobs(
+                        db, settings.batch_stale_after_seconds, settings.batch_max_attempts,
+                    )
+                    interval = settings.blob_gc_interval_seconds
+                    if interval > 0 and time.monotonic() - last_gc >= interval:
+                        last_gc = time.monotonic()
+                        await collect_garbage(db)
+                job = await claim_next_job(db, worker_id)
+
+            if job is not None:
+                await process_job(job.id, worker_id)
+                continue  # Check for more work immediately
+
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # A DB hiccup shouldn't kill the worker — back off and retry
+            log.error("batch_worker_error", worker_id=worker_id, error=str(e))
+
+        if wake is None:
+            await asyncio.sleep(settings.batch_poll_seconds)
+        else:
+            with contextlib.suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(wake.wait(), timeout=settings.batch_poll_seconds)
+            wake.clear()
+
+
+class BatchWorkerPool:
+    """
+    A fixed number of worker tasks sharing this process's event loop.
+
+    Usage (see main.py lifespan):
+        pool = BatchWorkerPool(size=2)
+        pool.start()
+        ...
+        pool.notify()        # a job was just queued — skip the poll delay
+        ...
+        await pool.stop()
+    """
+
+    def __init__(self, size: int):
+        self.size = size
+        self._wake = asyncio.Event()
+        self._tasks: list[asyncio.Task] = []
+
+    def start(self) -> None:
+        self._tasks = [
+            asyncio.create_task(run_worker(slot, self._wake), name=f"batch-worker-{slot}")
+            for slot in range(self.size)
+        ]
+
+    def notify(self) -> None:
+        self._wake.set()
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+
+# The in-process pool (None when batch_workers = 0 or before startup)
+_pool: BatchWorkerPool | None = None
+
+
+def start_worker_pool() -> None:
+    """Start in-process workers if configured. Called from main.py lifespan."""
+    global _pool
+    size = get_settings().batch_workers
+    if size > 0:
+        _pool = BatchWorkerPool(size)
+        _pool.start()
+
+
+async def stop_worker_pool() -> None:
+    global _pool
+    if _pool is not None:
+        await _pool.stop()
+        _pool = None
+
+
+def notify_job_queued() -> None:
+    """Wake in-process workers (no-op when workers run in other processes)."""
+    if _pool is not None:
+        _pool.notify()
@@ -0,0 +1,324 @@
+"""
+Blob storage for uploaded files — keeps file bytes out of batch_jobs rows.
+
+Uploads are streamed into the store chunk by chunk and addressed by the
+SHA-256 of their content. The job row only holds a short reference like
+"local:9f86d0…", so reading a job never drags a 10MB PDF along with it,
+and the same invoice uploaded twice is stored once.
+
+Two backends, picked by BLOB_STORE_BACKEND:
+  - "local":    files on disk under BLOB_STORE_PATH/<sha[:2]>/<sha>
+  - "postgres": Postgres large objects, indexed by the batch_blobs table.
+                The upload is spooled to a temp file first, so the
+                database only sees one short transaction at the end
+
+Blobs are shared by content, so they're deleted by reference:
+collect_garbage() removes blobs no batch job points at any more, once
+they're older than a grace period (an upload's blob is stored before its
+job row exists; a repeat upload refreshes the blob's age).
+
+Usage:
+    store = get_blob_store()
+    blob = await store.put_stream(chunks, max_size=10 * 1024 * 1024)
+    data = await store.get(blob.ref)
+"""
+
+import asyncio
+import hashlib
+import os
+import tempfile
+import time
+from abc import ABC, abstractmethod
+from collections.abc import AsyncIterator
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from functools import lru_cache
+from pathlib import Path
+
+import structlog
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from hts_oracle.config import get_settings
+from hts_oracle.db import get_session_factory
+
+log = structlog.get_logger()
+
+
+class BlobTooLargeError(ValueError):
+    """The stream went past max_size — nothing was stored."""
+
+
+@dataclass(frozen=True)
+class StoredBlob:
+    """What a job keeps instead of the bytes."""
+    ref: str        # "<backend>:<sha256>" — pass to BlobStore.get()
+    sha256: str
+    size: int
+
+
+def _split_ref(ref: str) -> tuple[str, str]:
+    backend, _, sha256 = ref.partition(":")
+    if not sha256:
+        raise ValueError(f"Malformed blob ref: {ref!r}")
+    return backend, sha256
+
+
+class BlobStore(ABC):
+    """Content-addressed blob storage. Subclasses pick where the bytes go."""
+
+    # Prefix used in refs ("local", "pg")
+    scheme: str
+
+    @abstractmethod
+    async def put_stream(self, chunks: AsyncIterator[bytes], max_size: int) -> StoredBlob:
+        """Consume `chunks`, store them, return the blob's reference."""
+
+    @abstractmethod
+    async def get(self, ref: str) -> bytes:
+        """Return a blob's full contents."""
+
+    @abstractmethod
+    async def delete_unreferenced(self, db: AsyncSession, grace_seconds: float) -> int:
+        """Delete blobs older than grace_seconds that no batch job refers to."""
+
+    def local_path(self, ref: str) -> Path | None:
+        """A filesystem path for the blob, if this backend has one."""
+        return None
+
+    def _ref(self, sha256: str) -> str:
+        return f"{self.scheme}:{sha256}"
+
+    async def _referenced(self, db: AsyncSession) -> set[str]:
+        """SHA-256s of this backend's blobs that batch jobs still point at."""
+        rows = await db.execute(
+            text("SELECT DISTINCT blob_ref FROM batch_jobs WHERE blob_ref LIKE :prefix"),
+            {"prefix": f"{self.scheme}:%"},
+        )
+        return {_split_ref(ref)[1] for ref in rows.scalars()}
+
+
+# ---------------------------------------------------------------------------
+# Local filesystem backend
+# ---------------------------------------------------------------------------
+
+class LocalBlobStore(BlobStore):
+    """
+    Stores blobs as files named by their SHA-256.
+
+    Each upload is written to a temp file in the store directory while it's
+    hashed, then renamed into place — so a half-written upload is never
+    visible under a content address.
+    """
+
+    scheme = "local"
+
+    def __init__(self, root: str | Path):
+        self.root = Path(root)
+
+    def _path(self, sha256: str) -> Path:
+        return self.root / sha256[:2] / sha256
+
+    async def put_stream(self, chunks: AsyncIterator[bytes], max_size: int) -> StoredBlob:
+        self.root.mkdir(parents=True, exist_ok=True)
+        hasher = hashlib.sha256()
+        size = 0
+
+        fd, tmp_name = tempfile.mkstemp(dir=self.root, prefix=".upload-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                async for chunk in chunks:
+                    size += len(chunk)
+                    if size > max_size:
+                        raise BlobTooLargeError(f"Blob exceeds {max_size} bytes")
+                    hasher.update(chunk)
+                    # Disk writes happen off the event loop
+                    await asyncio.to_thread(f.write, chunk)
+
+            sha256 = hasher.hexdigest()
+            final = self._path(sha256)
+            if final.exists():
+                os.unlink(tmp_name)  # Same content already stored
+                os.utime(final)      # Restart its grace period (see collect_garbage)
+            else:
+                final.parent.mkdir(parents=True, exist_ok=True)
+                os.replace(tmp_name, final)
+        except BaseException:
+            if os.path.exists(tmp_name):
+                os.unlink(tmp_name)
+            raise
+
+        return StoredBlob(ref=self._ref(sha256), sha256=sha256, size=size)
+
+    async def get(self, ref: str) -> bytes:
+        _, sha256 = _split_ref(ref)
+        return await asyncio.to_thread(self._path(sha256).read_bytes)
+
+    def local_path(self, ref: str) -> Path | None:
+        _, sha256 = _split_ref(ref)
+        return self._path(sha256)
+
+    async def delete_unreferenced(self, db: AsyncSession, grace_seconds: float) -> int:
+        referenced = await self._referenced(db)
+        cutoff = time.time() - grace_seconds
+
+        def sweep() -> int:
+            deleted = 0
+            for path in self.root.glob("??/*"):
+                if path.name in referenced or path.stat().st_mtime >= cutoff:
+                    continue
+                path.unlink(missing_ok=True)
+                deleted += 1
+            return deleted
+
+        return await asyncio.to_thread(sweep)
+
+
+# ---------------------------------------------------------------------------
+# Postgres large-object backend
+# ---------------------------------------------------------------------------
+
+class PostgresBlobStore(BlobStore):
+    """
+    Stores blobs as Postgres large objects.
+
+    The upload is first spooled to a local temp file while it's hashed and
+    size-checked — a slow client holds no connection. Then, in one short
+    transaction, the file is copied into a large object with one lo_put
+    per chunk (never held in memory whole), unless that content is already
+    stored. batch_blobs maps each SHA-256 to its large object's oid.
+    """
+
+    scheme = "pg"
+
+    # Bytes per lo_get / lo_put call
+    read_chunk_size = 1024 * 1024
+
+    async def put_stream(self, chunks: AsyncIterator[bytes], max_size: int) -> StoredBlob:
+        hasher = hashlib.sha256()
+        size = 0
+
+        with tempfile.TemporaryFile() as spool:
+            async for chunk in chunks:
+                size += len(chunk)
+                if size > max_size:
+                    raise BlobTooLargeError(f"Blob exceeds {max_size} bytes")
+                hasher.update(chunk)
+                await asyncio.to_thread(spool.write, chunk)
+            sha256 = hasher.hexdigest()
+            await asyncio.to_thread(spool.seek, 0)
+
+            async with get_session_factory()() as db:
+                # Already stored? Refresh its age so garbage collection
+                # leaves it alone until this upload's job exists.
+                exists = await db.scalar(
+                    text(
+                        "UPDATE batch_blobs SET created_at = now() "
+                        "WHERE sha256 = :sha RETURNING sha256"
+                    ),
+                    {"sha": sha256},
+                )
+                if exists is None:
+                    await self._write(db, spool, sha256, size)
+                await db.commit()
+
+        return StoredBlob(ref=self._ref(sha256), sha256=sha256, size=size)
+
+    async def _write(self, db: AsyncSession, spool, sha256: str, size: int) -> None:
+        oid = await db.scalar(text("SELECT lo_create(0)"))
+        offset = 0
+        while chunk := await asyncio.to_thread(spool.read, self.read_chunk_size):
+            await db.execute(
+                text("SELECT lo_put(cast(:oid as oid), :offset, :data)"),
+                {"oid": oid, "offset": offset, "data": chunk},
+            )
+            offset += len(chunk)
+        inserted = await db.scalar(
+            text(
+                "INSERT INTO batch_blobs (sha256, loid, size_bytes) "
+                "VALUES (:sha, :oid, :size) ON CONFLICT (sha256) DO NOTHING "
+                "RETURNING sha256"
+            ),
+            {"sha": sha256, "oid": oid, "size": size},
+        )
+        if inserted is None:
+            # A concurrent upload of the same content won — drop our copy
+            await db.execute(text("SELECT lo_unlink(cast(:oid as oid))"), {"oid": oid})
+
+    async def get(self, ref: str) -> bytes:
+        _, sha256 = _split_ref(ref)
+        async with get_session_factory()() as db:
+            row = (await db.execute(
+                text("SELECT loid, size_bytes FROM batch_blobs WHERE sha256 = :sha"),
+                {"sha": sha256},
+            )).one_or_none()
+            if row is None:
+                raise FileNotFoundError(f"Blob not found: {ref}")
+
+            parts = []
+            for offset in range(0, row.size_bytes, self.read_chunk_size):
+                parts.append(await db.scalar(
+                    text("SELECT lo_get(cast(:oid as oid), :offset, :length)"),
+                    {"oid": row.loid, "offset": offset, "length": self.read_chunk_size},
+                ))
+            return b"".join(parts)
+
+    async def delete_unreferenced(self, db: AsyncSession, grace_seconds: float) -> int:
+        # Index rows and their large objects go in the same transaction
+        result = await db.execute(
+            text(
+                "DELETE FROM batch_blobs b WHERE b.created_at < :cutoff AND NOT EXISTS ("
+                "  SELECT 1 FROM batch_jobs j WHERE j.blob_ref = :scheme || b.sha256"
+                ") RETURNING b.loid"
+            ),
+            {
+                "cutoff": datetime.utcnow() - timedelta(seconds=grace_seconds),
+                "scheme": f"{self.scheme}:",
+            },
+        )
+        loids = list(result.scalars())
+        for loid in loids:
+            await db.execute(text("SELECT lo_unlink(cast(:oid as oid))"), {"oid": loid})
+        await db.commit()
+        return len(loids)
+
+
+# ---------------------------------------------------------------------------
+# Backend selection
+# ---------------------------------------------------------------------------
+
+@lru_cache
+def get_blob_store() -> BlobStore:
+    """The configured blob store (cached, like the API clients)."""
+    settings = get_settings()
+    if settings.blob_store_backend == "postgres":
+        return PostgresBlobStore()
+    if settings.blob_store_backend == "local":
+        return LocalBlobStore(settings.blob_store_path)
+    raise ValueError(f"Unknown BLOB_STORE_BACKEND: {settings.blob_store_backend!r}")
+
+
+def store_for_ref(ref: str) -> BlobStore:
+    """
+    The store that can read `ref`.
+
+    Refs name their backend, so blobs written before a backend switch stay
+    readable.
+    """
+    scheme, _ = _split_ref(ref)
+    if scheme == PostgresBlobStore.scheme:
+        return PostgresBlobStore()
+    if scheme == LocalBlobStore.scheme:
+        return LocalBlobStore(get_settings().blob_store_path)
+    raise ValueError(f"Unknown blob ref scheme: {ref!r}")
+
+
+async def collect_garbage(db: AsyncSession) -> int:
+    """
+    Delete the configured store's blobs that no job refers to any more
+    (older than blob_gc_grace_seconds). Returns how many were deleted.
+    """
+    deleted = await get_blob_store().delete_unreferenced(db, get_settings().blob_gc_grace_seconds)
+    if deleted:
+        log.info("blob_gc", deleted=deleted)
+    return deleted
@@ -0,0 +1,214 @@
+"""
+Confidence gate calibration — when is the Claude call worth making?
+
+classify() asks Claude whenever the vector search's top similarity is
+below high_confidence_threshold. Every call where Claude just picks the
+vector top-1 again is latency and cost for nothing. The audit table
+records both picks (vector_top_hts_code, llm_pick_hts_code), so the rate
+at which Claude agrees can be measured as a function of:
+
+  - the top-1 similarity (classifications.confidence)
+  - the margin: top-1 minus top-2 similarity (top2_similarity) — a clear
+    winner at a modest similarity is often as safe as a high similarity
+
+The gate is: skip Claude when similarity >= threshold, or when the margin
+>= margin (margin 0 = that half is off). fit() searches a grid of both
+for the gate that sends the fewest queries to Claude while the
+agreement rate among the queries it would skip stays at or above the
+target — judged by the lower end of a 95% confidence interval (Wilson),
+so a handful of lucky agreements can't justify a gate.
+
+Claude's verdict is only known where Claude was asked: normally below
+the current threshold. CALIBRATION_SAMPLE_RATE sends a share of
+confident queries to Claude too, so a gate above the current threshold
+can be checked as well. Each sampled row stands for 1/rate confident
+queries, so it's weighted that way (Observation.weight): pooled
+unweighted with the fully-labelled rows below the threshold, the traffic
+above it would count for a tenth of what it is at a 10% rate. The
+confidence bound uses the effective sample size of the weights.
+
+The gate and the statistics are pure functions; cli/calibrate.py reads
+the audit rows and applies the result.
+"""
+
+import math
+from bisect import bisect_left
+from dataclasses import dataclass
+
+
+def skips_llm(similarity: float, second: float | None, threshold: float, margin: float) -> bool:
+    """The confidence gate: True when the vector top-1 is returned without asking Claude."""
+    if similarity >= threshold:
+        return True
+    return margin > 0 and second is not None and similarity - second >= margin
+
+
+def wilson_lower(successes: float, n: float, z: float = 1.96) -> float:
+    """Lower bound of the Wilson score interval for a proportion (0 when n is 0)."""
+    if n == 0:
+        return 0.0
+    p = successes / n
+    centre = p + z * z / (2 * n)
+    spread = z * math.sqrt(p * (1 - p) / n + z * z / (4 * n * n))
+    return (centre - spread) / (1 + z * z / n)
+
+
+def weighted_lower(weight: float, agreed_weight: float, weight_sq: float) -> float:
+    """wilson_lower() for weighted rows, at their effective (Kish) sample size."""
+    if weight <= 0:
+        return 0.0
+    n = weight * weight / weight_sq
+    return wilson_lower(agreed_weight / weight * n, n)
+
+
+@dataclass
+class Observation:
+    """
+    One classification: its similarities, and whether Claude agreed (None =
+    not asked). A calibration sample's weight is 1 / the sample rate.
+    """
+    similarity: float
+    second: float | None
+    agreed: bool | None = None
+    weight: float = 1.0
+
+    @property
+    def margin(self) -> float | None:
+        return None if self.second is None else self.similarity - self.second
+
+
+@dataclass
+class Bucket:
+    low: float
+    high: float
+    n: int            # Rows where Claude was asked
+    agreed: int
+    weight: float = 0.0
+    agreed_weight: float = 0.0
+
+    @property
+    def agreement(self) -> float:
+        return self.agreed_weight / self.weight if self.weight else 0.0
+
+
+def agreement_curve(observations: list[Observation], by: str, width: float) -> list[Bucket]:
+    """Claude's agreement rate per bucket of "similarity" or "margin"."""
+    buckets: dict[int, Bucket] = {}
+    for o in observations:
+        value = getattr(o, by)
+        if o.agreed is None or value is None:
+            continue
+        index = math.floor(round(value / width, 9))
+        bucket = buckets.setdefault(index, Bucket(index * width, (index + 1) * width, 0, 0))
+        bucket.n += 1
+        bucket.agreed += o.agreed
+        bucket.weight += o.weight
+        bucket.agreed_weight += o.weight * o.agreed
+    return [buckets[i] for i in sorted(buckets)]
+
+
+@dataclass
+class GateStats:
+    threshold: float
+    margin: float
+    skipped_labelled: int     # Labelled rows the gate would skip...
+    skipped_agreed: int       # ...and how many of those Claude agreed with
+    llm_share: float          # Share of all rows that would still go to Claude
+    # The same two counts weighted by Observation.weight, and the sum of
+    # squared weights (for the effective sample size)
+    skipped_weight: float = 0.0
+    skipped_agreed_weight: float = 0.0
+    skipped_weight_sq: float = 0.0
+
+    @property
+    def agreement(self) -> float:
+        return self.skipped_agreed_weight / self.skipped_weight if self.skipped_weight else 1.0
+
+    @property
+    def agreement_lower(self) -> float:
+        if not self.skipped_labelled:
+            return 1.0
+        return weighted_lower(
+            self.skipped_weight, self.skipped_agreed_weight, self.skipped_weight_sq,
+        )
+
+
+def evaluate_gate(observations: list[Observation], threshold: float, margin: float) -> GateStats:
+    skipped_labelled = skipped_agreed = asked = 0
+    weight = agreed_weight = weight_sq = 0.0
+    for o in observations:
+        if skips_llm(o.similarity, o.second, threshold, margin):
+            if o.agreed is not None:
+                skipped_labelled += 1
+                skipped_agreed += o.agreed
+                weight += o.weight
+                agreed_weight += o.weight * o.agreed
+                weight_sq += o.weight * o.weight
+        else:
+            asked += 1
+    return GateStats(
+        threshold, margin, skipped_labelled, skipped_agreed, asked / max(len(observations), 1),
+        weight, agreed_weight, weight_sq,
+    )
+
+
+def _grid(start: float, stop: float, step: float) -> list[float]:
+    return [round(start + i * step, 4) for i in range(int(round((stop - start) / step)) + 1)]
+
+
+def fit(
+    observations: list[Observation],
+    target: float = 0.95,
+    min_samples: int = 30,
+    step: float = 0.01,
+    max_margin: float = 0.30,
+) -> GateStats | None:
+    """
+    The gate with the smallest LLM share whose skipped queries agree with
+    Claude at >= target (lower confidence bound), backed by at least
+    min_samples labelled rows. None if no gate qualifies.
+
+    Same result as evaluate_gate() over the whole grid, but each margin
+    takes one sort: rows the margin half doesn't skip are skipped exactly
+    when their similarity is above the threshold, so the counts (and
+    weights) for every threshold come from suffix sums.
+    """
+    total = max(len(observations), 1)
+    best = None
+    for margin in [0.0, *_grid(step, max_margin, step)]:
+        by_margin, rest = [], []
+        for o in observations:
+            skipped = margin > 0 and o.margin is not None and o.margin >= margin
+            (by_margin if skipped else rest).append(o)
+        rest.sort(key=lambda o: o.similarity)
+        labelled = [o for o in by_margin if o.agreed is not None]
+        base = [
+            len(labelled),
+            sum(bool(o.agreed) for o in labelled),
+            sum(o.weight for o in labelled),
+            sum(o.weight * o.agreed for o in labelled),
+            sum(o.weight * o.weight for o in labelled),
+        ]
+        # suffix[i]: the same five sums over the labelled rows among rest[i:]
+        suffix = [[0, 0, 0.0, 0.0, 0.0] for _ in range(len(rest) + 1)]
+        for i in range(len(rest) - 1, -1, -1):
+            o = rest[i]
+            if o.agreed is None:
+                suffix[i] = suffix[i + 1]
+                continue
+            row = (1, bool(o.agreed), o.weight, o.weight * o.agreed, o.weight * o.weight)
+            suffix[i] = [acc + value for acc, value in zip(suffix[i + 1], row)]
+        similarities = [o.similarity for o in rest]
+
+        for threshold in _grid(0.30, 1.00, step):
+            asked = bisect_left(similarities, threshold)
+            sums = [b + a for b, a in zip(base, suffix[asked])]
+            stats = GateStats(
+                threshold, margin, sums[0], sums[1], asked / total, sums[2], sums[3], sums[4],
+            )
+            if stats.skipped_labelled < min_samples or stats.agreement_lower < target:
+                continue
+            rank = (stats.llm_share, -stats.agreement_lower)
+            if best is None or rank < (best.llm_share, -best.agreement_lower):
+                best = stats
+    return best
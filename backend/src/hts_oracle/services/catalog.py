@@ -0,0 +1,181 @@
+"""
+Active catalog revision — which table searches read, and hot-swapping it.
+
+Catalog revisions (models/catalog_revision.py) each live in their own
+table. This module keeps the process's view of the active one:
+
+    catalog.active_table()   → "hts_codes_r4" (or "hts_codes" before any revision)
+
+A background watcher polls catalog_revisions. When another revision
+becomes active (an import with --activate, or `cli.catalog activate` /
+`rollback`), the watcher first prewarms the new table and its HNSW index
+into Postgres' buffer cache, then switches the pointer. Requests already
+running finish on the old table; new ones go to the new table, which
+is already warm — there's no cold-cache latency spike at cutover.
+
+Polling rather than LISTEN/NOTIFY: LISTEN needs a dedicated session,
+which PgBouncer in transaction mode (Supabase) can't provide. The poll
+is a one-row indexed query every catalog_poll_seconds.
+"""
+
+import asyncio
+import re
+import time
+from dataclasses import dataclass
+
+import structlog
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from hts_oracle.config import get_settings
+from hts_oracle.db import get_session_factory
+
+log = structlog.get_logger()
+
+# The original table, served until the first revision is activated
+DEFAULT_TABLE = "hts_codes"
+
+# Table names are interpolated into SQL — only accept the ones we create
+_TABLE_NAME = re.compile(r"^hts_codes(_r\d+)?$")
+
+# Queries run against a table's HNSW index to pull its pages into cache
+# when pg_prewarm isn't available
+PREWARM_PROBES = 20
+
+
+@dataclass(frozen=True)
+class ActiveCatalog:
+    revision: int | None  # None = the original hts_codes table
+    table: str
+
+
+_active = ActiveCatalog(revision=None, table=DEFAULT_TABLE)
+
+
+def active_catalog() -> ActiveCatalog:
+    return _active
+
+
+def active_table() -> str:
+    """The table searches should read right now."""
+    return _active.table
+
+
+def pin(table: str, revision: int | None = None) -> None:
+    """
+    Serve this table whatever revision is active — for offline tools
+    (cli/evaluate.py) comparing revisions. Don't call it in the app:
+    the watcher would switch back on its next poll.
+    """
+    global _active
+    _active = ActiveCatalog(revision=revision, table=_checked(table))
+
+
+def _checked(table: str) -> str:
+    if not _TABLE_NAME.match(table):
+        raise ValueError(f"Unexpected catalog table name: {table!r}")
+    return table
+
+
+async def fetch_active(db: AsyncSession) -> ActiveCatalog:
+    """The revision marked active in the database (the default table if none)."""
+    row = (await db.execute(
+        text("SELECT id, table_name FROM catalog_revisions WHERE status = 'active'")
+    )).first()
+    if row is None:
+        return ActiveCatalog(revision=None, table=DEFAULT_TABLE)
+    return ActiveCatalog(revision=row.id, table=_checked(row.table_name))
+
+
+async def prewarm(db: AsyncSession, table: str) -> str:
+    """
+    Load a table and its HNSW index into Postgres' buffer cache.
+
+    Uses pg_prewarm when the extension is installed; otherwise reads the
+    table once and runs a few nearest-neighbor queries, which touches
+    the upper layers of the graph that every search walks through.
+    Returns the method used.
+    """
+    table = _checked(table)
+    has_prewarm = await db.scalar(text("SELECT 1 FROM pg_extension WHERE extname = 'pg_prewarm'"))
+    if has_prewarm:
+        await db.execute(text("SELECT pg_prewarm(cast(:rel as regclass))"), {"rel": table})
+        await db.execute(
+            text("SELECT pg_prewarm(cast(:rel as regclass))"), {"rel": f"ix_{table}_embedding"},
+        )
+        return "pg_prewarm"
+
+    await db.execute(text(f"SELECT count(*) FROM {table}"))
+    probes = (await db.execute(
+        text(f"SELECT embedding::text AS v FROM {table} WHERE embedding IS NOT NULL LIMIT :n"),
+        {"n": PREWARM_PROBES},
+    )).fetchall()
+    for probe in probes:
+        await db.execute(
+            text(f"SELECT id FROM {table} ORDER BY embedding <=> cast(:v as vector) LIMIT 10"),
+            {"v": probe.v},
+        )
+    return "queries"
+
+
+async def refresh(db: AsyncSession) -> bool:
+    """
+    Switch to the active revision if it changed — prewarming it first.
+
+    Returns True if the process switched tables.
+    """
+    global _active
+    target = await fetch_active(db)
+    if target == _active:
+        return False
+
+    started = time.perf_counter()
+    method = await prewarm(db, target.table)
+    previous, _active = _active, target
+    log.info(
+        "catalog_switched",
+        revision=target.revision,
+        table=target.table,
+        previous_revision=previous.revision,
+        prewarm=method,
+        prewarm_ms=round((time.perf_counter() - started) * 1000),
+    )
+    return True
+
+
+# ---------------------------------------------------------------------------
+# Background watcher (started from main.py lifespan)
+# ---------------------------------------------------------------------------
+
+async def _watch(interval: float) -> None:
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            async with get_session_factory()() as db:
+                await refresh(db)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # Keep serving the current revision; try again next tick
+            log.warn("catalog_refresh_failed", error=str(e))
+
+
+_watcher: asyncio.Task | None = None
+
+
+async def start_catalog_watcher() -> None:
+    """Load the active revision (warm), then watch for switches."""
+    global _watcher
+    async with get_session_factory()() as db:
+        await refresh(db)
+    interval = get_settings().catalog_poll_seconds
+    if interval > 0:
+        _watcher = asyncio.create_task(_watch(interval), name="catalog-watcher")
+
+
+async def stop_catalog_watcher() -> None:
+    global _watcher
+    if _watcher is not None:
+        _watcher.cancel()
+        await asyncio.gather(_watcher, return_exceptions=True)
+        _watcher = None
@@ -14,13 +14,19 @@ The flow:
     User query
         → embed query (OpenAI)
         → vector search (pgvector)
-        → confidence check
+        → confidence check (services/calibration.py: similarity, or margin over the runner-up)
             ├── HIGH (>= 0.65): return results ← most queries stop here
             └── LOW  (< 0.65):  ask Claude → return results
-        → log to audit table
+        → log to audit table (with both the vector top-1 and Claude's pick,
+          which cli/calibrate.py uses to tune the gate)
+
+Each step is a timing span (services/timing.py). The audit row keeps the
+per-stage milliseconds (stage_timings) next to the total latency_ms, so
+a slow classification can be traced to embedding, SQL or Claude.
 """
 
 import json
+import random
 import time
 
 import structlog
@@ -30,7 +36,10 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from hts_oracle.config import get_settings
 from hts_oracle.models.classification import Classification
+from hts_oracle.services import timing
+from hts_oracle.services.calibration import skips_llm
 from hts_oracle.services.searcher import search_hts
+from hts_oracle.services.timing import span
 
 log = structlog.get_logger()
 
@@ -42,33 +51,15 @@ log = structlog.get_logger()
 @lru_cache
 def _get_anthropic_client() -> AsyncAnthropic:
     settings = get_settings()
-    return AsyncAnthropic(api_key=settings.anthropic_api_key)
+    return AsyncAnthropic(api_key=settings.anthropic_api_key, base_url=settings.anthropic_base_url)
 
 
 # ---------------------------------------------------------------------------
 # Claude disambiguation — only called when vector search isn't confident
 # ---------------------------------------------------------------------------
 
-async def _ask_claude(query: str, candidates: list[dict], refinements: dict) -> dict:
-    """
-    Ask Claude to pick the best HTS code from the search candidates.
-
-    Claude receives:
-      - The user's product description
-      - Any refinement info (material, use, form)
-      - The top search results with descriptions
-
-    Claude returns JSON with:
-      - "hts_code": the code it thinks is best
-      - "analysis": brief explanation of why
-
-    Why Claude and not a cheaper model? Tariff classification requires
-    understanding trade law nuances (e.g., "knitted" vs "woven" changes
-    the code entirely). Claude handles this well.
-    """
-    settings = get_settings()
-    client = _get_anthropic_client()
-
+def claude_prompt(query: str, candidates: list[dict], refinements: dict) -> str:
+    """The disambiguation prompt (also used by cli/evaluate.py to estimate its cost)."""
     # Build a clear prompt with the candidates
     candidate_text = "\n".join(
         f"  {i+1}. {c['hts_code']} — {c['description']} "
@@ -82,7 +73,7 @@ async def _ask_claude(query: str, candidates: list[dict], refinements: dict) ->
         parts = [f"  - {k}: {v}" for k, v in refinements.items() if v]
         refinement_text = "\nAdditional product details:\n" + "\n".join(parts)
 
-    prompt = f"""You are an HTS (Harmonized Tariff Schedule) classification expert.
+    return f"""You are an HTS (Harmonized Tariff Schedule) classification expert.
 
 A user wants to classify this product:
   "{query}"
@@ -102,11 +93,34 @@ Respond with JSON only (no markdown, no explanation outside the JSON):
 If none of the candidates are a good match, pick the closest one and
 explain the limitation in your analysis."""
 
-    response = await client.messages.create(
-        model=settings.claude_model,
-        max_tokens=300,
-        messages=[{"role": "user", "content": prompt}],
-    )
+
+async def _ask_claude(query: str, candidates: list[dict], refinements: dict) -> dict:
+    """
+    Ask Claude to pick the best HTS code from the search candidates.
+
+    Claude receives:
+      - The user's product description
+      - Any refinement info (material, use, form)
+      - The top search results with descriptions
+
+    Claude returns JSON with:
+      - "hts_code": the code it thinks is best
+      - "analysis": brief explanation of why
+
+    Why Claude and not a cheaper model? Tariff classification requires
+    understanding trade law nuances (e.g., "knitted" vs "woven" changes
+    the code entirely). Claude handles this well.
+    """
+    settings = get_settings()
+    client = _get_anthropic_client()
+    prompt = claude_prompt(query, candidates, refinements)
+
+    with span("llm"):
+        response = await client.messages.create(
+            model=settings.claude_model,
+            max_tokens=300,
+            messages=[{"role": "user", "content": prompt}],
+        )
 
     # Parse Claude's JSON response.
     # Claude sometimes wraps JSON in markdown code blocks, so we
@@ -156,8 +170,23 @@ async def classify(
             "method": "...",       # "vector_only" or "llm_assisted"
             "analysis": "...",     # Claude's reasoning (if applicable)
             "latency_ms": 123,     # Total processing time
+            "stage_timings": {...} # Milliseconds per stage (embed, search, llm, ...)
         }
     """
+    with timing.collect() as stage_timings:
+        result = await _classify(query, db, material, intended_use, form, stage_timings)
+    result["stage_timings"] = timing.rounded(stage_timings)
+    return result
+
+
+async def _classify(
+    query: str,
+    db: AsyncSession,
+    material: str | None,
+    intended_use: str | None,
+    form: str | None,
+    stage_timings: dict[str, float],
+) -> dict:
     settings = get_settings()
     start_time = time.time()
 
@@ -188,13 +217,24 @@ async def classify(
     # This is THE key optimization. If the top result is confident enough,
     # we skip Claude entirely. No LLM call = fast response + zero cost.
     top_similarity = results[0]["similarity"]
+    second_similarity = results[1]["similarity"] if len(results) > 1 else None
+    vector_top_code = results[0]["hts_code"]
     method = "vector_only"
     analysis = None
+    picked_code = None
+
+    confident = skips_llm(
+        top_similarity, second_similarity,
+        settings.high_confidence_threshold, settings.high_confidence_margin,
+    )
+    # A sample of confident queries goes to Claude anyway — the only way
+    # calibration learns how often Claude agrees above the threshold
+    sampled = confident and random.random() < settings.calibration_sample_rate
 
-    if top_similarity < settings.high_confidence_threshold:
+    if not confident or sampled:
         # Low confidence — ask Claude to help.
         log.info(
-            "low_confidence_calling_claude",
+            "low_confidence_calling_claude" if not sampled else "calibration_sample_calling_claude",
             query=query[:100],
             top_similarity=top_similarity,
             threshold=settings.high_confidence_threshold,
@@ -205,7 +245,7 @@ async def classify(
         analysis = claude_result.get("analysis")
 
         # If Claude picked a specific code, move it to the top of results.
-        picked_code = claude_result.get("hts_code", "")
+        picked_code = claude_result.get("hts_code", "") or None
         if picked_code:
             # Find the picked code in our results and move it to position 0
             for i, r in enumerate(results):
@@ -228,12 +268,19 @@ async def classify(
         refinements={k: v for k, v in refinements.items() if v},
         top_hts_code=results[0]["hts_code"] if results else None,
         confidence=top_similarity,
+        top2_similarity=second_similarity,
+        vector_top_hts_code=vector_top_code,
+        llm_pick_hts_code=picked_code[:20] if picked_code else None,
+        calibration_sample_rate=settings.calibration_sample_rate if sampled else None,
         method=method,
         llm_model=settings.claude_model if method == "llm_assisted" else None,
         latency_ms=latency_ms,
+        # The commit's own time isn't known yet — it's in the Server-Timing header and /metrics
+        stage_timings=timing.rounded(stage_timings),
     )
     db.add(audit_entry)
-    await db.commit()
+    with span("db_commit"):
+        await db.commit()
 
     return {
         "results": results,
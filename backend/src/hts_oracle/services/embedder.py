@@ -17,6 +17,7 @@ from functools import lru_cache
 from openai import AsyncOpenAI
 
 from hts_oracle.config import get_settings
+from hts_oracle.services.timing import span
 
 
 # Cache the OpenAI client so we reuse the same HTTP connection pool.
@@ -24,7 +25,7 @@ from hts_oracle.config import get_settings
 @lru_cache
 def _get_openai_client() -> AsyncOpenAI:
     settings = get_settings()
-    return AsyncOpenAI(api_key=settings.openai_api_key)
+    return AsyncOpenAI(api_key=settings.openai_api_key, base_url=settings.openai_base_url)
 
 
 async def embed_text(text: str) -> list[float]:
@@ -40,11 +41,12 @@ async def embed_text(text: str) -> list[float]:
     settings = get_settings()
     client = _get_openai_client()
 
-    response = await client.embeddings.create(
-        model=settings.embedding_model,
-        input=text,
-        dimensions=settings.embedding_dimensions,
-    )
+    with span("embed"):
+        response = await client.embeddings.create(
+            model=settings.embedding_model,
+            input=text,
+            dimensions=settings.embedding_dimensions,
+        )
 
     return response.data[0].embedding
 
@@ -63,10 +65,11 @@ async def embed_batch(texts: list[str]) -> list[list[float]]:
     settings = get_settings()
     client = _get_openai_client()
 
-    response = await client.embeddings.create(
-        model=settings.embedding_model,
-        input=texts,
-        dimensions=settings.embedding_dimensions,
-    )
+    with span("embed"):
+        response = await client.embeddings.create(
+            model=settings.embedding_model,
+            input=texts,
+            dimensions=settings.embedding_dimensions,
+        )
 
     return [item.embedding for item in response.data]
\ No newline at end of file
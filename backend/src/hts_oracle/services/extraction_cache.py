@@ -0,0 +1,201 @@
+"""
+Content-hash cache for PDF text and extracted commodities.
+
+A batch job's slowest, priciest steps — parsing the PDF and asking Claude
+for its line items — depend only on the file's bytes, the Claude model and
+the table fast-path settings (table_extraction_enabled / _min_confidence,
+folded into the key by settings_key()). So the worker looks the upload's
+SHA-256 up here first:
+
+    cached = await lookup(db, job.content_sha256, settings.claude_model)
+    if cached: classify cached.commodities straight away
+    else:      parse + extract, then store(...)
+
+The table is bounded by extraction_cache_max_entries and
+extraction_cache_max_bytes (size_bytes per entry). Checking the totals
+costs a scan, so store() does it only every extraction_cache_check_every
+stores in this process, and deletes the least recently used entries only
+when a limit is exceeded.
+
+Hit/miss counters are kept per process (cache_stats()) and hits per entry
+in the table, both shown in GET /admin/stats.
+"""
+
+import json
+from dataclasses import dataclass
+
+import structlog
+from sqlalchemy import func, select, text
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from hts_oracle.config import get_settings
+from hts_oracle.models.extraction_cache import ExtractionCacheEntry
+
+log = structlog.get_logger()
+
+
+@dataclass
+class CachedExtraction:
+    """What a cache hit gives back to the worker."""
+    pdf_text: str
+    commodities: list[dict]
+    source: str | None
+
+
+# ---------------------------------------------------------------------------
+# Per-process counters
+# ---------------------------------------------------------------------------
+
+_stats = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+
+# Stores in this process since the last size check
+_unchecked_stores = 0
+
+
+def cache_stats() -> dict:
+    """This process's counters since startup, plus the hit rate."""
+    lookups = _stats["hits"] + _stats["misses"]
+    return {**_stats, "hit_rate": round(_stats["hits"] / lookups, 3) if lookups else 0.0}
+
+
+def reset_cache_stats() -> None:
+    global _unchecked_stores
+    for key in _stats:
+        _stats[key] = 0
+    _unchecked_stores = 0
+
+
+def settings_key(settings) -> str:
+    """The extraction settings an entry was made with (part of its key)."""
+    tables = "on" if settings.table_extraction_enabled else "off"
+    return f"tables={tables},min_confidence={settings.table_extraction_min_confidence:g}"
+
+
+# ---------------------------------------------------------------------------
+# Lookup / store
+# ---------------------------------------------------------------------------
+
+async def lookup(
+    db: AsyncSession, content_sha256: str, claude_model: str,
+) -> CachedExtraction | None:
+    """
+    The cached extraction for this file + model, or None.
+
+    A hit bumps the entry's hit count and recency in the same statement
+    (caller commits).
+    """
+    settings = get_settings()
+    if not settings.extraction_cache_enabled:
+        return None
+
+    table = ExtractionCacheEntry.__table__
+    row = (await db.execute(
+        table.update()
+        .where(
+            table.c.content_sha256 == content_sha256,
+            table.c.claude_model == claude_model,
+            table.c.extraction_settings == settings_key(settings),
+        )
+        .values(hits=table.c.hits + 1, last_used_at=func.now())
+        .returning(table.c.pdf_text, table.c.commodities, table.c.source)
+    )).one_or_none()
+
+    if row is None:
+        _stats["misses"] += 1
+        return None
+
+    _stats["hits"] += 1
+    log.info("extraction_cache_hit", sha256=content_sha256[:12], items=len(row.commodities))
+    return CachedExtraction(pdf_text=row.pdf_text, commodities=row.commodities, source=row.source)
+
+
+async def store(
+    db: AsyncSession,
+    content_sha256: str,
+    claude_model: str,
+    pdf_text: str,
+    commodities: list[dict],
+    source: str | None = None,
+) -> None:
+    """
+    Cache an extraction (caller commits). Every extraction_cache_check_every
+    stores, evict down to the entry and byte limits.
+    """
+    global _unchecked_stores
+    settings = get_settings()
+    if not settings.extraction_cache_enabled:
+        return
+
+    size = len(pdf_text.encode()) + len(json.dumps(commodities).encode())
+    values = {
+        "content_sha256": content_sha256,
+        "claude_model": claude_model,
+        "extraction_settings": settings_key(settings),
+        "pdf_text": pdf_text,
+        "commodities": commodities,
+        "source": source,
+        "size_bytes": size,
+    }
+    stmt = insert(ExtractionCacheEntry).values(**values)
+    await db.execute(stmt.on_conflict_do_update(
+        index_elements=["content_sha256", "claude_model", "extraction_settings"],
+        set_={
+            **{k: stmt.excluded[k] for k in ("pdf_text", "commodities", "source", "size_bytes")},
+            "last_used_at": func.now(),
+        },
+    ))
+    _stats["stores"] += 1
+
+    _unchecked_stores += 1
+    if _unchecked_stores < max(settings.extraction_cache_check_every, 1):
+        return
+    _unchecked_stores = 0
+    evicted = await _evict(
+        db, settings.extraction_cache_max_entries, settings.extraction_cache_max_bytes,
+    )
+    if evicted:
+        _stats["evictions"] += evicted
+        log.info("extraction_cache_evicted", count=evicted)
+
+
+async def _evict(db: AsyncSession, max_entries: int, max_bytes: int) -> int:
+    """
+    Delete the least recently used entries beyond max_entries, or beyond
+    max_bytes counted from the most recently used — but only if the table
+    is over a limit.
+    """
+    count, total = (await db.execute(
+        select(func.count(), func.coalesce(func.sum(ExtractionCacheEntry.size_bytes), 0))
+    )).one()
+    if count <= max_entries and total <= max_bytes:
+        return 0
+
+    result = await db.execute(
+        text(
+            "DELETE FROM extraction_cache"
+            " WHERE (content_sha256, claude_model, extraction_settings) IN ("
+            "  SELECT content_sha256, claude_model, extraction_settings FROM ("
+            "    SELECT content_sha256, claude_model, extraction_settings,"
+            "      row_number() OVER recent AS rank,"
+            "      sum(size_bytes) OVER recent AS running_bytes"
+            "    FROM extraction_cache"
+            "    WINDOW recent AS (ORDER BY last_used_at DESC ROWS UNBOUNDED PRECEDING)"
+            "  ) ranked WHERE rank > :keep OR running_bytes > :max_bytes"
+            ")"
+        ),
+        {"keep": max(max_entries, 0), "max_bytes": max(max_bytes, 0)},
+    )
+    return result.rowcount or 0
+
+
+async def table_stats(db: AsyncSession) -> dict:
+    """Entry count, total size and lifetime hits across all processes."""
+    row = (await db.execute(
+        select(
+            func.count(),
+            func.coalesce(func.sum(ExtractionCacheEntry.size_bytes), 0),
+            func.coalesce(func.sum(ExtractionCacheEntry.hits), 0),
+        ).select_from(ExtractionCacheEntry)
+    )).one()
+    return {"entries": row[0], "size_bytes": int(row[1]), "total_hits": int(row[2])}
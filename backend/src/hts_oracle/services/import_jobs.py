@@ -0,0 +1,303 @@
+"""
+Admin-triggered HTS imports, run in a child process.
+
+The import (cli/import_hts.py) is CPU- and network-heavy for minutes:
+CSV parsing, thousands of embedding calls, COPY, an HNSW build. Running
+it inside the API's event loop would stall every request behind it, so
+POST /admin/import-csv starts it as a separate process instead:
+
+    API process                               child process
+    ───────────                               ─────────────
+    launch() ─ create_subprocess_exec ──────► import_hts <csv> --progress-json
+    supervise():                                   --nice 10 --tpm-limit <share>
+        reads stdout line by line   ◄───────── {"event": "progress", "rows_per_second": ...}
+        copies the latest snapshot to import_jobs (≤ 1 write/s, plus heartbeats)
+    SSE stream (any API process) reads import_jobs
+
+The child runs at lower CPU priority and with a share of the embedding
+rate limit, and by default builds a new catalog revision rather than
+writing to the table searches read — live latency stays where it was.
+
+Only one import runs at a time (a second request gets a 409), enforced
+by a partial unique index on import_jobs. If the API process dies, the
+child's next progress line hits a closed pipe and it stops itself,
+cleaning up its half-built table (see embed_pipeline.stop_when_orphaned),
+so it can't keep running next to the import that replaces it. On a clean
+API shutdown the child gets SIGINT — the same cleanup, as on Ctrl-C — and
+is only killed if it hasn't exited after STOP_TIMEOUT_SECONDS.
+"""
+
+import asyncio
+import json
+import os
+import signal
+import sys
+from collections import deque
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import structlog
+from sqlalchemy import select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from hts_oracle.config import Settings
+from hts_oracle.db import get_session_factory
+from hts_oracle.models.import_job import ImportJob
+
+log = structlog.get_logger()
+
+# What the import does with the file (import_hts flags)
+MODES = ("revision", "incremental", "rebuild")
+
+ACTIVE_STATUSES = ("pending", "running")
+TERMINAL_STATUSES = ("complete", "failed")
+
+# The supervisor touches heartbeat_at at least this often...
+HEARTBEAT_SECONDS = 5
+# ...so a job silent for this long lost its supervisor (API process died)
+STALE_AFTER_SECONDS = 60
+
+# Progress snapshots are written to the job row at most this often
+PROGRESS_WRITE_SECONDS = 1.0
+
+# On shutdown, how long a SIGINTed import gets to drop its half-built table
+STOP_TIMEOUT_SECONDS = 30
+
+# Lines of plain-text output kept for the job's log_tail
+LOG_TAIL_LINES = 40
+
+
+class ImportAlreadyRunningError(Exception):
+    """Another import is pending or running."""
+
+    def __init__(self, job_id: int):
+        super().__init__(f"Import {job_id} is already running")
+        self.job_id = job_id
+
+
+def build_command(csv_path: str | Path, mode: str, activate: bool, settings: Settings) -> list[str]:
+    """The import_hts command line for an API-started import."""
+    command = [
+        sys.executable, "-m", "hts_oracle.cli.import_hts", str(csv_path),
+        "--progress-json",
+        "--tpm-limit",
+        str(max(int(settings.embedding_tpm_limit * settings.admin_import_tpm_share), 1)),
+    ]
+    if settings.admin_import_nice:
+        command += ["--nice", str(settings.admin_import_nice)]
+    if mode == "revision":
+        command.append("--revision")
+        if activate:
+            command.append("--activate")
+    elif mode == "rebuild":
+        command.append("--rebuild")
+    return command
+
+
+# ---------------------------------------------------------------------------
+# Job rows
+# ---------------------------------------------------------------------------
+
+async def active_job(db: AsyncSession) -> ImportJob | None:
+    """
+    The pending/running import, if any. Jobs whose heartbeat stopped are
+    marked failed on the way (their supervisor is gone).
+    """
+    cutoff = datetime.utcnow() - timedelta(seconds=STALE_AFTER_SECONDS)
+    await db.execute(
+        update(ImportJob)
+        .where(ImportJob.status.in_(ACTIVE_STATUSES), ImportJob.heartbeat_at < cutoff)
+        .values(
+            status="failed",
+            error="Import process stopped reporting",
+            finished_at=datetime.utcnow(),
+        )
+    )
+    await db.commit()
+    return await db.scalar(
+        select(ImportJob).where(ImportJob.status.in_(ACTIVE_STATUSES)).limit(1)
+    )
+
+
+async def create_job(db: AsyncSession, filename: str, mode: str, activate: bool) -> ImportJob:
+    """Record a new pending import. Raises ImportAlreadyRunningError if one is active."""
+    running = await active_job(db)
+    if running is not None:
+        raise ImportAlreadyRunningError(running.id)
+    job = ImportJob(
+        filename=filename,
+        status="pending",
+        mode=mode,
+        options={"activate": activate},
+        heartbeat_at=datetime.utcnow(),
+    )
+    db.add(job)
+    try:
+        await db.commit()
+    except IntegrityError:
+        # uq_import_jobs_one_active: another API process got in between
+        await db.rollback()
+        running = await db.scalar(
+            select(ImportJob).where(ImportJob.status.in_(ACTIVE_STATUSES)).limit(1)
+        )
+        raise ImportAlreadyRunningError(running.id if running else 0) from None
+    return job
+
+
+async def _update(job_id: int, **values) -> None:
+    async with get_session_factory()() as db:
+        await db.execute(
+            update(ImportJob)
+            .where(ImportJob.id == job_id)
+            .values(heartbeat_at=datetime.utcnow(), **values)
+        )
+        await db.commit()
+
+
+# ---------------------------------------------------------------------------
+# Reading the child's output
+# ---------------------------------------------------------------------------
+
+class ImportOutput:
+    """
+    Folds the import's stdout into job state.
+
+    JSON lines with an "event" key are progress reports (phase, progress,
+    summary); everything else is ordinary output, kept as a short tail
+    for the error message.
+    """
+
+    def __init__(self):
+        self.phase: str | None = None
+        self.progress: dict | None = None
+        self.summary: dict | None = None
+        self.tail: deque[str] = deque(maxlen=LOG_TAIL_LINES)
+
+    def feed(self, line: str) -> None:
+        line = line.rstrip("\r\n")
+        if not line.strip():
+            return
+        event = None
+        if line.startswith("{"):
+            try:
+                event = json.loads(line)
+            except json.JSONDecodeError:
+                pass
+        if not isinstance(event, dict) or "event" not in event:
+            self.tail.append(line.strip())
+            return
+
+        kind = event.pop("event")
+        if kind == "phase":
+            self.phase = event.get("phase")
+        elif kind == "progress":
+            self.progress = event
+        elif kind == "summary":
+            self.summary = event
+
+    @property
+    def ok(self) -> bool:
+        return bool(self.summary and self.summary.get("ok"))
+
+    def log_tail(self) -> str:
+        return "\n".join(self.tail)
+
+
+async def supervise(job_id: int, csv_path: Path, command: list[str]) -> None:
+    """
+    Run one import process to completion, mirroring its progress into the
+    job row. The uploaded CSV is deleted afterwards.
+    """
+    output = ImportOutput()
+    process = None
+    try:
+        process = await asyncio.create_subprocess_exec(
+            *command,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.STDOUT,
+            env={**os.environ, "PYTHONUNBUFFERED": "1"},
+        )
+        await _update(job_id, status="running", pid=process.pid, started_at=datetime.utcnow())
+        log.info("import_started", job_id=job_id, pid=process.pid)
+
+        last_write = 0.0
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                raw = await asyncio.wait_for(process.stdout.readline(), HEARTBEAT_SECONDS)
+            except TimeoutError:
+                await _update(job_id)  # Quiet phase (e.g. the index build) — just a heartbeat
+                continue
+            if not raw:
+                break
+            output.feed(raw.decode("utf-8", errors="replace"))
+            if loop.time() - last_write >= PROGRESS_WRITE_SECONDS:
+                last_write = loop.time()
+                await _update(job_id, phase=output.phase, progress=output.progress)
+
+        returncode = await process.wait()
+        ok = returncode == 0 and output.ok
+        await _update(
+            job_id,
+            status="complete" if ok else "failed",
+            phase=output.phase,
+            progress=output.progress,
+            summary=output.summary,
+            error=None if ok else f"Import exited with code {returncode}",
+            log_tail=output.log_tail(),
+            finished_at=datetime.utcnow(),
+        )
+        log.info("import_finished", job_id=job_id, ok=ok, returncode=returncode)
+
+    except asyncio.CancelledError:
+        # API shutting down — don't leave an orphaned import (or its table) behind
+        if process is not None and process.returncode is None:
+            for line in (await _stop(process)).decode("utf-8", errors="replace").splitlines():
+                output.feed(line)
+        await _update(
+            job_id, status="failed", error="API process shut down during the import",
+            log_tail=output.log_tail(), finished_at=datetime.utcnow(),
+        )
+        raise
+    except Exception as e:
+        log.error("import_supervisor_failed", job_id=job_id, error=str(e))
+        await _update(
+            job_id, status="failed", error=str(e),
+            log_tail=output.log_tail(), finished_at=datetime.utcnow(),
+        )
+    finally:
+        csv_path.unlink(missing_ok=True)
+
+
+async def _stop(process: asyncio.subprocess.Process) -> bytes:
+    """
+    Interrupt an import so its cleanup runs (SIGTERM would skip it), killing
+    it if it takes longer than STOP_TIMEOUT_SECONDS. Returns its last output.
+    """
+    process.send_signal(signal.SIGINT)
+    try:
+        output, _ = await asyncio.wait_for(process.communicate(), STOP_TIMEOUT_SECONDS)
+    except TimeoutError:
+        log.error("import_stop_timeout", pid=process.pid, timeout_s=STOP_TIMEOUT_SECONDS)
+        process.kill()
+        await process.wait()
+        return b""
+    return output or b""
+
+
+# Supervisor tasks running in this process (held so they aren't garbage collected)
+_supervisors: set[asyncio.Task] = set()
+
+
+def launch(job_id: int, csv_path: Path, command: list[str]) -> None:
+    task = asyncio.create_task(supervise(job_id, csv_path, command), name=f"import-{job_id}")
+    _supervisors.add(task)
+    task.add_done_callback(_supervisors.discard)
+
+
+async def stop_imports() -> None:
+    """Stop this process's imports (called from main.py lifespan on shutdown)."""
+    for task in list(_supervisors):
+        task.cancel()
+    await asyncio.gather(*_supervisors, return_exceptions=True)
@@ -0,0 +1,248 @@
+"""
+Batch job queue — Postgres-backed, shared by every worker on every node.
+
+The batch_jobs table IS the queue. No Redis, no broker:
+
+  claim_next_job()     SELECT ... FOR UPDATE SKIP LOCKED picks the oldest
+                       pending job. Two workers racing for the same row never
+                       block each other — the loser just skips to the next row.
+  heartbeat()          The owning worker bumps heartbeat_at while it runs.
+  reclaim_stale_jobs() Jobs whose worker stopped heartbeating (crash, deploy,
+                       OOM kill) go back to "pending" — or to "error" once
+                       they've used up batch_max_attempts.
+
+Progress goes into batch_job_events via JobEventLog, which the SSE endpoint
+tails. Workers never talk to HTTP clients directly.
+
+A worker that stalls past batch_stale_after_seconds may still be running
+when its job is handed to another worker. Its writes are fenced: every
+commit first runs hold_job() — an UPDATE of the job row WHERE worker_id
+is still this worker — in the same transaction, so a stale worker's
+commit finds no row, rolls back and raises JobLostError instead of writing
+over the new owner's job.
+"""
+
+import os
+import socket
+from datetime import datetime, timedelta
+
+import structlog
+from sqlalchemy import func, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from hts_oracle.models.batch_job import BatchJob
+from hts_oracle.models.batch_job_event import BatchJobEvent
+
+log = structlog.get_logger()
+
+# Events that end a job's stream — the SSE tail stops after sending one
+TERMINAL_EVENTS = ("complete", "error")
+
+
+class JobLostError(Exception):
+    """Raised when a worker discovers another worker has taken over its job."""
+
+
+def make_worker_id(slot: int) -> str:
+    """Identify a worker task as "hostname:pid:slot" (fits batch_jobs.worker_id)."""
+    return f"{socket.gethostname()[:60]}:{os.getpid()}:{slot}"
+
+
+async def claim_next_job(db: AsyncSession, worker_id: str) -> BatchJob | None:
+    """
+    Claim the oldest pending job for this worker, or return None if the queue is empty.
+
+    The row lock is held only for the claim itself — once status flips to
+    "processing" and the transaction commits, other workers' queries skip it.
+    """
+    result = await db.execute(
+        select(BatchJob)
+        .where(BatchJob.status == "pending")
+        .order_by(BatchJob.id)
+        .limit(1)
+        .with_for_update(skip_locked=True)
+    )
+    job = result.scalar_one_or_none()
+    if job is None:
+        await db.rollback()
+        return None
+
+    job.status = "processing"
+    job.worker_id = worker_id
+    job.heartbeat_at = datetime.utcnow()
+    job.started_at = datetime.utcnow()
+    job.attempts = (job.attempts or 0) + 1
+    await db.commit()
+
+    log.info("batch_job_claimed", job_id=job.id, worker_id=worker_id, attempt=job.attempts)
+    return job
+
+
+async def heartbeat(db: AsyncSession, job_id: int, worker_id: str) -> bool:
+    """
+    Mark a job as still alive. Returns False if this worker no longer owns it
+    (it was reclaimed after a long stall) — the caller should stop working on it.
+    """
+    result = await db.execute(
+        update(BatchJob)
+        .where(
+            BatchJob.id == job_id,
+            BatchJob.worker_id == worker_id,
+            BatchJob.status == "processing",
+        )
+        .values(heartbeat_at=datetime.utcnow())
+    )
+    await db.commit()
+    return result.rowcount == 1
+
+
+async def hold_job(db: AsyncSession, job_id: int, worker_id: str) -> bool:
+    """
+    Check, inside the caller's transaction, that this worker still owns the
+    job, and keep the row locked until that transaction ends.
+
+    The UPDATE takes the row lock that reclaim_stale_jobs() also needs: a
+    reclaim that committed first makes this match no row; one that comes
+    later waits, then sees a fresh heartbeat_at and leaves the job alone.
+    """
+    result = await db.execute(
+        update(BatchJob)
+        .where(BatchJob.id == job_id, BatchJob.worker_id == worker_id)
+        .values(heartbeat_at=datetime.utcnow())
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount == 1
+
+
+async def reclaim_stale_jobs(
+    db: AsyncSession,
+    stale_after_seconds: float,
+    max_attempts: int,
+) -> int:
+    """
+    Put jobs whose worker went silent back in the queue.
+
+    Jobs that have already been claimed max_attempts times are marked
+    "error" instead — a PDF that crashes every worker shouldn't loop forever.
+    Returns the number of jobs requeued.
+    """
+    cutoff = datetime.utcnow() - timedelta(seconds=stale_after_seconds)
+    stale = (
+        BatchJob.status == "processing",
+        BatchJob.heartbeat_at < cutoff,
+    )
+
+    exhausted = await db.execute(
+        update(BatchJob)
+        .where(*stale, BatchJob.attempts >= max_attempts)
+        .values(status="error", worker_id=None, completed_at=datetime.utcnow())
+        .returning(BatchJob.id)
+    )
+    exhausted_ids = [row.id for row in exhausted]
+
+    requeued = await db.execute(
+        update(BatchJob)
+        .where(*stale, BatchJob.attempts < max_attempts)
+        .values(status="pending", worker_id=None)
+        .returning(BatchJob.id)
+    )
+    requeued_ids = [row.id for row in requeued]
+    await db.commit()
+
+    # Give clients of abandoned jobs a terminal event so their streams end
+    for job_id in exhausted_ids:
+        events = await JobEventLog.open(db, job_id)
+        await events.append({
+            "event": "error",
+            "message": f"Job failed after {max_attempts} attempts",
+        })
+        await events.commit()
+
+    if exhausted_ids or requeued_ids:
+        log.warn("batch_jobs_reclaimed", requeued=requeued_ids, failed=exhausted_ids)
+    return len(requeued_ids)
+
+
+# ---------------------------------------------------------------------------
+# Event log — what workers write and the SSE endpoint reads
+# ---------------------------------------------------------------------------
+
+class JobEventLog:
+    """
+    Appends events for one job with a gap-free per-job sequence number.
+
+    Only the worker that owns a job writes to its log, so the next seq is
+    tracked in memory after one MAX(seq) lookup. It moves on only when a
+    commit succeeds; a rollback hands the same numbers out again. A
+    reclaimed job continues numbering where the previous attempt stopped,
+    so clients holding an old Last-Event-ID still see every new event.
+
+    With a worker_id, commit() is fenced by hold_job(): if the job has been
+    reclaimed it rolls back and raises JobLostError. A seq that's already taken
+    (uq_batch_job_events_job_seq) means the same thing — the new owner
+    has written to the log — and raises JobLostError too.
+    """
+
+    def __init__(self, db: AsyncSession, job_id: int, next_seq: int, worker_id: str | None = None):
+        self.db = db
+        self.job_id = job_id
+        self.next_seq = next_seq
+        self.worker_id = worker_id
+        self._pending = 0
+
+    @classmethod
+    async def open(
+        cls, db: AsyncSession, job_id: int, worker_id: str | None = None,
+    ) -> "JobEventLog":
+        last_seq = await db.scalar(
+            select(func.max(BatchJobEvent.seq)).where(BatchJobEvent.job_id == job_id)
+        )
+        return cls(db, job_id, (last_seq or 0) + 1, worker_id)
+
+    async def append(self, event: dict) -> int:
+        """Add an event to the session (written by commit()). Returns its seq."""
+        seq = self.next_seq + self._pending
+        self.db.add(BatchJobEvent(job_id=self.job_id, seq=seq, payload=event))
+        self._pending += 1
+        return seq
+
+    async def commit(self) -> None:
+        """Commit the session — events and any job changes — if the job is still ours."""
+        try:
+            if self.worker_id is not None:
+                # Before anything is flushed, so the row lock comes first
+                with self.db.no_autoflush:
+                    owned = await hold_job(self.db, self.job_id, self.worker_id)
+                if not owned:
+                    raise JobLostError(self.job_id)
+            await self.db.commit()
+        except JobLostError:
+            await self.rollback()
+            raise
+        except IntegrityError as e:
+            await self.rollback()
+            raise JobLostError(self.job_id) from e
+        self.next_seq += self._pending
+        self._pending = 0
+
+    async def rollback(self) -> None:
+        """Discard uncommitted events (and everything else in the session)."""
+        await self.db.rollback()
+        self._pending = 0
+
+
+async def read_events(
+    db: AsyncSession,
+    job_id: int,
+    after_seq: int,
+    limit: int = 100,
+) -> list[BatchJobEvent]:
+    """Events for a job with seq > after_seq, oldest first (the SSE tail query)."""
+    result = await db.execute(
+        select(BatchJobEvent)
+        .where(BatchJobEvent.job_id == job_id, BatchJobEvent.seq > after_seq)
+        .order_by(BatchJobEvent.seq)
+        .limit(limit)
+    )
+    return list(result.scalars().all())
@@ -0,0 +1,177 @@
+"""
+Structured logging that never blocks a request.
+
+structlog's PrintLogger writes each line to stdout from whichever thread
+logged it — for us, the event loop. In a container stdout is a pipe to
+the log collector; when the collector is slow the pipe fills, write()
+blocks, and every request in the process waits behind a log line.
+
+Here the last processor still renders the line where it was logged (so
+contextvars like request_id and the timestamp are right), but the logger
+only puts it on a bounded queue. A daemon thread drains the queue and
+writes to stdout in batches, one flush per batch. If the queue is full
+the line is dropped and counted (hts_oracle_log_records_dropped_total
+on /metrics) — losing a log line is better than stalling the app.
+
+High-frequency info events are sampled before any other processor runs
+(LOG_SAMPLE_RATES, e.g. "search_complete=0.1"): a dropped event costs one
+dict lookup and a random(). Kept ones carry sample_rate, so counts from
+the logs can be scaled back up. Warnings and errors have their own event
+names and are never sampled unless listed.
+
+Lines still in the queue are written at interpreter exit.
+"""
+
+import atexit
+import queue
+import random
+import sys
+import threading
+from typing import TextIO
+
+import structlog
+
+# Most lines a single write()/flush() carries
+BATCH_LINES = 256
+
+_STOP = object()
+
+_stats = {"written": 0, "dropped": 0, "sampled_out": 0}
+_drop_lock = threading.Lock()
+_writer: "LogWriter | None" = None
+
+
+class LogWriter:
+    """A bounded queue of rendered lines and the thread that writes them out."""
+
+    def __init__(self, stream: TextIO, maxsize: int):
+        self.stream = stream
+        self.queue: queue.Queue = queue.Queue(maxsize)
+        self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+        self._thread.start()
+
+    def put(self, line: str) -> None:
+        """Queue a line, or drop it if the queue is full. Never blocks."""
+        try:
+            self.queue.put_nowait(line)
+        except queue.Full:
+            with _drop_lock:
+                _stats["dropped"] += 1
+
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            line = self.queue.get()
+            if line is _STOP:
+                break
+            lines = [line]
+            while len(lines) < BATCH_LINES:
+                try:
+                    line = self.queue.get_nowait()
+                except queue.Empty:
+                    break
+                if line is _STOP:
+                    stopping = True
+                    break
+                lines.append(line)
+            try:
+                self.stream.write("\n".join(lines) + "\n")
+                self.stream.flush()
+            except (OSError, ValueError):
+                pass  # Closed or broken stdout — nowhere left to report it
+            _stats["written"] += len(lines)
+
+    def close(self, timeout: float = 2.0) -> None:
+        """Write out what's queued (waiting up to timeout) and stop the thread."""
+        try:
+            self.queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            return
+        self._thread.join(timeout)
+
+
+class QueueLogger:
+    """structlog logger: hands the rendered line to the writer."""
+
+    def __init__(self, writer: LogWriter):
+        self._writer = writer
+
+    def msg(self, message: str) -> None:
+        self._writer.put(message)
+
+    log = debug = info = warn = warning = msg
+    fatal = failure = err = error = critical = exception = msg
+
+
+class QueueLoggerFactory:
+    def __init__(self, writer: LogWriter):
+        self._logger = QueueLogger(writer)
+
+    def __call__(self, *args) -> QueueLogger:
+        return self._logger
+
+
+def sampler(rates: dict[str, float]):
+    """Processor: keep each listed event with its probability; others pass through."""
+    def sample(logger, method_name: str, event_dict: dict) -> dict:
+        rate = rates.get(event_dict.get("event"))
+        if rate is None or rate >= 1:
+            return event_dict
+        if random.random() >= rate:
+            _stats["sampled_out"] += 1
+            raise structlog.DropEvent
+        event_dict["sample_rate"] = rate
+        return event_dict
+    return sample
+
+
+def configure_logging(settings, stream: TextIO | None = None) -> None:
+    """
+    Configure structlog for the app: JSON in production, pretty console
+    output in development, through the writer thread unless LOG_ASYNC=false.
+    """
+    global _writer
+
+    processors = []
+    if settings.log_sample_rate_map:
+        processors.append(sampler(settings.log_sample_rate_map))
+    processors += [
+        structlog.contextvars.merge_contextvars,        # Attach request_id etc.
+        structlog.processors.add_log_level,             # Add "level": "info"
+        structlog.processors.TimeStamper(fmt="iso"),    # Add ISO timestamp
+        structlog.dev.ConsoleRenderer()                 # Pretty terminal output
+        if settings.environment == "development"
+        else structlog.processors.JSONRenderer(),       # JSON for production
+    ]
+
+    if settings.log_async:
+        if _writer is None:
+            _writer = LogWriter(stream or sys.stdout, settings.log_queue_size)
+            atexit.register(stop_log_writer)
+        logger_factory = QueueLoggerFactory(_writer)
+    else:
+        logger_factory = structlog.PrintLoggerFactory(stream or sys.stdout)
+
+    structlog.configure(
+        processors=processors,
+        wrapper_class=structlog.make_filtering_bound_logger(0),
+        context_class=dict,
+        logger_factory=logger_factory,
+        cache_logger_on_first_use=True,
+    )
+
+
+def stop_log_writer() -> None:
+    global _writer
+    if _writer is not None:
+        _writer.close()
+        _writer = None
+
+
+def log_stats() -> dict:
+    return {**_stats, "queued": _writer.queue.qsize() if _writer else 0}
+
+
+def reset_log_stats() -> None:
+    for key in _stats:
+        _stats[key] = 0
@@ -0,0 +1,120 @@
+"""
+Process metrics in the Prometheus text format (GET /metrics).
+
+Stage durations come from spans (services/timing.py): every span named
+"embed" is observed into the hts_oracle_embed_ms histogram, and so on.
+Histograms are created the first time a stage is observed. Point-in-time
+values (cache hit rates, DB pool usage) are passed to render() by the
+/metrics route as gauges.
+
+No client library: a histogram here is a fixed list of bucket counters,
+so observing a value is a bisect and two additions — cheap enough to do
+on every span of every request.
+
+Metrics are per process. With several uvicorn workers each scrape sees
+one worker; Prometheus aggregates across the instance's workers the
+same way it does across nodes.
+"""
+
+from bisect import bisect_left
+from dataclasses import dataclass, field
+
+PREFIX = "hts_oracle"
+
+# Milliseconds — from a cached lookup up to a slow Claude call
+BUCKETS_MS = (1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, 60000)
+
+HELP = {
+    "embed": "OpenAI embedding request duration",
+    "search": "pgvector search query duration",
+    "llm": "Claude disambiguation call duration",
+    "db_commit": "Classification audit commit duration",
+    "pdf_parse": "PDF text extraction duration (process pool)",
+    "extract": "Claude line-item extraction duration (all chunks, wall time)",
+    "request": "HTTP request duration (until the response starts)",
+}
+
+
+@dataclass
+class Histogram:
+    name: str
+    buckets: tuple[float, ...] = BUCKETS_MS
+    counts: list[int] = field(default_factory=list)  # One per bucket, plus +Inf
+    sum: float = 0.0
+    count: int = 0
+
+    def __post_init__(self):
+        self.counts = [0] * (len(self.buckets) + 1)
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def render(self) -> list[str]:
+        metric = f"{PREFIX}_{self.name}_ms"
+        lines = [
+            f"# HELP {metric} {HELP.get(self.name, self.name + ' duration')} (milliseconds)",
+            f"# TYPE {metric} histogram",
+        ]
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            lines.append(f'{metric}_bucket{{le="{bound:g}"}} {cumulative}')
+        lines.append(f'{metric}_bucket{{le="+Inf"}} {self.count}')
+        lines.append(f"{metric}_sum {self.sum:.3f}")
+        lines.append(f"{metric}_count {self.count}")
+        return lines
+
+
+_histograms: dict[str, Histogram] = {}
+
+
+def observe(name: str, ms: float) -> None:
+    """Record one duration (milliseconds) for a stage."""
+    histogram = _histograms.get(name)
+    if histogram is None:
+        histogram = _histograms[name] = Histogram(name)
+    histogram.observe(ms)
+
+
+def histogram(name: str) -> Histogram | None:
+    return _histograms.get(name)
+
+
+def reset() -> None:
+    """Forget all observations (tests)."""
+    _histograms.clear()
+
+
+@dataclass(frozen=True)
+class Gauge:
+    """A point-in-time value (or a running total, with kind="counter")."""
+    name: str
+    value: float
+    help: str
+    kind: str = "gauge"
+    labels: dict[str, str] = field(default_factory=dict)
+
+
+def _labels(labels: dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in labels.items()) + "}"
+
+
+def render(gauges: list[Gauge] = ()) -> str:
+    """All histograms plus the given gauges, in Prometheus exposition format."""
+    lines: list[str] = []
+    for name in sorted(_histograms):
+        lines += _histograms[name].render()
+
+    described = set()
+    for gauge in gauges:
+        metric = f"{PREFIX}_{gauge.name}"
+        if metric not in described:
+            described.add(metric)
+            lines.append(f"# HELP {metric} {gauge.help}")
+            lines.append(f"# TYPE {metric} {gauge.kind}")
+        lines.append(f"{metric}{_labels(gauge.labels)} {gauge.value:g}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,88 @@
+"""
+Synchronous pdfplumber work — runs inside the PDF worker processes, never on the event loop.
+
+Everything here is CPU-bound and blocking. pdf_parser.py sends these
+functions to its worker processes (serve() below is each worker's main
+loop), so this module is deliberately lightweight: child processes import
+it (and pdfplumber) and nothing else from the app.
+
+`source` is either the PDF bytes or a filesystem path. Paths are cheaper —
+with the local blob store each process opens the file itself instead of
+receiving a pickled copy of the whole PDF per task.
+"""
+
+import io
+from multiprocessing.connection import Connection
+from typing import NamedTuple
+
+import pdfplumber
+
+
+class PdfPage(NamedTuple):
+    """One parsed page, as sent back from a pool process."""
+    index: int
+    page_count: int
+    text: str
+    # pdfplumber tables (rows of cell strings) — only when requested
+    tables: list[list[list[str | None]]]
+
+
+def _open(source: bytes | str):
+    if isinstance(source, bytes):
+        return pdfplumber.open(io.BytesIO(source))
+    return pdfplumber.open(source)
+
+
+def count_pages(source: bytes | str) -> int:
+    """Number of pages in the PDF."""
+    with _open(source) as pdf:
+        return len(pdf.pages)
+
+
+def extract_page_range(
+    source: bytes | str,
+    start: int,
+    end: int,
+    with_tables: bool = False,
+) -> list[PdfPage]:
+    """
+    Extract pages [start, end) — text always, tables when with_tables=True.
+
+    Tables are read in the same pass as the text, so the table fast path
+    (services/table_extractor.py) doesn't cost a second parse of the PDF.
+    Pages with no text (scanned images, blank pages) come back as "".
+    """
+    with _open(source) as pdf:
+        page_count = len(pdf.pages)
+        pages = []
+        for index in range(start, min(end, page_count)):
+            page = pdf.pages[index]
+            pages.append(PdfPage(
+                index=index,
+                page_count=page_count,
+                text=page.extract_text() or "",
+                tables=page.extract_tables() if with_tables else [],
+            ))
+            page.close()  # Drop pdfplumber's per-page caches as we go
+        return pages
+
+
+def serve(conn: Connection) -> None:
+    """
+    A PDF worker's main loop: run each (fn, args) received on conn and send
+    back (True, result) or (False, exception). Exits on None or when the
+    parent's end of the pipe closes.
+    """
+    while True:
+        try:
+            request = conn.recv()
+        except (EOFError, OSError):
+            return
+        if request is None:
+            return
+        fn, args = request
+        try:
+            reply = (True, fn(*args))
+        except Exception as e:
+            reply = (False, e)
+        conn.send(reply)
@@ -2,26 +2,37 @@
 PDF parsing service — extracts commodity line items from invoice PDFs.
 
 Two-step process:
-  1. pdfplumber extracts raw text from the PDF
-  2. Claude identifies and extracts the commodity line items
+  1. pdfplumber extracts raw text (and tables) from the PDF
+  2. The line items are read from a line-item table if there's a clean one
+     (services/table_extractor.py); otherwise Claude extracts them from the text
 
 Why Claude for extraction? Invoice formats vary wildly — tables, free text,
 multiple columns, different languages. A regex or rule-based parser would
 break on every new format. Claude handles the variety reliably.
 
-Why not just Claude for everything? pdfplumber is free and instant.
-Claude is expensive and slow. We use pdfplumber for the mechanical part
-(PDF → text) and Claude for the intelligent part (text → line items).
+Why not just Claude for everything? pdfplumber is free and fast (and runs
+in a process pool, off the event loop). Claude is expensive and slow.
+We use pdfplumber for the mechanical part (PDF → text) and Claude for
+the intelligent part (text → line items).
 """
 
+import asyncio
 import json
+import multiprocessing
+import threading
+from collections import Counter
+from collections.abc import AsyncGenerator
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from time import perf_counter
 
-import pdfplumber
 import structlog
 from anthropic import AsyncAnthropic
 from functools import lru_cache
 
 from hts_oracle.config import get_settings
+from hts_oracle.services import pdf_pages, timing
+from hts_oracle.services.table_extractor import extract_from_tables
 
 log = structlog.get_logger()
 
@@ -29,10 +40,249 @@ log = structlog.get_logger()
 @lru_cache
 def _get_anthropic_client() -> AsyncAnthropic:
     settings = get_settings()
-    return AsyncAnthropic(api_key=settings.anthropic_api_key)
+    return AsyncAnthropic(api_key=settings.anthropic_api_key, base_url=settings.anthropic_base_url)
 
 
-async def extract_text_from_pdf(pdf_bytes: bytes) -> str:
+# ---------------------------------------------------------------------------
+# PDF process pool
+# ---------------------------------------------------------------------------
+# pdfplumber is pure Python and CPU-bound. Run on the event loop, a 10MB
+# invoice would freeze every other request in the worker (including
+# interactive /classify) for seconds. So all parsing happens in a bounded
+# pool of child processes:
+#   - pdf_workers caps how many cores parsing can take
+#   - each process is recycled after pdf_worker_max_tasks tasks, which caps
+#     memory growth from pdfminer's caches
+#   - a parse that runs past pdf_parse_timeout_seconds gets the processes
+#     working on that document killed — and only those
+#
+# Why not a ProcessPoolExecutor? It can't stop one task: killing any of its
+# processes breaks the whole pool, failing every other document mid-parse.
+# Here each process has its own pipe, so a stuck one can be terminated and
+# replaced without the others noticing. A thread per task waits on the
+# pipe, which keeps the event loop free and the pool usable from any loop.
+
+
+class _PdfWorker:
+    """One child process running pdf_pages.serve() on the other end of a pipe."""
+
+    def __init__(self, context):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(target=pdf_pages.serve, args=(child_conn,), daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.tasks = 0
+
+    def stop(self) -> None:
+        try:
+            self.conn.send(None)
+        except OSError:
+            pass
+        self.conn.close()
+
+
+class PdfTask:
+    """One call into the pool. kill() stops it, whether queued or running."""
+
+    def __init__(self, fn, *args):
+        self.fn = fn
+        self.args = args
+        self.killed = False
+        self.worker: _PdfWorker | None = None
+        self._lock = threading.Lock()
+
+    def cancel(self) -> None:
+        """Stop the task if it hasn't started yet; a running one finishes."""
+        with self._lock:
+            if self.worker is None:
+                self.killed = True
+
+    def kill(self) -> None:
+        """Stop the task now, terminating its process if it's running."""
+        with self._lock:
+            self.killed = True
+            if self.worker is not None:
+                self.worker.process.terminate()
+
+
+class PdfWorkerPool:
+    """Up to `size` worker processes; tasks beyond that wait for a free one."""
+
+    def __init__(self, size: int, max_tasks: int):
+        # "spawn": children start clean instead of forking the whole API
+        # process (event loop, DB pool and all)
+        self._context = multiprocessing.get_context("spawn")
+        self._slots = threading.BoundedSemaphore(size)
+        self._idle: list[_PdfWorker] = []
+        self._busy: set[_PdfWorker] = set()
+        self._lock = threading.Lock()
+        self._max_tasks = max_tasks
+        self._closed = False
+        # Threads waiting on the pipes (or for a slot); queued beyond this
+        self.dispatcher = ThreadPoolExecutor(max_workers=size * 4, thread_name_prefix="pdf-pool")
+
+    def run(self, task: PdfTask):
+        """Run the task in a worker process (blocking — called on a dispatcher thread)."""
+        with self._slots:
+            with self._lock:
+                if self._closed:
+                    raise RuntimeError("PDF pool is shut down")
+                worker = self._idle.pop() if self._idle else None
+            worker = worker or _PdfWorker(self._context)
+            with self._lock:
+                self._busy.add(worker)
+            with task._lock:
+                started = not task.killed
+                if started:
+                    task.worker = worker
+            reply = None
+            killed = not started
+            if started:
+                try:
+                    worker.conn.send((task.fn, task.args))
+                    reply = worker.conn.recv()
+                except (EOFError, OSError):
+                    pass
+                with task._lock:
+                    # From here on kill() can't reach this process, which may
+                    # go straight on to another document's task
+                    task.worker = None
+                    killed = task.killed
+            with self._lock:
+                self._busy.discard(worker)
+            if started and (reply is None or killed):
+                # Dead, or may have been killed after replying
+                worker.conn.close()
+                worker.process.join(1)
+            else:
+                worker.tasks += started
+                self._release(worker)
+
+        if reply is None:
+            if killed:
+                raise TimeoutError("PDF task was stopped")
+            raise RuntimeError(f"PDF worker exited with code {worker.process.exitcode}")
+        ok, result = reply
+        if not ok:
+            raise result
+        return result
+
+    def _release(self, worker: _PdfWorker) -> None:
+        with self._lock:
+            if not self._closed and worker.tasks < self._max_tasks:
+                self._idle.append(worker)
+                return
+        worker.stop()
+
+    def shutdown(self, kill: bool = False) -> None:
+        """Stop idle workers; busy ones finish their task first unless kill=True."""
+        with self._lock:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            busy = list(self._busy)
+        for worker in idle:
+            worker.stop()
+        if kill:
+            for worker in busy:
+                worker.process.terminate()
+        self.dispatcher.shutdown(wait=False, cancel_futures=True)
+
+
+_pdf_pool: PdfWorkerPool | None = None
+
+
+def _get_pdf_pool() -> PdfWorkerPool:
+    global _pdf_pool
+    if _pdf_pool is None:
+        settings = get_settings()
+        _pdf_pool = PdfWorkerPool(
+            size=max(settings.pdf_workers, 1),
+            max_tasks=settings.pdf_worker_max_tasks,
+        )
+    return _pdf_pool
+
+
+def shutdown_pdf_pool(kill: bool = False) -> None:
+    """
+    Tear down the PDF pool (a new one is created on next use).
+
+    kill=True terminates busy processes too, instead of letting them finish.
+    """
+    global _pdf_pool
+    pool, _pdf_pool = _pdf_pool, None
+    if pool is not None:
+        pool.shutdown(kill=kill)
+
+
+async def _run_in_pool(task: PdfTask):
+    loop = asyncio.get_running_loop()
+    pool = _get_pdf_pool()
+    return await loop.run_in_executor(pool.dispatcher, pool.run, task)
+
+
+async def iter_pdf_pages(
+    source: bytes | str,
+    with_tables: bool = False,
+) -> AsyncGenerator[pdf_pages.PdfPage, None]:
+    """
+    Extract text page by page in the process pool, yielding as pages finish.
+
+    Yields PdfPage(index, page_count, text, tables). Documents longer than
+    pdf_pages_per_task pages are split into page ranges parsed in parallel,
+    so pages can arrive out of order. Tables are only extracted when
+    with_tables=True.
+
+    Raises TimeoutError if the whole document takes longer than
+    pdf_parse_timeout_seconds. The processes parsing it are killed (and
+    replaced on demand); other documents in the pool carry on.
+
+    The pdf_parse stage is the wall time from the page count until the
+    last range finished — not the sum over ranges, which run in parallel
+    — and not the time the caller spends on the pages it's handed.
+    """
+    settings = get_settings()
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + settings.pdf_parse_timeout_seconds
+
+    count = PdfTask(pdf_pages.count_pages, source)
+    ranges: list[PdfTask] = []
+    started = perf_counter()
+    finished: list[float] = []
+    try:
+        page_count = await asyncio.wait_for(
+            _run_in_pool(count), timeout=settings.pdf_parse_timeout_seconds,
+        )
+        finished.append(perf_counter())
+
+        step = max(settings.pdf_pages_per_task, 1)
+        ranges = [
+            PdfTask(pdf_pages.extract_page_range, source, start, start + step, with_tables)
+            for start in range(0, page_count, step)
+        ]
+        futures = [asyncio.ensure_future(_run_in_pool(task)) for task in ranges]
+        for future in futures:
+            future.add_done_callback(lambda _: finished.append(perf_counter()))
+        try:
+            for next_done in asyncio.as_completed(futures, timeout=max(deadline - loop.time(), 0)):
+                for page in await next_done:
+                    yield page
+        finally:
+            for future, task in zip(futures, ranges):
+                future.cancel()
+                task.cancel()
+
+    except TimeoutError:
+        log.error("pdf_parse_timeout", timeout_s=settings.pdf_parse_timeout_seconds)
+        for task in [count, *ranges]:
+            task.kill()
+        raise TimeoutError("PDF parsing timed out") from None
+    finally:
+        # Cut short (timeout, error, caller stopped reading): up to now
+        ended = max(finished) if len(finished) == 1 + len(ranges) else perf_counter()
+        timing.record("pdf_parse", (ended - started) * 1000)
+
+
+async def extract_text_from_pdf(source: bytes | str) -> str:
     """
     Extract raw text from a PDF file using pdfplumber.
 
@@ -40,21 +290,215 @@ async def extract_text_from_pdf(pdf_bytes: bytes) -> str:
     most PDF libraries. It returns plain text that preserves the
     approximate layout.
 
-    Returns empty string if extraction fails (bad PDF, scanned image, etc.)
+    Parsing runs in the PDF process pool (see iter_pdf_pages), so the
+    event loop stays free while a large document is being read.
+
+    Returns empty string if extraction fails (bad PDF, scanned image, timeout, etc.)
     """
     try:
-        with pdfplumber.open(pdf_bytes) as pdf:
-            pages_text = []
-            for page in pdf.pages:
-                text = page.extract_text()
-                if text:
-                    pages_text.append(text)
-            return "\n\n".join(pages_text)
+        pages = {}
+        async for page in iter_pdf_pages(source):
+            pages[page.index] = page.text
+        return "\n\n".join(pages[i] for i in sorted(pages) if pages[i])
     except Exception as e:
         log.error("pdf_text_extraction_failed", error=str(e))
         return ""
 
 
+# ---------------------------------------------------------------------------
+# Line-item extraction
+# ---------------------------------------------------------------------------
+
+@dataclass
+class ExtractedChunk:
+    """Line items found in one piece of an invoice (streamed as chunks finish)."""
+    index: int              # Chunk position in the document (0-based)
+    total: int              # How many chunks the document was split into
+    items: list[dict]
+    source: str = "claude"  # "table" when the rule-based extractor read it
+
+
+async def iter_line_items(
+    pdf_text: str,
+    tables: list[list[list]],
+) -> AsyncGenerator[ExtractedChunk, None]:
+    """
+    Get an invoice's line items as cheaply as possible, streaming them back.
+
+    Tries the rule-based table extractor first. Its result is used only when
+    it's confident (>= table_extraction_min_confidence) and comes back as a
+    single chunk. Otherwise — no line-item table, or a messy one — Claude
+    reads the text chunk by chunk (see iter_commodities).
+    """
+    settings = get_settings()
+
+    if settings.table_extraction_enabled and tables:
+        result = extract_from_tables(tables)
+        if result.items and result.confidence >= settings.table_extraction_min_confidence:
+            log.info(
+                "commodities_extracted_from_tables",
+                count=len(result.items),
+                confidence=result.confidence,
+            )
+            yield ExtractedChunk(index=0, total=1, items=result.items, source="table")
+            return
+        log.info(
+            "table_extraction_fallback_to_claude",
+            confidence=result.confidence,
+            reason=result.reason,
+        )
+
+    async for chunk in iter_commodities(pdf_text):
+        yield chunk
+
+
+async def extract_line_items(pdf_text: str, tables: list[list[list]]) -> list[dict]:
+    """All line items from iter_line_items(), in document order."""
+    return _in_document_order([chunk async for chunk in iter_line_items(pdf_text, tables)])
+
+
+def chunk_text(text: str, max_chars: int, overlap_lines: int) -> list[str]:
+    """
+    Split invoice text into line-aligned chunks of at most ~max_chars.
+
+    Each chunk after the first starts with the last `overlap_lines` lines of
+    the previous one, so a line item that straddles a boundary is seen whole
+    by at least one chunk. (The duplicates this creates are removed when
+    chunks are merged.) A single line longer than max_chars is hard-split.
+    """
+    lines: list[str] = []
+    for line in text.splitlines():
+        while len(line) > max_chars:
+            lines.append(line[:max_chars])
+            line = line[max_chars:]
+        lines.append(line)
+
+    chunks: list[str] = []
+    current: list[str] = []
+    size = 0
+    for line in lines:
+        if current and size + len(line) + 1 > max_chars:
+            chunks.append("\n".join(current))
+            # Carry the tail over — but never so much that it fills the chunk
+            current = current[-overlap_lines:] if overlap_lines else []
+            while current and sum(len(c) + 1 for c in current) > max_chars // 2:
+                current.pop(0)
+            size = sum(len(c) + 1 for c in current)
+        current.append(line)
+        size += len(line) + 1
+
+    if any(line.strip() for line in current):
+        chunks.append("\n".join(current))
+    return chunks
+
+
+def _item_key(item: dict) -> tuple:
+    """Identity used to spot the same line item reported by two overlapping chunks."""
+    description = " ".join(str(item.get("description") or "").lower().split())
+    return (description, str(item.get("quantity") or ""), str(item.get("value") or ""))
+
+
+def _drop_overlap_duplicates(
+    items: list[dict],
+    neighbour: list[dict],
+    window: int,
+    neighbour_is_before: bool,
+) -> list[dict]:
+    """
+    Remove items that a neighbouring chunk already reported from the overlap.
+
+    Two chunks share only `window` lines (extraction_overlap_lines), which
+    hold at most `window` items: the end of the earlier chunk and the start
+    of the later one. So only our first `window` items are matched against
+    the previous chunk's last `window` (or our last against the next
+    chunk's first) — the same item listed again elsewhere on the invoice
+    is a real line, not an overlap copy.
+
+    Counts are respected: if an invoice really lists the same thing twice,
+    one neighbour copy only cancels one of them.
+    """
+    if window <= 0 or not items or not neighbour:
+        return items
+    if neighbour_is_before:
+        edge, rest = items[:window], items[window:]
+        remaining = Counter(_item_key(item) for item in neighbour[-window:])
+    else:
+        rest, edge = items[:-window], items[-window:]
+        remaining = Counter(_item_key(item) for item in neighbour[:window])
+
+    kept = []
+    for item in edge:
+        key = _item_key(item)
+        if remaining[key] > 0:
+            remaining[key] -= 1
+            continue
+        kept.append(item)
+    return kept + rest if neighbour_is_before else rest + kept
+
+
+def _in_document_order(chunks: list[ExtractedChunk]) -> list[dict]:
+    return [item for chunk in sorted(chunks, key=lambda c: c.index) for item in chunk.items]
+
+
+async def iter_commodities(pdf_text: str) -> AsyncGenerator[ExtractedChunk, None]:
+    """
+    Extract line items with Claude, one overlapping chunk at a time, concurrently.
+
+    Long invoices used to be cut at 8,000 characters, silently dropping
+    later items. Now the whole text is split (chunk_text), up to
+    extraction_concurrency chunks are sent to Claude at once, and each
+    chunk's items are yielded as soon as its call returns — so latency
+    tracks the slowest chunk, not the document length.
+
+    Items a chunk shares with an adjacent chunk (from the overlap) are
+    yielded only once: whichever chunk finishes second drops them. Only
+    items at the chunks' shared edge are compared.
+
+    The extract stage is the wall time until the last chunk's call
+    returned, like pdf_parse in iter_pdf_pages — the calls overlap.
+    """
+    if not pdf_text.strip():
+        return
+
+    settings = get_settings()
+    chunks = chunk_text(
+        pdf_text, settings.extraction_chunk_chars, settings.extraction_overlap_lines,
+    )
+    total = len(chunks)
+    limit = asyncio.Semaphore(max(settings.extraction_concurrency, 1))
+
+    async def run(index: int, text: str) -> tuple[int, list[dict]]:
+        async with limit:
+            return index, await _extract_chunk(text, index, total)
+
+    started = perf_counter()
+    tasks = [asyncio.ensure_future(run(i, text)) for i, text in enumerate(chunks)]
+    returned: list[float] = []
+    for task in tasks:
+        task.add_done_callback(lambda _: returned.append(perf_counter()))
+    finished: dict[int, list[dict]] = {}
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            index, items = await next_done
+            for neighbour in (index - 1, index + 1):
+                if neighbour in finished:
+                    items = _drop_overlap_duplicates(
+                        items, finished[neighbour], settings.extraction_overlap_lines,
+                        neighbour_is_before=neighbour < index,
+                    )
+            finished[index] = items
+            yield ExtractedChunk(index=index, total=total, items=items)
+    finally:
+        for task in tasks:
+            task.cancel()
+        # Cut short (error, caller stopped reading): up to now
+        ended = max(returned) if len(returned) == total else perf_counter()
+        timing.record("extract", (ended - started) * 1000)
+
+    if total > 1:
+        log.info("commodities_extracted_chunked", chunks=total)
+
+
 async def extract_commodities(pdf_text: str) -> list[dict]:
     """
     Use Claude to identify commodity line items from invoice text.
@@ -64,18 +508,31 @@ async def extract_commodities(pdf_text: str) -> list[dict]:
       - "quantity": how many (if mentioned)
       - "value": dollar amount (if mentioned)
 
+    Long texts are split into chunks extracted concurrently (see
+    iter_commodities); the merged result is in document order.
+
     Example output:
       [
         {"description": "Cotton knitted t-shirts, men's, crew neck", "quantity": "500 pcs", "value": "$2,500"},
         {"description": "Stainless steel hex bolts, M10x40", "quantity": "10,000 pcs", "value": "$850"}
       ]
     """
-    if not pdf_text.strip():
-        return []
+    return _in_document_order([chunk async for chunk in iter_commodities(pdf_text)])
+
 
+async def _extract_chunk(text: str, index: int, total: int) -> list[dict]:
+    """One Claude call: the line items in one chunk of invoice text."""
     settings = get_settings()
     client = _get_anthropic_client()
 
+    part_note = ""
+    if total > 1:
+        part_note = (
+            f"\nThis is part {index + 1} of {total} of a longer invoice. Extract only the "
+            "line items that appear in this part (a line cut off at the very start or "
+            "end of the part can be skipped — the neighbouring part includes it).\n"
+        )
+
     prompt = f"""You are an expert at reading commercial invoices and packing lists.
 
 Extract ALL commodity line items from this invoice text. For each item, provide:
@@ -92,15 +549,15 @@ Example output:
 ]
 
 If no commodity items are found, return an empty array: []
-
+{part_note}
 Invoice text:
 ---
-{pdf_text[:8000]}
+{text}
 ---"""
 
     response = await client.messages.create(
         model=settings.claude_model,
-        max_tokens=2000,
+        max_tokens=4000,
         messages=[{"role": "user", "content": prompt}],
     )
 
@@ -116,8 +573,8 @@ Invoice text:
         if not isinstance(items, list):
             log.warn("claude_returned_non_list", response=response_text[:200])
             return []
-        log.info("commodities_extracted", count=len(items))
+        log.info("commodities_extracted", count=len(items), chunk=index + 1, chunks=total)
         return items
     except json.JSONDecodeError:
         log.error("commodity_extraction_json_error", response=response_text[:200])
-        return []
\ No newline at end of file
+        return []
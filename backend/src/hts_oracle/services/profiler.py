@@ -0,0 +1,212 @@
+"""
+On-demand sampling profiler for live requests.
+
+When p99 climbs, the stage timings (services/timing.py) say which stage
+got slower; this says where the worker's CPU went inside it. A profiled
+request gets a sampler thread that reads the event loop thread's stack
+with sys._current_frames() every profiler_interval_ms, and counts each
+distinct stack. When the request finishes, the counts are written as a
+collapsed-stack file:
+
+    ./profiles/20261018T101500123-post-api_v1_classify-4312-1.collapsed
+        main.py:<module>;...;searcher.py:search_hts;... 17
+        main.py:<module>;...;BaseEventLoop._run_once;selectors.py:EpollSelector.select 212
+
+— one line per stack with its sample count, the input flamegraph.pl and
+speedscope.app take. Time the loop spent waiting on I/O shows up under
+select(). Asyncio runs every request on the same thread, so requests
+in flight at the same time appear in the profile too.
+
+What gets profiled (ProfilerMiddleware, only installed with PROFILER_ENABLED):
+  - a random fraction of requests (sample_rate, switched through the admin API)
+  - any request sent with "X-Profile: 1" and a valid X-Admin-Key
+
+Cost is bounded: one profile at a time per process (others aren't
+profiled), at most profiler_max_seconds per profile, and the oldest files
+are deleted beyond profiler_max_files. Without PROFILER_ENABLED the
+middleware isn't installed at all.
+"""
+
+import itertools
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+
+import structlog
+
+from hts_oracle.config import Settings
+
+log = structlog.get_logger()
+
+SUFFIX = ".collapsed"
+
+# Stacks are cut at this many frames (innermost kept)
+MAX_DEPTH = 128
+
+# Profile file names are built from the request path — keep them tame
+_UNSAFE = re.compile(r"[^A-Za-z0-9_.-]+")
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{os.path.basename(code.co_filename)}:{code.co_qualname}"
+
+
+def collapse(frame, max_depth: int = MAX_DEPTH) -> str:
+    """One stack, root first, as "file.py:func;file.py:func;..."."""
+    labels = []
+    while frame is not None and len(labels) < max_depth:
+        labels.append(_frame_label(frame))
+        frame = frame.f_back
+    return ";".join(reversed(labels))
+
+
+class Sampler(threading.Thread):
+    """Samples one thread's stack at a fixed interval until stopped (or max_seconds)."""
+
+    def __init__(self, thread_id: int, interval: float, max_seconds: float):
+        super().__init__(name="profiler-sampler", daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.max_seconds = max_seconds
+        self.stacks: Counter[str] = Counter()
+        self._stop_event = threading.Event()
+
+    def run(self) -> None:
+        deadline = time.monotonic() + self.max_seconds
+        while not self._stop_event.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                break
+            self.stacks[collapse(frame)] += 1
+            del frame
+            if time.monotonic() >= deadline:
+                break
+
+    def stop(self) -> Counter[str]:
+        self._stop_event.set()
+        self.join()
+        return self.stacks
+
+
+def render(stacks: Counter[str]) -> str:
+    return "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+
+
+@dataclass
+class ProfileInfo:
+    name: str
+    size_bytes: int
+    created_at: datetime
+
+
+class Profiler:
+    """Per-process profiler state: the sampling switch and the profile directory."""
+
+    def __init__(
+        self,
+        directory: str | Path,
+        sample_rate: float = 0.0,
+        interval_ms: float = 5.0,
+        max_seconds: float = 30.0,
+        max_files: int = 200,
+    ):
+        self.directory = Path(directory)
+        self.sample_rate = sample_rate
+        self.interval = interval_ms / 1000
+        self.max_seconds = max_seconds
+        self.max_files = max_files
+        self._busy = threading.Lock()  # One profile at a time
+        self._sequence = itertools.count(1)  # Keeps names unique within a millisecond
+
+    @classmethod
+    def from_settings(cls, settings: Settings) -> "Profiler":
+        return cls(
+            settings.profile_dir,
+            sample_rate=settings.profiler_sample_rate,
+            interval_ms=settings.profiler_interval_ms,
+            max_seconds=settings.profiler_max_seconds,
+            max_files=settings.profiler_max_files,
+        )
+
+    def sampled(self) -> bool:
+        """Whether a request should be profiled by the sampling switch."""
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def start(self, method: str, path: str) -> "ActiveProfile | None":
+        """Start profiling the calling thread. None if another profile is running."""
+        if not self._busy.acquire(blocking=False):
+            return None
+        stamp = datetime.utcnow().strftime("%Y%m%dT%H%M%S%f")[:-3]
+        route = _UNSAFE.sub("_", path.strip("/")) or "root"
+        name = f"{stamp}-{method.lower()}-{route[:80]}-{os.getpid()}-{next(self._sequence)}{SUFFIX}"
+        sampler = Sampler(threading.get_ident(), self.interval, self.max_seconds)
+        sampler.start()
+        return ActiveProfile(self, name, sampler)
+
+    def _finish(self, profile: "ActiveProfile") -> None:
+        try:
+            stacks = profile.sampler.stop()
+            self.directory.mkdir(parents=True, exist_ok=True)
+            (self.directory / profile.name).write_text(render(stacks))
+            self.prune()
+            log.info("request_profiled", profile=profile.name, samples=sum(stacks.values()))
+        except Exception as e:
+            log.warn("profile_write_failed", profile=profile.name, error=str(e))
+        finally:
+            self._busy.release()
+
+    def prune(self) -> int:
+        """Delete the oldest profiles beyond max_files."""
+        files = sorted(self.directory.glob(f"*{SUFFIX}"), key=lambda p: p.stat().st_mtime)
+        stale = files[:max(len(files) - self.max_files, 0)]
+        for path in stale:
+            path.unlink(missing_ok=True)
+        return len(stale)
+
+    def list_profiles(self) -> list[ProfileInfo]:
+        """Stored profiles, newest first."""
+        if not self.directory.is_dir():
+            return []
+        infos = []
+        for path in self.directory.glob(f"*{SUFFIX}"):
+            stat = path.stat()
+            created = datetime.utcfromtimestamp(stat.st_mtime)
+            infos.append(ProfileInfo(path.name, stat.st_size, created))
+        return sorted(infos, key=lambda info: info.created_at, reverse=True)
+
+    def path_for(self, name: str) -> Path | None:
+        """The file for a profile name from the API — None unless it's one of ours."""
+        if not name.endswith(SUFFIX) or _UNSAFE.search(name) or name.startswith("."):
+            return None
+        path = self.directory / name
+        return path if path.is_file() else None
+
+
+@dataclass
+class ActiveProfile:
+    profiler: Profiler
+    name: str
+    sampler: Sampler
+
+    def finish(self) -> None:
+        """Stop sampling and write the profile (blocks for the file write only)."""
+        self.profiler._finish(self)
+
+
+_profiler: Profiler | None = None
+
+
+def get_profiler(settings: Settings) -> Profiler:
+    """This process's profiler (created on first use)."""
+    global _profiler
+    if _profiler is None:
+        _profiler = Profiler.from_settings(settings)
+    return _profiler
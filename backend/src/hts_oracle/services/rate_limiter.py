@@ -0,0 +1,391 @@
+"""
+Rate limiting — sliding-window counters with pluggable storage.
+
+Each client key (IP + route group) keeps just two counters: requests in
+the current fixed window and in the previous one. The previous window is
+weighted by how much of it still overlaps the sliding window:
+
+    estimate = previous × (1 − elapsed/window) + current
+
+That's O(1) time and memory per request (the old limiter kept and
+re-filtered a list of every timestamp in the window), and it tracks a
+true sliding window closely without its cost.
+
+Backends (RATE_LIMIT_BACKEND):
+  - "memory":   a dict in this process. Idle keys are swept periodically
+                and the dict is capped at rate_limit_max_keys.
+  - "shared":   a fixed-size table in a memory-mapped file (/dev/shm by
+                default), locked with flock — shared by every worker
+                process on one host, bounded by construction.
+  - "postgres": an UNLOGGED counters table — shared by every node.
+                One upsert per request; old windows are deleted periodically.
+
+Limits are written "N/second|minute|hour" or "N/<seconds>s". Per-route
+limits match on path prefix (longest wins); other paths use the default.
+"""
+
+import asyncio
+import hashlib
+import math
+import mmap
+import os
+import struct
+import time
+from dataclasses import dataclass
+from pathlib import Path
+
+import structlog
+from sqlalchemy import text
+
+from hts_oracle.config import Settings
+from hts_oracle.db import get_session_factory
+
+log = structlog.get_logger()
+
+_UNITS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+
+
+@dataclass(frozen=True)
+class RateLimit:
+    requests: int
+    window_seconds: int
+
+    def __str__(self) -> str:
+        return f"{self.requests}/{self.window_seconds}s"
+
+
+def parse_limit(spec: str) -> RateLimit:
+    """ "60/minute" → RateLimit(60, 60); "10/30s" → RateLimit(10, 30)."""
+    try:
+        count, period = spec.strip().split("/", 1)
+        period = period.strip().lower()
+        if period.endswith("s") and period[:-1].isdigit():
+            seconds = int(period[:-1])
+        else:
+            seconds = _UNITS[period[:-1] if period[:-1] in _UNITS else period]  # "minutes" too
+        limit = RateLimit(int(count), seconds)
+    except (ValueError, KeyError):
+        raise ValueError(f"Invalid rate limit {spec!r} (expected e.g. '60/minute' or '10/30s')")
+    if limit.requests < 1 or limit.window_seconds < 1:
+        raise ValueError(f"Invalid rate limit {spec!r}")
+    return limit
+
+
+@dataclass(frozen=True)
+class Decision:
+    allowed: bool
+    limit: int
+    remaining: int
+    retry_after: float  # Seconds until a request would be allowed (0 if allowed)
+
+
+def sliding_window(previous: int, current: int, limit: RateLimit, now: float) -> Decision:
+    """Decide one request given the two window counters (before counting it)."""
+    window = limit.window_seconds
+    elapsed = (now % window) / window
+    estimate = previous * (1 - elapsed) + current
+
+    if estimate + 1 <= limit.requests:
+        return Decision(True, limit.requests, int(limit.requests - estimate - 1), 0.0)
+
+    if current + 1 > limit.requests or previous == 0:
+        # Even with the previous window fully decayed this one is full
+        retry = window - now % window
+    else:
+        # Wait for the previous window's weight to decay enough:
+        # previous × (1 − t) + current + 1 ≤ limit
+        fraction = 1 - (limit.requests - current - 1) / previous
+        retry = (fraction - elapsed) * window
+    return Decision(False, limit.requests, 0, max(retry, 0.0))
+
+
+def _roll(window: int, current: int, previous: int, now_window: int) -> tuple[int, int]:
+    """(previous, current) counters as of `now_window`."""
+    if window == now_window:
+        return previous, current
+    if window == now_window - 1:
+        return current, 0
+    return 0, 0
+
+
+# ---------------------------------------------------------------------------
+# Backends
+# ---------------------------------------------------------------------------
+
+class MemoryBackend:
+    """Per-process counters in a dict, with periodic sweeps of idle keys."""
+
+    def __init__(self, max_keys: int = 100_000, sweep_seconds: float = 60.0, clock=time.time):
+        self.max_keys = max_keys
+        self.sweep_seconds = sweep_seconds
+        self._clock = clock
+        # key → [window index, current count, previous count, window seconds]
+        self._counters: dict[str, list[int]] = {}
+        self._last_sweep = clock()
+
+    async def hit(self, key: str, limit: RateLimit) -> Decision:
+        now = self._clock()
+        if now - self._last_sweep >= self.sweep_seconds or len(self._counters) >= self.max_keys:
+            self.sweep(now)
+
+        now_window = int(now // limit.window_seconds)
+        entry = self._counters.get(key)
+        previous, current = (
+            _roll(entry[0], entry[1], entry[2], now_window) if entry else (0, 0)
+        )
+        decision = sliding_window(previous, current, limit, now)
+        if decision.allowed:
+            current += 1
+        self._counters[key] = [now_window, current, previous, limit.window_seconds]
+        return decision
+
+    def sweep(self, now: float) -> int:
+        """Drop keys idle for two windows (their counters are zero anyway)."""
+        self._last_sweep = now
+        idle = [
+            key for key, (window, _, _, seconds) in self._counters.items()
+            if window < int(now // seconds) - 1
+        ]
+        for key in idle:
+            del self._counters[key]
+        # Still at the cap: drop the oldest-inserted tenth, so a flood of
+        # new clients doesn't make every request pay for a sweep
+        overflow = len(self._counters) - int(self.max_keys * 0.9)
+        if overflow > 0:
+            for key in list(self._counters)[:overflow]:
+                del self._counters[key]
+        return len(idle)
+
+    def __len__(self) -> int:
+        return len(self._counters)
+
+
+class SharedMemoryBackend:
+    """
+    Counters in a memory-mapped file, shared by all processes on the host.
+
+    The file is a fixed open-addressed hash table — `slots` entries of
+    (key hash, window, current, previous, window seconds). A key probes
+    PROBES slots from its hash; a slot whose window is two or more of its
+    own windows behind is free for reuse, so idle keys are evicted simply
+    by being overwritten. If every probed slot is live, the one whose
+    window ended first is taken. Route limits can have different periods,
+    so slots are compared in seconds, never by raw window index.
+
+    An exclusive flock guards each read-modify-write; the critical section
+    is a few struct unpacks, far below a millisecond. The lock is taken
+    non-blocking: if another worker holds it, hit() sleeps LOCK_RETRY_SECONDS
+    and tries again, so the event loop is never stuck in flock().
+    """
+
+    SLOT = struct.Struct("<QqIII")  # key hash, window index, current, previous, window seconds
+    PROBES = 8
+    LOCK_RETRY_SECONDS = 0.0005
+
+    def __init__(self, path: str | Path, slots: int = 65_536, clock=time.time):
+        import fcntl  # POSIX only — the shared backend is for Linux hosts
+
+        self._fcntl = fcntl
+        self.slots = slots
+        self._clock = clock
+        size = slots * self.SLOT.size
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            if os.fstat(fd).st_size != size:
+                # New table, or resized by config / an older slot layout: start zeroed
+                os.ftruncate(fd, 0)
+                os.ftruncate(fd, size)
+            fcntl.flock(fd, fcntl.LOCK_UN)
+            self._map = mmap.mmap(fd, size)
+        except BaseException:
+            os.close(fd)
+            raise
+        self._fd = fd
+
+    @staticmethod
+    def _hash(key: str) -> int:
+        return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "little") or 1
+
+    async def hit(self, key: str, limit: RateLimit) -> Decision:
+        now = self._clock()
+        now_window = int(now // limit.window_seconds)
+        key_hash = self._hash(key)
+        start = key_hash % self.slots
+
+        await self._lock()
+        try:
+            chosen, oldest, oldest_end = None, None, None
+            entry = None
+            for probe in range(self.PROBES):
+                slot = (start + probe) % self.slots
+                stored_hash, window, current, previous, seconds = self.SLOT.unpack_from(
+                    self._map, slot * self.SLOT.size,
+                )
+                if stored_hash == key_hash:
+                    chosen = slot
+                    if seconds == limit.window_seconds:  # Else the limit changed: start over
+                        entry = (window, current, previous)
+                    break
+                if stored_hash == 0 or window < int(now // seconds) - 1:
+                    if chosen is None:
+                        chosen = slot  # Empty or idle — reusable
+                    continue
+                end = (window + 1) * seconds
+                if oldest_end is None or end < oldest_end:
+                    oldest, oldest_end = slot, end
+            if chosen is None:
+                chosen = oldest
+
+            previous, current = _roll(*entry, now_window) if entry else (0, 0)
+            decision = sliding_window(previous, current, limit, now)
+            if decision.allowed:
+                current += 1
+            self.SLOT.pack_into(
+                self._map, chosen * self.SLOT.size,
+                key_hash, now_window, current, previous, limit.window_seconds,
+            )
+        finally:
+            self._fcntl.flock(self._fd, self._fcntl.LOCK_UN)
+        return decision
+
+    async def _lock(self) -> None:
+        while True:
+            try:
+                self._fcntl.flock(self._fd, self._fcntl.LOCK_EX | self._fcntl.LOCK_NB)
+                return
+            except BlockingIOError:
+                await asyncio.sleep(self.LOCK_RETRY_SECONDS)
+
+    def close(self) -> None:
+        self._map.close()
+        os.close(self._fd)
+
+
+class PostgresBackend:
+    """
+    Counters in the rate_limit_counters table, shared by every node.
+
+    One statement per request: the upsert increments the current window
+    only while the sliding estimate (using the previous window's count)
+    is under the limit. No row back = rejected. Errors fail open — a
+    database hiccup shouldn't take the API down with it.
+    """
+
+    _HIT = text("""
+        INSERT INTO rate_limit_counters AS c (key, window_start, count)
+        SELECT :key, :window, 1
+        WHERE coalesce(
+            (SELECT count FROM rate_limit_counters WHERE key = :key AND window_start = :prev), 0
+        ) * :weight + 1 <= :limit
+        ON CONFLICT (key, window_start) DO UPDATE SET count = c.count + 1
+        WHERE coalesce(
+            (SELECT count FROM rate_limit_counters WHERE key = :key AND window_start = :prev), 0
+        ) * :weight + c.count + 1 <= :limit
+        RETURNING count
+    """)
+
+    def __init__(self, sweep_seconds: float = 300.0, clock=time.time):
+        self.sweep_seconds = sweep_seconds
+        self._clock = clock
+        self._last_sweep = clock()
+
+    async def hit(self, key: str, limit: RateLimit) -> Decision:
+        now = self._clock()
+        window = limit.window_seconds
+        now_window = int(now // window)
+        weight = 1 - (now % window) / window
+        try:
+            async with get_session_factory()() as db:
+                count = await db.scalar(self._HIT, {
+                    "key": key,
+                    "window": now_window * window,
+                    "prev": (now_window - 1) * window,
+                    "weight": weight,
+                    "limit": limit.requests,
+                })
+                if now - self._last_sweep >= self.sweep_seconds:
+                    self._last_sweep = now
+                    # Anything older than a day can't matter to any limit we use
+                    await db.execute(
+                        text("DELETE FROM rate_limit_counters WHERE window_start < :cutoff"),
+                        {"cutoff": int(now) - 86400},
+                    )
+                await db.commit()
+        except Exception as e:
+            log.warn("rate_limit_backend_error", error=str(e))
+            return Decision(True, limit.requests, limit.requests, 0.0)
+
+        if count is None:
+            return Decision(False, limit.requests, 0, window - now % window)
+        return Decision(True, limit.requests, max(limit.requests - count, 0), 0.0)
+
+
+# ---------------------------------------------------------------------------
+# The limiter the middleware uses
+# ---------------------------------------------------------------------------
+
+class RateLimiter:
+    """
+    Picks the limit for a path and checks it against the backend.
+
+    Each route group counts separately: a client's uploads don't use up
+    its classify budget. Exempt paths (health checks) are never limited.
+    """
+
+    def __init__(
+        self,
+        backend,
+        default: RateLimit,
+        routes: dict[str, RateLimit] | None = None,
+        exempt: tuple[str, ...] = (),
+    ):
+        self.backend = backend
+        self.default = default
+        # Longest prefix first, so /api/v1/batch/upload beats /api/v1/batch
+        self.routes = sorted((routes or {}).items(), key=lambda item: -len(item[0]))
+        self.exempt = exempt
+
+    def limit_for(self, path: str) -> tuple[str, RateLimit] | None:
+        """(route group, limit) for a path — None if it's exempt."""
+        if any(path.startswith(prefix) or path.endswith(prefix) for prefix in self.exempt):
+            return None
+        for prefix, limit in self.routes:
+            if path.startswith(prefix):
+                return prefix, limit
+        return "*", self.default
+
+    async def check(self, client: str, path: str) -> Decision | None:
+        """The decision for this request, or None if the path isn't limited."""
+        match = self.limit_for(path)
+        if match is None:
+            return None
+        group, limit = match
+        return await self.backend.hit(f"{group}|{client}", limit)
+
+
+def build_rate_limiter(settings: Settings) -> RateLimiter:
+    """The limiter described by the RATE_LIMIT_* settings."""
+    if settings.rate_limit_backend == "memory":
+        backend = MemoryBackend(max_keys=settings.rate_limit_max_keys)
+    elif settings.rate_limit_backend == "shared":
+        backend = SharedMemoryBackend(
+            settings.rate_limit_shared_path, slots=settings.rate_limit_shared_slots,
+        )
+    elif settings.rate_limit_backend == "postgres":
+        backend = PostgresBackend()
+    else:
+        raise ValueError(f"Unknown RATE_LIMIT_BACKEND: {settings.rate_limit_backend!r}")
+
+    return RateLimiter(
+        backend,
+        default=parse_limit(settings.rate_limit_default),
+        routes={
+            prefix: parse_limit(spec) for prefix, spec in settings.rate_limit_route_map.items()
+        },
+        exempt=tuple(settings.rate_limit_exempt_list),
+    )
+
+
+def retry_after_header(decision: Decision) -> str:
+    return str(max(math.ceil(decision.retry_after), 1))
@@ -12,6 +12,9 @@ How it works:
 
 pgvector's <=> operator computes cosine DISTANCE (0 = identical, 2 = opposite).
 We convert to similarity (1 - distance) so higher = better match.
+
+Searches read the active catalog revision's table (services/catalog.py),
+which the catalog watcher switches when a new revision is activated.
 """
 
 import structlog
@@ -20,7 +23,9 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from hts_oracle.config import get_settings
 from hts_oracle.models.hts_code import HtsCode
+from hts_oracle.services import catalog
 from hts_oracle.services.embedder import embed_text
+from hts_oracle.services.timing import span
 
 log = structlog.get_logger()
 
@@ -109,17 +114,21 @@ async def search_hts(
         "SELECT id, hts_number, description, enhanced_description, enriched_text, "
         "context_path, chapter, is_leaf, general_rate, special_rate, unit, "
         "(embedding <=> cast(:qvec as vector)) AS distance "
-        "FROM hts_codes "
+        f"FROM {catalog.active_table()} "
         "WHERE embedding IS NOT NULL AND is_leaf = true "
         "ORDER BY embedding <=> cast(:qvec as vector) "
         "LIMIT :lim"
     )
 
-    result = await db.execute(
-        stmt,
-        {"qvec": vector_str, "lim": fetch_count},
-    )
-    rows = result.fetchall()
+    with span("search"):
+        if settings.hnsw_ef_search:
+            # SET LOCAL lasts until the end of this transaction only
+            await db.execute(text(f"SET LOCAL hnsw.ef_search = {int(settings.hnsw_ef_search)}"))
+        result = await db.execute(
+            stmt,
+            {"qvec": vector_str, "lim": fetch_count},
+        )
+        rows = result.fetchall()
 
     if not rows:
         log.warn("no_search_results", query=query[:100])
@@ -0,0 +1,283 @@
+"""
+Structured invoice files (CSV / XLSX / JSON) → line items, no PDF or LLM needed.
+
+ERP exports already have one row per line item. For those, the two most
+expensive batch phases — PDF parsing and Claude extraction — are pure
+overhead: we just need to know which column is which.
+
+Columns are found one of two ways:
+  - An explicit column map from the upload, naming the file's column for
+    each role:   {"description": "Part Desc", "quantity": "Qty", "value": "Ext Amt"}
+  - Otherwise, the same header vocabulary the PDF table extractor uses
+    (table_extractor.match_header) — "Description", "Qty", "Amount", ...
+
+CSV and XLSX rows are read one at a time (csv.reader over the file,
+openpyxl in read-only mode), so a large export never has to be loaded
+whole. JSON is the exception: the document is parsed in one go, so its
+memory is bounded only by the upload size limit. Every format stops at
+max_items line items with a StructuredFileError. The output items have
+the extract_commodities() shape:
+    {"description": ..., "quantity": ..., "value": ...}
+
+XLSX needs the optional openpyxl dependency:  pip install -e ".[xlsx]"
+"""
+
+import csv
+import io
+import json
+from collections.abc import Iterable, Iterator
+
+from hts_oracle.services.table_extractor import match_header
+
+# Upload formats this module reads (the job's source_format)
+STRUCTURED_FORMATS = ("csv", "xlsx", "json")
+
+# Roles a column map can name. "value" is the line total.
+COLUMN_ROLES = ("description", "quantity", "unit", "value")
+
+# How many leading rows to search for the header (titles sometimes come first)
+HEADER_SEARCH_ROWS = 10
+
+
+class StructuredFileError(ValueError):
+    """The file can't be read as line items — the message is shown to the user."""
+
+
+def format_for_filename(filename: str) -> str | None:
+    """ "orders.CSV" → "csv"; None for anything that isn't a structured format."""
+    extension = filename.rsplit(".", 1)[-1].lower() if "." in filename else ""
+    return extension if extension in STRUCTURED_FORMATS else None
+
+
+def xlsx_supported() -> bool:
+    try:
+        import openpyxl  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def parse_column_map(raw: str | None) -> dict[str, str] | None:
+    """
+    Validate the upload's column_map form field (a JSON object).
+
+    Keys must be roles from COLUMN_ROLES; values are the file's column
+    names. "description" is required — it's the only column we can't
+    classify without.
+    """
+    if not raw:
+        return None
+    try:
+        column_map = json.loads(raw)
+    except json.JSONDecodeError:
+        raise StructuredFileError("column_map must be a JSON object")
+    if not isinstance(column_map, dict) or not column_map:
+        raise StructuredFileError("column_map must be a JSON object")
+
+    unknown = set(column_map) - set(COLUMN_ROLES)
+    if unknown:
+        raise StructuredFileError(
+            f"Unknown column_map roles: {', '.join(sorted(unknown))} "
+            f"(expected: {', '.join(COLUMN_ROLES)})"
+        )
+    if "description" not in column_map:
+        raise StructuredFileError("column_map must name the description column")
+    if not all(isinstance(v, str) and v.strip() for v in column_map.values()):
+        raise StructuredFileError("column_map values must be column names")
+    return {role: name.strip() for role, name in column_map.items()}
+
+
+# ---------------------------------------------------------------------------
+# Column resolution
+# ---------------------------------------------------------------------------
+
+def _cell_text(value) -> str:
+    """Spreadsheet cells can be numbers, dates or None — make them text."""
+    if value is None:
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)  # 500.0 from Excel → "500"
+    return " ".join(str(value).split())
+
+
+def _normalize(name: str) -> str:
+    return " ".join(name.lower().split())
+
+
+def resolve_columns(header: list[str], column_map: dict[str, str] | None) -> dict[str, int] | None:
+    """
+    Map roles to column indexes for this header row, or None if it isn't one.
+
+    With a column map every mapped column must be present. Without one,
+    the header has to look like a line-item header to match_header().
+    """
+    if column_map:
+        positions = {_normalize(name): i for i, name in enumerate(header) if name}
+        roles = {}
+        for role, name in column_map.items():
+            if _normalize(name) not in positions:
+                return None
+            roles[role] = positions[_normalize(name)]
+        return roles
+
+    found = match_header(header)
+    if found is None:
+        return None
+    roles = {role: found[role] for role in ("description", "quantity", "unit") if role in found}
+    if "amount" in found:
+        roles["value"] = found["amount"]
+    return roles
+
+
+def rows_to_items(
+    rows: Iterable[list],
+    column_map: dict[str, str] | None = None,
+    max_items: int | None = None,
+) -> Iterator[dict]:
+    """
+    Turn raw rows (header first, somewhere in the first few rows) into items.
+
+    Rows without a description are skipped. Raises StructuredFileError if
+    no header row is found, or on line item max_items + 1.
+    """
+    roles = None
+    searched: list[list[str]] = []
+    count = 0
+
+    for raw in rows:
+        row = [_cell_text(cell) for cell in raw]
+
+        if roles is None:
+            roles = resolve_columns(row, column_map)
+            if roles is None:
+                searched.append(row)
+                if len(searched) >= HEADER_SEARCH_ROWS:
+                    break
+            continue
+
+        def cell(role: str) -> str:
+            index = roles.get(role)
+            return row[index] if index is not None and index < len(row) else ""
+
+        description = cell("description")
+        if not description:
+            continue
+        count += 1
+        if max_items is not None and count > max_items:
+            raise StructuredFileError(
+                f"File has more than {max_items} line items — split it into smaller uploads"
+            )
+        quantity = cell("quantity")
+        if quantity and cell("unit"):
+            quantity = f"{quantity} {cell('unit')}"
+        yield {
+            "description": description,
+            "quantity": quantity or None,
+            "value": cell("value") or None,
+        }
+
+    if roles is None:
+        if column_map:
+            wanted = ", ".join(f'"{name}"' for name in column_map.values())
+            raise StructuredFileError(f"No header row with the mapped columns ({wanted}) found")
+        raise StructuredFileError(
+            "No line-item header found — name the columns with column_map "
+            '(e.g. {"description": "Item", "quantity": "Qty", "value": "Total"})'
+        )
+
+
+# ---------------------------------------------------------------------------
+# Readers — one per format, each yielding rows as lists of cells
+# ---------------------------------------------------------------------------
+
+def _open_binary(source: bytes | str):
+    return io.BytesIO(source) if isinstance(source, bytes) else open(source, "rb")
+
+
+def _iter_csv(source: bytes | str) -> Iterator[list]:
+    with _open_binary(source) as raw:
+        # utf-8-sig drops the BOM Excel puts on "CSV UTF-8" exports
+        text = io.TextIOWrapper(raw, encoding="utf-8-sig", errors="replace", newline="")
+        sample = text.read(8192)
+        text.seek(0)
+        try:
+            dialect = csv.Sniffer().sniff(sample, delimiters=",;\t|")
+        except csv.Error:
+            dialect = csv.excel
+        yield from csv.reader(text, dialect)
+
+
+def _iter_xlsx(source: bytes | str) -> Iterator[list]:
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise StructuredFileError("XLSX uploads need openpyxl (pip install -e \".[xlsx]\")")
+
+    with _open_binary(source) as raw:
+        try:
+            workbook = load_workbook(raw, read_only=True, data_only=True)
+        except Exception:
+            raise StructuredFileError("File does not appear to be a valid XLSX workbook")
+        try:
+            # First sheet only — exports put the line items there
+            yield from workbook.worksheets[0].iter_rows(values_only=True)
+        finally:
+            workbook.close()
+
+
+def _iter_json(source: bytes | str) -> Iterator[list]:
+    """
+    A JSON array of objects (or {"items": [...]}) → header row + value rows.
+
+    The header is the union of keys, in first-seen order, so objects with
+    missing optional fields still line up. Unlike the other readers this
+    loads the whole document first (json has no incremental parser).
+    """
+    with _open_binary(source) as raw:
+        try:
+            data = json.load(raw)
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            raise StructuredFileError("File is not valid JSON")
+
+    if isinstance(data, dict):
+        data = data.get("items", data.get("line_items"))
+    if not isinstance(data, list) or not all(isinstance(row, dict) for row in data):
+        raise StructuredFileError('JSON must be an array of objects (or {"items": [...]})')
+
+    keys: dict[str, None] = {}
+    for row in data:
+        keys.update(dict.fromkeys(row))
+    header = list(keys)
+    yield header
+    for row in data:
+        yield [row.get(key) for key in header]
+
+
+_READERS = {"csv": _iter_csv, "xlsx": _iter_xlsx, "json": _iter_json}
+
+
+def iter_structured_items(
+    source: bytes | str,
+    source_format: str,
+    column_map: dict[str, str] | None = None,
+    max_items: int | None = None,
+) -> Iterator[dict]:
+    """
+    Line items from a structured file, one row at a time.
+
+    `source` is the file's bytes or a path (the local blob store passes
+    paths). Blocking — run it in a thread from async code.
+    """
+    if source_format not in _READERS:
+        raise StructuredFileError(f"Unsupported format: {source_format}")
+    return rows_to_items(_READERS[source_format](source), column_map, max_items)
+
+
+def read_structured_items(
+    source: bytes | str,
+    source_format: str,
+    column_map: dict[str, str] | None = None,
+    max_items: int | None = None,
+) -> list[dict]:
+    """All items from iter_structured_items() (for asyncio.to_thread)."""
+    return list(iter_structured_items(source, source_format, column_map, max_items))
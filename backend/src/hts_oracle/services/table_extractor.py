@@ -0,0 +1,261 @@
+"""
+Rule-based line-item extraction from invoice tables — the fast path before Claude.
+
+Many commercial invoices are a clean table:
+
+    Description              | Qty  | Unit Price | Amount
+    Cotton t-shirts, men's   | 500  | $5.00      | $2,500.00
+    Steel hex bolts M10x40   | 10000| $0.085     | $850.00
+                             |      | TOTAL      | $3,350.00
+
+For those, pdfplumber's table detection plus a few column-header rules
+gets the line items exactly, in milliseconds, for free. Claude is only
+needed when no table looks like a line-item table.
+
+The extractor scores its own confidence (0-1). The caller uses the table
+result only above table_extraction_min_confidence, so a shaky parse never
+replaces the LLM — it just falls through to it.
+
+Everything here is pure Python on already-extracted cell text, so it's
+cheap to run and easy to test against a corpus (tests/fixtures/invoice_tables/).
+"""
+
+import re
+from dataclasses import dataclass, field
+
+# ---------------------------------------------------------------------------
+# Column header vocabulary
+# ---------------------------------------------------------------------------
+# Each role maps to header phrases seen on real invoices. Matching is done on
+# a normalized header (lowercase, punctuation → spaces), so "Unit Price (USD)"
+# matches "unit price". When several phrases match, the longest one wins.
+
+HEADER_KEYWORDS: dict[str, tuple[str, ...]] = {
+    "description": (
+        "description of goods", "goods description", "item description",
+        "product description", "description", "commodity", "particulars",
+        "product", "goods", "article", "desc",
+    ),
+    "quantity": ("quantity", "qty", "pcs", "pieces", "units shipped"),
+    "unit": ("unit of measure", "uom", "u m", "unit"),
+    "unit_price": (
+        "unit price", "unit cost", "unit value", "price per unit", "price unit",
+        "u price", "price", "rate",
+    ),
+    "amount": (
+        "line total", "total amount", "total value", "total price",
+        "extended price", "ext price", "amount", "total", "value", "extension",
+    ),
+}
+
+# Short rows starting with one of these are summary rows, not items
+SUMMARY_PREFIXES = (
+    "total", "subtotal", "sub total", "grand total", "freight", "shipping",
+    "insurance", "tax", "vat", "discount", "balance", "amount due",
+)
+
+_NUMBER_RE = re.compile(r"-?\d[\d,]*(?:\.\d+)?")
+
+
+@dataclass
+class TableExtraction:
+    """Result of trying to read line items from a PDF's tables."""
+    items: list[dict] = field(default_factory=list)
+    confidence: float = 0.0
+    reason: str = ""        # Why confidence is what it is (for logs)
+
+
+# ---------------------------------------------------------------------------
+# Cell helpers
+# ---------------------------------------------------------------------------
+
+def _clean(cell) -> str:
+    """pdfplumber cells can be None or contain wrapped lines — flatten them."""
+    if cell is None:
+        return ""
+    return " ".join(str(cell).split())
+
+
+def _normalize_header(text: str) -> str:
+    return " ".join(re.sub(r"[^a-z0-9]+", " ", text.lower()).split())
+
+
+def parse_number(text: str) -> float | None:
+    """
+    The first number in a cell: "$2,500.00" → 2500.0, "500 pcs" → 500.0.
+
+    Returns None when the cell has no number.
+    """
+    match = _NUMBER_RE.search(text)
+    if not match:
+        return None
+    try:
+        return float(match.group().replace(",", ""))
+    except ValueError:
+        return None
+
+
+# ---------------------------------------------------------------------------
+# Header detection
+# ---------------------------------------------------------------------------
+
+def match_header(row: list[str]) -> dict[str, int] | None:
+    """
+    Map column roles to indexes if `row` looks like a line-item header.
+
+    A header needs a description column plus at least one of quantity /
+    unit_price / amount. Each column gets at most one role, and each role
+    the first column that matches it best.
+    """
+    roles: dict[str, int] = {}
+    for index, cell in enumerate(row):
+        header = _normalize_header(cell)
+        if not header or len(header) > 40:
+            continue  # Blank, or a sentence rather than a column heading
+
+        # The longest matching phrase wins, so "Unit Price" is unit_price
+        # (not unit) and "Total Amount" is amount (not a summary row).
+        best_role, best_len = None, 0
+        for role, phrases in HEADER_KEYWORDS.items():
+            if role in roles:
+                continue
+            for phrase in phrases:
+                if len(phrase) > best_len and (
+                    header == phrase
+                    or header.startswith(phrase + " ")
+                    or header.endswith(" " + phrase)
+                ):
+                    best_role, best_len = role, len(phrase)
+        if best_role:
+            roles[best_role] = index
+
+    if "description" not in roles:
+        return None
+    if not roles.keys() & {"quantity", "unit_price", "amount"}:
+        return None
+    return roles
+
+
+# ---------------------------------------------------------------------------
+# Table → items
+# ---------------------------------------------------------------------------
+
+def _is_summary_row(row: list[str], roles: dict[str, int]) -> bool:
+    description = row[roles["description"]] if roles["description"] < len(row) else ""
+    text = _normalize_header(description or " ".join(row))
+    # "Total", "Grand Total USD" — but not "Tax-free cotton blend shirts, men's"
+    if len(text.split()) > 4:
+        return False
+    return any(text == prefix or text.startswith(prefix + " ") for prefix in SUMMARY_PREFIXES)
+
+
+def _parse_rows(rows: list[list[str]], roles: dict[str, int]) -> tuple[list[dict], int, int]:
+    """
+    Turn data rows into items.
+
+    Returns (items, numeric_cells_expected, numeric_cells_ok) — the counts
+    feed the confidence score.
+    """
+    def cell(row: list[str], role: str) -> str:
+        index = roles.get(role)
+        return row[index] if index is not None and index < len(row) else ""
+
+    numeric_roles = [r for r in ("quantity", "unit_price", "amount") if r in roles]
+    items: list[dict] = []
+    expected = ok = 0
+
+    for row in rows:
+        if not any(row):
+            continue
+        if _is_summary_row(row, roles):
+            continue
+
+        description = cell(row, "description")
+        has_numbers = any(cell(row, role) for role in numeric_roles)
+
+        if description and not has_numbers and items:
+            # Wrapped description continuing the previous line item
+            items[-1]["description"] += " " + description
+            continue
+        if not description:
+            continue
+
+        for role in numeric_roles:
+            expected += 1
+            if parse_number(cell(row, role)) is not None:
+                ok += 1
+
+        quantity = cell(row, "quantity")
+        unit = cell(row, "unit")
+        if quantity and unit:
+            quantity = f"{quantity} {unit}"
+
+        items.append({
+            "description": description,
+            "quantity": quantity or None,
+            "value": cell(row, "amount") or None,
+        })
+
+    return items, expected, ok
+
+
+def extract_from_tables(tables: list[list[list]]) -> TableExtraction:
+    """
+    Read line items from pdfplumber tables (page order), scoring confidence.
+
+    Tables without their own header row are treated as continuations of
+    the previous line-item table when they have the same column count —
+    that's how multi-page invoices usually come out of pdfplumber.
+    """
+    items: list[dict] = []
+    expected = ok = 0
+    header_strength = 0.0
+    roles: dict[str, int] | None = None
+    width = 0
+
+    for raw_table in tables:
+        table = [[_clean(c) for c in row] for row in raw_table if row]
+        if not table:
+            continue
+
+        # Look for a header in the first few rows (titles sometimes come first)
+        found = None
+        for offset, row in enumerate(table[:4]):
+            found = match_header(row)
+            if found:
+                roles, width = found, len(row)
+                data_rows = table[offset + 1:]
+                # 3 numeric roles recognised = strongest header signal
+                numeric = len(found.keys() & {"quantity", "unit_price", "amount"})
+                header_strength = max(header_strength, 0.6 + 0.4 * numeric / 3)
+                break
+
+        if not found:
+            if roles is None or len(table[0]) != width:
+                continue  # Not a line-item table (addresses, terms, ...)
+            data_rows = table
+
+        table_items, table_expected, table_ok = _parse_rows(data_rows, roles)
+        items.extend(table_items)
+        expected += table_expected
+        ok += table_ok
+
+    if roles is None:
+        return TableExtraction(reason="no line-item header found")
+    if not items:
+        return TableExtraction(reason="header found but no item rows")
+
+    # --- Confidence ---
+    # header:   how clearly the columns were identified
+    # numeric:  share of qty/price/amount cells that actually hold numbers
+    # text:     share of descriptions that read like products (letters, not just codes)
+    numeric_ratio = ok / expected if expected else 0.0
+    wordy = sum(1 for item in items if len(re.findall(r"[A-Za-z]{2,}", item["description"])) >= 1)
+    text_ratio = wordy / len(items)
+
+    confidence = 0.4 * header_strength + 0.4 * numeric_ratio + 0.2 * text_ratio
+    return TableExtraction(
+        items=items,
+        confidence=round(confidence, 3),
+        reason=f"header={header_strength:.2f} numeric={numeric_ratio:.2f} text={text_ratio:.2f}",
+    )
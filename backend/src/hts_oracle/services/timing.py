@@ -0,0 +1,90 @@
+"""
+Stage timing spans — where a request's time goes.
+
+    with span("embed"):
+        response = await client.embeddings.create(...)
+
+Each span adds its duration (milliseconds) to the current request's
+stage timings and to that stage's /metrics histogram. The request's
+timings are a plain dict held in a context variable:
+
+  - TimingMiddleware starts one per HTTP request and sends it back as a
+    Server-Timing header (visible in the browser's network panel)
+  - classify() collects its own and stores them on the classification row
+
+A stage that runs more than once in a request (two Claude calls) reports
+the sum of its spans. Work that runs concurrently should be timed once
+around the whole of it (or passed to record()), not per task — parallel
+spans would add up to more than the wall time.
+
+A span is two perf_counter() calls, a dict update and a histogram
+bisect — a few microseconds, next to stages that take milliseconds.
+"""
+
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from time import perf_counter
+
+from hts_oracle.services import metrics
+
+_timings: ContextVar[dict[str, float] | None] = ContextVar("stage_timings", default=None)
+
+
+def record(name: str, ms: float) -> None:
+    """Add `ms` to stage `name` in the current collection and its histogram."""
+    timings = _timings.get()
+    if timings is not None:
+        timings[name] = timings.get(name, 0.0) + ms
+    metrics.observe(name, ms)
+
+
+@contextmanager
+def span(name: str) -> Iterator[None]:
+    """Time a block as stage `name`."""
+    started = perf_counter()
+    try:
+        yield
+    finally:
+        record(name, (perf_counter() - started) * 1000)
+
+
+@contextmanager
+def collect() -> Iterator[dict[str, float]]:
+    """
+    Collect the spans inside this block into their own dict:
+
+        with collect() as timings:
+            ...
+        timings  # {"embed": 182.4, "search": 3.1}
+
+    They still count toward any enclosing collection (the request's).
+    """
+    timings: dict[str, float] = {}
+    token = _timings.set(timings)
+    try:
+        yield timings
+    finally:
+        _timings.reset(token)
+        outer = _timings.get()
+        if outer is not None:
+            for name, ms in timings.items():
+                outer[name] = outer.get(name, 0.0) + ms
+
+
+def current() -> dict[str, float] | None:
+    """The stage timings being collected right now (None outside a collection)."""
+    return _timings.get()
+
+
+def rounded(timings: dict[str, float]) -> dict[str, float]:
+    """Timings rounded to 0.1 ms, for storing or logging."""
+    return {name: round(ms, 1) for name, ms in timings.items()}
+
+
+def server_timing(timings: dict[str, float], total_ms: float | None = None) -> str:
+    """A Server-Timing header value: "embed;dur=182.4, search;dur=3.1, total;dur=190.2"."""
+    parts = [f"{name};dur={ms:.1f}" for name, ms in timings.items()]
+    if total_ms is not None:
+        parts.append(f"total;dur={total_ms:.1f}")
+    return ", ".join(parts)
@@ -0,0 +1,155 @@
+"""
+Tests for batch job item storage (services/batch_items.py) and how the
+worker writes items while a job runs.
+
+These tests verify that:
+  1. write_items() upserts rows at consecutive positions from
+     first_position, in chunks of WRITE_CHUNK_SIZE
+  2. read_items_page() is keyset pagination: position > after, ordered,
+     limited — no OFFSET
+  3. read_all_items() walks pages from the last position seen until a
+     short page
+  4. The worker stores items as they're classified (on throttled progress
+     commits), then rewrites ambiguous placeholders with Claude's answers
+     on "complete"
+
+The statements are compiled for Postgres instead of run.
+"""
+
+from contextlib import asynccontextmanager
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from sqlalchemy.dialects import postgresql
+
+from hts_oracle.models.batch_job import BatchJob
+from hts_oracle.models.batch_job_item import BatchJobItem
+from hts_oracle.services import batch_items, batch_worker, job_queue
+
+
+def _session():
+    db = MagicMock()
+    db.execute = AsyncMock(return_value=MagicMock(rowcount=1))
+    db.commit = AsyncMock()
+    db.rollback = AsyncMock()
+    db.scalar = AsyncMock(return_value=None)
+    return db
+
+
+def _sql(statement) -> str:
+    return str(statement.compile(dialect=postgresql.dialect()))
+
+
+def _item(n: int, status: str = "confident") -> dict:
+    return {"commodity": f"item {n}", "quantity": 10, "value": None, "hts_code": "6109.10.00",
+            "description": "T-shirts", "confidence": 90, "general_rate": "16.5%", "status": status}
+
+
+class TestWriteItems:
+
+    async def test_positions_and_chunks(self):
+        db = _session()
+        with patch.object(batch_items, "WRITE_CHUNK_SIZE", 2):
+            await batch_items.write_items(db, 7, [_item(n) for n in range(5)], first_position=10)
+
+        chunks = [c.args[1] for c in db.execute.call_args_list]
+        assert [len(rows) for rows in chunks] == [2, 2, 1]
+        rows = [row for rows in chunks for row in rows]
+        assert [row["position"] for row in rows] == [10, 11, 12, 13, 14]
+        assert rows[0]["job_id"] == 7 and rows[0]["quantity"] == "10"  # Stored as text
+
+        sql = _sql(db.execute.call_args.args[0])
+        assert "ON CONFLICT (job_id, position) DO UPDATE" in sql
+        assert "status = excluded.status" in sql
+
+    async def test_nothing_to_write(self):
+        db = _session()
+        await batch_items.write_items(db, 7, [], first_position=3)
+        db.execute.assert_not_awaited()
+
+
+class TestKeysetPagination:
+
+    async def test_page_query(self):
+        db = _session()
+        db.execute.return_value = MagicMock(scalars=MagicMock(return_value=MagicMock(all=list)))
+        await batch_items.read_items_page(db, 7, after_position=99, limit=50)
+
+        statement = db.execute.call_args.args[0]
+        sql = _sql(statement)
+        assert "batch_job_items.position > %(position_1)s" in sql
+        assert "ORDER BY batch_job_items.position" in sql
+        assert "OFFSET" not in sql
+        params = statement.compile(dialect=postgresql.dialect()).params
+        assert (params["job_id_1"], params["position_1"], params["param_1"]) == (7, 99, 50)
+
+    async def test_read_all_walks_pages(self):
+        rows = [
+            BatchJobItem(position=n, commodity=f"item {n}", status="confident") for n in range(5)
+        ]
+        pages = [rows[0:2], rows[2:4], rows[4:5]]
+        read_page = AsyncMock(side_effect=pages)
+        with patch.object(batch_items, "read_items_page", read_page):
+            items = await batch_items.read_all_items(_session(), 7, page_size=2)
+
+        assert [item["commodity"] for item in items] == [f"item {n}" for n in range(5)]
+        assert [c.args[2] for c in read_page.call_args_list] == [-1, 1, 3]
+
+
+class TestWorkerWrites:
+    """process_job() with classify_batch faked and write_items captured."""
+
+    async def _process(self, mock_settings, events):
+        mock_settings.batch_progress_every_items = 2
+        mock_settings.batch_progress_every_seconds = 3600
+        job = BatchJob(id=1, status="processing", worker_id="me")
+        db = _session()
+        db.execute.return_value = MagicMock(scalar_one=MagicMock(return_value=job))
+
+        @asynccontextmanager
+        async def session():
+            yield db
+
+        async def classify_batch(commodities, db):
+            for event in events:
+                yield event
+
+        writes = []
+
+        async def write_items(db, job_id, items, first_position=0):
+            writes.append((first_position, [item["status"] for item in items]))
+
+        with (
+            patch.object(batch_worker, "get_settings", return_value=mock_settings),
+            patch.object(batch_worker, "get_session_factory", return_value=session),
+            patch.object(batch_worker, "_extract_commodities", AsyncMock(return_value=[{}] * 4)),
+            patch.object(batch_worker, "classify_batch", classify_batch),
+            patch.object(batch_worker, "write_items", write_items),
+            patch.object(batch_worker, "clear_items", AsyncMock()) as clear_items,
+            patch.object(job_queue, "hold_job", AsyncMock(return_value=True)),
+        ):
+            await batch_worker.process_job(1, "me")
+        clear_items.assert_awaited_once()
+        return writes, db
+
+    async def test_items_written_as_classified(self, mock_settings):
+        def settled(n, status="confident"):
+            return {"event": "item_progress", "index": n, "status": status,
+                    "position": n, "item": _item(n, status)}
+
+        final = [_item(0), _item(1, "llm_assisted"), _item(2), _item(3)]
+        writes, db = await self._process(mock_settings, [
+            {"event": "item_progress", "index": 0, "status": "searching"},
+            settled(0),                  # Throttle due: item 0 written
+            settled(1, "ambiguous"),
+            settled(2),                  # Due: items 1-2 written
+            settled(3),
+            {"event": "complete", "items": final, "summary": {}},
+        ])
+
+        assert writes == [
+            (0, ["confident"]),
+            (1, ["ambiguous", "confident"]),
+            (1, ["llm_assisted", "confident", "confident"]),  # From the first placeholder on
+        ]
+        logged = [c.args[0].payload for c in db.add.call_args_list if hasattr(c.args[0], "payload")]
+        assert not any("item" in event or "items" in event for event in logged)
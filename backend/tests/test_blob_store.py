@@ -0,0 +1,194 @@
+"""
+Tests for the blob stores.
+
+These tests verify that:
+  1. LocalBlobStore streams chunks to disk and addresses them by SHA-256
+  2. Identical content is stored only once
+  3. Uploads over the size limit are rejected without leaving anything behind
+  4. PostgresBlobStore reads the whole upload before it opens a session,
+     then writes the large object in one transaction (or only refreshes an
+     existing blob)
+  5. Garbage collection deletes only blobs no job refers to that are past
+     the grace period, on both backends
+
+The Postgres backend runs against a session that records its statements.
+"""
+
+import hashlib
+import os
+import time
+from contextlib import asynccontextmanager
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from hts_oracle.services import blob_store
+from hts_oracle.services.blob_store import BlobTooLargeError, LocalBlobStore, PostgresBlobStore
+
+
+async def _chunks(*parts: bytes):
+    for part in parts:
+        yield part
+
+
+class TestLocalBlobStore:
+    """Tests for the filesystem backend."""
+
+    async def test_round_trips_content(self, tmp_path):
+        """Bytes streamed in should come back unchanged."""
+        store = LocalBlobStore(tmp_path)
+
+        blob = await store.put_stream(_chunks(b"%PDF-1.7 ", b"hello"), max_size=1024)
+
+        assert await store.get(blob.ref) == b"%PDF-1.7 hello"
+        assert blob.size == 14
+
+    async def test_addresses_blob_by_sha256(self, tmp_path):
+        """The ref and on-disk name should be the content hash."""
+        store = LocalBlobStore(tmp_path)
+        expected = hashlib.sha256(b"invoice bytes").hexdigest()
+
+        blob = await store.put_stream(_chunks(b"invoice ", b"bytes"), max_size=1024)
+
+        assert blob.sha256 == expected
+        assert blob.ref == f"local:{expected}"
+        assert store.local_path(blob.ref) == tmp_path / expected[:2] / expected
+
+    async def test_deduplicates_identical_uploads(self, tmp_path):
+        """Uploading the same content twice should store one file."""
+        store = LocalBlobStore(tmp_path)
+
+        first = await store.put_stream(_chunks(b"same"), max_size=1024)
+        second = await store.put_stream(_chunks(b"sa", b"me"), max_size=1024)
+
+        assert first.ref == second.ref
+        stored = [p for p in tmp_path.rglob("*") if p.is_file()]
+        assert len(stored) == 1
+
+    async def test_rejects_oversized_stream(self, tmp_path):
+        """Going past max_size should raise and leave no partial file."""
+        store = LocalBlobStore(tmp_path)
+
+        with pytest.raises(BlobTooLargeError):
+            await store.put_stream(_chunks(b"x" * 600, b"x" * 600), max_size=1000)
+
+        assert [p for p in tmp_path.rglob("*") if p.is_file()] == []
+
+    async def test_missing_blob_raises(self, tmp_path):
+        """Reading a ref that was never stored should raise FileNotFoundError."""
+        store = LocalBlobStore(tmp_path)
+
+        with pytest.raises(FileNotFoundError):
+            await store.get("local:" + "0" * 64)
+
+
+class FakeSession:
+    """Records SQL; answers lo_create, the existence check and INSERT ... RETURNING."""
+
+    def __init__(self, existing: bool = False, referenced: tuple = ()):
+        self.statements: list[tuple[str, dict]] = []
+        self.existing = existing
+        self.referenced = referenced
+        self.commit = AsyncMock()
+
+    async def execute(self, statement, params=None):
+        self.statements.append((str(statement), params or {}))
+        result = MagicMock()
+        result.scalars.return_value = iter(self.referenced)
+        return result
+
+    async def scalar(self, statement, params=None):
+        sql = str(statement)
+        self.statements.append((sql, params or {}))
+        if "lo_create" in sql:
+            return 4242
+        if sql.startswith("UPDATE batch_blobs"):
+            return params["sha"] if self.existing else None
+        return params.get("sha")
+
+
+class TestPostgresBlobStore:
+    """Tests for the large-object backend."""
+
+    def _store(self, session: FakeSession, opened: list):
+        @asynccontextmanager
+        async def factory():
+            opened.append(time.monotonic())
+            yield session
+
+        return patch.object(blob_store, "get_session_factory", return_value=factory)
+
+    async def test_session_opened_after_upload_is_read(self):
+        session, opened, consumed = FakeSession(), [], []
+
+        async def chunks():
+            for part in (b"%PDF-1.7 ", b"slow ", b"client"):
+                yield part
+            consumed.append(time.monotonic())
+
+        store = PostgresBlobStore()
+        store.read_chunk_size = 8
+        with self._store(session, opened):
+            blob = await store.put_stream(chunks(), max_size=1024)
+
+        assert opened[0] >= consumed[0]
+        assert blob.sha256 == hashlib.sha256(b"%PDF-1.7 slow client").hexdigest()
+        puts = [params for sql, params in session.statements if "lo_put" in sql]
+        assert [(p["offset"], p["data"]) for p in puts] == [
+            (0, b"%PDF-1.7"), (8, b" slow cl"), (16, b"ient"),
+        ]
+        assert any(sql.startswith("INSERT INTO batch_blobs") for sql, _ in session.statements)
+        session.commit.assert_awaited_once()
+
+    async def test_existing_content_only_refreshed(self):
+        session, opened = FakeSession(existing=True), []
+        with self._store(session, opened):
+            blob = await PostgresBlobStore().put_stream(_chunks(b"same"), max_size=1024)
+
+        assert blob.ref.startswith("pg:")
+        assert [sql.split()[0] for sql, _ in session.statements] == ["UPDATE"]
+
+    async def test_oversized_upload_never_touches_the_database(self):
+        opened = []
+        with self._store(FakeSession(), opened):
+            with pytest.raises(BlobTooLargeError):
+                await PostgresBlobStore().put_stream(_chunks(b"x" * 600, b"x" * 600), max_size=1000)
+        assert opened == []
+
+    async def test_gc_unlinks_deleted_rows(self):
+        session = FakeSession(referenced=(11, 12))
+        assert await PostgresBlobStore().delete_unreferenced(session, 3600) == 2
+        delete_sql, params = session.statements[0]
+        assert "NOT EXISTS" in delete_sql and params["scheme"] == "pg:"
+        assert [p["oid"] for sql, p in session.statements[1:]] == [11, 12]
+        session.commit.assert_awaited_once()
+
+
+class TestLocalGarbageCollection:
+
+    async def test_deletes_only_old_unreferenced_blobs(self, tmp_path):
+        store = LocalBlobStore(tmp_path)
+        kept = await store.put_stream(_chunks(b"still queued"), max_size=1024)
+        orphan = await store.put_stream(_chunks(b"job deleted"), max_size=1024)
+        recent = await store.put_stream(_chunks(b"job not created yet"), max_size=1024)
+        old = time.time() - 7200
+        for blob in (kept, orphan):
+            os.utime(store.local_path(blob.ref), (old, old))
+
+        session = FakeSession(referenced=(kept.ref,))
+        assert await store.delete_unreferenced(session, grace_seconds=3600) == 1
+
+        assert store.local_path(kept.ref).exists()
+        assert not store.local_path(orphan.ref).exists()
+        assert store.local_path(recent.ref).exists()
+        assert session.statements[0][1] == {"prefix": "local:%"}
+
+    async def test_repeat_upload_restarts_grace_period(self, tmp_path):
+        store = LocalBlobStore(tmp_path)
+        blob = await store.put_stream(_chunks(b"uploaded again"), max_size=1024)
+        old = time.time() - 7200
+        os.utime(store.local_path(blob.ref), (old, old))
+
+        await store.put_stream(_chunks(b"uploaded again"), max_size=1024)
+
+        assert await store.delete_unreferenced(FakeSession(), grace_seconds=3600) == 0
@@ -0,0 +1,190 @@
+"""
+Tests for confidence gate calibration.
+
+These tests verify that:
+  1. The gate skips Claude on similarity, or on the margin when it's on
+  2. Agreement is bucketed by similarity and margin from labelled rows only
+  3. fit() finds the gate with the fewest Claude calls that holds the
+     target agreement (by its lower confidence bound), matching a brute
+     force search, and gives up when the data can't support any gate
+  4. Calibration samples count 1/rate times: a gate that only looks good
+     because the sampled traffic is under-counted isn't chosen
+  5. classify() records the vector top-1, Claude's pick and the runner-up's
+     similarity, applies the margin gate, and samples confident queries
+     to Claude at calibration_sample_rate (recording the rate)
+  6. The fitted values are written into an env file in place
+"""
+
+import random
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from hts_oracle.cli.calibrate import update_env_file
+from hts_oracle.services import calibration, classifier
+from hts_oracle.services.calibration import Observation
+
+
+class TestGate:
+
+    def test_similarity_or_margin(self):
+        assert calibration.skips_llm(0.70, 0.69, threshold=0.65, margin=0.0)
+        assert not calibration.skips_llm(0.60, 0.40, threshold=0.65, margin=0.0)  # Margin off
+        assert calibration.skips_llm(0.60, 0.40, threshold=0.65, margin=0.10)
+        assert not calibration.skips_llm(0.60, 0.55, threshold=0.65, margin=0.10)
+        assert not calibration.skips_llm(0.60, None, threshold=0.65, margin=0.10)
+
+    def test_wilson_lower(self):
+        assert calibration.wilson_lower(0, 0) == 0.0
+        assert calibration.wilson_lower(10, 10) == pytest.approx(0.722, abs=0.001)
+        assert calibration.wilson_lower(1000, 1000) > 0.99
+
+    def test_weighted_lower(self):
+        # Equal weights change nothing; uneven ones shrink the effective n
+        expected = calibration.wilson_lower(8, 10)
+        assert calibration.weighted_lower(50.0, 40.0, 250.0) == pytest.approx(expected)
+        assert calibration.weighted_lower(20.0, 20.0, 110.0) < calibration.wilson_lower(20, 20)
+
+
+class TestAgreementCurve:
+
+    def test_buckets(self):
+        observations = [
+            Observation(0.52, 0.40, agreed=True),
+            Observation(0.54, 0.53, agreed=False),
+            Observation(0.61, 0.50, agreed=True),
+            Observation(0.80, 0.60, agreed=None),  # Claude not asked
+        ]
+        buckets = calibration.agreement_curve(observations, "similarity", 0.05)
+        assert [(round(b.low, 2), b.n, b.agreement) for b in buckets] == [
+            (0.5, 2, 0.5), (0.6, 1, 1.0),
+        ]
+        margins = calibration.agreement_curve(observations, "margin", 0.10)
+        assert [(round(b.low, 2), b.n) for b in margins] == [(0.0, 1), (0.1, 2)]
+
+
+def _synthetic(seed: int = 7, n: int = 3000) -> list[Observation]:
+    """
+    Claude agrees more often at high similarity and wide margins; a tenth
+    of confident rows are labelled.
+    """
+    rng = random.Random(seed)
+    observations = []
+    for _ in range(n):
+        similarity = rng.uniform(0.35, 0.90)
+        margin = rng.uniform(0.0, 0.20)
+        sampled = similarity >= 0.65 and rng.random() < 0.1
+        labelled = similarity < 0.65 or sampled
+        agreed = rng.random() < min(0.995, 0.2 + similarity + 2 * margin) if labelled else None
+        weight = 10.0 if sampled else 1.0
+        observations.append(Observation(similarity, similarity - margin, agreed, weight))
+    return observations
+
+
+class TestFit:
+
+    def test_matches_brute_force(self):
+        observations = _synthetic()
+        fitted = calibration.fit(observations, target=0.9, step=0.02)
+
+        best = None
+        for threshold in calibration._grid(0.30, 1.00, 0.02):
+            for margin in [0.0, *calibration._grid(0.02, 0.30, 0.02)]:
+                stats = calibration.evaluate_gate(observations, threshold, margin)
+                if stats.skipped_labelled >= 30 and stats.agreement_lower >= 0.9:
+                    rank = (stats.llm_share, -stats.agreement_lower)
+                    if best is None or rank < (best.llm_share, -best.agreement_lower):
+                        best = stats
+        assert fitted == best
+
+    def test_fewer_calls_than_similarity_alone(self):
+        observations = _synthetic()
+        fitted = calibration.fit(observations, target=0.95)
+        assert fitted.agreement_lower >= 0.95
+        assert fitted.margin > 0
+        current = calibration.evaluate_gate(observations, 0.65, 0.0)
+        assert fitted.llm_share < current.llm_share
+
+    def test_samples_weighted_by_rate(self):
+        # Below 0.6 Claude always agrees; the 1% sample above it shows it
+        # agreeing only 80% of the time there — at 100x the traffic
+        observations = [Observation(0.50 + i / 2000, 0.45, agreed=True) for i in range(200)]
+        observations += [
+            Observation(0.61 + i / 1000, 0.45, agreed=i % 5 != 0, weight=100.0) for i in range(50)
+        ]
+        observations += [Observation(0.61 + i / 1000, 0.45) for i in range(50) for _ in range(99)]
+
+        unweighted = [Observation(o.similarity, o.second, o.agreed) for o in observations]
+        assert calibration.evaluate_gate(unweighted, 0.5, 0.0).agreement == pytest.approx(0.96)
+        assert calibration.fit(unweighted, target=0.9).llm_share == 0.0  # "Never ask Claude"
+
+        weighted = calibration.evaluate_gate(observations, 0.5, 0.0)
+        assert weighted.agreement == pytest.approx((200 + 40 * 100) / (200 + 50 * 100))
+        assert calibration.fit(observations, target=0.9) is None
+
+    def test_no_gate_without_enough_agreement(self):
+        observations = [Observation(0.5 + i / 1000, 0.45, agreed=i % 2 == 0) for i in range(200)]
+        assert calibration.fit(observations, target=0.95) is None
+
+
+class TestClassifyRecordsPicks:
+
+    RESULTS = [
+        {"hts_code": "6109.10.00.12", "similarity": 0.60, "confidence_score": 60.0},
+        {"hts_code": "6109.10.00.14", "similarity": 0.45, "confidence_score": 45.0},
+    ]
+
+    async def _classify(self, settings, claude_pick="6109.10.00.14"):
+        db = MagicMock()
+        db.commit = AsyncMock()
+        ask = AsyncMock(return_value={"hts_code": claude_pick, "analysis": "Closer."})
+        results = [dict(r) for r in self.RESULTS]
+        with patch.object(classifier, "get_settings", return_value=settings), \
+             patch.object(classifier, "search_hts", AsyncMock(return_value=results)), \
+             patch.object(classifier, "_ask_claude", ask):
+            result = await classifier.classify("cotton t-shirts", db)
+        return result, db.add.call_args.args[0], ask
+
+    async def test_both_picks_stored(self, mock_settings):
+        result, audit, ask = await self._classify(mock_settings)
+        assert ask.called
+        assert result["results"][0]["hts_code"] == "6109.10.00.14"
+        assert audit.vector_top_hts_code == "6109.10.00.12"
+        assert audit.llm_pick_hts_code == "6109.10.00.14"
+        assert audit.top2_similarity == 0.45
+
+    async def test_margin_gate_skips_claude(self, mock_settings):
+        mock_settings.high_confidence_margin = 0.10
+        result, audit, ask = await self._classify(mock_settings)
+        assert not ask.called
+        assert result["method"] == "vector_only"
+        assert audit.llm_pick_hts_code is None
+        assert audit.vector_top_hts_code == "6109.10.00.12"
+
+    async def test_calibration_sample(self, mock_settings):
+        mock_settings.high_confidence_threshold = 0.5
+        mock_settings.calibration_sample_rate = 1.0
+        result, audit, ask = await self._classify(mock_settings, claude_pick="6109.10.00.12")
+        assert ask.called
+        assert result["method"] == "llm_assisted"
+        assert audit.llm_pick_hts_code == audit.vector_top_hts_code
+        assert audit.calibration_sample_rate == 1.0
+
+    async def test_below_threshold_is_not_a_sample(self, mock_settings):
+        mock_settings.calibration_sample_rate = 1.0
+        _, audit, ask = await self._classify(mock_settings)
+        assert ask.called
+        assert audit.calibration_sample_rate is None
+
+
+class TestEnvFile:
+
+    def test_replaces_and_appends(self, tmp_path):
+        path = tmp_path / ".env.local"
+        path.write_text("OPENAI_API_KEY=sk-x\n# HIGH_CONFIDENCE_THRESHOLD=0.65\n")
+        update_env_file(
+            path, {"HIGH_CONFIDENCE_THRESHOLD": "0.58", "HIGH_CONFIDENCE_MARGIN": "0.08"},
+        )
+        assert path.read_text() == (
+            "OPENAI_API_KEY=sk-x\nHIGH_CONFIDENCE_THRESHOLD=0.58\nHIGH_CONFIDENCE_MARGIN=0.08\n"
+        )
@@ -0,0 +1,230 @@
+"""
+Tests for catalog revisions.
+
+These tests verify that:
+  1. The app serves hts_codes until a revision is active, then that revision's table
+  2. A switch prewarms the new table before searches are pointed at it
+  3. Unexpected table names are refused (they're interpolated into SQL)
+  4. Activation only accepts ready/retired revisions and reports the previous one,
+     and the original table (revision 0) is never dropped or pruned
+  5. A "building" revision is dropped only when forced, or by prune once
+     it's older than --building-older-than
+  6. import_hts --revision builds a new revision table, marking it ready
+     (and active with --activate), or failed if a batch didn't make it
+
+The SQL runs against Postgres and isn't covered here — sessions and
+connections are mocks.
+"""
+
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from hts_oracle.cli import bulk_upsert, shadow_table
+from hts_oracle.cli import catalog as catalog_cli
+from hts_oracle.cli.import_hts import import_csv
+from hts_oracle.services import catalog
+
+
+@pytest.fixture(autouse=True)
+def reset_active():
+    original = catalog._active
+    yield
+    catalog._active = original
+
+
+def _db(active_row=None, has_prewarm=False):
+    """A mock session: the catalog_revisions query returns `active_row`."""
+    result = MagicMock()
+    result.first.return_value = active_row
+    result.fetchall.return_value = [SimpleNamespace(v="[0.1,0.2]")]
+    db = MagicMock()
+    db.execute = AsyncMock(return_value=result)
+    db.scalar = AsyncMock(return_value=1 if has_prewarm else None)
+    return db
+
+
+def _sql(db) -> list[str]:
+    return [str(call.args[0]) for call in db.execute.await_args_list]
+
+
+class TestActiveCatalog:
+
+    async def test_default_table_without_revisions(self):
+        active = await catalog.fetch_active(_db(None))
+        assert active == catalog.ActiveCatalog(revision=None, table="hts_codes")
+
+    async def test_active_revision_table(self):
+        active = await catalog.fetch_active(_db(SimpleNamespace(id=4, table_name="hts_codes_r4")))
+        assert active == catalog.ActiveCatalog(revision=4, table="hts_codes_r4")
+
+    async def test_unexpected_table_name_is_refused(self):
+        with pytest.raises(ValueError):
+            await catalog.fetch_active(_db(SimpleNamespace(id=1, table_name="users; DROP TABLE x")))
+
+
+class TestRefresh:
+
+    async def test_switch_prewarms_then_points_searches_at_new_table(self):
+        db = _db(SimpleNamespace(id=2, table_name="hts_codes_r2"))
+
+        assert await catalog.refresh(db) is True
+
+        assert catalog.active_table() == "hts_codes_r2"
+        assert any("FROM hts_codes_r2 ORDER BY embedding" in sql for sql in _sql(db))
+
+    async def test_unchanged_revision_does_nothing(self):
+        catalog._active = catalog.ActiveCatalog(revision=2, table="hts_codes_r2")
+        db = _db(SimpleNamespace(id=2, table_name="hts_codes_r2"))
+
+        assert await catalog.refresh(db) is False
+        assert db.execute.await_count == 1  # Just the lookup
+
+    async def test_pg_prewarm_used_when_installed(self):
+        db = _db(has_prewarm=True)
+
+        assert await catalog.prewarm(db, "hts_codes_r3") == "pg_prewarm"
+        relations = [call.args[1]["rel"] for call in db.execute.await_args_list]
+        assert relations == ["hts_codes_r3", "ix_hts_codes_r3_embedding"]
+
+
+def _conn(status: str | None, previous: int | None = 1):
+    conn = MagicMock()
+    conn.fetchrow = AsyncMock(
+        return_value={"status": status, "table_name": "hts_codes_r5"} if status else None,
+    )
+    conn.fetchval = AsyncMock(side_effect=["hts_codes_r5", previous])  # to_regclass, then UPDATE
+    conn.execute = AsyncMock()
+    transaction = MagicMock()
+    transaction.__aenter__ = AsyncMock()
+    transaction.__aexit__ = AsyncMock(return_value=False)
+    conn.transaction.return_value = transaction
+    return conn
+
+
+class TestActivate:
+
+    async def test_ready_revision_becomes_active(self):
+        conn = _conn("ready", previous=4)
+
+        assert await catalog_cli.activate(conn, 5) == 4
+        assert "status = 'active'" in conn.execute.await_args.args[0]
+
+    @pytest.mark.parametrize("status", ["building", "failed", "dropped", "active"])
+    async def test_other_statuses_are_refused(self, status):
+        with pytest.raises(catalog_cli.RevisionError):
+            await catalog_cli.activate(_conn(status), 5)
+
+    async def test_unknown_revision(self):
+        with pytest.raises(catalog_cli.RevisionError):
+            await catalog_cli.activate(_conn(None), 99)
+
+
+class TestDrop:
+
+    async def test_original_table_is_kept(self):
+        conn = _conn("retired")
+        conn.fetchrow.return_value = {"status": "retired", "table_name": "hts_codes"}
+        with pytest.raises(catalog_cli.RevisionError):
+            await catalog_cli.drop_revision(conn, catalog_cli.ORIGINAL_REVISION)
+        conn.execute.assert_not_awaited()
+
+    async def test_building_needs_force(self):
+        conn = _conn("building")
+        with pytest.raises(catalog_cli.RevisionError):
+            await catalog_cli.drop_revision(conn, 5)
+        conn.execute.assert_not_awaited()
+
+        assert await catalog_cli.drop_revision(conn, 5, force=True) == "hts_codes_r5"
+        assert conn.execute.await_args_list[0].args[0] == "DROP TABLE IF EXISTS hts_codes_r5"
+
+    async def test_prune_abandoned_builds(self):
+        conn = _conn("building")
+        conn.fetch = AsyncMock(side_effect=[[], [{"id": 5}]])  # Retired, then abandoned builds
+        assert await catalog_cli.prune(conn, keep=2, building_older_than_hours=24) == [5]
+        assert conn.fetch.await_args.args[1] == 24
+        assert "status = 'building'" in conn.fetch.await_args.args[0]
+
+    async def test_prune_skips_the_original_table(self):
+        conn = _conn("retired")
+        conn.fetch = AsyncMock(return_value=[])
+        assert await catalog_cli.prune(conn, keep=2) == []
+        assert conn.fetch.await_args.args[1:] == (2, catalog_cli.ORIGINAL_REVISION)
+
+
+class TestRevisionImport:
+    """import_csv(revision=True) with the database and OpenAI mocked."""
+
+    async def _run(self, tmp_path, mock_settings, upsert, activate):
+        path = tmp_path / "hts.csv"
+        path.write_text(
+            "HTS Number,Original Description,Enriched Text,Context Path,Is Leaf Node\n"
+            "0101.21.0000,Other,Horses,,Yes\n"
+        )
+        openai_client = MagicMock()
+        openai_client.embeddings.create = AsyncMock(
+            return_value=MagicMock(
+                data=[MagicMock(embedding=[0.1])], usage=MagicMock(total_tokens=3),
+            ),
+        )
+        conn = MagicMock(fetchval=AsyncMock(return_value="2026-01-01"), close=AsyncMock())
+        cli_mocks = {
+            "active_revision": AsyncMock(return_value=(4, "hts_codes_r4")),
+            "create_revision": AsyncMock(return_value=(5, "hts_codes_r5")),
+            "mark_ready": AsyncMock(return_value=1),
+            "mark_failed": AsyncMock(),
+            "activate": AsyncMock(return_value=4),
+        }
+        shadow_mocks = {
+            "create_shadow": AsyncMock(return_value=1),
+            "prune_stale": AsyncMock(return_value=0),
+            "build_indexes": AsyncMock(),
+            "swap_in": AsyncMock(),
+        }
+        with (
+            patch("hts_oracle.cli.import_hts.get_settings", return_value=mock_settings),
+            patch("hts_oracle.cli.import_hts.AsyncOpenAI", return_value=openai_client),
+            patch.object(bulk_upsert, "connect", AsyncMock(return_value=conn)),
+            patch.object(bulk_upsert, "fetch_current_embed_hashes", AsyncMock(return_value={})),
+            patch.object(bulk_upsert, "upsert_batch", side_effect=upsert),
+            patch.multiple(catalog_cli, **cli_mocks),
+            patch.multiple(shadow_table, **shadow_mocks),
+        ):
+            await import_csv(str(path), revision=True, activate=activate)
+        return cli_mocks, shadow_mocks
+
+    async def test_builds_and_activates_new_revision(self, tmp_path, mock_settings):
+        tables = []
+
+        async def upsert(conn, records, stats, table=bulk_upsert.LIVE_TABLE):
+            tables.append(table)
+
+        cli_mocks, shadow_mocks = await self._run(tmp_path, mock_settings, upsert, activate=True)
+
+        assert tables == ["hts_codes_r5"]
+        shadow_mocks["create_shadow"].assert_awaited_once()
+        assert shadow_mocks["create_shadow"].await_args.kwargs["source"] == "hts_codes_r4"
+        assert shadow_mocks["build_indexes"].await_args.kwargs["table"] == "hts_codes_r5"
+        cli_mocks["mark_ready"].assert_awaited_once()
+        cli_mocks["activate"].assert_awaited_once()
+        shadow_mocks["swap_in"].assert_not_awaited()
+
+    async def test_without_activate_leaves_revision_ready(self, tmp_path, mock_settings):
+        async def upsert(conn, records, stats, table=bulk_upsert.LIVE_TABLE):
+            pass
+
+        cli_mocks, _ = await self._run(tmp_path, mock_settings, upsert, activate=False)
+
+        cli_mocks["mark_ready"].assert_awaited_once()
+        cli_mocks["activate"].assert_not_awaited()
+
+    async def test_failed_batch_marks_revision_failed(self, tmp_path, mock_settings):
+        async def upsert(conn, records, stats, table=bulk_upsert.LIVE_TABLE):
+            raise ConnectionError("connection reset")
+
+        cli_mocks, shadow_mocks = await self._run(tmp_path, mock_settings, upsert, activate=True)
+
+        cli_mocks["mark_failed"].assert_awaited_once()
+        cli_mocks["mark_ready"].assert_not_awaited()
+        shadow_mocks["build_indexes"].assert_not_awaited()
@@ -0,0 +1,153 @@
+"""
+Tests for the import pipeline's building blocks.
+
+These tests verify that:
+  1. RateLimiter holds requests back once the TPM or RPM budget is spent
+  2. embed_with_retry backs off on rate limits and gives up on bad requests
+  3. Checkpoint only resumes from a file made for the same input
+
+Time is faked — nothing here actually sleeps or calls OpenAI.
+"""
+
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import httpx
+import openai
+import pytest
+
+from hts_oracle.cli.embed_pipeline import Checkpoint, RateLimiter, embed_with_retry
+
+
+class FakeClock:
+    """A monotonic clock that only moves when asyncio.sleep is 'called'."""
+
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps: list[float] = []
+
+    def __call__(self) -> float:
+        return self.now
+
+    async def sleep(self, seconds: float) -> None:
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock():
+    clock = FakeClock()
+    with patch("hts_oracle.cli.embed_pipeline.asyncio.sleep", clock.sleep):
+        yield clock
+
+
+def _error(cls, status: int, retry_after: str | None = None):
+    headers = {"retry-after": retry_after} if retry_after else {}
+    response = httpx.Response(status, headers=headers, request=httpx.Request("POST", "https://api"))
+    return cls("error", response=response, body=None)
+
+
+def _response(vectors, tokens):
+    return MagicMock(
+        data=[MagicMock(embedding=v) for v in vectors], usage=MagicMock(total_tokens=tokens),
+    )
+
+
+class TestRateLimiter:
+    """Tests for the TPM / RPM budget."""
+
+    async def test_within_budget_does_not_wait(self, clock):
+        limiter = RateLimiter(tokens_per_minute=1000, requests_per_minute=10, clock=clock)
+
+        await limiter.acquire(500)
+        await limiter.acquire(500)
+
+        assert clock.sleeps == []
+
+    async def test_waits_for_tokens_to_refill(self, clock):
+        limiter = RateLimiter(tokens_per_minute=600, requests_per_minute=100, clock=clock)
+
+        await limiter.acquire(600)
+        await limiter.acquire(60)   # 600 TPM refills 10 tokens/s → 6s
+
+        assert sum(clock.sleeps) == pytest.approx(6.0)
+
+    async def test_request_limit_applies_too(self, clock):
+        limiter = RateLimiter(tokens_per_minute=10**6, requests_per_minute=2, clock=clock)
+
+        for _ in range(3):
+            await limiter.acquire(1)
+
+        assert sum(clock.sleeps) == pytest.approx(30.0)   # 2 RPM → one every 30s
+
+    async def test_settle_charges_real_usage(self, clock):
+        limiter = RateLimiter(tokens_per_minute=600, requests_per_minute=100, clock=clock)
+
+        await limiter.acquire(100)
+        limiter.settle(estimated=100, actual=600)   # The call used the whole minute
+        await limiter.acquire(60)
+
+        assert sum(clock.sleeps) == pytest.approx(6.0)
+
+
+class TestEmbedWithRetry:
+    """Tests for retry / backoff around one embeddings call."""
+
+    async def test_retries_rate_limits(self, clock):
+        client = MagicMock()
+        client.embeddings.create = AsyncMock(side_effect=[
+            _error(openai.RateLimitError, 429, retry_after="2"),
+            _response([[0.1]], tokens=7),
+        ])
+        limiter = RateLimiter(10**6, 10**4, clock=clock)
+
+        vectors, tokens = await embed_with_retry(client, ["text"], "m", 1, limiter)
+
+        assert vectors == [[0.1]]
+        assert tokens == 7
+        assert client.embeddings.create.await_count == 2
+        assert 2.0 <= clock.sleeps[-1] <= 2.5   # Retry-After, plus jitter
+
+    async def test_gives_up_after_max_attempts(self, clock):
+        client = MagicMock()
+        client.embeddings.create = AsyncMock(side_effect=_error(openai.InternalServerError, 503))
+        limiter = RateLimiter(10**6, 10**4, clock=clock)
+
+        with pytest.raises(openai.InternalServerError):
+            await embed_with_retry(client, ["text"], "m", 1, limiter, max_attempts=3)
+
+        assert client.embeddings.create.await_count == 3
+
+    async def test_bad_request_is_not_retried(self, clock):
+        client = MagicMock()
+        client.embeddings.create = AsyncMock(side_effect=_error(openai.BadRequestError, 400))
+        limiter = RateLimiter(10**6, 10**4, clock=clock)
+
+        with pytest.raises(openai.BadRequestError):
+            await embed_with_retry(client, ["text"], "m", 1, limiter)
+
+        assert client.embeddings.create.await_count == 1
+
+
+class TestCheckpoint:
+    """Tests for resuming an interrupted import."""
+
+    def test_round_trip(self, tmp_path):
+        path = tmp_path / "hts.csv.import-checkpoint.json"
+        Checkpoint(path, {"csv_sha256": "abc"}).mark_done(3)
+
+        assert Checkpoint(path, {"csv_sha256": "abc"}).load() == {3}
+
+    def test_ignores_checkpoint_for_other_input(self, tmp_path):
+        path = tmp_path / "hts.csv.import-checkpoint.json"
+        Checkpoint(path, {"csv_sha256": "abc"}).mark_done(3)
+
+        assert Checkpoint(path, {"csv_sha256": "different"}).load() == set()
+
+    def test_clear_removes_file(self, tmp_path):
+        path = tmp_path / "cp.json"
+        checkpoint = Checkpoint(path, {})
+        checkpoint.mark_done(1)
+        checkpoint.clear()
+
+        assert not path.exists()
+        assert checkpoint.load() == set()
@@ -0,0 +1,118 @@
+"""
+Tests for the retrieval evaluation CLI (cli/evaluate.py).
+
+These tests verify that:
+  1. A result counts as correct when its code starts with the label
+  2. --sweep values make a grid of typed settings, applied and restored
+     around each configuration
+  3. Recall@k, the LLM share and the cost estimate are computed per configuration
+  4. The recommendation is the cheapest configuration that holds accuracy
+  5. hnsw_ef_search is set for the search's transaction only when configured
+"""
+
+import argparse
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from hts_oracle.cli import evaluate
+from hts_oracle.cli.evaluate import Outcome, Prices
+from hts_oracle.services.searcher import search_hts
+
+
+class TestMatching:
+
+    def test_prefix_match_on_digits(self):
+        assert evaluate.is_correct("6109.10.00.12", "6109.10.00")
+        assert evaluate.is_correct("6109.10.0012", "6109.10.00.12")
+        assert not evaluate.is_correct("6109.90.10", "6109.10")
+
+    def test_first_correct_rank(self):
+        codes = ["6110.20.20", "6109.10.00.12", "6109.10.00.14"]
+        assert evaluate.first_correct_rank(codes, "6109.10") == 2
+        assert evaluate.first_correct_rank(codes, "7318") is None
+
+    def test_load_golden(self, tmp_path):
+        path = tmp_path / "golden.csv"
+        path.write_text('description,hts_code\n"Cotton t-shirts",6109.10\n,7318\n')
+        assert evaluate.load_golden(path) == [evaluate.GoldenItem("Cotton t-shirts", "6109.10")]
+        path.write_text("query,code\nx,1\n")
+        with pytest.raises(SystemExit):
+            evaluate.load_golden(path)
+
+
+class TestConfigurations:
+
+    def test_grid_is_typed(self):
+        sweeps = [
+            evaluate.parse_assignment("high_confidence_threshold=0.6,0.7"),
+            evaluate.parse_assignment("HNSW_EF_SEARCH=40,100"),
+        ]
+        fixed = [evaluate.parse_assignment("search_candidates=60")]
+        configs = evaluate.configurations(sweeps, fixed)
+        assert len(configs) == 4
+        assert configs[0] == {
+            "search_candidates": 60, "high_confidence_threshold": 0.6, "hnsw_ef_search": 40,
+        }
+        assert evaluate.configurations([], []) == [{}]
+
+    def test_unknown_setting(self):
+        with pytest.raises(argparse.ArgumentTypeError):
+            evaluate.parse_assignment("ef_search=40")
+
+    def test_overridden_restores(self, mock_settings):
+        with evaluate.overridden(mock_settings, {"high_confidence_threshold": 0.9}):
+            assert mock_settings.high_confidence_threshold == 0.9
+        assert mock_settings.high_confidence_threshold == 0.65
+
+
+class TestSummary:
+
+    def test_recall_llm_and_cost(self):
+        outcomes = [
+            Outcome(rank=1, llm=False, latency_ms=100, query_tokens=10, prompt_tokens=1000),
+            Outcome(rank=4, llm=True, latency_ms=900, query_tokens=10, prompt_tokens=1000),
+            Outcome(rank=None, llm=True, latency_ms=1100, query_tokens=10, prompt_tokens=1000),
+            Outcome(rank=8, llm=False, latency_ms=120, query_tokens=10, prompt_tokens=1000),
+        ]
+        prices = Prices(embedding=0.02, llm_input=1.0, llm_output=5.0)
+        summary = evaluate.summarize(outcomes, prices)
+        assert (summary["recall@1"], summary["recall@5"], summary["recall@10"]) == (0.25, 0.5, 0.75)
+        assert summary["llm"] == 0.5
+        # Per query: 10 × 0.02 embedding + half of (1000 × 1 + 80 × 5) Claude, per 1M tokens
+        assert summary["cost_per_1k"] == pytest.approx(1000 * (0.2 + 0.5 * 1400) / 1e6, abs=1e-4)
+
+    def test_recommend_cheapest_within_tolerance(self):
+        summaries = [
+            {"recall@5": 0.90, "cost_per_1k": 0.80, "p95_ms": 900},
+            {"recall@5": 0.89, "cost_per_1k": 0.30, "p95_ms": 700},
+            {"recall@5": 0.89, "cost_per_1k": 0.30, "p95_ms": 500},
+            {"recall@5": 0.70, "cost_per_1k": 0.01, "p95_ms": 200},
+        ]
+        assert evaluate.recommend(summaries, "recall@5", tolerance=0.02) == 2
+        assert evaluate.recommend(summaries, "recall@5", tolerance=0.0) == 0
+
+
+class TestEfSearch:
+
+    @pytest.fixture
+    def db(self):
+        db = AsyncMock()
+        result = MagicMock()
+        result.fetchall.return_value = []
+        db.execute.return_value = result
+        return db
+
+    async def test_set_local_when_configured(self, db, mock_settings):
+        mock_settings.hnsw_ef_search = 100
+        with patch("hts_oracle.services.searcher.get_settings", return_value=mock_settings), \
+             patch("hts_oracle.services.searcher.embed_text", AsyncMock(return_value=[0.1] * 1536)):
+            await search_hts("cotton t-shirts", db)
+        first_statement = str(db.execute.call_args_list[0].args[0])
+        assert first_statement == "SET LOCAL hnsw.ef_search = 100"
+
+    async def test_not_set_by_default(self, db, mock_settings):
+        with patch("hts_oracle.services.searcher.get_settings", return_value=mock_settings), \
+             patch("hts_oracle.services.searcher.embed_text", AsyncMock(return_value=[0.1] * 1536)):
+            await search_hts("cotton t-shirts", db)
+        assert db.execute.call_count == 1
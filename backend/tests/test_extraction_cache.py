@@ -0,0 +1,142 @@
+"""
+Tests for the extraction cache's bookkeeping.
+
+These tests verify that:
+  1. A hit returns the cached text and commodities and counts as a hit
+  2. A miss returns None and counts as a miss
+  3. The table extraction settings are part of the cache key
+  4. Stores check the table's size only every extraction_cache_check_every
+     stores, and evict only when over the entry or byte limit; evictions
+     are counted
+  5. A disabled cache never touches the database
+
+The SQL itself runs against Postgres and isn't covered here — the session
+is a mock.
+"""
+
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from hts_oracle.services import extraction_cache
+
+
+@pytest.fixture(autouse=True)
+def patch_settings(mock_settings):
+    with patch("hts_oracle.services.extraction_cache.get_settings", return_value=mock_settings):
+        yield mock_settings
+
+
+@pytest.fixture(autouse=True)
+def fresh_stats():
+    extraction_cache.reset_cache_stats()
+    yield
+    extraction_cache.reset_cache_stats()
+
+
+def _db_returning(row=None, rowcount=0, totals=(0, 0)):
+    """A mock session whose execute() returns `row` / `rowcount` / `totals` (count, bytes)."""
+    result = MagicMock()
+    result.one_or_none.return_value = row
+    result.one.return_value = totals
+    result.rowcount = rowcount
+    db = MagicMock()
+    db.execute = AsyncMock(return_value=result)
+    return db
+
+
+class TestLookup:
+    """Tests for reading the cache."""
+
+    async def test_hit_returns_cached_extraction(self):
+        items = [{"description": "Cotton t-shirts", "quantity": "500", "value": "$2,500"}]
+        db = _db_returning(SimpleNamespace(pdf_text="INVOICE", commodities=items, source="table"))
+
+        cached = await extraction_cache.lookup(db, "ab" * 32, "claude-test")
+
+        assert cached.commodities == items
+        assert cached.pdf_text == "INVOICE"
+        assert extraction_cache.cache_stats()["hits"] == 1
+
+    async def test_miss_returns_none(self):
+        db = _db_returning(None)
+
+        assert await extraction_cache.lookup(db, "ab" * 32, "claude-test") is None
+        stats = extraction_cache.cache_stats()
+        assert stats["misses"] == 1
+        assert stats["hit_rate"] == 0.0
+
+    async def test_disabled_cache_skips_database(self, patch_settings):
+        patch_settings.extraction_cache_enabled = False
+        db = _db_returning(None)
+
+        assert await extraction_cache.lookup(db, "ab" * 32, "claude-test") is None
+        db.execute.assert_not_called()
+
+    async def test_key_includes_table_settings(self, patch_settings):
+        patch_settings.table_extraction_enabled = True
+        patch_settings.table_extraction_min_confidence = 0.8
+        db = _db_returning(None)
+
+        await extraction_cache.lookup(db, "ab" * 32, "claude-test")
+
+        statement = db.execute.await_args.args[0].compile(dialect=postgresql.dialect())
+        assert "extraction_cache.extraction_settings = " in str(statement)
+        assert "tables=on,min_confidence=0.8" in statement.params.values()
+
+        patch_settings.table_extraction_enabled = False
+        assert extraction_cache.settings_key(patch_settings) == "tables=off,min_confidence=0.8"
+
+
+class TestStore:
+    """Tests for writing (and evicting from) the cache."""
+
+    async def test_store_checks_size_periodically(self, patch_settings):
+        patch_settings.extraction_cache_check_every = 3
+        db = _db_returning(totals=(1, 100))
+
+        for _ in range(3):
+            await extraction_cache.store(
+                db, "ab" * 32, "claude-test", "text", [{"description": "x"}],
+            )
+
+        # Three upserts, then one size check on the third store — under the limits, no DELETE
+        assert db.execute.await_count == 4
+        assert "count(*)" in str(db.execute.await_args_list[3].args[0])
+        assert extraction_cache.cache_stats()["stores"] == 3
+        assert extraction_cache.cache_stats()["evictions"] == 0
+
+    async def test_store_evicts_over_entry_limit(self, patch_settings):
+        patch_settings.extraction_cache_check_every = 1
+        patch_settings.extraction_cache_max_entries = 10
+        db = _db_returning(rowcount=3, totals=(13, 100))
+
+        await extraction_cache.store(db, "ab" * 32, "claude-test", "text", [{"description": "x"}])
+
+        assert db.execute.await_count == 3  # Upsert, size check, eviction
+        eviction_params = db.execute.await_args_list[2].args[1]
+        assert eviction_params == {
+            "keep": 10, "max_bytes": patch_settings.extraction_cache_max_bytes,
+        }
+        assert extraction_cache.cache_stats()["evictions"] == 3
+
+    async def test_store_evicts_over_byte_budget(self, patch_settings):
+        patch_settings.extraction_cache_check_every = 1
+        patch_settings.extraction_cache_max_bytes = 1000
+        db = _db_returning(rowcount=1, totals=(2, 1500))
+
+        await extraction_cache.store(db, "ab" * 32, "claude-test", "text", [{"description": "x"}])
+
+        assert db.execute.await_count == 3
+        assert "running_bytes > :max_bytes" in str(db.execute.await_args_list[2].args[0])
+        assert extraction_cache.cache_stats()["evictions"] == 1
+
+    async def test_hit_rate(self):
+        hit = SimpleNamespace(pdf_text="t", commodities=[], source=None)
+        await extraction_cache.lookup(_db_returning(hit), "a" * 64, "m")
+        await extraction_cache.lookup(_db_returning(hit), "a" * 64, "m")
+        await extraction_cache.lookup(_db_returning(None), "b" * 64, "m")
+
+        assert extraction_cache.cache_stats()["hit_rate"] == pytest.approx(0.667)
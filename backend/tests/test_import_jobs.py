@@ -0,0 +1,256 @@
+"""
+Tests for admin-triggered imports.
+
+These tests verify that:
+  1. The import command line carries the mode, rate-limit share and nice level
+  2. The import's JSON progress lines become job state; other output becomes the log tail
+  3. The supervisor runs a real child process, records its progress and
+     result, and deletes the uploaded file
+  4. The admin key is required, and the endpoint is off without one
+  5. A second job that loses the race to the unique index gets
+     ImportAlreadyRunningError, not a 500
+  6. An import whose progress pipe closes (the API process died) cancels
+     itself, runs its cleanup and exits
+  7. On API shutdown the import is interrupted so its cleanup runs, and
+     killed only if it doesn't exit in time
+
+The job row updates are captured instead of written to Postgres.
+"""
+
+import asyncio
+import subprocess
+import sys
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy.exc import IntegrityError
+
+from hts_oracle.cli.embed_pipeline import ImportProgress, stop_when_orphaned
+from hts_oracle.models.import_job import ImportJob
+from hts_oracle.routes.admin import require_admin_key
+from hts_oracle.services import import_jobs
+from hts_oracle.services.import_jobs import ImportAlreadyRunningError, ImportOutput, build_command
+
+
+class TestBuildCommand:
+
+    def test_revision_mode_with_activation(self, mock_settings):
+        command = build_command("/tmp/x.csv", "revision", True, mock_settings)
+        assert command[:4] == [sys.executable, "-m", "hts_oracle.cli.import_hts", "/tmp/x.csv"]
+        assert "--progress-json" in command
+        assert command[command.index("--tpm-limit") + 1] == str(
+            int(mock_settings.embedding_tpm_limit * mock_settings.admin_import_tpm_share)
+        )
+        assert command[-2:] == ["--revision", "--activate"]
+
+    def test_incremental_mode_has_no_build_flags(self, mock_settings):
+        command = build_command("/tmp/x.csv", "incremental", True, mock_settings)
+        assert not {"--revision", "--activate", "--rebuild"} & set(command)
+
+    def test_rebuild_mode(self, mock_settings):
+        assert build_command("/tmp/x.csv", "rebuild", False, mock_settings)[-1] == "--rebuild"
+
+
+class TestImportOutput:
+
+    def test_events_and_plain_lines(self):
+        output = ImportOutput()
+        output.feed("Reading hts.csv...\n")
+        output.feed('{"event": "phase", "phase": "load"}\n')
+        output.feed('{"event": "progress", "rows_written": 200, "rows_per_second": 50.0}\n')
+        output.feed('{"not": "an event"}\n')
+        output.feed('{"event": "summary", "ok": true, "rows": 200}\n')
+
+        assert output.phase == "load"
+        assert output.progress == {"rows_written": 200, "rows_per_second": 50.0}
+        assert output.ok
+        assert output.log_tail() == 'Reading hts.csv...\n{"not": "an event"}'
+
+    def test_no_summary_is_not_ok(self):
+        output = ImportOutput()
+        output.feed("Traceback (most recent call last):\n")
+        assert not output.ok
+
+    def test_progress_snapshot_is_json_ready(self):
+        progress = ImportProgress(total_rows=400, rows_written=200, texts_embedded=100)
+        snapshot = progress.snapshot()
+        assert snapshot["rows_written"] == 200
+        assert snapshot["rows_per_second"] > 0
+        assert {"embeddings_per_second", "tokens_per_minute"} <= set(snapshot)
+
+
+class TestSupervise:
+    """supervise() against a real child process that prints like import_hts."""
+
+    async def _run(self, tmp_path, script: str) -> list[dict]:
+        updates = []
+
+        async def capture(job_id, **values):
+            updates.append(values)
+
+        csv_path = tmp_path / "upload.csv"
+        csv_path.write_text("HTS Number\n")
+        with patch.object(import_jobs, "_update", side_effect=capture):
+            await import_jobs.supervise(1, csv_path, [sys.executable, "-c", script])
+        assert not csv_path.exists()
+        return updates
+
+    async def test_successful_import(self, tmp_path):
+        script = (
+            "import json\n"
+            "print('Reading...')\n"
+            "print(json.dumps({'event': 'phase', 'phase': 'load'}))\n"
+            "print(json.dumps({'event': 'progress', 'rows_written': 10, 'rows_per_second': 5.0}))\n"
+            "print(json.dumps({'event': 'summary', 'ok': True, 'rows': 10}))\n"
+        )
+        updates = await self._run(tmp_path, script)
+
+        assert updates[0]["status"] == "running"
+        final = updates[-1]
+        assert final["status"] == "complete"
+        assert final["summary"] == {"ok": True, "rows": 10}
+        assert final["progress"]["rows_per_second"] == 5.0
+        assert final["error"] is None
+
+    async def test_crashed_import_is_failed_with_log_tail(self, tmp_path):
+        updates = await self._run(tmp_path, "import sys; print('boom'); sys.exit(3)")
+
+        final = updates[-1]
+        assert final["status"] == "failed"
+        assert "code 3" in final["error"]
+        assert "boom" in final["log_tail"]
+
+
+class TestShutdown:
+    """supervise() cancelled (API shutdown) while a real child is mid-import."""
+
+    # Stands in for import_hts: asyncio.run, a cleanup in finally, exit 1 on SIGINT
+    SCRIPT = (
+        "import asyncio, json, signal, sys\n"
+        "IGNORE_SIGINT = {ignore}\n"
+        "async def main():\n"
+        "    if IGNORE_SIGINT:\n"
+        "        signal.signal(signal.SIGINT, signal.SIG_IGN)\n"
+        "    print(json.dumps({{'event': 'phase', 'phase': 'load'}}), flush=True)\n"
+        "    try:\n"
+        "        await asyncio.sleep(30)\n"
+        "    finally:\n"
+        "        print('dropped half-built table', flush=True)\n"
+        "try:\n"
+        "    asyncio.run(main())\n"
+        "except (asyncio.CancelledError, KeyboardInterrupt):\n"
+        "    sys.exit(1)\n"
+    )
+
+    async def _cancel_mid_import(self, tmp_path, ignore_sigint: bool) -> list[dict]:
+        updates = []
+        started = asyncio.Event()
+
+        async def capture(job_id, **values):
+            updates.append(values)
+            if values.get("phase") == "load":
+                started.set()
+
+        csv_path = tmp_path / "upload.csv"
+        csv_path.write_text("HTS Number\n")
+        command = [sys.executable, "-c", self.SCRIPT.format(ignore=ignore_sigint)]
+        with patch.object(import_jobs, "_update", side_effect=capture):
+            task = asyncio.create_task(import_jobs.supervise(1, csv_path, command))
+            await asyncio.wait_for(started.wait(), 10)
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+        return updates
+
+    async def test_interrupted_import_cleans_up(self, tmp_path):
+        updates = await self._cancel_mid_import(tmp_path, ignore_sigint=False)
+
+        final = updates[-1]
+        assert final["status"] == "failed"
+        assert "dropped half-built table" in final["log_tail"]
+
+    async def test_killed_if_it_does_not_stop(self, tmp_path):
+        with patch.object(import_jobs, "STOP_TIMEOUT_SECONDS", 0.5):
+            started = asyncio.get_running_loop().time()
+            updates = await self._cancel_mid_import(tmp_path, ignore_sigint=True)
+
+        assert asyncio.get_running_loop().time() - started < 10
+        assert updates[-1]["status"] == "failed"
+
+
+class TestAdminKey:
+
+    def test_missing_or_wrong_key_rejected(self, mock_settings):
+        mock_settings.admin_api_key = "s3cret"
+        with patch("hts_oracle.routes.admin.get_settings", return_value=mock_settings):
+            for key in (None, "wrong"):
+                with pytest.raises(HTTPException) as e:
+                    require_admin_key(key)
+                assert e.value.status_code == 401
+            require_admin_key("s3cret")
+
+    def test_disabled_without_configured_key(self, mock_settings):
+        mock_settings.admin_api_key = ""
+        with patch("hts_oracle.routes.admin.get_settings", return_value=mock_settings):
+            with pytest.raises(HTTPException) as e:
+                require_admin_key("anything")
+        assert e.value.status_code == 503
+
+
+class TestCreateJob:
+
+    async def test_lost_race_is_already_running(self):
+        db = MagicMock()
+        db.execute = AsyncMock()
+        db.scalar = AsyncMock(side_effect=[None, ImportJob(id=4, status="pending")])
+        db.commit = AsyncMock(side_effect=[
+            None,  # active_job()'s stale sweep
+            IntegrityError("INSERT", {}, Exception("uq_import_jobs_one_active")),
+        ])
+        db.rollback = AsyncMock()
+
+        with pytest.raises(ImportAlreadyRunningError) as e:
+            await import_jobs.create_job(db, "hts.csv", "revision", activate=False)
+        assert e.value.job_id == 4
+        db.rollback.assert_awaited_once()
+
+
+class TestOrphaned:
+
+    def test_closed_pipe_cancels_and_cleans_up(self, tmp_path):
+        marker = tmp_path / "cleaned"
+        script = (
+            "import asyncio, json\n"
+            "from hts_oracle.cli.embed_pipeline import stop_when_orphaned\n"
+            "async def report():\n"
+            "    while True:\n"
+            "        print(json.dumps({'event': 'progress'}), flush=True)\n"
+            "        await asyncio.sleep(0.05)\n"
+            "async def main():\n"
+            "    stop_when_orphaned(asyncio.create_task(report()), asyncio.current_task())\n"
+            "    try:\n"
+            "        await asyncio.sleep(30)\n"
+            "    finally:\n"
+            f"        open({str(marker)!r}, 'w').close()\n"
+            "try:\n"
+            "    asyncio.run(main())\n"
+            "except asyncio.CancelledError:\n"
+            "    raise SystemExit(1)\n"
+        )
+        child = subprocess.Popen([sys.executable, "-c", script], stdout=subprocess.PIPE)
+        assert child.stdout.readline()
+        child.stdout.close()  # The API process went away
+        assert child.wait(timeout=10) == 1
+        assert marker.exists()
+
+    async def test_other_reporter_errors_ignored(self):
+        async def fail():
+            raise ValueError("not a pipe")
+
+        task = asyncio.create_task(asyncio.sleep(0.2))
+        reporter = asyncio.create_task(fail())
+        stop_when_orphaned(reporter, task)
+        await asyncio.sleep(0.01)
+        assert not task.cancelled()
+        await task
@@ -0,0 +1,222 @@
+"""
+Tests for the batch job queue, its event log and the SSE resume.
+
+These tests verify that:
+  1. Claiming a job marks it processing for this worker; an empty queue
+     gives None
+  2. Reclaiming requeues stale jobs and fails exhausted ones with a
+     terminal event
+  3. Event seqs advance only when a commit succeeds, so they stay gap-free
+  4. A worker's commit is fenced: if the job was reclaimed (no row
+     matches its worker_id) or the new owner already used the seq, it
+     rolls back and raises JobLostError
+  5. A worker that lost its job doesn't write "complete" or "error" over
+     the new owner's
+  6. The SSE stream resumes after Last-Event-ID (or ?after=) and ends at
+     the terminal event
+
+SKIP LOCKED and the row locks themselves need a live Postgres and aren't
+run here.
+"""
+
+from contextlib import asynccontextmanager
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.exc import IntegrityError
+
+from hts_oracle.db import get_db
+from hts_oracle.models.batch_job import BatchJob
+from hts_oracle.models.batch_job_event import BatchJobEvent
+from hts_oracle.routes import batch as batch_route
+from hts_oracle.services import batch_worker, job_queue
+from hts_oracle.services.job_queue import JobEventLog, JobLostError
+
+
+def _session(rowcount: int = 1):
+    """A mocked AsyncSession whose UPDATEs match `rowcount` rows."""
+    db = MagicMock()
+    db.execute = AsyncMock(return_value=MagicMock(rowcount=rowcount))
+    db.commit = AsyncMock()
+    db.rollback = AsyncMock()
+    db.scalar = AsyncMock(return_value=None)
+    return db
+
+
+def _added_events(db) -> list[dict]:
+    return [
+        c.args[0].payload for c in db.add.call_args_list if isinstance(c.args[0], BatchJobEvent)
+    ]
+
+
+class TestClaim:
+
+    async def test_claims_for_this_worker(self):
+        job = BatchJob(id=3, status="pending", attempts=1)
+        db = _session()
+        db.execute.return_value = MagicMock(scalar_one_or_none=MagicMock(return_value=job))
+
+        claimed = await job_queue.claim_next_job(db, "host:1:0")
+
+        assert claimed is job
+        assert (job.status, job.worker_id, job.attempts) == ("processing", "host:1:0", 2)
+        statement = db.execute.call_args.args[0].compile(dialect=postgresql.dialect())
+        assert "FOR UPDATE SKIP LOCKED" in str(statement)
+        db.commit.assert_awaited_once()
+
+    async def test_empty_queue(self):
+        db = _session()
+        db.execute.return_value = MagicMock(scalar_one_or_none=MagicMock(return_value=None))
+        assert await job_queue.claim_next_job(db, "host:1:0") is None
+        db.rollback.assert_awaited_once()
+
+
+class TestReclaim:
+
+    async def test_requeues_and_fails_exhausted(self):
+        db = _session()
+        db.execute.side_effect = [
+            [MagicMock(id=7)],                      # Exhausted → error
+            [MagicMock(id=8), MagicMock(id=9)],     # Requeued
+        ]
+        assert await job_queue.reclaim_stale_jobs(db, 60, max_attempts=3) == 2
+        assert _added_events(db) == [{"event": "error", "message": "Job failed after 3 attempts"}]
+        added = db.add.call_args.args[0]
+        assert (added.job_id, added.seq) == (7, 1)
+        failed = db.execute.call_args_list[0].args[0].compile()
+        assert "completed_at" in failed.params
+
+
+class TestEventLog:
+
+    async def test_seq_advances_on_commit_only(self):
+        db = _session()
+        events = JobEventLog(db, job_id=1, next_seq=5, worker_id="me")
+        assert [await events.append({"n": 1}), await events.append({"n": 2})] == [5, 6]
+        await events.commit()
+        assert events.next_seq == 7
+
+        assert await events.append({"n": 3}) == 7
+        await events.rollback()
+        assert await events.append({"n": 3}) == 7  # Reused, no gap
+
+    async def test_commit_fenced_on_ownership(self):
+        db = _session(rowcount=0)  # Reclaimed: no row with worker_id = me
+        events = JobEventLog(db, job_id=1, next_seq=5, worker_id="me")
+        await events.append({"event": "complete"})
+        with pytest.raises(JobLostError):
+            await events.commit()
+        db.commit.assert_not_awaited()
+        db.rollback.assert_awaited_once()
+        assert events.next_seq == 5
+
+        fence = str(db.execute.call_args.args[0].compile())
+        assert "batch_jobs.worker_id = :worker_id_1" in fence
+
+    async def test_seq_collision_is_job_lost(self):
+        db = _session()
+        db.commit.side_effect = IntegrityError(
+            "INSERT", {}, Exception("uq_batch_job_events_job_seq"),
+        )
+        events = JobEventLog(db, job_id=1, next_seq=5, worker_id="me")
+        await events.append({"event": "item_progress"})
+        with pytest.raises(JobLostError):
+            await events.commit()
+        db.rollback.assert_awaited_once()
+
+    async def test_unowned_log_not_fenced(self):
+        db = _session(rowcount=0)
+        events = JobEventLog(db, job_id=1, next_seq=1)
+        await events.append({"event": "error"})
+        await events.commit()
+        db.execute.assert_not_awaited()
+        db.commit.assert_awaited_once()
+
+
+class TestLostJob:
+    """process_job() when another worker takes the job over part way."""
+
+    async def _process(self, mock_settings, events, owned):
+        job = BatchJob(id=1, status="processing", worker_id="me")
+        db = _session()
+        db.execute.return_value = MagicMock(scalar_one=MagicMock(return_value=job))
+
+        @asynccontextmanager
+        async def session():
+            yield db
+
+        async def classify_batch(commodities, db):
+            for event in events:
+                if isinstance(event, Exception):
+                    raise event
+                yield event
+
+        with (
+            patch.object(batch_worker, "get_settings", return_value=mock_settings),
+            patch.object(batch_worker, "get_session_factory", return_value=session),
+            patch.object(
+                batch_worker, "_extract_commodities", AsyncMock(return_value=[{"commodity": "x"}]),
+            ),
+            patch.object(batch_worker, "classify_batch", classify_batch),
+            patch.object(batch_worker, "write_items", AsyncMock()),
+            patch.object(job_queue, "hold_job", AsyncMock(side_effect=owned)),
+        ):
+            await batch_worker.process_job(1, "me")
+        return db
+
+    async def test_complete_not_written(self, mock_settings):
+        # Owned for the items_total commit, reclaimed before "complete"
+        db = await self._process(
+            mock_settings,
+            [{"event": "complete", "items": [{}], "summary": {}}],
+            owned=[True, False],
+        )
+        assert db.commit.await_count == 1
+        db.rollback.assert_awaited()
+
+    async def test_error_not_written_over_new_owner(self, mock_settings):
+        # Reclaimed while classifying; the failure's error event is fenced too
+        db = await self._process(
+            mock_settings, [{"event": "phase"}, RuntimeError("boom")], owned=[True, True, False],
+        )
+        assert db.commit.await_count == 2
+        assert db.rollback.await_count == 2
+
+
+class TestStreamResume:
+
+    def _client(self, events_by_call, settings):
+        app = FastAPI()
+        app.include_router(batch_route.router, prefix="/api/v1")
+        db = _session()
+        db.execute.return_value = MagicMock(scalar_one_or_none=MagicMock(return_value=1))
+        app.dependency_overrides[get_db] = lambda: db
+
+        @asynccontextmanager
+        async def session():
+            yield _session()
+
+        read_events = AsyncMock(side_effect=events_by_call)
+        patches = (
+            patch.object(batch_route, "get_session_factory", return_value=session),
+            patch.object(batch_route, "read_events", read_events),
+            patch.object(batch_route, "get_settings", return_value=settings),
+        )
+        return TestClient(app), read_events, patches
+
+    def test_resumes_after_last_event_id(self, mock_settings):
+        rows = [
+            BatchJobEvent(seq=6, payload={"event": "item_progress", "index": 3}),
+            BatchJobEvent(seq=7, payload={"event": "error", "message": "failed"}),
+        ]
+        client, read_events, (p1, p2, p3) = self._client([rows], mock_settings)
+        with p1, p2, p3:
+            response = client.get("/api/v1/batch/1/stream?after=2", headers={"Last-Event-ID": "5"})
+
+        assert read_events.await_args.kwargs["after_seq"] == 5
+        assert response.text.startswith("id: 6\ndata: ")
+        assert response.text.rstrip().endswith('"message": "failed"}')
+        assert read_events.await_count == 1  # Stopped at the terminal event
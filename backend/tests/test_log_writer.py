@@ -0,0 +1,129 @@
+"""
+Tests for non-blocking structured logging (services/log_writer.py).
+
+These tests verify that:
+  1. Queued lines are written by the writer thread, in order, and what's
+     still queued is written on close
+  2. A full queue drops lines and counts them instead of blocking
+  3. Listed events are sampled at their rate and tagged with it; other
+     events always pass
+  4. configure_logging() sends rendered lines through the writer
+  5. LOG_SAMPLE_RATES parses into a map, and dropped lines show on /metrics
+"""
+
+import io
+import json
+import threading
+from unittest.mock import patch
+
+import pytest
+import structlog
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from hts_oracle.routes import metrics as metrics_route
+from hts_oracle.services import log_writer
+from hts_oracle.services.log_writer import LogWriter
+
+
+@pytest.fixture(autouse=True)
+def clean_stats():
+    log_writer.reset_log_stats()
+    yield
+    log_writer.reset_log_stats()
+
+
+class BlockingStream(io.StringIO):
+    """A stdout whose write() waits until released — a full container log pipe."""
+
+    def __init__(self):
+        super().__init__()
+        self.entered = threading.Event()
+        self.release = threading.Event()
+
+    def write(self, text):
+        self.entered.set()
+        self.release.wait(5)
+        return super().write(text)
+
+
+class TestWriter:
+
+    def test_lines_written_in_order(self):
+        stream = io.StringIO()
+        writer = LogWriter(stream, maxsize=1000)
+        for i in range(500):
+            writer.put(f"line {i}")
+        writer.close()
+        assert stream.getvalue().splitlines() == [f"line {i}" for i in range(500)]
+        assert log_writer.log_stats()["written"] == 500
+
+    def test_full_queue_drops_without_blocking(self):
+        stream = BlockingStream()
+        writer = LogWriter(stream, maxsize=2)
+        writer.put("a")
+        assert stream.entered.wait(5)  # The writer is stuck in write("a")
+        for line in "bcde":
+            writer.put(line)           # Returns at once
+        assert log_writer.log_stats()["dropped"] == 2
+
+        stream.release.set()
+        writer.close()
+        assert stream.getvalue().splitlines() == ["a", "b", "c"]
+
+
+class TestSampling:
+
+    def test_rates(self):
+        sample = log_writer.sampler({"search_complete": 0.1, "embedding_query": 0.0})
+        with patch.object(log_writer.random, "random", return_value=0.05):
+            assert sample(None, "info", {"event": "search_complete"}) == {
+                "event": "search_complete", "sample_rate": 0.1,
+            }
+            with pytest.raises(structlog.DropEvent):
+                sample(None, "info", {"event": "embedding_query"})
+        with patch.object(log_writer.random, "random", return_value=0.5):
+            with pytest.raises(structlog.DropEvent):
+                sample(None, "info", {"event": "search_complete"})
+            assert sample(None, "warning", {"event": "claude_failed"}) == {"event": "claude_failed"}
+        assert log_writer.log_stats()["sampled_out"] == 2
+
+    def test_rate_map(self, mock_settings):
+        mock_settings.log_sample_rates = "search_complete=0.1, embedding_query=0"
+        assert mock_settings.log_sample_rate_map == {"search_complete": 0.1, "embedding_query": 0.0}
+        mock_settings.log_sample_rates = ""
+        assert mock_settings.log_sample_rate_map == {}
+
+
+class TestConfigure:
+
+    def test_lines_go_through_the_writer(self, mock_settings):
+        previous = structlog.get_config()
+        mock_settings.environment = "production"
+        mock_settings.log_sample_rates = "embedding_query=0"
+        stream = io.StringIO()
+        try:
+            with patch.object(log_writer, "_writer", None):
+                log_writer.configure_logging(mock_settings, stream=stream)
+                log = structlog.get_logger()
+                log.info("embedding_query", query="cotton")
+                log.info("search_complete", results=10)
+                log_writer.stop_log_writer()
+        finally:
+            structlog.configure(**previous)
+
+        lines = [json.loads(line) for line in stream.getvalue().splitlines()]
+        assert [(line["event"], line["level"]) for line in lines] == [("search_complete", "info")]
+        assert lines[0]["results"] == 10
+
+
+class TestMetrics:
+
+    def test_dropped_on_scrape(self):
+        log_writer._stats["dropped"] = 7
+        app = FastAPI()
+        app.include_router(metrics_route.router)
+        with patch.object(metrics_route, "pool_stats", return_value={}):
+            response = TestClient(app).get("/metrics")
+        assert "hts_oracle_log_records_dropped_total 7" in response.text
+        assert "hts_oracle_log_queue_depth" in response.text
@@ -0,0 +1,52 @@
+"""
+Tests for the microbenchmark suite (benchmarks/microbench.py).
+
+These tests verify that:
+  1. Every case still runs against the current code
+  2. The Mann-Whitney test tells shifted samples from noise
+  3. Only a slowdown that is both over the threshold and significant
+     counts as a regression
+"""
+
+import random
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "benchmarks"))
+
+import microbench  # noqa: E402
+
+
+class TestCases:
+
+    def test_every_case_runs(self):
+        for name, setup in microbench.CASES.items():
+            function = setup()
+            function()
+            assert microbench.measure(function, repeat=2, warmup=0, min_time=0.0001), name
+
+
+class TestComparison:
+
+    def _samples(self, center: float, seed: int) -> list[float]:
+        rng = random.Random(seed)
+        return [center * rng.uniform(0.97, 1.03) for _ in range(25)]
+
+    def test_mann_whitney(self):
+        same = microbench.mann_whitney_p(self._samples(100, 1), self._samples(100, 2))
+        shifted = microbench.mann_whitney_p(self._samples(120, 1), self._samples(100, 2))
+        assert same > 0.05
+        assert shifted < 0.001
+        assert microbench.mann_whitney_p([5.0] * 10, [5.0] * 10) == 1.0
+
+    def test_regression_needs_threshold_and_significance(self):
+        baseline = {"samples_ns": self._samples(100, 2)}
+        def regressed(samples, base):
+            return microbench.compare("x", samples, base, threshold=0.10, alpha=0.01)[1]
+
+        slower = regressed(self._samples(120, 1), baseline)
+        small = regressed(self._samples(105, 1), baseline)
+        faster = regressed(self._samples(80, 1), baseline)
+        assert (slower, small, faster) == (True, False, False)
+        noisy = {"samples_ns": [100.0, 300.0] * 5}
+        assert not regressed([120.0, 330.0] * 5, noisy)  # 12.5% slower median, but within the noise
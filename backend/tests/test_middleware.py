@@ -0,0 +1,106 @@
+"""
+Tests for the ASGI middleware stack.
+
+These tests verify that:
+  1. Security headers are added to every response, replacing any the route set
+  2. Streaming responses pass through chunk by chunk — the first SSE event
+     arrives before the stream finishes (no buffering in the middleware)
+  3. Rate limit headers are added to streamed responses too
+  4. Non-HTTP scopes (lifespan) pass straight through
+"""
+
+import asyncio
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from starlette.responses import PlainTextResponse, StreamingResponse
+
+from hts_oracle.middleware import RateLimitMiddleware, SecurityHeadersMiddleware
+from hts_oracle.services.rate_limiter import MemoryBackend, RateLimit, RateLimiter
+
+
+def _app(events: list[str]) -> FastAPI:
+    app = FastAPI()
+    app.add_middleware(SecurityHeadersMiddleware)
+    app.add_middleware(
+        RateLimitMiddleware, limiter=RateLimiter(MemoryBackend(), default=RateLimit(100, 60)),
+    )
+
+    @app.get("/plain")
+    async def plain():
+        return PlainTextResponse("ok", headers={"X-Frame-Options": "SAMEORIGIN"})
+
+    @app.get("/stream")
+    async def stream():
+        async def generate():
+            for i in range(3):
+                events.append(f"sent {i}")
+                yield f"data: {i}\n\n"
+                await asyncio.sleep(0.01)
+        return StreamingResponse(generate(), media_type="text/event-stream")
+
+    return app
+
+
+class TestSecurityHeaders:
+
+    def test_added_and_replaced(self):
+        response = TestClient(_app([])).get("/plain")
+        assert response.headers["X-Content-Type-Options"] == "nosniff"
+        assert response.headers["Referrer-Policy"] == "strict-origin-when-cross-origin"
+        # The route's own value is replaced, never duplicated
+        assert response.headers.get_list("X-Frame-Options") == ["DENY"]
+
+
+class TestStreaming:
+
+    async def test_chunks_pass_through_unbuffered(self):
+        # Driven as raw ASGI: the test client buffers bodies itself
+        events: list[str] = []
+        app = _app(events)
+        messages = []
+
+        async def receive():
+            return {"type": "http.request", "body": b"", "more_body": False}
+
+        async def send(message):
+            messages.append(message)
+            if message["type"] == "http.response.body" and message.get("body"):
+                events.append(f"received {message['body'].decode().strip()}")
+
+        scope = {
+            "type": "http", "asgi": {"version": "3.0", "spec_version": "2.4"},
+            "http_version": "1.1",
+            "method": "GET", "scheme": "http", "path": "/stream", "raw_path": b"/stream",
+            "root_path": "", "query_string": b"", "headers": [],
+            "client": ("203.0.113.7", 5000), "server": ("test", 80),
+        }
+        await app(scope, receive, send)
+
+        # Each event reaches the client before the next one is generated
+        assert events == [
+            "sent 0", "received data: 0",
+            "sent 1", "received data: 1",
+            "sent 2", "received data: 2",
+        ]
+        headers = dict(messages[0]["headers"])
+        assert headers[b"x-frame-options"] == b"DENY"
+        assert headers[b"x-ratelimit-limit"] == b"100"
+
+
+class TestLifespan:
+
+    def test_lifespan_passes_through(self):
+        started = []
+        app = _app([])
+
+        @asynccontextmanager
+        async def lifespan(app):
+            started.append(True)
+            yield
+
+        app.router.lifespan_context = lifespan
+        with TestClient(app):
+            pass
+        assert started == [True]
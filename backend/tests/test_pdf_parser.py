@@ -0,0 +1,221 @@
+"""
+Tests for chunked commodity extraction.
+
+These tests verify that:
+  1. chunk_text() splits on line boundaries, overlaps chunks, and covers all text
+  2. extract_commodities() merges chunk results in document order
+  3. Items reported by two overlapping chunks are kept only once — but
+     only when they sit in the overlap, not anywhere in the neighbour,
+     and the concurrent calls are timed once by wall clock
+  4. The process pool parses a real PDF split into page ranges, in order
+     once merged, and records the parse's wall time as one pdf_parse stage
+     (not the sum of its parallel ranges)
+  5. A document that times out has only its own processes killed: another
+     document's parse in the same pool finishes normally
+
+Claude is never called — _extract_chunk is patched per test.
+"""
+
+import asyncio
+import time
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+from hts_oracle.services import metrics, pdf_parser, timing
+from hts_oracle.services.pdf_parser import PdfTask, chunk_text, extract_commodities
+
+FIXTURE_PDF = Path(__file__).parent / "fixtures" / "three_page_invoice.pdf"
+
+
+@pytest.fixture(autouse=True)
+def patch_settings(mock_settings):
+    mock_settings.extraction_chunk_chars = 60
+    mock_settings.extraction_overlap_lines = 1
+    mock_settings.extraction_concurrency = 2
+    with patch("hts_oracle.services.pdf_parser.get_settings", return_value=mock_settings):
+        yield
+
+
+INVOICE = "\n".join(f"Line {i:02d}: cotton shirts, 10 pcs, $50" for i in range(12))
+
+
+class TestChunkText:
+    """Tests for splitting invoice text into chunks."""
+
+    def test_short_text_is_one_chunk(self):
+        assert chunk_text("one line\ntwo lines", max_chars=100, overlap_lines=2) == [
+            "one line\ntwo lines"
+        ]
+
+    def test_chunks_are_line_aligned_and_bounded(self):
+        chunks = chunk_text(INVOICE, max_chars=120, overlap_lines=1)
+
+        assert len(chunks) > 1
+        original_lines = set(INVOICE.splitlines())
+        for chunk in chunks:
+            assert len(chunk) <= 120
+            assert set(chunk.splitlines()) <= original_lines  # No line cut in half
+
+    def test_chunks_overlap(self):
+        """Each chunk starts with the last line of the previous one."""
+        chunks = chunk_text(INVOICE, max_chars=120, overlap_lines=1)
+
+        for previous, current in zip(chunks, chunks[1:]):
+            assert current.splitlines()[0] == previous.splitlines()[-1]
+
+    def test_every_line_is_covered(self):
+        chunks = chunk_text(INVOICE, max_chars=120, overlap_lines=1)
+
+        covered = {line for chunk in chunks for line in chunk.splitlines()}
+        assert covered == set(INVOICE.splitlines())
+
+    def test_hard_splits_overlong_lines(self):
+        chunks = chunk_text("x" * 250, max_chars=100, overlap_lines=0)
+        assert [len(c) for c in chunks] == [100, 100, 50]
+
+
+class TestExtractCommodities:
+    """Tests for merging per-chunk Claude results."""
+
+    async def test_merges_chunks_in_document_order(self):
+        """Chunks finishing out of order still produce document order."""
+        async def fake_extract(text, index, total):
+            await asyncio.sleep(0.01 * (total - index))  # Last chunk finishes first
+            return [{"description": f"item {index}", "quantity": None, "value": None}]
+
+        with patch("hts_oracle.services.pdf_parser._extract_chunk", side_effect=fake_extract):
+            items = await extract_commodities(INVOICE)
+
+        indexes = [int(item["description"].split()[1]) for item in items]
+        assert indexes == list(range(len(indexes)))
+        assert len(indexes) > 1
+
+    async def test_drops_duplicates_from_overlap(self):
+        """An item seen by two neighbouring chunks is returned once."""
+        shared = {"description": "Steel bolts M10", "quantity": "100 pcs", "value": "$20"}
+
+        async def fake_extract(text, index, total):
+            items = [{"description": f"item {index}", "quantity": None, "value": None}]
+            if index == 0:
+                items.append(shared)  # Last line of chunk 0...
+            if index == 1:
+                items.insert(0, dict(shared, description="steel  bolts m10"))  # ...first of chunk 1
+            return items
+
+        with patch("hts_oracle.services.pdf_parser._extract_chunk", side_effect=fake_extract):
+            items = await extract_commodities(INVOICE)
+
+        bolts = [i for i in items if "bolts" in i["description"].lower()]
+        assert len(bolts) == 1
+
+    async def test_keeps_repeats_outside_the_overlap(self):
+        """The same item listed again deeper in the next chunk is a real line."""
+        repeated = {"description": "Steel bolts M10", "quantity": "100 pcs", "value": "$20"}
+
+        async def fake_extract(text, index, total):
+            if index == 0:
+                return [{"description": "Nuts", "quantity": None, "value": None}, repeated]
+            if index == 1:
+                return [{"description": "Washers", "quantity": None, "value": None}, repeated]
+            return []
+
+        with patch("hts_oracle.services.pdf_parser._extract_chunk", side_effect=fake_extract):
+            items = await extract_commodities(INVOICE)
+
+        assert items.count(repeated) == 2
+
+    async def test_keeps_genuine_repeats_within_a_chunk(self):
+        """Two identical lines in one chunk are two items, not a duplicate."""
+        repeated = {"description": "Cotton towels", "quantity": "10", "value": "$30"}
+
+        async def fake_extract(text, index, total):
+            return [repeated, repeated] if index == 0 else []
+
+        with patch("hts_oracle.services.pdf_parser._extract_chunk", side_effect=fake_extract):
+            items = await extract_commodities(INVOICE)
+
+        assert items == [repeated, repeated]
+
+    async def test_extract_timed_by_wall_clock(self):
+        """Concurrent chunk calls are one extract stage: their wall time, not their sum."""
+        async def fake_extract(text, index, total):
+            await asyncio.sleep(0.1)
+            return []
+
+        metrics.reset()
+        with patch("hts_oracle.services.pdf_parser._extract_chunk", side_effect=fake_extract):
+            with timing.collect() as timings:
+                await extract_commodities(INVOICE)
+        chunks = len(chunk_text(INVOICE, 60, 1))
+        # Two at a time (extraction_concurrency): about half the summed calls
+        assert 100 * (chunks // 2) <= timings["extract"] < 100 * chunks * 0.75
+        assert metrics.histogram("extract").count == 1
+        metrics.reset()
+
+    async def test_empty_text_makes_no_calls(self):
+        with patch("hts_oracle.services.pdf_parser._extract_chunk") as mock_extract:
+            assert await extract_commodities("   ") == []
+        mock_extract.assert_not_called()
+
+
+def stuck_page_range(source, start, end, with_tables=False):
+    """Stands in for pdf_pages.extract_page_range on a pathological PDF (runs in a worker)."""
+    time.sleep(60)
+
+
+def slow_page_range(source, start, end, with_tables=False):
+    """pdf_pages.extract_page_range taking a second per range (runs in a worker)."""
+    from hts_oracle.services.pdf_pages import extract_page_range
+
+    time.sleep(1)
+    return extract_page_range(source, start, end, with_tables)
+
+
+class TestPdfPool:
+    """Parsing in the worker processes, against a small three-page PDF."""
+
+    @pytest.fixture(autouse=True)
+    def pool(self, mock_settings):
+        mock_settings.pdf_workers = 3
+        mock_settings.pdf_pages_per_task = 1
+        yield
+        pdf_parser.shutdown_pdf_pool(kill=True)
+
+    async def test_page_ranges_in_parallel(self):
+        pages = [page async for page in pdf_parser.iter_pdf_pages(str(FIXTURE_PDF))]
+        assert sorted(page.index for page in pages) == [0, 1, 2]
+        assert {page.page_count for page in pages} == {3}
+
+        text = await pdf_parser.extract_text_from_pdf(FIXTURE_PDF.read_bytes())
+        assert [line.split()[3] for line in text.split("\n\n")] == ["1", "2", "3"]
+        assert "Stainless steel hex bolts" in text
+
+    async def test_parse_timed_by_wall_clock(self):
+        with patch.object(pdf_parser.pdf_pages, "extract_page_range", slow_page_range):
+            # Warm up: start the workers and have them import this module
+            _ = [page async for page in pdf_parser.iter_pdf_pages(str(FIXTURE_PDF))]
+            metrics.reset()
+            with timing.collect() as timings:
+                pages = [page async for page in pdf_parser.iter_pdf_pages(str(FIXTURE_PDF))]
+        assert len(pages) == 3
+        # Three one-second ranges side by side: about one second, not three
+        assert 1000 <= timings["pdf_parse"] < 2500
+        assert metrics.histogram("pdf_parse").count == 1
+        metrics.reset()
+
+    async def test_timeout_kills_only_that_document(self, mock_settings):
+        mock_settings.pdf_parse_timeout_seconds = 3
+        other = asyncio.ensure_future(pdf_parser._run_in_pool(PdfTask(time.sleep, 4)))
+
+        started = time.monotonic()
+        with patch.object(pdf_parser.pdf_pages, "extract_page_range", stuck_page_range):
+            with pytest.raises(TimeoutError):
+                async for _ in pdf_parser.iter_pdf_pages(str(FIXTURE_PDF)):
+                    pass
+        assert time.monotonic() - started < 10
+
+        assert await other is None  # Its process was left alone
+        pages = [page async for page in pdf_parser.iter_pdf_pages(str(FIXTURE_PDF))]
+        assert len(pages) == 3      # Killed processes are replaced
@@ -0,0 +1,183 @@
+"""
+Tests for the sampling profiler.
+
+These tests verify that:
+  1. The sampler records the target thread's stacks, root first, with counts
+  2. Requests are profiled only when sampled or asked for with a valid admin key,
+     and the profile's name comes back in X-Profile
+  3. Only one profile runs at a time, and each is capped at max_seconds
+  4. Old profiles are pruned beyond max_files, and only our own file
+     names can be downloaded
+  5. The admin endpoints switch the sample rate and list profiles,
+     and refuse when the profiler isn't enabled
+"""
+
+import threading
+import time
+from collections import Counter
+from unittest.mock import patch
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from hts_oracle.middleware import ProfilerMiddleware
+from hts_oracle.routes import admin
+from hts_oracle.services.profiler import Profiler, Sampler, render
+
+
+def _busy_function(stop: threading.Event) -> None:
+    while not stop.is_set():
+        sum(range(1000))
+
+
+class TestSampler:
+
+    def test_samples_target_thread(self):
+        stop = threading.Event()
+        worker = threading.Thread(target=_busy_function, args=(stop,))
+        worker.start()
+        try:
+            sampler = Sampler(worker.ident, interval=0.001, max_seconds=5)
+            sampler.start()
+            time.sleep(0.1)
+            stacks = sampler.stop()
+        finally:
+            stop.set()
+            worker.join()
+
+        assert sum(stacks.values()) > 5
+        top_stack = stacks.most_common(1)[0][0]
+        frames = top_stack.split(";")
+        assert frames[0].startswith("threading.py:")  # Root first
+        assert "test_profiler.py:_busy_function" in frames
+
+    def test_stops_at_max_seconds(self):
+        sampler = Sampler(threading.get_ident(), interval=0.001, max_seconds=0.05)
+        sampler.start()
+        sampler.join(timeout=2)
+        assert not sampler.is_alive()
+
+    def test_render_collapsed(self):
+        text = render(Counter({"a.py:main;b.py:work": 3, "a.py:main": 1}))
+        assert text == "a.py:main;b.py:work 3\na.py:main 1\n"
+
+
+class TestProfiler:
+
+    def test_one_profile_at_a_time(self, tmp_path):
+        profiler = Profiler(tmp_path, interval_ms=1)
+        first = profiler.start("GET", "/api/v1/classify")
+        assert first is not None
+        assert profiler.start("GET", "/api/v1/classify") is None
+        first.finish()
+        second = profiler.start("GET", "/api/v1/classify")
+        assert second is not None
+        second.finish()
+        assert len(profiler.list_profiles()) == 2
+
+    def test_prunes_oldest(self, tmp_path):
+        profiler = Profiler(tmp_path, max_files=3)
+        for i in range(5):
+            path = tmp_path / f"2026{i}-get-x-1.collapsed"
+            path.write_text("a 1\n")
+            time.sleep(0.01)
+        assert profiler.prune() == 2
+        assert sorted(p.name[:5] for p in tmp_path.iterdir()) == ["20262", "20263", "20264"]
+
+    def test_path_for_only_our_files(self, tmp_path):
+        profiler = Profiler(tmp_path)
+        (tmp_path / "x-get-api-1.collapsed").write_text("a 1\n")
+        (tmp_path / "secrets.txt").write_text("no")
+        assert profiler.path_for("x-get-api-1.collapsed") is not None
+        assert profiler.path_for("secrets.txt") is None
+        assert profiler.path_for("../x-get-api-1.collapsed") is None
+
+
+class TestMiddleware:
+
+    def _client(self, profiler: Profiler) -> TestClient:
+        app = FastAPI()
+        app.add_middleware(ProfilerMiddleware, profiler=profiler)
+
+        @app.get("/api/v1/classify")
+        async def classify():
+            time.sleep(0.02)  # Something to sample
+            return {"ok": True}
+
+        return TestClient(app)
+
+    def test_not_profiled_by_default(self, tmp_path, mock_settings):
+        mock_settings.admin_api_key = "s3cret"
+        with patch("hts_oracle.middleware.get_settings", return_value=mock_settings):
+            client = self._client(Profiler(tmp_path))
+            assert "X-Profile" not in client.get("/api/v1/classify").headers
+            # Asking without the admin key doesn't count
+            response = client.get(
+                "/api/v1/classify", headers={"X-Profile": "1", "X-Admin-Key": "wrong"},
+            )
+        assert "X-Profile" not in response.headers
+        assert list(tmp_path.iterdir()) == []
+
+    def test_profiled_on_request(self, tmp_path, mock_settings):
+        mock_settings.admin_api_key = "s3cret"
+        with patch("hts_oracle.middleware.get_settings", return_value=mock_settings):
+            client = self._client(Profiler(tmp_path, interval_ms=1))
+            response = client.get(
+                "/api/v1/classify", headers={"X-Profile": "1", "X-Admin-Key": "s3cret"},
+            )
+
+        name = response.headers["X-Profile"]
+        assert "-get-api_v1_classify-" in name
+        content = (tmp_path / name).read_text()
+        assert "test_profiler.py:TestMiddleware._client.<locals>.classify" in content
+
+    def test_sample_rate(self, tmp_path):
+        client = self._client(Profiler(tmp_path, sample_rate=1.0, interval_ms=1))
+        for _ in range(3):
+            assert "X-Profile" in client.get("/api/v1/classify").headers
+        assert len(list(tmp_path.iterdir())) == 3
+
+
+class TestAdminEndpoints:
+
+    @pytest.fixture
+    def client(self, tmp_path, mock_settings):
+        mock_settings.admin_api_key = "s3cret"
+        mock_settings.profiler_enabled = True
+        app = FastAPI()
+        app.include_router(admin.router, prefix="/api/v1")
+        profiler = Profiler(tmp_path)
+        with patch.object(admin, "get_settings", return_value=mock_settings), \
+             patch.object(admin, "get_profiler", return_value=profiler):
+            yield TestClient(app, headers={"X-Admin-Key": "s3cret"}), mock_settings, tmp_path
+
+    def test_switch_sample_rate(self, client):
+        client, _, _ = client
+        response = client.put("/api/v1/admin/profiler", json={"sample_rate": 0.05})
+        assert response.json()["sample_rate"] == 0.05
+        assert client.put("/api/v1/admin/profiler", json={"sample_rate": 2}).status_code == 422
+
+    def test_list_and_download(self, client):
+        client, _, directory = client
+        name = "20261018T101500000-get-api_v1_classify-1.collapsed"
+        (directory / name).write_text("a.py:main 4\n")
+        profiles = client.get("/api/v1/admin/profiles").json()["profiles"]
+        assert [p["name"] for p in profiles] == [name]
+        download = client.get(profiles[0]["url"])
+        assert download.text == "a.py:main 4\n"
+        assert client.get("/api/v1/admin/profiles/missing.collapsed").status_code == 404
+
+    def test_disabled(self, client):
+        client, settings, _ = client
+        settings.profiler_enabled = False
+        assert client.get("/api/v1/admin/profiler").status_code == 503
+
+    def test_requires_admin_key(self, client):
+        client, _, _ = client
+        response = client.get("/api/v1/admin/profiles", headers={"X-Admin-Key": "nope"})
+        assert response.status_code == 401
+        response = client.get(
+            "/api/v1/admin/profiles", headers={"X-Admin-Key": "n\xf6pe".encode("latin-1")},
+        )
+        assert response.status_code == 401
@@ -0,0 +1,301 @@
+"""
+Tests for the rate limiter.
+
+These tests verify that:
+  1. Limits parse from "60/minute" / "10/30s" and bad specs are refused
+  2. The sliding window weights the previous window by its remaining overlap
+  3. The in-memory backend allows up to the limit, rejects with a
+     Retry-After, rolls over windows and sweeps idle keys
+  4. Two shared-memory backends on one file (= two workers) share counts,
+     waiting for the other's lock doesn't block the event loop, and a key
+     with a short window doesn't take over a live longer-window key's slot
+  5. Per-route limits use the longest matching prefix, count separately,
+     and exempt paths aren't limited
+  6. The middleware returns 429 with Retry-After and X-RateLimit headers,
+     and requests with a valid X-Admin-Key aren't limited
+
+The Postgres backend's SQL isn't covered here (no database in tests).
+"""
+
+import asyncio
+import fcntl
+import os
+from unittest.mock import patch
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from hts_oracle.middleware import RateLimitMiddleware
+from hts_oracle.services.rate_limiter import (
+    MemoryBackend,
+    RateLimit,
+    RateLimiter,
+    SharedMemoryBackend,
+    build_rate_limiter,
+    parse_limit,
+    sliding_window,
+)
+
+
+class Clock:
+    def __init__(self, now: float = 1_000_020.0):  # 20s into a minute window
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestParseLimit:
+
+    def test_units(self):
+        assert parse_limit("60/minute") == RateLimit(60, 60)
+        assert parse_limit("5/second") == RateLimit(5, 1)
+        assert parse_limit("100/hours") == RateLimit(100, 3600)
+        assert parse_limit("10/30s") == RateLimit(10, 30)
+
+    @pytest.mark.parametrize("spec", ["", "60", "x/minute", "60/fortnight", "0/minute"])
+    def test_invalid(self, spec):
+        with pytest.raises(ValueError):
+            parse_limit(spec)
+
+
+class TestSlidingWindow:
+
+    def test_previous_window_weighted_by_overlap(self):
+        limit = RateLimit(10, 60)
+        # 30s into the window: half of the previous window's 10 still count
+        decision = sliding_window(previous=10, current=4, limit=limit, now=30.0)
+        assert decision.allowed
+        assert decision.remaining == 0  # 5 + 4 + this one = 10
+
+        decision = sliding_window(previous=10, current=5, limit=limit, now=30.0)
+        assert not decision.allowed
+        # Allowed once 10 × (1 − t) + 5 + 1 ≤ 10 → t = 0.6 → 6s from now
+        assert decision.retry_after == pytest.approx(6.0)
+
+    def test_full_current_window_waits_for_next_window(self):
+        decision = sliding_window(previous=0, current=10, limit=RateLimit(10, 60), now=45.0)
+        assert not decision.allowed
+        assert decision.retry_after == pytest.approx(15.0)
+
+
+class TestMemoryBackend:
+
+    async def test_allows_up_to_limit_then_rejects(self):
+        backend = MemoryBackend(clock=Clock())
+        limit = RateLimit(3, 60)
+        results = [await backend.hit("ip", limit) for _ in range(4)]
+        assert [d.allowed for d in results] == [True, True, True, False]
+        assert [d.remaining for d in results[:3]] == [2, 1, 0]
+        assert results[3].retry_after > 0
+
+    async def test_rejected_requests_are_not_counted(self):
+        clock = Clock()
+        backend = MemoryBackend(clock=clock)
+        limit = RateLimit(2, 60)
+        for _ in range(10):
+            await backend.hit("ip", limit)
+        # Two windows later nothing carries over, however many were rejected
+        clock.now += 120
+        assert (await backend.hit("ip", limit)).remaining == 1
+
+    async def test_keys_are_independent(self):
+        backend = MemoryBackend(clock=Clock())
+        limit = RateLimit(1, 60)
+        assert (await backend.hit("a", limit)).allowed
+        assert not (await backend.hit("a", limit)).allowed
+        assert (await backend.hit("b", limit)).allowed
+
+    async def test_previous_window_carries_over(self):
+        clock = Clock(now=1_000_020.0)
+        backend = MemoryBackend(clock=clock)
+        limit = RateLimit(4, 60)
+        for _ in range(4):
+            await backend.hit("ip", limit)
+        # Just into the next window, almost all of the 4 still count
+        clock.now = 1_000_080.0 + 1
+        assert not (await backend.hit("ip", limit)).allowed
+        # Near its end, they've nearly decayed
+        clock.now = 1_000_080.0 + 55
+        assert (await backend.hit("ip", limit)).allowed
+
+    async def test_sweeps_idle_keys(self):
+        clock = Clock()
+        backend = MemoryBackend(clock=clock, sweep_seconds=60)
+        limit = RateLimit(5, 60)
+        for i in range(50):
+            await backend.hit(f"ip-{i}", limit)
+        assert len(backend) == 50
+        clock.now += 180
+        await backend.hit("new", limit)
+        assert len(backend) == 1
+
+    async def test_max_keys_caps_memory(self):
+        backend = MemoryBackend(clock=Clock(), max_keys=10)
+        for i in range(100):
+            await backend.hit(f"ip-{i}", RateLimit(5, 60))
+        assert len(backend) <= 10
+
+
+class TestSharedMemoryBackend:
+
+    async def test_workers_share_counts(self, tmp_path):
+        path = tmp_path / "ratelimit"
+        clock = Clock()
+        worker_a = SharedMemoryBackend(path, slots=64, clock=clock)
+        worker_b = SharedMemoryBackend(path, slots=64, clock=clock)
+        limit = RateLimit(4, 60)
+        try:
+            assert (await worker_a.hit("ip", limit)).allowed
+            assert (await worker_b.hit("ip", limit)).allowed
+            assert (await worker_a.hit("ip", limit)).allowed
+            assert (await worker_b.hit("ip", limit)).remaining == 0
+            assert not (await worker_a.hit("ip", limit)).allowed
+        finally:
+            worker_a.close()
+            worker_b.close()
+
+    async def test_lock_wait_yields_to_the_loop(self, tmp_path):
+        path = tmp_path / "ratelimit"
+        backend = SharedMemoryBackend(path, slots=8, clock=Clock())
+        other = os.open(path, os.O_RDWR)
+        fcntl.flock(other, fcntl.LOCK_EX)  # Another worker is mid-update
+        try:
+            hit = asyncio.create_task(backend.hit("ip", RateLimit(5, 60)))
+            await asyncio.sleep(0.01)
+            assert not hit.done()          # Waiting — but this coroutine still ran
+            fcntl.flock(other, fcntl.LOCK_UN)
+            assert (await asyncio.wait_for(hit, 1)).allowed
+        finally:
+            os.close(other)
+            backend.close()
+
+    async def test_full_table_reuses_slots(self, tmp_path):
+        clock = Clock()
+        backend = SharedMemoryBackend(tmp_path / "ratelimit", slots=8, clock=clock)
+        limit = RateLimit(1, 60)
+        try:
+            for i in range(100):  # Far more keys than slots
+                assert (await backend.hit(f"ip-{i}", limit)).allowed
+            # Idle slots are reclaimed once their windows are old
+            clock.now += 120
+            assert (await backend.hit("ip-0", limit)).allowed
+            assert not (await backend.hit("ip-0", limit)).allowed
+        finally:
+            backend.close()
+
+    async def test_live_slot_of_a_longer_window_kept(self, tmp_path):
+        clock = Clock()
+        backend = SharedMemoryBackend(tmp_path / "ratelimit", slots=2, clock=clock)
+        hashes = {"hourly": 2, "minutely": 4}  # Both probe slot 0 first, then 1
+        hourly, minutely = RateLimit(2, 3600), RateLimit(60, 60)
+        try:
+            with patch.object(SharedMemoryBackend, "_hash", staticmethod(hashes.get)):
+                for _ in range(2):
+                    assert (await backend.hit("hourly", hourly)).allowed
+                assert (await backend.hit("minutely", minutely)).allowed
+                assert not (await backend.hit("hourly", hourly)).allowed
+        finally:
+            backend.close()
+
+
+class TestRateLimiter:
+
+    def _limiter(self):
+        return RateLimiter(
+            MemoryBackend(clock=Clock()),
+            default=RateLimit(60, 60),
+            routes={"/api/v1/batch": RateLimit(20, 60), "/api/v1/batch/upload": RateLimit(2, 60)},
+            exempt=("/health",),
+        )
+
+    def test_longest_prefix_wins(self):
+        limiter = self._limiter()
+        upload = limiter.limit_for("/api/v1/batch/upload")
+        assert upload == ("/api/v1/batch/upload", RateLimit(2, 60))
+        assert limiter.limit_for("/api/v1/batch/7/items") == ("/api/v1/batch", RateLimit(20, 60))
+        assert limiter.limit_for("/api/v1/classify") == ("*", RateLimit(60, 60))
+        assert limiter.limit_for("/api/v1/health") is None
+
+    async def test_route_groups_counted_separately(self):
+        limiter = self._limiter()
+        await limiter.check("ip", "/api/v1/batch/upload")
+        await limiter.check("ip", "/api/v1/batch/upload")
+        assert not (await limiter.check("ip", "/api/v1/batch/upload")).allowed
+        assert (await limiter.check("ip", "/api/v1/classify")).allowed
+
+    def test_built_from_settings(self, mock_settings):
+        mock_settings.rate_limit_routes = "/api/v1/batch/upload=10/minute, /api/v1/admin=5/30s"
+        limiter = build_rate_limiter(mock_settings)
+        assert isinstance(limiter.backend, MemoryBackend)
+        assert limiter.limit_for("/api/v1/admin/stats") == ("/api/v1/admin", RateLimit(5, 30))
+
+        mock_settings.rate_limit_backend = "redis"
+        with pytest.raises(ValueError, match="RATE_LIMIT_BACKEND"):
+            build_rate_limiter(mock_settings)
+
+
+class TestMiddleware:
+
+    def _client(self):
+        app = FastAPI()
+        limiter = RateLimiter(
+            MemoryBackend(), default=RateLimit(2, 60), exempt=("/health",),
+        )
+        app.add_middleware(RateLimitMiddleware, limiter=limiter)
+
+        @app.get("/api/v1/classify")
+        async def classify():
+            return {"ok": True}
+
+        @app.get("/api/v1/health")
+        async def health():
+            return {"status": "healthy"}
+
+        return TestClient(app)
+
+    def test_429_with_headers(self):
+        client = self._client()
+        first = client.get("/api/v1/classify")
+        assert first.status_code == 200
+        assert first.headers["X-RateLimit-Limit"] == "2"
+        assert first.headers["X-RateLimit-Remaining"] == "1"
+        client.get("/api/v1/classify")
+
+        rejected = client.get("/api/v1/classify")
+        assert rejected.status_code == 429
+        assert int(rejected.headers["Retry-After"]) >= 1
+
+    def test_health_exempt(self):
+        client = self._client()
+        for _ in range(5):
+            response = client.get("/api/v1/health")
+            assert response.status_code == 200
+            assert "X-RateLimit-Limit" not in response.headers
+
+    def test_admin_key_not_limited(self, mock_settings):
+        mock_settings.admin_api_key = "secret"
+        client = self._client()
+        with patch("hts_oracle.middleware.get_settings", return_value=mock_settings):
+            def get(key):
+                return client.get("/api/v1/classify", headers={"X-Admin-Key": key}).status_code
+
+            assert [get("secret") for _ in range(5)] == [200] * 5
+            assert [get("wrong") for _ in range(3)] == [200, 200, 429]
+
+    def test_non_ascii_admin_key(self, mock_settings):
+        mock_settings.admin_api_key = "secret"
+        client = self._client()
+        with patch("hts_oracle.middleware.get_settings", return_value=mock_settings):
+            key = "s\xe9cret".encode("latin-1")
+            response = client.get("/api/v1/classify", headers={"X-Admin-Key": key})
+        assert response.status_code == 200
+
+    def test_clients_limited_by_forwarded_ip(self):
+        client = self._client()
+        for _ in range(2):
+            client.get("/api/v1/classify", headers={"X-Forwarded-For": "203.0.113.7"})
+        blocked = client.get("/api/v1/classify", headers={"X-Forwarded-For": "203.0.113.7"})
+        other = client.get("/api/v1/classify", headers={"X-Forwarded-For": "198.51.100.2"})
+        assert (blocked.status_code, other.status_code) == (429, 200)
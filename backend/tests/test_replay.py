@@ -0,0 +1,123 @@
+"""
+Tests for traffic replay (cli/replay.py).
+
+These tests verify that:
+  1. A replay file round-trips and keeps the recorded inter-arrival offsets
+  2. Timed replay sends each request at its offset divided by the speed;
+     max speed sends them back to back
+  3. Refinements are sent as request fields
+  4. Rate-limited requests, other errors, latency and drift against the
+     recorded answers are summarized
+"""
+
+import argparse
+import json
+import time
+from dataclasses import asdict
+
+import httpx
+import pytest
+
+from hts_oracle.cli import replay
+from hts_oracle.cli.replay import Outcome, Recorded
+
+
+def _record(
+    at: str,
+    query: str = "cotton t-shirts",
+    code: str | None = "6109.10.00.12",
+    method: str = "vector_only",
+):
+    return Recorded(
+        at=at, query=query, refinements={}, top_hts_code=code, method=method, latency_ms=120,
+    )
+
+
+def _app(sent: list):
+    """A stand-in /classify: 6109.10.00.14 for queries about shirts, 500 for anything else."""
+    def handler(request: httpx.Request) -> httpx.Response:
+        body = json.loads(request.content)
+        sent.append((time.monotonic(), body))
+        if "shirt" not in body["query"]:
+            return httpx.Response(500)
+        return httpx.Response(200, json={
+            "results": [{"hts_code": "6109.10.00.14"}, {"hts_code": "6109.10.00.12"}],
+            "method": "llm_assisted",
+        })
+    return httpx.MockTransport(handler)
+
+
+class TestReplayFile:
+
+    def test_round_trip_and_offsets(self, tmp_path):
+        records = [_record("2026-10-01T09:00:01.500000"), _record("2026-10-01T09:00:00")]
+        path = tmp_path / "traffic.jsonl"
+        path.write_text("".join(json.dumps(asdict(r)) + "\n" for r in records))
+        loaded = replay.load(path)
+        assert loaded == sorted(records, key=lambda r: r.at)
+        assert replay.offsets(loaded) == [0.0, 1.5]
+
+
+class TestReplay:
+
+    async def test_keeps_timing_at_speed(self):
+        sent = []
+        records = [
+            _record("2026-10-01T09:00:00"),
+            _record("2026-10-01T09:00:01"),
+            _record("2026-10-01T09:00:03"),
+        ]
+        async with httpx.AsyncClient(base_url="http://target", transport=_app(sent)) as client:
+            outcomes, _ = await replay.replay(client, records, speed=10, concurrency=4)
+        gaps = [b[0] - sent[0][0] for b in sent]
+        assert gaps[1] == pytest.approx(0.1, abs=0.05)
+        assert gaps[2] == pytest.approx(0.3, abs=0.05)
+        assert all(o.status == 200 for o in outcomes)
+
+    async def test_max_speed(self):
+        sent = []
+        records = [_record("2026-10-01T09:00:00"), _record("2026-10-01T10:00:00")]
+        async with httpx.AsyncClient(base_url="http://target", transport=_app(sent)) as client:
+            _, seconds = await replay.replay(client, records, speed=None, concurrency=4)
+        assert seconds < 1
+
+    async def test_refinements_sent(self):
+        sent = []
+        record = _record("2026-10-01T09:00:00")
+        record.refinements = {"material": "cotton", "form": None}
+        async with httpx.AsyncClient(base_url="http://target", transport=_app(sent)) as client:
+            await replay.replay(client, [record], speed=None, concurrency=1)
+        assert sent[0][1] == {"query": "cotton t-shirts", "material": "cotton"}
+
+    def test_speed_argument(self):
+        assert replay._speed("max") is None
+        assert replay._speed("10") == 10.0
+        with pytest.raises(argparse.ArgumentTypeError):
+            replay._speed("0")
+
+
+class TestSummary:
+
+    def test_errors_latency_and_drift(self):
+        outcomes = [
+            Outcome(_record("2026-10-01T09:00:00"), 200, 100.0, 0.0,
+                    ["6109.10.00.12", "6109.10.00.14"], "vector_only"),
+            Outcome(_record("2026-10-01T09:00:01"), 200, 300.0, 0.0,
+                    ["6109.10.00.14", "6109.10.00.12"], "llm_assisted"),
+            Outcome(_record("2026-10-01T09:00:02", code="7318.15.20"), 200, 700.0, 250.0,
+                    ["6109.10.00.14"], "llm_assisted"),
+            Outcome(_record("2026-10-01T09:00:04", query="steel bolts"), 429, 5.0, 0.0),
+        ]
+        summary = replay.summarize(outcomes, seconds=2.0)
+        assert (summary["requests"], summary["ok"], summary["rate_limited"]) == (4, 3, 1)
+        assert summary["errors"] == {}
+        assert (summary["qps"], summary["recorded_qps"], summary["late"]) == (2.0, 1.0, 1)
+        assert summary["p50_ms"] == 300.0
+        assert summary["histogram"]["<250"] == 1 and summary["histogram"]["<1000"] == 1
+        assert summary["top1_changed"] == pytest.approx(2 / 3, abs=0.001)
+        assert summary["recorded_in_top5"] == pytest.approx(2 / 3, abs=0.001)
+        assert summary["llm_recorded"] == 0.0
+        assert summary["llm_replayed"] == pytest.approx(0.667, abs=0.001)
+        assert summary["changed_examples"][0] == {
+            "query": "cotton t-shirts", "recorded": "6109.10.00.12", "replayed": "6109.10.00.14",
+        }
@@ -0,0 +1,243 @@
+"""
+Tests for the shadow-table rebuild (import_hts --rebuild).
+
+These tests verify that:
+  1. Phase timings accumulate per phase and total up
+  2. The swap moves sequence ownership before dropping the live table,
+     then renames the shadow table and its indexes into place
+  3. The swap runs in a single transaction; the live table's other
+     indexes are built on the shadow beforehand and renamed into place,
+     its grants re-issued, and index definitions that can't be rewritten
+     are refused
+  4. A rebuild loads into the shadow table and swaps it in — unless a
+     batch failed, in which case the shadow table is dropped instead
+  5. A failed embedding call also aborts a build (rebuild, or a revision
+     with --activate): nothing is swapped in or activated, and the JSON
+     summary reports ok: false
+
+Index builds and the swap itself need a live Postgres and aren't run here.
+"""
+
+from contextlib import nullcontext
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from hts_oracle.cli import bulk_upsert, catalog, shadow_table
+from hts_oracle.cli.import_hts import import_csv
+from hts_oracle.cli.shadow_table import (
+    SHADOW_TABLE,
+    PhaseTimings,
+    copy_index,
+    swap_in,
+    swap_statements,
+)
+
+
+class TestPhaseTimings:
+
+    def test_phases_accumulate_in_order(self):
+        timings = PhaseTimings()
+        with timings.phase("load"):
+            pass
+        with timings.phase("index"):
+            pass
+        with timings.phase("load"):
+            pass
+        assert list(timings.phases) == ["load", "index"]
+        assert timings.total == sum(timings.phases.values())
+        assert "total" in timings.report()
+
+    def test_failed_phase_is_still_timed(self):
+        timings = PhaseTimings()
+        try:
+            with timings.phase("swap"):
+                raise RuntimeError("lock timeout")
+        except RuntimeError:
+            pass
+        assert "swap" in timings.phases
+
+
+class TestSwapStatements:
+
+    def test_sequence_ownership_moves_before_drop(self):
+        statements = swap_statements("public.hts_codes_id_seq")
+        owned = statements.index(
+            f"ALTER SEQUENCE public.hts_codes_id_seq OWNED BY {SHADOW_TABLE}.id",
+        )
+        assert owned < statements.index("DROP TABLE hts_codes")
+
+    def test_shadow_renamed_then_indexes_take_live_names(self):
+        statements = swap_statements(None)
+        renamed = statements.index(f"ALTER TABLE {SHADOW_TABLE} RENAME TO hts_codes")
+        index_renames = [s for s in statements if s.startswith("ALTER INDEX")]
+        embedding = f"ALTER INDEX ix_{SHADOW_TABLE}_embedding RENAME TO ix_hts_codes_embedding"
+        assert embedding in index_renames
+        assert all(statements.index(s) > renamed for s in index_renames)
+        assert not any("SEQUENCE" in s for s in statements)
+
+    def test_lock_is_taken_first(self):
+        statements = swap_statements(None)
+        assert statements[0].startswith("SET LOCAL lock_timeout")
+        assert statements[1] == "LOCK TABLE hts_codes IN ACCESS EXCLUSIVE MODE"
+
+    def _conn(self, indexes=(), grants=()):
+        conn = MagicMock()
+        conn.fetchval = AsyncMock(return_value="public.hts_codes_id_seq")
+        conn.fetch = AsyncMock(side_effect=[list(indexes), list(grants)])
+        conn.execute = AsyncMock()
+        transaction = MagicMock()
+        transaction.__aenter__ = AsyncMock()
+        transaction.__aexit__ = AsyncMock(return_value=False)
+        conn.transaction.return_value = transaction
+        return conn
+
+    async def test_swap_runs_in_one_transaction(self):
+        conn = self._conn(indexes=[  # Only the ones the rebuild makes itself
+            {"indexname": "hts_codes_pkey", "indexdef": "CREATE UNIQUE INDEX ..."},
+            {"indexname": "ix_hts_codes_embedding", "indexdef": "CREATE INDEX ..."},
+        ])
+
+        await swap_in(conn)
+
+        conn.transaction.assert_called_once()
+        executed = [call.args[0] for call in conn.execute.await_args_list]
+        assert executed == swap_statements("public.hts_codes_id_seq")
+
+    async def test_extra_indexes_and_grants_carried_over(self):
+        conn = self._conn(
+            indexes=[{
+                "indexname": "ix_hts_codes_chapter",
+                "indexdef": "CREATE INDEX ix_hts_codes_chapter ON public.hts_codes "
+                            "USING btree (chapter) WHERE (is_leaf)",
+            }],
+            grants=[{"privilege_type": "SELECT", "grantee": "readonly", "is_grantable": False}],
+        )
+
+        await swap_in(conn)
+
+        executed = [call.args[0] for call in conn.execute.await_args_list]
+        create = (
+            f"CREATE INDEX ix_{SHADOW_TABLE}_copy0 ON {SHADOW_TABLE} "
+            f"USING btree (chapter) WHERE (is_leaf)"
+        )
+        locked = executed.index("LOCK TABLE hts_codes IN ACCESS EXCLUSIVE MODE")
+        assert executed.index(create) < locked
+        renamed = executed.index(f"ALTER TABLE {SHADOW_TABLE} RENAME TO hts_codes")
+        rename_index = f"ALTER INDEX ix_{SHADOW_TABLE}_copy0 RENAME TO ix_hts_codes_chapter"
+        assert executed.index(rename_index) > renamed
+        assert executed[-1] == "GRANT SELECT ON hts_codes TO readonly"
+
+    def test_unrecognised_index_refused(self):
+        with pytest.raises(RuntimeError, match="Can't copy index"):
+            copy_index(0, "CREATE INDEX weird ON hts_codes")
+
+
+def _write_csv(path, numbers):
+    header = ["HTS Number", "Original Description", "Enriched Text", "Context Path", "Is Leaf Node"]
+    lines = [",".join(header)] + [f"{n},Other,Text for {n},,Yes" for n in numbers]
+    path.write_text("\n".join(lines) + "\n")
+
+
+class TestRebuildImport:
+    """import_csv(rebuild=True) with the database and OpenAI mocked."""
+
+    async def _run(self, tmp_path, mock_settings, upsert, embed_error=None, **kwargs):
+        path = tmp_path / "hts.csv"
+        _write_csv(path, ["0101.21.0000", "0101.29.0000"])
+        openai_client = MagicMock()
+        openai_client.embeddings.create = AsyncMock(
+            return_value=MagicMock(
+                data=[MagicMock(embedding=[0.1]), MagicMock(embedding=[0.2])],
+                usage=MagicMock(total_tokens=10),
+            ),
+        )
+        conn = MagicMock(fetchval=AsyncMock(return_value="2026-01-01"), close=AsyncMock())
+        mocks = {
+            "create_shadow": AsyncMock(return_value=5),
+            "prune_stale": AsyncMock(return_value=1),
+            "build_indexes": AsyncMock(),
+            "swap_in": AsyncMock(),
+            "drop_shadow": AsyncMock(),
+        }
+        revision_mocks = {
+            "create_revision": AsyncMock(return_value=(7, "hts_codes_r7")),
+            "mark_ready": AsyncMock(),
+            "mark_failed": AsyncMock(),
+            "activate": AsyncMock(),
+        }
+        embed = AsyncMock(side_effect=embed_error) if embed_error else None
+        with (
+            patch("hts_oracle.cli.import_hts.get_settings", return_value=mock_settings),
+            patch("hts_oracle.cli.import_hts.AsyncOpenAI", return_value=openai_client),
+            patch.object(bulk_upsert, "connect", AsyncMock(return_value=conn)),
+            patch.object(catalog, "active_revision", AsyncMock(return_value=(None, "hts_codes"))),
+            patch.object(bulk_upsert, "fetch_current_embed_hashes", AsyncMock(return_value={})),
+            patch.object(bulk_upsert, "upsert_batch", side_effect=upsert),
+            patch.multiple(shadow_table, **mocks),
+            patch.multiple(catalog, **revision_mocks),
+            patch("hts_oracle.cli.import_hts.emit_json") as emit_json,
+            patch("hts_oracle.cli.import_hts.embed_with_retry", embed) if embed else nullcontext(),
+        ):
+            await import_csv(str(path), **(kwargs or {"rebuild": True}))
+        self.summary = next(
+            (c.args[0] for c in emit_json.call_args_list if c.args[0].get("event") == "summary"),
+            None,
+        )
+        return {**mocks, **revision_mocks}, path
+
+    async def test_loads_into_shadow_and_swaps(self, tmp_path, mock_settings):
+        tables = []
+
+        async def upsert(conn, records, stats, table=bulk_upsert.LIVE_TABLE):
+            tables.append(table)
+
+        mocks, path = await self._run(tmp_path, mock_settings, upsert)
+
+        assert tables == [SHADOW_TABLE]
+        mocks["prune_stale"].assert_awaited_once()
+        mocks["build_indexes"].assert_awaited_once()
+        mocks["swap_in"].assert_awaited_once()
+        mocks["drop_shadow"].assert_not_awaited()
+        assert not path.with_name(path.name + ".import-checkpoint.json").exists()
+
+    async def test_failed_batch_keeps_live_table(self, tmp_path, mock_settings):
+        async def upsert(conn, records, stats, table=bulk_upsert.LIVE_TABLE):
+            raise ConnectionError("connection reset")
+
+        mocks, _ = await self._run(tmp_path, mock_settings, upsert)
+
+        mocks["build_indexes"].assert_not_awaited()
+        mocks["swap_in"].assert_not_awaited()
+        mocks["drop_shadow"].assert_awaited_once()
+
+    async def test_failed_embedding_keeps_live_table(self, tmp_path, mock_settings):
+        async def upsert(conn, records, stats, table=bulk_upsert.LIVE_TABLE):
+            pass
+
+        mocks, _ = await self._run(
+            tmp_path, mock_settings, upsert, embed_error=RuntimeError("rate limited"),
+            rebuild=True, progress_json=True,
+        )
+
+        mocks["prune_stale"].assert_not_awaited()
+        mocks["swap_in"].assert_not_awaited()
+        mocks["drop_shadow"].assert_awaited_once()
+        assert self.summary["ok"] is False
+        assert self.summary["failed_embeddings"] == 1
+
+    async def test_failed_embedding_does_not_activate_revision(self, tmp_path, mock_settings):
+        async def upsert(conn, records, stats, table=bulk_upsert.LIVE_TABLE):
+            pass
+
+        mocks, _ = await self._run(
+            tmp_path, mock_settings, upsert, embed_error=RuntimeError("rate limited"),
+            revision=True, activate=True, progress_json=True,
+        )
+
+        mocks["activate"].assert_not_awaited()
+        mocks["mark_ready"].assert_not_awaited()
+        mocks["mark_failed"].assert_awaited_once()
+        assert mocks["mark_failed"].await_args.args[1] == 7
+        assert self.summary["ok"] is False
+        assert self.summary["activated"] is False
@@ -0,0 +1,192 @@
+"""
+Tests for structured invoice uploads (CSV / XLSX / JSON).
+
+These tests verify that:
+  1. Columns are detected from common header names, or from a column map
+  2. Each format's rows come out as {description, quantity, value} items
+  3. Unusable files and column maps fail with a readable message
+  4. A file with more line items than max_items is refused, whatever its
+     format
+
+No PDF parsing or Claude calls are involved — that's the point.
+"""
+
+import json
+
+import pytest
+
+from hts_oracle.services.structured_invoice import (
+    StructuredFileError,
+    format_for_filename,
+    iter_structured_items,
+    parse_column_map,
+    read_structured_items,
+)
+
+CSV_EXPORT = (
+    "Item Description,Qty,UOM,Unit Price,Line Total\n"
+    "Cotton t-shirts men's,500,pcs,5.00,2500.00\n"
+    "Steel hex bolts M10x40,10000,pcs,0.085,850.00\n"
+    ",,,,\n"
+)
+
+
+class TestFormatDetection:
+
+    def test_structured_extensions(self):
+        assert format_for_filename("orders.CSV") == "csv"
+        assert format_for_filename("export.xlsx") == "xlsx"
+        assert format_for_filename("items.json") == "json"
+
+    def test_other_files_are_not_structured(self):
+        assert format_for_filename("invoice.pdf") is None
+        assert format_for_filename("README") is None
+
+
+class TestCsv:
+    """Tests for CSV exports."""
+
+    def test_detects_columns_from_header(self):
+        items = read_structured_items(CSV_EXPORT.encode(), "csv")
+
+        assert items == [
+            {"description": "Cotton t-shirts men's", "quantity": "500 pcs", "value": "2500.00"},
+            {"description": "Steel hex bolts M10x40", "quantity": "10000 pcs", "value": "850.00"},
+        ]
+
+    def test_reads_from_a_path(self, tmp_path):
+        """The local blob store hands the worker a file path, not bytes."""
+        path = tmp_path / "export.csv"
+        path.write_bytes(CSV_EXPORT.encode())
+
+        assert len(read_structured_items(str(path), "csv")) == 2
+
+    def test_column_map_overrides_detection(self):
+        data = b"Part,Part Desc,Ship Qty,Ext Amt\nA-1,Wool scarves,20,$300\n"
+        column_map = {"description": "Part Desc", "quantity": "ship qty", "value": "Ext Amt"}
+
+        items = read_structured_items(data, "csv", column_map)
+
+        assert items == [{"description": "Wool scarves", "quantity": "20", "value": "$300"}]
+
+    def test_semicolon_delimited_with_bom(self):
+        """European Excel exports: BOM + semicolons."""
+        data = "﻿Description;Quantity;Amount\nCeramic mugs;48;96,00\n".encode()
+
+        items = read_structured_items(data, "csv")
+
+        assert items == [{"description": "Ceramic mugs", "quantity": "48", "value": "96,00"}]
+
+    def test_skips_title_rows_before_header(self):
+        data = b"ACME Corp export\n\nDescription,Qty\nRubber gaskets,100\n"
+
+        assert read_structured_items(data, "csv") == [
+            {"description": "Rubber gaskets", "quantity": "100", "value": None},
+        ]
+
+    def test_no_header_raises(self):
+        data = b"foo,bar\n1,2\n"
+
+        with pytest.raises(StructuredFileError, match="column_map"):
+            read_structured_items(data, "csv")
+
+    def test_missing_mapped_column_raises(self):
+        with pytest.raises(StructuredFileError, match="Part Desc"):
+            read_structured_items(CSV_EXPORT.encode(), "csv", {"description": "Part Desc"})
+
+    def test_rows_are_streamed(self):
+        """Items come out one at a time, not after the whole file is read."""
+        rows = iter_structured_items(CSV_EXPORT.encode(), "csv")
+
+        assert next(rows)["description"] == "Cotton t-shirts men's"
+
+
+class TestJson:
+    """Tests for JSON exports."""
+
+    def test_array_of_objects(self):
+        data = json.dumps([
+            {"description": "LED bulbs", "qty": 200, "amount": 180.5},
+            {"description": "Glass vases", "qty": 12},
+        ]).encode()
+
+        items = read_structured_items(data, "json")
+
+        assert items == [
+            {"description": "LED bulbs", "quantity": "200", "value": "180.5"},
+            {"description": "Glass vases", "quantity": "12", "value": None},
+        ]
+
+    def test_items_wrapper(self):
+        data = json.dumps({"items": [{"Product": "Leather belts", "Quantity": 5}]}).encode()
+
+        assert read_structured_items(data, "json")[0]["description"] == "Leather belts"
+
+    def test_not_a_list_raises(self):
+        with pytest.raises(StructuredFileError, match="array of objects"):
+            read_structured_items(b'{"invoice": 42}', "json")
+
+    def test_invalid_json_raises(self):
+        with pytest.raises(StructuredFileError, match="not valid JSON"):
+            read_structured_items(b"[{", "json")
+
+
+class TestMaxItems:
+    """Tests for the line-item cap."""
+
+    def test_at_the_limit_is_fine(self):
+        assert len(read_structured_items(CSV_EXPORT.encode(), "csv", max_items=2)) == 2
+
+    @pytest.mark.parametrize("source_format", ["csv", "json"])
+    def test_over_the_limit_raises(self, source_format):
+        rows = [{"description": f"Item {n}", "qty": n} for n in range(5)]
+        data = {
+            "csv": "description,qty\n" + "".join(f"Item {n},{n}\n" for n in range(5)),
+            "json": json.dumps(rows),
+        }[source_format].encode()
+
+        with pytest.raises(StructuredFileError, match="more than 3 line items"):
+            read_structured_items(data, source_format, max_items=3)
+
+
+class TestXlsx:
+    """Tests for XLSX exports (skipped when openpyxl isn't installed)."""
+
+    def test_reads_first_sheet(self, tmp_path):
+        openpyxl = pytest.importorskip("openpyxl")
+        workbook = openpyxl.Workbook()
+        sheet = workbook.active
+        sheet.append(["Description", "Quantity", "Total"])
+        sheet.append(["Bamboo cutting boards", 300.0, 1200.0])
+        path = tmp_path / "export.xlsx"
+        workbook.save(path)
+
+        items = read_structured_items(str(path), "xlsx")
+
+        assert items == [
+            {"description": "Bamboo cutting boards", "quantity": "300", "value": "1200"},
+        ]
+
+
+class TestColumnMap:
+    """Tests for validating the upload's column_map field."""
+
+    def test_empty_is_none(self):
+        assert parse_column_map(None) is None
+        assert parse_column_map("") is None
+
+    def test_valid_map(self):
+        assert parse_column_map('{"description": " Item ", "value": "Total"}') == {
+            "description": "Item", "value": "Total",
+        }
+
+    @pytest.mark.parametrize("raw, message", [
+        ("not json", "JSON object"),
+        ('["Item"]', "JSON object"),
+        ('{"quantity": "Qty"}', "description"),
+        ('{"description": "Item", "hs_code": "HS"}', "Unknown column_map roles"),
+        ('{"description": ""}', "column names"),
+    ])
+    def test_invalid_maps(self, raw, message):
+        with pytest.raises(StructuredFileError, match=message):
+            parse_column_map(raw)
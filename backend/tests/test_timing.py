@@ -0,0 +1,159 @@
+"""
+Tests for stage timing spans, the Server-Timing header and /metrics.
+
+These tests verify that:
+  1. Spans add their duration to the current collection and its histogram,
+     repeated stages sum, and nested collections roll up into the outer one
+  2. Histograms count values into the right buckets and render in the
+     Prometheus text format
+  3. TimingMiddleware sends the request's stages as a Server-Timing header
+  4. classify() returns its stage timings and stores them on the audit row
+  5. GET /metrics serves the histograms plus cache and pool gauges
+"""
+
+import asyncio
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from hts_oracle.middleware import TimingMiddleware
+from hts_oracle.routes import metrics as metrics_route
+from hts_oracle.services import classifier, metrics, timing
+from hts_oracle.services.timing import span
+
+
+@pytest.fixture(autouse=True)
+def clean_metrics():
+    metrics.reset()
+    yield
+    metrics.reset()
+
+
+class TestSpans:
+
+    def test_spans_collected_and_summed(self):
+        with timing.collect() as timings:
+            with span("embed"):
+                pass
+            with span("llm"):
+                pass
+            with span("llm"):
+                pass
+        assert set(timings) == {"embed", "llm"}
+        assert metrics.histogram("llm").count == 2
+        assert timing.current() is None
+
+    def test_outside_a_collection_only_metrics(self):
+        with span("search"):
+            pass
+        assert metrics.histogram("search").count == 1
+
+    def test_nested_collection_rolls_up(self):
+        with timing.collect() as request:
+            with span("embed"):
+                pass
+            with timing.collect() as inner:
+                with span("search"):
+                    pass
+        assert set(inner) == {"search"}
+        assert set(request) == {"embed", "search"}
+        assert request["search"] == inner["search"]
+
+    async def test_concurrent_tasks_share_the_request(self):
+        async def stage(name):
+            with span(name):
+                await asyncio.sleep(0)
+
+        with timing.collect() as timings:
+            await asyncio.gather(stage("pdf_parse"), stage("pdf_parse"), stage("extract"))
+        assert set(timings) == {"pdf_parse", "extract"}
+        assert metrics.histogram("pdf_parse").count == 2
+
+    def test_server_timing_format(self):
+        header = timing.server_timing({"embed": 182.44, "search": 3.06}, total_ms=190.2)
+        assert header == "embed;dur=182.4, search;dur=3.1, total;dur=190.2"
+
+
+class TestHistogram:
+
+    def test_buckets(self):
+        histogram = metrics.Histogram("search", buckets=(1, 10, 100))
+        for value in (0.5, 1, 5, 50, 500):
+            histogram.observe(value)
+        assert histogram.counts == [2, 1, 1, 1]  # ≤1, ≤10, ≤100, +Inf
+        assert histogram.count == 5
+        assert histogram.sum == pytest.approx(556.5)
+
+    def test_render(self):
+        metrics.observe("embed", 3.0)
+        metrics.observe("embed", 300.0)
+        gauge = metrics.Gauge("db_pool_connections", 2, "Pool", labels={"state": "checked_out"})
+        text = metrics.render([gauge])
+        assert "# TYPE hts_oracle_embed_ms histogram" in text
+        assert 'hts_oracle_embed_ms_bucket{le="5"} 1' in text
+        assert 'hts_oracle_embed_ms_bucket{le="500"} 2' in text
+        assert 'hts_oracle_embed_ms_bucket{le="+Inf"} 2' in text
+        assert "hts_oracle_embed_ms_count 2" in text
+        assert 'hts_oracle_db_pool_connections{state="checked_out"} 2' in text
+
+
+class TestServerTimingHeader:
+
+    def test_header_lists_stages(self):
+        app = FastAPI()
+        app.add_middleware(TimingMiddleware)
+
+        @app.get("/work")
+        async def work():
+            with span("embed"):
+                pass
+            with span("search"):
+                pass
+            return {"ok": True}
+
+        response = TestClient(app).get("/work")
+        header = response.headers["Server-Timing"]
+        assert [part.split(";")[0] for part in header.split(", ")] == ["embed", "search", "total"]
+        assert metrics.histogram("request").count == 1
+
+
+class TestClassifyTimings:
+
+    async def test_stage_timings_returned_and_stored(self, mock_settings):
+        results = [{"hts_code": "6109.10.00", "similarity": 0.9, "confidence_score": 90.0}]
+
+        async def fake_search(text, db):
+            with span("embed"):
+                pass
+            with span("search"):
+                pass
+            return results
+
+        db = MagicMock()
+        db.commit = AsyncMock()
+        with patch.object(classifier, "get_settings", return_value=mock_settings), \
+             patch.object(classifier, "search_hts", fake_search):
+            result = await classifier.classify("cotton t-shirts", db)
+
+        assert set(result["stage_timings"]) == {"embed", "search", "db_commit"}
+        audit = db.add.call_args.args[0]
+        assert set(audit.stage_timings) == {"embed", "search"}
+        assert metrics.histogram("db_commit").count == 1
+
+
+class TestMetricsEndpoint:
+
+    def test_scrape(self):
+        metrics.observe("llm", 1200.0)
+        app = FastAPI()
+        app.include_router(metrics_route.router)
+        with patch.object(metrics_route, "pool_stats", return_value={"size": 5, "checked_out": 1}):
+            response = TestClient(app).get("/metrics")
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+        assert "hts_oracle_llm_ms_count 1" in response.text
+        assert "hts_oracle_extraction_cache_hit_rate" in response.text
+        assert 'hts_oracle_db_pool_connections{state="checked_out"} 1' in response.text
@@ -0,0 +1,138 @@
+"""
+Tests for the raw USITC CSV parser.
+
+These tests verify that:
+  1. The indent hierarchy becomes context paths, with group rows included
+  2. Leaf status comes from the next line's indent
+  3. Statistical lines inherit duty rates from their parent line
+  4. Leaf numbers are normalized to XXXX.XX.XXXX
+  5. The import detects the format and reads the shipped file, hashing
+     it in the same pass as the scan
+
+The sample is the first lines of data/hts_2026_revision_4_csv.csv.
+"""
+
+import csv
+import hashlib
+import io
+from pathlib import Path
+
+import pytest
+
+from hts_oracle.cli.import_hts import _leaf_rows, _scan, build_embed_text
+from hts_oracle.cli.usitc_parser import (
+    is_usitc_header,
+    iter_usitc_csv,
+    normalize_hts_number,
+    parse_usitc_rows,
+)
+
+SAMPLE = '''﻿HTS Number,Indent,Description,Unit of Quantity,General Rate of Duty,\
+Special Rate of Duty,Column 2 Rate of Duty,Quota Quantity,Additional Duties
+"0101","0","Live horses, asses, mules and hinnies:","","","","","",""
+"","1","Horses:","","","","","",""
+"0101.21.00","2","Purebred breeding animals","","Free","","Free","",""
+"0101.21.00.10","3","Males","[""No.""]","","","","",""
+"0101.21.00.20","3","Females","[""No.""]","","","","",""
+"0101.30.00.00","1","Asses","[""No.""]","6.8%","Free (A+,AU)","15%","",""
+"0102","0","Live bovine animals:","","","","","",""
+"","1","Cattle:","","","","","",""
+"0102.21.00","2","Purebred breeding animals","","Free","","Free","",""
+"","3","Dairy:","","","","","",""
+"0102.21.00.10","4","Male","[""No.""]","","","","",""
+"0102.90.40","1","Other","[""No.""]","1%","","","",""
+'''
+
+DATA_FILE = Path(__file__).parents[2] / "data" / "hts_2026_revision_4_csv.csv"
+
+
+def _parse(text: str = SAMPLE, **kwargs) -> dict[str, dict]:
+    rows = parse_usitc_rows(csv.reader(io.StringIO(text.lstrip("﻿"))), **kwargs)
+    return {row["HTS Number"]: row for row in rows}
+
+
+class TestHierarchy:
+
+    def test_only_leaves_by_default(self):
+        assert list(_parse()) == [
+            "0101.21.0010", "0101.21.0020", "0101.30.0000", "0102.21.0010", "0102.90.4000",
+        ]
+
+    def test_context_path_includes_group_rows(self):
+        row = _parse()["0102.21.0010"]
+
+        path = "Live bovine animals > Cattle > Purebred breeding animals > Dairy"
+        assert row["Context Path"] == path
+        assert row["Enhanced Description"].startswith("Male (Live bovine animals > Cattle")
+
+    def test_shallower_line_closes_deeper_ancestors(self):
+        """Asses (indent 1) isn't under Horses (indent 1) or its children."""
+        assert _parse()["0101.30.0000"]["Context Path"] == "Live horses, asses, mules and hinnies"
+
+    def test_non_leaves_marked_when_requested(self):
+        rows = _parse(leaves_only=False)
+
+        assert rows["0101.21.00"]["Is Leaf Node"] == "No"
+        assert rows["0101.21.0010"]["Is Leaf Node"] == "Yes"
+        assert "" not in rows  # Group rows have no number and are never emitted
+
+
+class TestRatesAndNumbers:
+
+    def test_statistical_lines_inherit_rates(self):
+        row = _parse()["0101.21.0010"]
+
+        assert row["General Rate of Duty"] == "Free"
+        assert row["Unit of Quantity"] == '["No."]'
+
+    def test_own_rates_win(self):
+        row = _parse()["0101.30.0000"]
+
+        assert row["General Rate of Duty"] == "6.8%"
+        assert row["Special Rate of Duty"] == "Free (A+,AU)"
+
+    @pytest.mark.parametrize("raw, normalized", [
+        ("0101.21.00.10", "0101.21.0010"),
+        ("0101210010", "0101.21.0010"),
+        ("0102.90.40", "0102.90.4000"),   # 8-digit leaf: implied "00" suffix
+        ("0101", "0101"),
+    ])
+    def test_normalize(self, raw, normalized):
+        assert normalize_hts_number(raw) == normalized
+
+    def test_chapter(self):
+        assert _parse()["0102.90.4000"]["Category"] == "01"
+
+
+class TestImportIntegration:
+
+    def test_detects_format(self):
+        assert is_usitc_header(["﻿HTS Number", "Indent", "Description"])
+        assert not is_usitc_header(["HTS Number", "Indent", "Description", "Is Leaf Node"])
+
+    def test_import_reads_usitc_file(self, tmp_path):
+        path = tmp_path / "usitc.csv"
+        path.write_text(SAMPLE, encoding="utf-8")
+
+        rows = list(_leaf_rows(path))
+
+        assert len(rows) == 5
+        # The path is already in the enhanced description — not repeated
+        assert build_embed_text(rows[0]).count("Purebred breeding animals") == 1
+
+    def test_scan_hashes_the_file_as_it_parses(self, tmp_path):
+        path = tmp_path / "usitc.csv"
+        path.write_text(SAMPLE, encoding="utf-8")
+
+        file_hash, keys = _scan(path)
+
+        assert file_hash == hashlib.sha256(path.read_bytes()).hexdigest()
+        assert [number for _, number, _ in keys] == [row["HTS Number"] for row in _leaf_rows(path)]
+
+    @pytest.mark.skipif(not DATA_FILE.exists(), reason="USITC data file not present")
+    def test_full_file(self):
+        numbers = [row["HTS Number"] for row in iter_usitc_csv(DATA_FILE)]
+
+        assert len(numbers) > 20_000
+        assert len(set(numbers)) == len(numbers)
+        assert all(len(n) == 12 for n in numbers)
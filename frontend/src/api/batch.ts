@@ -68,11 +68,22 @@ export interface BatchSummary {
 // ---------------------------------------------------------------------------
 
 /**
- * Upload a PDF for batch classification. Returns a job_id.
+ * Upload an invoice (PDF, or a CSV / XLSX / JSON line-item export) for batch
+ * classification. Returns a job_id.
+ *
+ * columnMap names a structured file's columns, e.g.
+ * { description: "Item", quantity: "Qty", value: "Total" }. Without it the
+ * backend detects them from the header row.
  */
-export async function uploadPdf(file: File): Promise<{ job_id: number; filename: string }> {
+export async function uploadPdf(
+  file: File,
+  columnMap?: Record<string, string>
+): Promise<{ job_id: number; filename: string }> {
   const formData = new FormData();
   formData.append("file", file);
+  if (columnMap) {
+    formData.append("column_map", JSON.stringify(columnMap));
+  }
 
   const response = await fetch(`${API_BASE_URL}/api/v1/batch/upload`, {
     method: "POST",
@@ -94,6 +105,10 @@ export async function uploadPdf(file: File): Promise<{ job_id: number; filename:
  * callback for each parsed event. The callback receives typed events
  * so the component doesn't need to do any parsing.
  *
+ * The job runs on a backend worker regardless of this connection, so if
+ * the stream drops before a complete/error event we reconnect with
+ * Last-Event-ID and the server replays only what we missed.
+ *
  * Returns an AbortController — call .abort() to disconnect.
  */
 export function streamBatchProgress(
@@ -102,44 +117,75 @@ export function streamBatchProgress(
   onError: (error: Error) => void,
 ): AbortController {
   const controller = new AbortController();
+  const maxReconnects = 5;
 
   // Use fetch + ReadableStream instead of EventSource.
   // EventSource doesn't support custom headers or POST requests,
   // and it auto-reconnects in ways we don't want to handle here.
   (async () => {
-    try {
-      const response = await fetch(`${API_BASE_URL}/api/v1/batch/${jobId}/stream`, {
-        signal: controller.signal,
-      });
-
-      if (!response.ok) {
-        throw new Error(`Stream connection failed (${response.status})`);
-      }
-
-      const reader = response.body!.getReader();
-      const decoder = new TextDecoder();
-      let buffer = "";
+    let lastEventId: string | null = null;
+    let finished = false;
+    let reconnects = 0;
 
-      while (true) {
-        const { done, value } = await reader.read();
-        if (done) break;
-
-        buffer += decoder.decode(value, { stream: true });
-
-        // SSE events are separated by double newlines
-        const parts = buffer.split("\n\n");
-        buffer = parts.pop()!; // Keep incomplete chunk
+    try {
+      while (!finished) {
+        const headers: Record<string, string> = {};
+        if (lastEventId) headers["Last-Event-ID"] = lastEventId;
+
+        try {
+          const response = await fetch(`${API_BASE_URL}/api/v1/batch/${jobId}/stream`, {
+            signal: controller.signal,
+            headers,
+          });
+
+          if (!response.ok) {
+            throw new Error(`Stream connection failed (${response.status})`);
+          }
 
-        for (const part of parts) {
-          const line = part.trim();
-          if (!line.startsWith("data: ")) continue;
+          const reader = response.body!.getReader();
+          const decoder = new TextDecoder();
+          let buffer = "";
+
+          while (true) {
+            const { done, value } = await reader.read();
+            if (done) break;
+
+            buffer += decoder.decode(value, { stream: true });
+
+            // SSE events are separated by double newlines
+            const parts = buffer.split("\n\n");
+            buffer = parts.pop()!; // Keep incomplete chunk
+
+            for (const part of parts) {
+              // Each event is a few "field: value" lines (id, data).
+              // Lines starting with ":" are keepalive comments.
+              let data = "";
+              for (const line of part.split("\n")) {
+                if (line.startsWith("id: ")) lastEventId = line.slice(4).trim();
+                else if (line.startsWith("data: ")) data += line.slice(6);
+              }
+              if (!data) continue;
+
+              try {
+                const event = JSON.parse(data) as BatchSSEEvent;
+                if (event.event === "complete" || event.event === "error") finished = true;
+                onEvent(event);
+              } catch {
+                // Skip malformed events
+              }
+            }
+          }
+        } catch (err) {
+          if ((err as Error).name === "AbortError") throw err;
+          if (reconnects >= maxReconnects) throw err;
+        }
 
-          try {
-            const event = JSON.parse(line.slice(6)) as BatchSSEEvent;
-            onEvent(event);
-          } catch {
-            // Skip malformed events
+        if (!finished) {
+          // Dropped mid-job — back off briefly, then resume from lastEventId
+          if (++reconnects > maxReconnects) {
+            throw new Error("Lost connection to the batch stream");
           }
+          await new Promise((resolve) => setTimeout(resolve, 1000 * reconnects));
         }
       }
     } catch (err) {
@@ -150,4 +196,4 @@ export function streamBatchProgress(
   })();
 
   return controller;
-}
\ No newline at end of file
+}
@@ -17,6 +17,7 @@ import type { BatchItem, BatchSummary } from "@/api/batch";
 const PHASE_LABELS: Record<string, string> = {
   extracting_text: "Extracting text from PDF...",
   extracting_commodities: "Identifying products...",
+  reading_rows: "Reading line items...",
   searching: "Classifying products...",
   resolving: "Resolving ambiguous items...",
 };
@@ -1,7 +1,8 @@
 /**
- * UploadZone — drag-and-drop PDF upload area.
+ * UploadZone — drag-and-drop invoice upload area.
  *
- * Accepts PDF files via drag-and-drop or file picker.
+ * Accepts PDF invoices and structured line-item exports (CSV, XLSX, JSON)
+ * via drag-and-drop or file picker.
  * Shows a visual indicator when a file is being dragged over.
  */
 
@@ -9,6 +10,14 @@ import { useState, useRef, useCallback } from "react";
 import { Upload, FileText } from "lucide-react";
 import { cn } from "@/lib/utils";
 
+// File types the batch endpoint accepts
+const ACCEPTED_EXTENSIONS = [".pdf", ".csv", ".xlsx", ".json"];
+
+function isAccepted(file: File): boolean {
+  const name = file.name.toLowerCase();
+  return ACCEPTED_EXTENSIONS.some((ext) => name.endsWith(ext));
+}
+
 interface UploadZoneProps {
   onUpload: (file: File) => void;
   isLoading: boolean;
@@ -33,7 +42,7 @@ export function UploadZone({ onUpload, isLoading }: UploadZoneProps) {
       setIsDragging(false);
 
       const file = e.dataTransfer.files[0];
-      if (file && file.type === "application/pdf") {
+      if (file && isAccepted(file)) {
         onUpload(file);
       }
     },
@@ -76,10 +85,10 @@ export function UploadZone({ onUpload, isLoading }: UploadZoneProps) {
 
       <div className="text-center">
         <p className="text-sm font-medium">
-          {isDragging ? "Drop your PDF here" : "Upload a PDF invoice"}
+          {isDragging ? "Drop your file here" : "Upload a PDF invoice or CSV / XLSX / JSON export"}
         </p>
         <p className="mt-1 text-xs text-muted-foreground">
-          Drag and drop, or click to select. Max 10MB.
+          Drag and drop, or click to select. PDFs up to 10MB, exports up to 50MB.
         </p>
       </div>
 
@@ -87,10 +96,10 @@ export function UploadZone({ onUpload, isLoading }: UploadZoneProps) {
       <input
         ref={fileInputRef}
         type="file"
-        accept=".pdf"
+        accept={ACCEPTED_EXTENSIONS.join(",")}
         onChange={handleFileSelect}
         className="hidden"
-        aria-label="Upload PDF"
+        aria-label="Upload invoice"
       />
     </div>
   );